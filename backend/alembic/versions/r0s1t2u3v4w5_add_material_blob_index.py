@@ -0,0 +1,53 @@
+"""Add blob-existence index columns to materials
+
+Revision ID: r0s1t2u3v4w5
+Revises: q9r0s1t2u3v4
+Create Date: 2026-07-20
+
+``/demo/presets`` used to LIST four whole bucket prefixes (generated/,
+examples/, users/, static/) into per-instance Python sets and drop Material
+rows whose result blob was missing. users/ grows with every subscriber's
+output, so memory and cold-listing latency grew with the customer base.
+
+The existence state is now persisted on the row:
+
+  * ``blob_missing``      — none of the row's result URLs resolve to a live
+                             object (external URLs count as live).
+  * ``blob_verified_at``  — when the background verifier last checked it
+                             (NULL = never; served until checked).
+
+Request-time filtering becomes ``blob_missing IS NOT TRUE``. The composite
+index on (is_active, blob_verified_at) serves the verifier's
+oldest-first batch scan.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'r0s1t2u3v4w5'
+down_revision = 'q9r0s1t2u3v4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'materials',
+        sa.Column('blob_missing', sa.Boolean(), nullable=False, server_default=sa.text('false')),
+    )
+    op.add_column(
+        'materials',
+        sa.Column('blob_verified_at', sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index(
+        'idx_material_blob_verified',
+        'materials',
+        ['is_active', 'blob_verified_at'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('idx_material_blob_verified', table_name='materials')
+    op.drop_column('materials', 'blob_verified_at')
+    op.drop_column('materials', 'blob_missing')
@@ -0,0 +1,35 @@
+"""Partial index for the media cleanup scan on user_generations
+
+Revision ID: s2t3u4v5w6x7
+Revises: r0s1t2u3v4w5
+Create Date: 2026-07-24
+
+``run_media_cleanup`` now expires media in bounded batches of
+``WHERE media_expired = false AND expires_at <= now() ... FOR UPDATE SKIP
+LOCKED``. The plain ``expires_at`` index also covers every already-expired
+row, which is most of the table over time. This partial index only holds
+generations that still have media, so it stays small and each batch is an
+index range scan.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 's2t3u4v5w6x7'
+down_revision = 'r0s1t2u3v4w5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'idx_user_generation_pending_expiry',
+        'user_generations',
+        ['expires_at'],
+        unique=False,
+        postgresql_where=sa.text('media_expired = false'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('idx_user_generation_pending_expiry', table_name='user_generations')
@@ -1283,13 +1283,14 @@ async def get_moderation_queue(
 
 @router.get("/materials/readiness-status")
 async def get_material_readiness_status(
+    fresh: bool = Query(default=False, description="Bypass the cached readiness snapshot"),
     db: AsyncSession = Depends(get_db),
     admin: User = Depends(require_admin)
 ):
     """Full check_all_materials() breakdown — shows exactly which tools/topics are failing."""
     from app.services.material_generator import get_material_generator
     generator = get_material_generator()
-    status = await generator.check_all_materials(db)
+    status = await generator.check_all_materials(db, use_cache=not fresh)
     failing = {k: v for k, v in status.items() if not v.get("ready", False)}
     passing = {k: v for k, v in status.items() if v.get("ready", False)}
     return {
@@ -1320,6 +1321,8 @@ async def deactivate_stale_selector_materials(
     so future re-pregeneration can overwrite them in place.
     """
     from app.models.material import Material, ToolType
+    from app.services.demo_cache_service import invalidate_demo_cache
+    from app.services.material_readiness import invalidate_readiness_snapshot
 
     targets = [
         (ToolType.TRY_ON, "model_id"),
@@ -1346,6 +1349,8 @@ async def deactivate_stale_selector_materials(
             for r in rows:
                 r.is_active = False
             await db.commit()
+            await invalidate_readiness_snapshot()
+            await invalidate_demo_cache(db, rows)
 
         summary["tools"][tool_enum.value] = {
             "selector_key": selector_key,
@@ -1371,6 +1376,7 @@ async def seed_material_readiness(
     from app.config.topic_registry import get_landing_topics, get_topic_ids_for_tool, get_topic_info
     from app.core.database import AsyncSessionLocal
     from app.models.material import Material, ToolType
+    from app.services.material_readiness import invalidate_readiness_snapshot
     from sqlalchemy import update, or_
 
     # All 8 tools the readiness check covers
@@ -1495,6 +1501,7 @@ async def seed_material_readiness(
         total_inserted += landing_inserted
 
         await session.commit()
+    await invalidate_readiness_snapshot()
 
     return {
         "success": True,
@@ -1536,6 +1543,7 @@ async def seed_demo_material(
 ):
     """Insert one pre-built demo Material row. Idempotent on lookup_hash."""
     from app.models.material import Material, ToolType, MaterialSource, MaterialStatus
+    from app.services.material_readiness import invalidate_readiness_snapshot
 
     try:
         tool_type_enum = ToolType(payload.tool_type)
@@ -1573,6 +1581,7 @@ async def seed_demo_material(
             updated = True
         if updated:
             await db.commit()
+            await invalidate_readiness_snapshot()
         return {
             "success": True,
             "inserted": False,
@@ -1611,6 +1620,7 @@ async def seed_demo_material(
     db.add(material)
     await db.commit()
     await db.refresh(material)
+    await invalidate_readiness_snapshot()
 
     return {
         "success": True,
@@ -1633,6 +1643,8 @@ async def cleanup_gcs_404_materials(
     import asyncio
     from app.services.gcs_storage_service import get_gcs_storage
     from app.models.material import Material
+    from app.services.demo_cache_service import invalidate_demo_cache
+    from app.services.material_readiness import invalidate_readiness_snapshot
     from sqlalchemy import select, and_, or_
 
     gcs = get_gcs_storage()
@@ -1662,7 +1674,7 @@ async def cleanup_gcs_404_materials(
             return None
         return clean.split(marker, 1)[1]
 
-    deactivated_ids = []
+    deactivated = []
     for m in materials:
         wm = _blob_name(m.result_watermarked_url)
         ri = _blob_name(m.result_image_url)
@@ -1674,9 +1686,13 @@ async def cleanup_gcs_404_materials(
         )
         if not has_valid:
             m.is_active = False
-            deactivated_ids.append(str(m.id))
+            deactivated.append(m)
 
     await db.commit()
+    if deactivated:
+        await invalidate_readiness_snapshot()
+        await invalidate_demo_cache(db, deactivated)
+    deactivated_ids = [str(m.id) for m in deactivated]
     logger.info(f"[cleanup-gcs-404] Deactivated {len(deactivated_ids)} materials")
     return {
         "success": True,
@@ -1701,6 +1717,71 @@ async def get_system_health(
     return await service.get_system_health()
 
 
+@router.get("/generation-queue")
+async def get_generation_queue(
+    admin: User = Depends(require_admin)
+):
+    """
+    Load-governor admission queue: in-flight count, waiters per priority
+    tier, expected wait for a newcomer and observed queue latency.
+    """
+    from app.services.load_governor import queue_stats
+
+    return await queue_stats()
+
+
+@router.get("/image-engine")
+async def get_image_engine_stats(
+    admin: User = Depends(require_admin)
+):
+    """
+    Image-engine process pool: pending jobs, rejections, and per-job-kind
+    counts with average run time (in the worker) and time spent queued.
+    """
+    from app.services.image_engine import get_image_engine
+
+    return get_image_engine().stats()
+
+
+@router.get("/segmentation-pool")
+async def get_segmentation_pool_stats(
+    admin: User = Depends(require_admin)
+):
+    """
+    Local rembg fallback pool: queue depth, in-flight images, batches, and
+    per-image latency (time queued and inference time in the worker).
+    """
+    from app.services.segmentation_pool import get_segmentation_pool
+
+    return get_segmentation_pool().stats()
+
+
+@router.get("/signed-url-cache")
+async def get_signed_url_cache_stats(
+    admin: User = Depends(require_admin)
+):
+    """
+    Signed-URL cache for this instance: LRU size, hits in the in-process and
+    Redis tiers, misses, evictions, and signing latency.
+    """
+    from app.services.gcs_storage_service import get_gcs_storage
+
+    return get_gcs_storage().signed_url_stats()
+
+
+@router.get("/gemini-cache")
+async def get_gemini_cache_stats(
+    admin: User = Depends(require_admin)
+):
+    """
+    Gemini response cache for this instance: entries, hits in the in-process
+    and Redis tiers, coalesced callers, hit ratio and Gemini time saved.
+    """
+    from app.services.gemini_cache import get_gemini_cache
+
+    return get_gemini_cache().stats()
+
+
 @router.get("/ai-services")
 async def get_ai_services_status(
     admin: User = Depends(require_admin)
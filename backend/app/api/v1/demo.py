@@ -38,6 +38,7 @@ from app.services.moderation import get_moderation_service
 from app.services.block_cache import get_block_cache
 from app.services.gemini_service import get_gemini_service
 from app.services.gcs_storage_service import get_gcs_storage
+from app.services.material_readiness import invalidate_readiness_snapshot
 from app.services.similarity import get_similarity_service
 from app.services.rescue_service import get_rescue_service
 from app.core.config import get_settings
@@ -1084,80 +1085,14 @@ async def get_presets(
         )
 
     lookup_service = get_material_lookup_service(db)
-    # Over-fetch: the GCS-existence post-filter below can drop rows whose
-    # signed-URL blobs were rotated/expired since the last cache refresh.
-    # If we asked the DB for exactly `limit` rows, and all of them happen to
-    # be stale, the endpoint returns 0 even though more matching rows exist.
-    # Pull a generous superset so the post-filter has material to work with.
-    fetch_limit = max(limit * 5, 50)
-    presets = await lookup_service.get_presets_for_tool(tool_type, topic, fetch_limit, product_id=product_id, platform=platform, role=role)
+    # Rows whose result blobs are gone (lifecycle deletes, failed pregenerate
+    # uploads, …) are excluded in SQL via Material.blob_missing, maintained by
+    # app.services.blob_index — no per-request bucket listing.
+    presets = await lookup_service.get_presets_for_tool(tool_type, topic, limit, product_id=product_id, platform=platform, role=role)
 
     from app.services.gcs_storage_service import get_gcs_storage
     gcs = get_gcs_storage()
 
-    # Drop Material rows whose primary result blob no longer exists in GCS.
-    # Stale rows (deleted by lifecycle, failed pregenerate uploads, etc.) sign
-    # successfully but the URL 404s on the browser, which makes the LandingPage
-    # hero fall back to placeholder images. We use a 5-minute cached blob
-    # listing so hot read paths stay fast.
-    if gcs.enabled and presets:
-        # Combine blob listings for the four prefixes our outputs land under:
-        #   • generated/      — pregen / runtime AI outputs (most pregen rows)
-        #   • examples/       — curated bg/fx/ps/room/avatar pairs that the
-        #                       reseed_background_removal_inputs script remaps
-        #                       bg_removal rows onto.
-        #   • users/          — runtime tool outputs are stored per-user under
-        #                       users/<user_id>/<tool>/<file>. Without this
-        #                       prefix every short_video / ai_avatar /
-        #                       live-generated seed row gets dropped.
-        #   • static/         — admin-curated demo pairs (e.g. room_redesign
-        #                       Scandinavian / Industrial / Japandi rendered
-        #                       from static/examples/_inputs/room-empty.jpg).
-        #                       Without this prefix the curated seeds were
-        #                       silently filtered out (audit 2026-05-26).
-        # 900s + stale-while-revalidate (see list_blob_names_cached): only the
-        # first gallery load per instance pays the GCS LIST cost; later loads
-        # return instantly and refresh in the background.
-        existing_gen = gcs.list_blob_names_cached("generated/", ttl_seconds=900)
-        existing_examples = gcs.list_blob_names_cached("examples/", ttl_seconds=900)
-        existing_users = gcs.list_blob_names_cached("users/", ttl_seconds=900)
-        existing_static = gcs.list_blob_names_cached("static/", ttl_seconds=900)
-        existing = (
-            (existing_gen or set())
-            | (existing_examples or set())
-            | (existing_users or set())
-            | (existing_static or set())
-        )
-        if existing:
-            def _row_has_live_blob(p) -> bool:
-                # A row is keepable if at least one of its result URLs either
-                # points outside our bucket (external CDN) or references a
-                # blob we just listed.
-                for url_attr in ("result_image_url", "result_watermarked_url", "result_video_url"):
-                    u = getattr(p, url_attr, None)
-                    if not u:
-                        continue
-                    blob_name = gcs.extract_blob_name(u, gcs.bucket_name)
-                    if blob_name is None:
-                        # External URL — assume reachable.
-                        return True
-                    if blob_name in existing:
-                        return True
-                return False
-            before = len(presets)
-            presets = [p for p in presets if _row_has_live_blob(p)]
-            dropped = before - len(presets)
-            if dropped:
-                import logging as _logging
-                _logging.getLogger(__name__).warning(
-                    "[presets/%s] Dropped %d/%d Material rows with missing GCS blobs (topic=%s).",
-                    tool_type, dropped, before, topic,
-                )
-
-    # Apply the user-requested limit AFTER GCS filtering so a stale-blob
-    # streak in the first N DB rows can't starve the response.
-    presets = presets[:limit]
-
     def _r(u):
         # Permanent public URL (no signing, no TTL) — these preset rows are the
         # shared demo cache every visitor loads; the objects are public.
@@ -1187,6 +1122,17 @@ async def get_presets(
             return c
         return None
 
+    # If the bucket uses uniform access, public_url() has to sign. Sign the
+    # whole page up front in one batch (LRU → shared Redis → concurrent
+    # signBlob off the loop) so _r() below only hits the in-process LRU.
+    await gcs.prewarm_public_urls([
+        u for p in presets for u in (
+            getattr(p, "input_image_url", None), getattr(p, "input_video_url", None),
+            getattr(p, "result_image_url", None), getattr(p, "result_video_url", None),
+            getattr(p, "result_watermarked_url", None), _safe_thumb(p),
+        )
+    ])
+
     payload = {
         "success": True,
         "tool_type": tool_type,
@@ -1950,6 +1896,7 @@ async def generate_paid_tier(
         db.add(material)
         await db.commit()
         await db.refresh(material)
+        await invalidate_readiness_snapshot()
 
         material_id = str(material.id)
 
@@ -3611,10 +3558,10 @@ async def upload_file(
         # image format, we accept and re-encode to a clean PNG. Falls
         # through to the strict validator for non-image uploads (rare;
         # this endpoint is image-only in practice).
-        from app.services.image_normalize_service import normalize_uploaded_image
+        from app.services.image_engine import get_image_engine
 
         try:
-            normalized = normalize_uploaded_image(
+            normalized = await get_image_engine().normalize(
                 content,
                 rules=COMMON_IMAGE_DIMENSION_RULES,
                 max_bytes=20 * 1024 * 1024,
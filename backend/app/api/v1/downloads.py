@@ -72,7 +72,7 @@ async def download_generation_result(
     # Preferred path: re-sign GCS URL with response-content-disposition so the
     # browser saves the file as <filename> instead of opening it inline.
     gcs = get_gcs_storage()
-    signed = gcs.refresh_signed_url(download_url, download_filename=filename)
+    signed = await gcs.refresh_signed_url_async(download_url, download_filename=filename)
     if signed and signed != download_url:
         return RedirectResponse(url=signed)
 
@@ -791,7 +791,7 @@ async def clear_conversation(
     Use this to start fresh without accumulated context.
     """
     service = get_interior_design_service()
-    cleared = service.clear_conversation(conversation_id)
+    cleared = await service.clear_conversation(conversation_id)
 
     return {
         "success": True,
@@ -1849,9 +1849,9 @@ async def demo_redesign(
     # the bytes aren't a decodable image at all.
     contents = await image.read()
     try:
-        from app.services.image_normalize_service import normalize_uploaded_image
+        from app.services.image_engine import get_image_engine
 
-        normalized = normalize_uploaded_image(
+        normalized = await get_image_engine().normalize(
             contents,
             rules=ROOM_REDESIGN_IMAGE_DIMENSION_RULES,
             max_bytes=20 * 1024 * 1024,
@@ -2490,7 +2490,6 @@ async def floorplan_house_tour_video(
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Every image_url must be a public URL")
 
     async def _work() -> Dict[str, Any]:
-        import asyncio as _asyncio
         import os as _os
         import tempfile as _tempfile
         import httpx as _httpx
@@ -2588,18 +2587,13 @@ async def floorplan_house_tour_video(
                     "-movflags", "+faststart",
                     out_path,
                 ]
-                proc = await _asyncio.create_subprocess_exec(
-                    *cmd,
-                    stdout=_asyncio.subprocess.PIPE,
-                    stderr=_asyncio.subprocess.PIPE,
-                )
-                try:
-                    _, err_bytes = await _asyncio.wait_for(proc.communicate(), timeout=300)
-                except _asyncio.TimeoutError:
-                    proc.kill()
+                from app.services.ffmpeg_runner import run_ffmpeg
+
+                result = await run_ffmpeg(cmd, timeout=300)
+                if result.timed_out:
                     return await _fail("Video assembly timed out. Please try again.")
-                if proc.returncode != 0:
-                    logger.error("house tour ffmpeg failed: %s", (err_bytes or b"")[-500:])
+                if result.returncode != 0:
+                    logger.error("house tour ffmpeg failed: %s", result.detail(500))
                     return await _fail("Video assembly failed. Please try again.")
 
                 with open(out_path, "rb") as fh:
@@ -19,10 +19,11 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy import func
 import asyncio
+import shutil
 import uuid
 import tempfile
 from pathlib import Path
-from PIL import Image, ImageOps
+from PIL import Image
 import httpx
 from io import BytesIO
 
@@ -54,6 +55,8 @@ from app.services.plan_gates import require_model_access
 from app.services.tier_config import get_user_tier
 from app.services.demo_cache_service import DemoCacheService
 from app.services.gcs_storage_service import get_gcs_storage
+from app.services.image_engine import get_image_engine
+from app.services import ffmpeg_runner
 from app.services.email_service import send_admin_tool_failure_email
 from app.services.prompt_library import lookup_prompt as _lookup_curated_prompt
 from app.services.access_gate import (
@@ -698,29 +701,20 @@ async def _run_ffmpeg_voiceover_mux(video_url: str, audio_url: str, user_id: str
         await _download_media_to_path(audio_url, input_audio)
 
         async def run_ffmpeg(args: list[str]) -> tuple[int, str]:
-            process = await asyncio.create_subprocess_exec(
-                *args,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-            )
-            stdout, stderr = await process.communicate()
-            detail = (stderr or stdout).decode("utf-8", errors="replace")[-1200:]
-            return process.returncode, detail
+            result = await ffmpeg_runner.run_ffmpeg(args)
+            return (0 if result.ok else result.returncode or -1), result.detail()
 
         # Detect whether the source video has any audio track. ffprobe is
         # already installed alongside ffmpeg in the runtime image.
         async def has_audio_stream(path: Path) -> bool:
-            probe = await asyncio.create_subprocess_exec(
+            probe = await ffmpeg_runner.run_ffprobe([
                 "ffprobe", "-v", "error",
                 "-select_streams", "a:0",
                 "-show_entries", "stream=index",
                 "-of", "csv=p=0",
                 str(path),
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-            )
-            stdout, _ = await probe.communicate()
-            return bool((stdout or b"").strip())
+            ])
+            return bool((probe.stdout or b"").strip())
 
         source_has_audio = await has_audio_stream(input_video)
 
@@ -742,18 +736,15 @@ async def _run_ffmpeg_voiceover_mux(video_url: str, audio_url: str, user_id: str
 
         # Get video duration so atrim can pin the audio to the visual length.
         async def video_duration(path: Path) -> float:
-            probe = await asyncio.create_subprocess_exec(
+            probe = await ffmpeg_runner.run_ffprobe([
                 "ffprobe", "-v", "error",
                 "-select_streams", "v:0",
                 "-show_entries", "format=duration",
                 "-of", "default=noprint_wrappers=1:nokey=1",
                 str(path),
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-            )
-            stdout, _ = await probe.communicate()
+            ])
             try:
-                return float((stdout or b"0").decode("utf-8", errors="ignore").strip() or 0)
+                return float((probe.stdout or b"0").decode("utf-8", errors="ignore").strip() or 0)
             except ValueError:
                 return 0.0
 
@@ -803,12 +794,11 @@ async def _run_ffmpeg_voiceover_mux(video_url: str, audio_url: str, user_id: str
         if returncode != 0 or not output_video.exists():
             raise RuntimeError(f"ffmpeg dubbing mux failed: {detail}")
 
-        output_bytes = output_video.read_bytes()
         output_id = uuid.uuid4().hex[:12]
         gcs = get_gcs_storage()
         if gcs.enabled:
-            return gcs.upload_public(
-                data=output_bytes,
+            return await gcs.upload_stream(
+                output_video,
                 blob_name=f"generated/video/dubbing/{user_id}/{output_id}.mp4",
                 content_type="video/mp4",
             )
@@ -817,7 +807,7 @@ async def _run_ffmpeg_voiceover_mux(video_url: str, audio_url: str, user_id: str
         output_dir.mkdir(parents=True, exist_ok=True)
         filename = f"video_dubbing_{output_id}.mp4"
         local_output = output_dir / filename
-        local_output.write_bytes(output_bytes)
+        await asyncio.to_thread(shutil.copyfile, output_video, local_output)
         public_base = os.environ.get("PUBLIC_APP_URL", "").rstrip("/") or settings.BACKEND_URL.rstrip("/")
         static_path = f"/static/generated/{filename}"
         return f"{public_base}{static_path}" if public_base else static_path
@@ -838,19 +828,15 @@ async def _extract_first_frame_to_gcs(video_url: str, user_id: str | None) -> st
 
         await _download_media_to_path(video_url, input_video)
 
-        process = await asyncio.create_subprocess_exec(
+        result = await ffmpeg_runner.run_ffmpeg([
             "ffmpeg", "-y",
             "-i", str(input_video),
             "-frames:v", "1",
             "-q:v", "2",
             str(output_image),
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-        )
-        _, stderr = await process.communicate()
-        if process.returncode != 0 or not output_image.exists():
-            detail = (stderr or b"").decode("utf-8", errors="replace")[-800:]
-            raise RuntimeError(f"ffmpeg first-frame extraction failed: {detail}")
+        ], timeout=60)
+        if not result.ok or not output_image.exists():
+            raise RuntimeError(f"ffmpeg first-frame extraction failed: {result.detail(800)}")
 
         data = output_image.read_bytes()
         output_id = uuid.uuid4().hex[:12]
@@ -2121,8 +2107,6 @@ async def _composite_cutout_on_background(
     composite is uploaded as JPEG at 92% quality. Returns the new URL,
     or None on any failure (caller falls back to the transparent PNG).
     """
-    from io import BytesIO
-
     # Download the cutout (transparent PNG from BG-removal upstream).
     try:
         async with httpx.AsyncClient(timeout=60.0, follow_redirects=True) as client:
@@ -2133,12 +2117,8 @@ async def _composite_cutout_on_background(
         logger.warning("composite: failed to download cutout %s: %s", cutout_url, fetch_err)
         return None
 
-    cutout = Image.open(BytesIO(cutout_bytes))
-    if cutout.mode != "RGBA":
-        cutout = cutout.convert("RGBA")
-    width, height = cutout.size
-
-    # Build the replacement canvas.
+    # Fetch the replacement background, if any.
+    bg_bytes = None
     if background_image_url:
         try:
             async with httpx.AsyncClient(timeout=60.0, follow_redirects=True) as client:
@@ -2148,28 +2128,17 @@ async def _composite_cutout_on_background(
         except Exception as bg_err:
             logger.warning("composite: failed to download replacement bg %s: %s", background_image_url, bg_err)
             return None
-        try:
-            bg = Image.open(BytesIO(bg_bytes)).convert("RGB")
-        except Exception as bg_open_err:
-            logger.warning("composite: replacement bg not a valid image: %s", bg_open_err)
-            return None
-        # Cover-fit: scale so the bg covers the cutout dimensions, then center-crop.
-        bw, bh = bg.size
-        scale = max(width / bw, height / bh)
-        new_w, new_h = int(bw * scale + 0.5), int(bh * scale + 0.5)
-        bg = bg.resize((new_w, new_h), Image.Resampling.LANCZOS)
-        left = (new_w - width) // 2
-        top = (new_h - height) // 2
-        canvas = bg.crop((left, top, left + width, top + height))
-    elif color is not None:
-        canvas = Image.new("RGB", (width, height), color)
-    else:
-        canvas = Image.new("RGB", (width, height), (255, 255, 255))
 
-    canvas.paste(cutout, mask=cutout.split()[-1])
-    buf = BytesIO()
-    canvas.save(buf, format="JPEG", quality=92)
-    out_bytes = buf.getvalue()
+    # Decode, cover-fit and re-encode in the image engine's process pool.
+    try:
+        out_bytes = await get_image_engine().composite_cutout(
+            cutout_bytes,
+            color=None if bg_bytes is not None else (color or (255, 255, 255)),
+            background_bytes=bg_bytes,
+        )
+    except Exception as composite_err:
+        logger.warning("composite: failed to composite cutout %s: %s", cutout_url, composite_err)
+        return None
 
     file_id = uuid.uuid4().hex[:12]
     blob_name = f"generated/image/bg_replace/{user_id}/{file_id}.jpg"
@@ -2381,6 +2350,10 @@ async def remove_background(
         )
 
 
+# Images of one /remove-bg/batch request processed at once.
+_BATCH_BG_CONCURRENCY = 4
+
+
 @router.post("/remove-bg/batch", response_model=ToolResponse)
 async def remove_background_batch(
     request: RemoveBackgroundBatchRequest,
@@ -2429,7 +2402,6 @@ async def remove_background_batch(
         input_params={"image_count": len(request.image_urls)},
     )
 
-    results = []
     provider_router = get_provider_router()
 
     # If the caller asked for an AI-generated scene, render it once and
@@ -2460,67 +2432,76 @@ async def remove_background_batch(
     if (request.output_format or "").lower() in ("white", "black"):
         flatten_color = (255, 255, 255) if request.output_format.lower() == "white" else (0, 0, 0)
 
-    for image_url in request.image_urls:
-        try:
-            # Use provider router for background removal (PiAPI)
-            result = await provider_router.route(
-                TaskType.BACKGROUND_REMOVAL,
-                {"image_url": str(image_url)},
-                user_tier=get_user_tier(current_user),
-            )
-            if result.get("success"):
-                output = result.get("output", {})
-                cutout_url = output.get("image_url")
-                cutout_url = await _persist_provider_url(cutout_url, "image", current_user)
-
-                # Apply the same priority chain as the single endpoint.
-                bg_choice = shared_ai_background or request.background_image_url
-                if cutout_url and bg_choice:
-                    try:
-                        composed = await _composite_cutout_on_background(
-                            cutout_url, current_user.id,
-                            background_image_url=str(bg_choice),
-                        )
-                        if composed:
-                            cutout_url = composed
-                    except Exception as bg_err:
-                        logger.warning("background_removal[batch]: image composite failed: %s", bg_err)
-                elif cutout_url and color_rgb is not None:
-                    try:
-                        composed = await _composite_cutout_on_background(
-                            cutout_url, current_user.id, color=color_rgb,
-                        )
-                        if composed:
-                            cutout_url = composed
-                    except Exception as bg_err:
-                        logger.warning("background_removal[batch]: color composite failed: %s", bg_err)
-                elif cutout_url and flatten_color is not None:
-                    try:
-                        composed = await _composite_cutout_on_background(
-                            cutout_url, current_user.id, color=flatten_color,
-                        )
-                        if composed:
-                            cutout_url = composed
-                    except Exception as bg_err:
-                        logger.warning("background_removal[batch]: flatten failed: %s", bg_err)
+    # Images run concurrently (bounded) instead of one after another: the
+    # provider calls overlap, and when PiAPI fails over to the local rembg
+    # fallback the segmentation pool receives them together and batches them.
+    # gather() keeps results in input order.
+    semaphore = asyncio.Semaphore(_BATCH_BG_CONCURRENCY)
 
-                results.append({
-                    "input_url": str(image_url),
-                    "result_url": cutout_url,
-                    "success": True
-                })
-            else:
-                results.append({
+    async def _process_one(image_url) -> Dict[str, Any]:
+        async with semaphore:
+            try:
+                # Use provider router for background removal (PiAPI)
+                result = await provider_router.route(
+                    TaskType.BACKGROUND_REMOVAL,
+                    {"image_url": str(image_url)},
+                    user_tier=get_user_tier(current_user),
+                )
+                if result.get("success"):
+                    output = result.get("output", {})
+                    cutout_url = output.get("image_url")
+                    cutout_url = await _persist_provider_url(cutout_url, "image", current_user)
+
+                    # Apply the same priority chain as the single endpoint.
+                    bg_choice = shared_ai_background or request.background_image_url
+                    if cutout_url and bg_choice:
+                        try:
+                            composed = await _composite_cutout_on_background(
+                                cutout_url, current_user.id,
+                                background_image_url=str(bg_choice),
+                            )
+                            if composed:
+                                cutout_url = composed
+                        except Exception as bg_err:
+                            logger.warning("background_removal[batch]: image composite failed: %s", bg_err)
+                    elif cutout_url and color_rgb is not None:
+                        try:
+                            composed = await _composite_cutout_on_background(
+                                cutout_url, current_user.id, color=color_rgb,
+                            )
+                            if composed:
+                                cutout_url = composed
+                        except Exception as bg_err:
+                            logger.warning("background_removal[batch]: color composite failed: %s", bg_err)
+                    elif cutout_url and flatten_color is not None:
+                        try:
+                            composed = await _composite_cutout_on_background(
+                                cutout_url, current_user.id, color=flatten_color,
+                            )
+                            if composed:
+                                cutout_url = composed
+                        except Exception as bg_err:
+                            logger.warning("background_removal[batch]: flatten failed: %s", bg_err)
+
+                    return {
+                        "input_url": str(image_url),
+                        "result_url": cutout_url,
+                        "success": True
+                    }
+                else:
+                    return {
+                        "input_url": str(image_url),
+                        "success": False,
+                        "error": result.get("error", "Failed")
+                    }
+            except Exception as e:
+                return {
                     "input_url": str(image_url),
                     "success": False,
-                    "error": result.get("error", "Failed")
-                })
-        except Exception as e:
-            results.append({
-                "input_url": str(image_url),
-                "success": False,
-                "error": str(e)
-            })
+                    "error": str(e)
+                }
+
+    results = list(await asyncio.gather(*(_process_one(u) for u in request.image_urls)))
 
     # Pro-rata refund for failed images (capped by the deduction snapshot).
     # Terminal-mark the reclaim row FIRST (worker discipline): the batch is
@@ -2940,73 +2921,38 @@ async def _composite_product_scene(product_no_bg_url: str, scene_url: str) -> di
         {"success": True, "image_url": str} or {"success": False, "error": str}
     """
     try:
-        def _prepare_image(source: Image.Image, mode: str) -> Image.Image:
-            prepared = ImageOps.exif_transpose(source)
-            if max(prepared.size) > PRODUCT_SCENE_MAX_DIMENSION:
-                prepared.thumbnail(
-                    (PRODUCT_SCENE_MAX_DIMENSION, PRODUCT_SCENE_MAX_DIMENSION),
-                    Image.Resampling.LANCZOS,
-                )
-            return prepared.convert(mode)
-
-        async def _load_image(url: str, mode: str) -> Image.Image:
+        async def _load_bytes(url: str) -> bytes:
             if url.startswith("/static") or url.startswith("static"):
                 local_path = Path("/app") / url.lstrip("/")
-                with Image.open(local_path) as source:
-                    return _prepare_image(source, mode)
+                return await asyncio.to_thread(local_path.read_bytes)
 
             async with httpx.AsyncClient(timeout=60.0, follow_redirects=True) as client:
                 response = await client.get(url)
                 response.raise_for_status()
-            with Image.open(BytesIO(response.content)) as source:
-                return _prepare_image(source, mode)
-
-        product_img = await _load_image(product_no_bg_url, "RGBA")
-        scene_img = await _load_image(scene_url, "RGB")
-        product_resized: Image.Image | None = None
-        upload_buffer: BytesIO | None = None
-
-        # Resize product to fit nicely in scene (60% of scene width, centered)
-        scene_w, scene_h = scene_img.size
-        target_w = int(scene_w * 0.6)
-
-        prod_w, prod_h = product_img.size
-        scale = target_w / prod_w
-        new_w = target_w
-        new_h = int(prod_h * scale)
+            return response.content
 
-        # Ensure product doesn't exceed scene height
-        if new_h > scene_h * 0.8:
-            scale = (scene_h * 0.8) / prod_h
-            new_h = int(prod_h * scale)
-            new_w = int(prod_w * scale)
-
-        product_resized = product_img.resize((new_w, new_h), Image.Resampling.LANCZOS)
-
-        # Center product on scene
-        x_offset = (scene_w - new_w) // 2
-        y_offset = (scene_h - new_h) // 2
-
-        # Composite onto the RGB scene using the product alpha channel.
-        scene_img.paste(product_resized, (x_offset, y_offset), product_resized)
+        product_bytes, scene_bytes = await asyncio.gather(
+            _load_bytes(product_no_bg_url), _load_bytes(scene_url)
+        )
+        # Product at 60% of scene width (capped at 80% height), centered —
+        # decoded and composited in the image engine's process pool.
+        png_bytes = await get_image_engine().composite_scene(
+            product_bytes, scene_bytes, max_dimension=PRODUCT_SCENE_MAX_DIMENSION
+        )
 
         filename = f"product_scene_{uuid.uuid4().hex[:8]}.png"
         from app.services.gcs_storage_service import get_gcs_storage
         gcs = get_gcs_storage()
         if gcs.enabled:
-            upload_buffer = BytesIO()
-            scene_img.save(upload_buffer, "PNG", optimize=True)
-            upload_buffer.seek(0)
             result_url = gcs.upload_public(
-                data=upload_buffer.getvalue(),
+                data=png_bytes,
                 blob_name=f"generated/image/{filename}",
                 content_type="image/png",
             )
         else:
             output_dir = Path("/app/static/generated")
             output_dir.mkdir(parents=True, exist_ok=True)
-            output_path = output_dir / filename
-            scene_img.save(output_path, "PNG", optimize=True)
+            (output_dir / filename).write_bytes(png_bytes)
             result_url = f"/static/generated/{filename}"
 
         logger.info(f"[Composite] Saved: {result_url}")
@@ -3015,15 +2961,6 @@ async def _composite_product_scene(product_no_bg_url: str, scene_url: str) -> di
     except Exception as e:
         logger.error(f"[Composite] Error: {e}")
         return {"success": False, "error": str(e)}
-    finally:
-        if upload_buffer is not None:
-            upload_buffer.close()
-        if product_resized is not None:
-            product_resized.close()
-        if 'product_img' in locals():
-            product_img.close()
-        if 'scene_img' in locals():
-            scene_img.close()
 
 
 # ============================================================================
@@ -3351,7 +3288,9 @@ async def _try_on_inner(
                             logger.warning(f"  Garment image is {w}x{h}, Kling AI requires >= 512px. Upscaling...")
                             scale = max(512 / w, 512 / h)
                             new_w, new_h = int(w * scale), int(h * scale)
-                            img = img.resize((new_w, new_h), Image.Resampling.LANCZOS)
+                            upscaled = await get_image_engine().resize(
+                                img_resp.content, (new_w, new_h), fmt="JPEG", quality=90
+                            )
                             # VG-BUG-007 fix: upload to GCS (not ephemeral
                             # /app/static/generated/) so PiAPI can fetch it
                             # reliably even when a different Cloud Run instance
@@ -3360,11 +3299,8 @@ async def _try_on_inner(
                             gcs = get_gcs_storage()
                             upscale_name = f"tryon_upscaled_{uuid.uuid4().hex[:8]}.jpg"
                             if gcs.enabled:
-                                buf = BytesIO()
-                                img.convert("RGB").save(buf, "JPEG", quality=90)
-                                buf.seek(0)
                                 garment_url = gcs.upload_public(
-                                    data=buf.getvalue(),
+                                    data=upscaled,
                                     blob_name=f"generated/image/{upscale_name}",
                                     content_type="image/jpeg",
                                 )
@@ -3372,8 +3308,7 @@ async def _try_on_inner(
                             else:
                                 upscale_dir = Path("/app/static/generated")
                                 upscale_dir.mkdir(parents=True, exist_ok=True)
-                                upscale_path = upscale_dir / upscale_name
-                                img.convert("RGB").save(upscale_path, "JPEG", quality=90)
+                                (upscale_dir / upscale_name).write_bytes(upscaled)
                                 public_base = os.environ.get("PUBLIC_APP_URL", "").rstrip("/")
                                 garment_url = f"{public_base}/static/generated/{upscale_name}" if public_base else f"/static/generated/{upscale_name}"
                                 logger.info(f"  Upscaled garment to {new_w}x{new_h} (ephemeral path, GCS disabled)")
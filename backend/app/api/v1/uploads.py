@@ -15,6 +15,7 @@ import asyncio
 import json
 import logging
 import os
+import shutil
 import tempfile
 import uuid
 from datetime import datetime, timezone
@@ -38,6 +39,7 @@ from app.core.upload_validation import (
     validate_uploaded_content,
 )
 from app.providers.provider_router import get_provider_router, TaskType
+from app.services.ffmpeg_runner import run_ffmpeg, run_ffprobe
 from app.core.model_registry import POLLO_MODELS as _POLLO_REG
 from app.services.gcs_storage_service import get_gcs_storage
 from app.services.email_service import send_admin_tool_failure_email
@@ -443,7 +445,7 @@ async def _save_upload(file: UploadFile, user_id: str, tool_type: str) -> tuple[
 
     gcs = get_gcs_storage()
     if gcs.enabled:
-        file_url = gcs.upload_public(
+        file_url = await gcs.upload_public_async(
             data=content,
             blob_name=f"uploads/{user_id}/{filename}",
             content_type=content_type,
@@ -483,21 +485,17 @@ VIDEO_NORMALIZE_MAX_DURATION_SEC = 120  # hard cap; longer clips fail fast
 
 async def _probe_video_metadata(path: Path) -> tuple[float, int, int]:
     """Return (duration_sec, width, height) via ffprobe; raise if unreadable."""
-    proc = await asyncio.create_subprocess_exec(
+    probe = await run_ffprobe([
         "ffprobe", "-v", "error",
         "-select_streams", "v:0",
         "-show_entries", "stream=width,height:format=duration",
         "-of", "json",
         str(path),
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE,
-    )
-    stdout, stderr = await proc.communicate()
-    if proc.returncode != 0:
-        detail = (stderr or b"").decode("utf-8", errors="replace")[-500:]
-        raise HTTPException(status_code=400, detail=f"Video could not be inspected: {detail}")
+    ])
+    if not probe.ok:
+        raise HTTPException(status_code=400, detail=f"Video could not be inspected: {probe.detail(500)}")
     try:
-        data = json.loads(stdout.decode("utf-8", errors="replace"))
+        data = json.loads(probe.stdout.decode("utf-8", errors="replace"))
         stream = (data.get("streams") or [{}])[0]
         fmt = data.get("format") or {}
         width = int(stream.get("width") or 0)
@@ -510,6 +508,23 @@ async def _probe_video_metadata(path: Path) -> tuple[float, int, int]:
     return duration, width, height
 
 
+async def _persist_normalized_video(path: Path, user_id: str) -> str:
+    """Stream a (normalized) video file to durable storage; returns its URL.
+    The file is never read into memory as a whole."""
+    gcs = get_gcs_storage()
+    if gcs.enabled:
+        return await gcs.upload_stream(
+            path,
+            blob_name=f"uploads/videos/{user_id}/{uuid.uuid4().hex[:12]}.mp4",
+            content_type="video/mp4",
+        )
+    local_dir = Path(UPLOAD_DIR)
+    local_dir.mkdir(parents=True, exist_ok=True)
+    local_name = f"{user_id}_{uuid.uuid4().hex[:12]}.mp4"
+    await asyncio.to_thread(shutil.copyfile, path, local_dir / local_name)
+    return f"/static/uploads/{local_name}"
+
+
 @router.post("/video-normalize", response_model=VideoNormalizeResponse)
 async def normalize_video(
     file: UploadFile = File(...),
@@ -585,23 +600,10 @@ async def normalize_video(
             and ext in {".mp4", ".m4v"}
         )
         if already_ok:
-            output_bytes = input_path.read_bytes()
-            user_id = str(current_user.id)
-            gcs = get_gcs_storage()
-            blob_name = f"uploads/videos/{user_id}/{uuid.uuid4().hex[:12]}.mp4"
-            if gcs.enabled:
-                video_url = gcs.upload_public(
-                    data=output_bytes, blob_name=blob_name, content_type="video/mp4",
-                )
-            else:
-                local_dir = Path(UPLOAD_DIR)
-                local_dir.mkdir(parents=True, exist_ok=True)
-                local_name = f"{user_id}_{uuid.uuid4().hex[:12]}.mp4"
-                (local_dir / local_name).write_bytes(output_bytes)
-                video_url = f"/static/uploads/{local_name}"
+            video_url = await _persist_normalized_video(input_path, str(current_user.id))
             return VideoNormalizeResponse(
                 video_url=video_url,
-                size_bytes=len(output_bytes),
+                size_bytes=size_so_far,
                 duration_sec=duration,
                 width=src_w,
                 height=src_h,
@@ -612,11 +614,15 @@ async def normalize_video(
 
         # Hard wall-clock cap per ffmpeg pass. A 120 s 1080p source encodes
         # in ~30 s on Cloud Run's 1 vCPU; if we ever blow past 5 minutes the
-        # input is pathological (broken container, unseekable webm) and we
-        # should kill the process instead of letting it tie up the worker
+        # input is pathological (broken container, unseekable webm) and the
+        # runner kills the process instead of letting it tie up the worker
         # until Cloud Run's 3600 s request timeout fires.
         ENCODE_TIMEOUT_SEC = 300
 
+        def log_progress(progress) -> None:
+            if duration > 0 and not progress.done:
+                logger.debug("[video-normalize] %.0f%% (speed %sx)", 100 * progress.out_time_s / duration, progress.speed)
+
         async def run_encode(crf: int) -> tuple[int, str]:
             scale = (
                 f"scale='if(gt(iw,ih),min({VIDEO_NORMALIZE_MAX_DIMENSION},iw),-2)':"
@@ -635,31 +641,11 @@ async def normalize_video(
                 "-movflags", "+faststart",
                 str(output_path),
             ]
-            proc = await asyncio.create_subprocess_exec(
-                *args,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-            )
-            try:
-                stdout, stderr = await asyncio.wait_for(
-                    proc.communicate(), timeout=ENCODE_TIMEOUT_SEC,
-                )
-            except asyncio.TimeoutError:
-                logger.error("[video-normalize] ffmpeg crf=%s exceeded %ss; killing", crf, ENCODE_TIMEOUT_SEC)
-                try:
-                    proc.kill()
-                except ProcessLookupError:
-                    pass
-                # Drain any remaining output so the pipe doesn't hold a
-                # zombie around. Bound this wait so a misbehaving subprocess
-                # can't lock us up a second time.
-                try:
-                    await asyncio.wait_for(proc.communicate(), timeout=5)
-                except Exception:
-                    pass
+            result = await run_ffmpeg(args, timeout=ENCODE_TIMEOUT_SEC, on_progress=log_progress)
+            if result.timed_out:
+                logger.error("[video-normalize] ffmpeg crf=%s exceeded %ss; killed", crf, ENCODE_TIMEOUT_SEC)
                 return -1, f"ffmpeg timed out after {ENCODE_TIMEOUT_SEC}s"
-            detail = (stderr or stdout).decode("utf-8", errors="replace")[-1500:]
-            return proc.returncode, detail
+            return result.returncode, result.detail(1500)
 
         last_detail = ""
         success_crf: Optional[int] = None
@@ -681,31 +667,16 @@ async def normalize_video(
                 detail=f"Video re-encode failed: {last_detail[-400:]}",
             )
 
-        output_bytes = output_path.read_bytes()
+        output_size = output_path.stat().st_size
         out_duration, out_w, out_h = await _probe_video_metadata(output_path)
-
-        user_id = str(current_user.id)
-        gcs = get_gcs_storage()
-        blob_name = f"uploads/videos/{user_id}/{uuid.uuid4().hex[:12]}.mp4"
-        if gcs.enabled:
-            video_url = gcs.upload_public(
-                data=output_bytes,
-                blob_name=blob_name,
-                content_type="video/mp4",
-            )
-        else:
-            local_dir = Path(UPLOAD_DIR)
-            local_dir.mkdir(parents=True, exist_ok=True)
-            local_name = f"{user_id}_{uuid.uuid4().hex[:12]}.mp4"
-            (local_dir / local_name).write_bytes(output_bytes)
-            video_url = f"/static/uploads/{local_name}"
+        video_url = await _persist_normalized_video(output_path, str(current_user.id))
 
         note = None
         if success_crf is None:
             note = "Output is still larger than the soft target; provider may downsample further."
         return VideoNormalizeResponse(
             video_url=video_url,
-            size_bytes=len(output_bytes),
+            size_bytes=output_size,
             duration_sec=out_duration,
             width=out_w,
             height=out_h,
@@ -166,6 +166,34 @@ async def lifespan(app: FastAPI):
     cleanup_task = asyncio.create_task(_media_cleanup_loop())
     logger.info("[Background] Hourly media cleanup task started")
 
+    # Expired online-session sweep (moved off the heartbeat path). Every
+    # instance runs the loop; a Redis lock lets one of them sweep per round.
+    from app.services.session_tracker import session_sweeper_loop
+    session_sweeper_task = asyncio.create_task(session_sweeper_loop())
+
+    # Material blob-existence index (replaces per-request GCS listings in
+    # /demo/presets): applies upload/delete hooks and re-verifies stale rows.
+    from app.services.blob_index import blob_index_verifier_loop
+    blob_index_task = asyncio.create_task(blob_index_verifier_loop())
+
+    # Email outbox sender: send_email only enqueues; every instance drains
+    # due messages over pooled SMTP connections.
+    from app.services.email_outbox import email_outbox_sender_loop
+    email_outbox_task = asyncio.create_task(email_outbox_sender_loop())
+
+    # Warm the local rembg fallback so a PiAPI outage doesn't start with a
+    # model load per worker. Off by default — the pool otherwise starts on
+    # the first fallback request.
+    if settings.SEGMENTATION_PRELOAD:
+        async def _preload_segmentation():
+            try:
+                from app.services.segmentation_pool import get_segmentation_pool
+                await get_segmentation_pool().start(preload=True)
+            except Exception as e:
+                logger.warning(f"[Segmentation] Preload failed (non-fatal): {e}")
+
+        asyncio.create_task(_preload_segmentation())
+
     # Model-registry live cache subscriber. Listens on a Redis channel for
     # admin overrides published by ModelRegistryService.set_override and
     # refreshes the in-process PIAPI_MODELS dict so each Cloud Run instance
@@ -187,6 +215,20 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.warning(f"[Background] Model registry subscriber failed to start: {e}")
 
+    # Fleet-wide provider circuit breaker (opt-in). Mirrors open/closed
+    # transitions published by other instances so failover is cluster-wide.
+    provider_breaker_task = None
+    if settings.PROVIDER_SHARED_BREAKER_ENABLED:
+        try:
+            from app.api.deps import get_redis
+            from app.services.provider_breaker import provider_breaker_subscriber_loop
+            redis_client = await get_redis()
+            if redis_client:
+                provider_breaker_task = asyncio.create_task(provider_breaker_subscriber_loop(redis_client))
+                logger.info("[Background] Provider breaker pub/sub subscriber started")
+        except Exception as e:
+            logger.warning(f"[Background] Provider breaker subscriber failed to start: {e}")
+
     yield
 
     # Shutdown: cancel cleanup task and MCP servers
@@ -195,12 +237,40 @@ async def lifespan(app: FastAPI):
         await cleanup_task
     except asyncio.CancelledError:
         pass
+    for task in (session_sweeper_task, blob_index_task, email_outbox_task):
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
     if model_registry_task:
         model_registry_task.cancel()
         try:
             await model_registry_task
         except asyncio.CancelledError:
             pass
+    if provider_breaker_task:
+        provider_breaker_task.cancel()
+        try:
+            await provider_breaker_task
+        except asyncio.CancelledError:
+            pass
+    # Flush buffered generation_metrics rows before the instance goes away.
+    try:
+        from app.services.metrics_sink import get_metrics_sink
+        await get_metrics_sink().drain()
+    except Exception as e:
+        logger.warning(f"[Background] Metrics sink drain failed: {e}")
+    try:
+        from app.services.email_service import email_service
+        await email_service.smtp_pool.close()
+    except Exception as e:
+        logger.warning(f"[Background] SMTP pool close failed: {e}")
+    # Stop image-engine worker processes (started lazily on first job).
+    from app.services.image_engine import shutdown_image_engine
+    shutdown_image_engine()
+    from app.services.segmentation_pool import shutdown_segmentation_pool
+    await shutdown_segmentation_pool()
     # MCP shutdown removed 2026-05-26 alongside MCP startup.
     logger.info("VidGo AI Backend shutting down...")
 
@@ -248,6 +248,14 @@ class Material(Base):
     """Target user role tag, e.g. 'creator', 'seller', 'designer', 'marketer',
     'agency'. Null = unspecified / matches all."""
 
+    # === Blob-existence index ===
+    # Maintained by app.services.blob_index (GCS upload/delete hooks + the
+    # periodic verifier). blob_missing=True means none of the result URLs
+    # resolve to a live object, so public preset queries skip the row.
+    # NULL blob_verified_at = not checked yet (served, verified soon).
+    blob_missing = Column(Boolean, nullable=False, default=False, server_default="false")
+    blob_verified_at = Column(DateTime(timezone=True), nullable=True)
+
     # === Timestamps ===
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -268,6 +276,7 @@ class Material(Base):
         Index('idx_material_prompt_effect', 'prompt', 'effect_prompt'),  # For deduplication
         Index('idx_material_lookup_hash', 'lookup_hash'),  # For preset-only mode fast lookup
         Index('idx_material_audience', 'platform', 'role', 'tool_type', 'is_active'),
+        Index('idx_material_blob_verified', 'is_active', 'blob_verified_at'),
     )
 
     @staticmethod
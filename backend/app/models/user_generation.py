@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Enum, Boolean, Text
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Enum, Boolean, Text, Index, text
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -64,6 +64,16 @@ class UserGeneration(Base):
         comment="True when media URLs have been cleared after expiry"
     )
 
+    # Partial index for the media cleanup scan: only rows still holding media
+    # (a shrinking fraction of the table) are indexed.
+    __table_args__ = (
+        Index(
+            'idx_user_generation_pending_expiry',
+            'expires_at',
+            postgresql_where=text('media_expired = false'),
+        ),
+    )
+
     # Relationships
     user = relationship("User", back_populates="generations")
 
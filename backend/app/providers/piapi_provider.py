@@ -21,6 +21,8 @@ import uuid
 
 from app.providers.base import BaseProvider
 from app.services.gcs_storage_service import get_gcs_storage
+from app.services.poll_scheduler import get_poll_scheduler
+from app.services.ffmpeg_runner import run_ffmpeg
 from app.core.model_registry import (
     PIAPI_MODELS,
     PIAPI_KLING_VERSIONS,
@@ -308,7 +310,7 @@ class PiAPIProvider(BaseProvider):
                 with open(input_path, "wb") as f:
                     f.write(source_bytes)
 
-                proc = await asyncio.create_subprocess_exec(
+                result = await run_ffmpeg([
                     "ffmpeg",
                     "-y",
                     "-hide_banner",
@@ -325,12 +327,9 @@ class PiAPIProvider(BaseProvider):
                     "-b:a",
                     "128k",
                     output_path,
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE,
-                )
-                _, stderr = await proc.communicate()
-                if proc.returncode != 0:
-                    raise RuntimeError(stderr.decode("utf-8", errors="ignore") or "ffmpeg audio conversion failed")
+                ], timeout=120)
+                if not result.ok:
+                    raise RuntimeError(result.detail() or "ffmpeg audio conversion failed")
 
                 with open(output_path, "rb") as f:
                     normalized = f.read()
@@ -617,14 +616,9 @@ class PiAPIProvider(BaseProvider):
                         output_path,
                     ]
 
-                proc = await asyncio.create_subprocess_exec(
-                    *cmd,
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE,
-                )
-                _, stderr = await proc.communicate()
-                if proc.returncode != 0:
-                    raise RuntimeError(stderr.decode("utf-8", errors="ignore") or "ffmpeg avatar fallback failed")
+                result = await run_ffmpeg(cmd, timeout=180)
+                if not result.ok:
+                    raise RuntimeError(result.detail() or "ffmpeg avatar fallback failed")
 
                 with open(output_path, "rb") as f:
                     video_bytes = f.read()
@@ -2685,61 +2679,67 @@ class PiAPIProvider(BaseProvider):
                     task_id, cb_exc, exc_info=True,
                 )
 
-        # Poll for result. 5-second cadence, so attempts ≈ seconds / 5.
-        max_attempts = max(1, max_wait_seconds // 5)
-        for attempt in range(max_attempts):
+        # Poll for result on the shared per-process scheduler: one loop for
+        # every in-flight task id, adaptive cadence per task kind (see
+        # app/services/poll_scheduler.py) instead of a private 5 s timer.
+        task_type = payload.get("task_type", "unknown")
+
+        async def _check():
             try:
                 status_response = await self.client.get(
                     f"{self.BASE_URL}/task/{task_id}"
                 )
                 status_data = status_response.json()
-
-                # Handle different response structures
-                if "data" in status_data:
-                    task_data = status_data["data"]
-                else:
-                    task_data = status_data
-
-                status = task_data.get("status", "").lower()
-
-                if status in ["completed", "success", "done"]:
-                    output = task_data.get("output") or task_data.get("result", {})
-                    self._log_response(payload.get("task_type", "unknown"), True)
-                    return {
-                        "success": True,
-                        "task_id": task_id,
-                        "output": output
-                    }
-                elif status in ["failed", "error"]:
-                    error_msg = self._extract_task_error(task_data)
-                    self._log_response(payload.get("task_type", "unknown"), False, error_msg)
-                    raise Exception(error_msg)
-
-                # Still processing, wait and retry
-                await asyncio.sleep(5)
-
             # A transient blip while POLLING (network drop, 5xx error body that
             # isn't valid JSON, connection reset) must NOT kill an otherwise
             # healthy upstream task — the generation is still running on PiAPI's
-            # side. Swallow these and keep polling. Note: the deliberate
-            # ``raise Exception(error_msg)`` for a *failed task* above is a bare
-            # Exception and is intentionally NOT caught here, so genuine task
-            # failures still propagate to the caller (and _retry_transient).
+            # side. Report "still pending" and let the scheduler retry. Note:
+            # the deliberate ``raise Exception(error_msg)`` for a *failed task*
+            # below is outside this try, so genuine task failures still
+            # propagate to the caller (and _retry_transient).
             except (httpx.HTTPStatusError, httpx.TransportError, json.JSONDecodeError) as e:
-                if attempt < max_attempts - 1:
-                    logger.warning(
-                        "[PiAPI] poll transient error for task %s (attempt %d/%d): %s — continuing",
-                        task_id,
-                        attempt + 1,
-                        max_attempts,
-                        str(e)[:160],
-                    )
-                    await asyncio.sleep(5)
-                    continue
-                raise Exception(f"Failed to poll task status: {e}")
+                logger.warning(
+                    "[PiAPI] poll transient error for task %s: %s — continuing",
+                    task_id,
+                    str(e)[:160],
+                )
+                return False, None
 
-        self._log_response(payload.get("task_type", "unknown"), False, "Task timeout")
-        raise Exception("PiAPI task timeout - generation took too long")
+            # Handle different response structures
+            if "data" in status_data:
+                task_data = status_data["data"]
+            else:
+                task_data = status_data
+
+            status = task_data.get("status", "").lower()
+
+            if status in ["completed", "success", "done"]:
+                output = task_data.get("output") or task_data.get("result", {})
+                self._log_response(task_type, True)
+                return True, {
+                    "success": True,
+                    "task_id": task_id,
+                    "output": output
+                }
+            elif status in ["failed", "error"]:
+                error_msg = self._extract_task_error(task_data)
+                self._log_response(task_type, False, error_msg)
+                raise Exception(error_msg)
+
+            # Still processing
+            return False, None
+
+        try:
+            return await get_poll_scheduler().wait(
+                _check,
+                provider=self.name,
+                label=f"{payload.get('model', '')}/{task_type}",
+                timeout=max_wait_seconds,
+                task_id=task_id,
+            )
+        except asyncio.TimeoutError:
+            self._log_response(task_type, False, "Task timeout")
+            raise Exception("PiAPI task timeout - generation took too long")
 
     async def close(self):
         """Close HTTP client."""
@@ -36,6 +36,8 @@ from app.providers.a2e_provider import A2EProvider
 from app.core.config import get_settings
 from app.services.gcs_storage_service import get_gcs_storage
 from app.services.email_service import email_service
+from app.services.poll_scheduler import poll_task_label
+from app.services.provider_breaker import get_provider_breaker
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -277,6 +279,11 @@ class ProviderRouter:
         # Tracks which TaskTypes we have already warned about for missing
         # user_tier — keeps the migration log from spamming once-per-call.
         self._tier_warn_seen: set = set()
+        # Fleet-wide breaker/health state shared over Redis (opt-in). None
+        # keeps the per-instance dicts above as the only breaker.
+        self._shared_breaker = (
+            get_provider_breaker() if settings.PROVIDER_SHARED_BREAKER_ENABLED else None
+        )
 
     # ─────────────────────────────────────────────────────────────────────────
     # MAIN ROUTING METHOD
@@ -322,8 +329,14 @@ class ProviderRouter:
                 params["_priority"] = "low"
 
         task_label = task_type.value if hasattr(task_type, "value") else str(task_type)
-        async with generation_slot(params["_priority"], task_label):
-            return await self._route_impl(task_type, params, user_tier, persist_to_gcs)
+        # Lets the shared poll scheduler key its backoff curve on the router
+        # task type (matches generation_metrics.task_type for its priors).
+        label_token = poll_task_label.set(task_label)
+        try:
+            async with generation_slot(params["_priority"], task_label):
+                return await self._route_impl(task_type, params, user_tier, persist_to_gcs)
+        finally:
+            poll_task_label.reset(label_token)
 
     async def _route_impl(
         self,
@@ -373,6 +386,9 @@ class ProviderRouter:
 
         providers_to_try = self._get_providers_for_task(task_type, params)
         candidate_providers, skipped_providers = self._route_candidates(providers_to_try)
+        candidate_providers, skipped_providers = await self._apply_shared_breaker(
+            task_type, candidate_providers, skipped_providers
+        )
 
         if not candidate_providers:
             error_msg = self._get_user_friendly_error(
@@ -400,6 +416,7 @@ class ProviderRouter:
                     raise Exception(f"{provider_name} soft-failed: {err_msg}")
 
                 self._record_success(provider_name)
+                await self._record_shared_outcome(provider_name, task_type, None)
 
                 # Persist to GCS if enabled
                 if persist_to_gcs:
@@ -468,6 +485,7 @@ class ProviderRouter:
                     error_message=str(e),
                 )
                 self._record_failure(provider_name, str(e))
+                await self._record_shared_outcome(provider_name, task_type, str(e))
                 await self._maybe_alert_provider_failure(
                     provider_name=provider_name,
                     task_type=task_type,
@@ -576,6 +594,60 @@ class ProviderRouter:
         logger.warning("No provider candidates available for route %s; skipped=%s", providers, skipped)
         return [], skipped
 
+    async def _apply_shared_breaker(
+        self,
+        task_type: TaskType,
+        candidates: list[str],
+        skipped: list[str],
+    ) -> tuple[list[str], list[str]]:
+        """Drop candidates whose fleet-wide circuit is open for this task.
+
+        No-op unless PROVIDER_SHARED_BREAKER_ENABLED. Closed circuits cost a
+        local dict lookup; only a half-open circuit touches Redis (probe
+        election).
+        """
+        breaker = getattr(self, "_shared_breaker", None)
+        if breaker is None or not candidates:
+            return candidates, skipped
+
+        task_label = task_type.value if hasattr(task_type, "value") else str(task_type)
+        allowed: list[str] = []
+        skipped = list(skipped)
+        for provider_name in candidates:
+            if await breaker.allow(provider_name, task_label):
+                allowed.append(provider_name)
+            else:
+                skipped.append(provider_name)
+        if not allowed:
+            logger.warning(
+                "Shared breaker open for every candidate of task=%s; skipped=%s",
+                task_label, skipped,
+            )
+        return allowed, skipped
+
+    async def _record_shared_outcome(
+        self,
+        provider: str,
+        task_type: TaskType,
+        error: Optional[str],
+    ) -> None:
+        """Feed one attempt's outcome to the fleet-wide breaker.
+
+        Input/validation errors (NON_ALERT_FAILURE_HINTS) say nothing about
+        provider health, so they never count toward opening the circuit.
+        """
+        breaker = getattr(self, "_shared_breaker", None)
+        if breaker is None:
+            return
+        task_label = task_type.value if hasattr(task_type, "value") else str(task_type)
+        try:
+            if error is None:
+                await breaker.record_success(provider, task_label)
+            elif not any(token in error.lower() for token in self.NON_ALERT_FAILURE_HINTS):
+                await breaker.record_failure(provider, task_label)
+        except Exception as exc:  # pragma: no cover - breaker is best-effort
+            logger.warning("shared breaker update failed provider=%s: %s", provider, exc)
+
     def _is_provider_disabled_by_config(self, provider: str) -> bool:
         if provider == "piapi":
             return not os.getenv("PIAPI_KEY", "")
@@ -924,6 +996,21 @@ class ProviderRouter:
                 cached = self._status_cache.get(provider, {})
                 return cached.get("status") == ProviderStatus.HEALTHY
 
+        # Another instance probed this provider within the TTL — reuse its
+        # answer instead of every instance hitting the health endpoint.
+        breaker = getattr(self, "_shared_breaker", None)
+        if breaker is not None:
+            shared = await breaker.get_health(provider)
+            if shared is not None:
+                now = datetime.now()
+                if shared:
+                    self._record_success(provider)
+                else:
+                    self._status_cache.setdefault(provider, {})["status"] = ProviderStatus.DEGRADED
+                self._status_cache.setdefault(provider, {})["last_check"] = now
+                self._last_health_check[provider] = now
+                return shared
+
         try:
             provider_instance = self._get_provider_instance(provider)
             if provider_instance is None:
@@ -937,6 +1024,10 @@ class ProviderRouter:
                 )
                 return False
             is_healthy = await provider_instance.health_check()
+            if breaker is not None:
+                await breaker.set_health(
+                    provider, is_healthy, int(self._health_cache_ttl().total_seconds())
+                )
             now = datetime.now()
             if is_healthy:
                 self._record_success(provider)
@@ -1233,39 +1324,30 @@ class ProviderRouter:
         used_backup: bool,
         error_message: Optional[str] = None,
     ) -> None:
-        """Best-effort insert into generation_metrics.
+        """Best-effort enqueue into generation_metrics.
 
-        Uses its own AsyncSession so router callers don't need to thread a
-        request-scoped session through. NEVER raises — metrics infrastructure
-        failure must not surface as user error.
+        Hands the row to the process-wide metrics sink, which batches it
+        into a multi-row INSERT off the request path — no session, no DB
+        round-trip here. NEVER raises — metrics infrastructure failure must
+        not surface as user error.
         """
         try:
-            from app.core.database import AsyncSessionLocal
-            from app.models.model_registry import GenerationMetric
+            from app.services.metrics_sink import get_metrics_sink
 
             task_label = task_type.value if hasattr(task_type, "value") else str(task_type)
-            model_used = self._derive_model_used(task_type, params)
-            err_short = (error_message or "")[:1000] or None
-            user_id = params.get("user_id")  # tools.py doesn't pass this today; kept for future opt-in
-            cohort = params.get("_cohort")    # populated by an experiment runner; NULL when no experiment active
-
-            async with AsyncSessionLocal() as session:
-                session.add(
-                    GenerationMetric(
-                        task_type=task_label,
-                        provider_used=provider,
-                        model_used=model_used,
-                        duration_ms=duration_ms,
-                        success=success,
-                        error_message=err_short,
-                        used_backup=used_backup,
-                        user_id=user_id,
-                        cohort=cohort,
-                    )
-                )
-                await session.commit()
+            get_metrics_sink().submit({
+                "task_type": task_label,
+                "provider_used": provider,
+                "model_used": self._derive_model_used(task_type, params),
+                "duration_ms": duration_ms,
+                "success": success,
+                "error_message": (error_message or "")[:1000] or None,
+                "used_backup": used_backup,
+                "user_id": params.get("user_id"),  # tools.py doesn't pass this today; kept for future opt-in
+                "cohort": params.get("_cohort"),   # populated by an experiment runner; NULL when no experiment active
+            })
         except Exception as exc:  # pragma: no cover
-            logger.warning("metrics write failed task=%s provider=%s: %s", task_type, provider, exc)
+            logger.warning("metrics enqueue failed task=%s provider=%s: %s", task_type, provider, exc)
 
     async def close(self):
         await asyncio.gather(
@@ -1153,8 +1153,7 @@ Respond ONLY with JSON: {"nsfw": 0.0, "violence": 0.0, "hate": 0.0, "self_harm":
         # actually produces a segmented result instead of a near-identical RGB.
         self._log_request("background_removal", params)
         try:
-            from rembg import remove
-            from PIL import Image
+            from app.services.segmentation_pool import get_segmentation_pool
 
             image_url = params["image_url"]
             if image_url.startswith("/"):
@@ -1166,14 +1165,14 @@ Respond ONLY with JSON: {"nsfw": 0.0, "violence": 0.0, "hate": 0.0, "self_harm":
                     raise Exception(f"Failed to fetch image: HTTP {img_resp.status_code}")
                 image_data = img_resp.content
 
-            loop = asyncio.get_event_loop()
-            output_bytes = await loop.run_in_executor(None, remove, image_data)
+            # Warm per-worker rembg session; concurrent calls are micro-batched.
+            output_bytes = await get_segmentation_pool().remove(image_data)
 
             from app.services.gcs_storage_service import get_gcs_storage
             gcs = get_gcs_storage()
             filename = f"rembg_{uuid.uuid4().hex[:8]}.png"
             if gcs.enabled:
-                result_url = gcs.upload_public(
+                result_url = await gcs.upload_public_async(
                     output_bytes,
                     f"generated/background_removal/{filename}",
                     content_type="image/png",
@@ -18,6 +18,7 @@ from pathlib import Path
 from typing import Optional, Dict, Any, List, Tuple
 import httpx
 from app.core.config import get_settings
+from app.services.poll_scheduler import get_poll_scheduler
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -398,33 +399,40 @@ class A2EAvatarService:
             timeout: Max wait time in seconds (default 20 min — A2E avatar
                 renders with lip-sync on long scripts can run 8-15 min;
                 lower defaults aborted healthy jobs mid-render)
-            poll_interval: Seconds between status checks
+            poll_interval: Minimum seconds between status checks (the shared
+                poll scheduler widens the gap for long-running task kinds)
 
         Returns:
             Final task status with video_url
         """
-        elapsed = 0
         logger.info(f"Waiting for A2E task {task_id} (timeout: {timeout}s)")
 
-        while elapsed < timeout:
+        async def _check():
             status = await self.get_task_status(task_id)
             task_status = status.get("status", "").lower()
-
-            logger.info(f"A2E task {task_id}: {task_status} ({elapsed}s elapsed)")
+            logger.info(f"A2E task {task_id}: {task_status}")
 
             if task_status == "succeed":
                 logger.info(f"A2E task {task_id} completed successfully")
-                return status
+                return True, status
             elif task_status == "failed":
                 error_msg = status.get("error", "Unknown error")
                 logger.error(f"A2E task {task_id} failed: {error_msg}")
-                return status
-
-            await asyncio.sleep(poll_interval)
-            elapsed += poll_interval
+                return True, status
+            return False, None
 
-        logger.error(f"A2E task {task_id} timed out after {timeout}s")
-        return {"success": False, "status": "timeout", "error": "Task timed out"}
+        try:
+            return await get_poll_scheduler().wait(
+                _check,
+                provider="a2e",
+                label="task",
+                timeout=timeout,
+                task_id=task_id,
+                min_interval=poll_interval,
+            )
+        except asyncio.TimeoutError:
+            logger.error(f"A2E task {task_id} timed out after {timeout}s")
+            return {"success": False, "status": "timeout", "error": "Task timed out"}
 
     async def generate_and_wait(
         self,
@@ -22,6 +22,8 @@ from app.models.user import User
 from app.models.billing import Plan, Subscription, Order, CreditTransaction, Generation, ServicePricing
 from app.models.material import Material, MaterialStatus, ToolType
 from app.models.user_generation import UserGeneration
+from app.services.demo_cache_service import invalidate_demo_cache
+from app.services.material_readiness import invalidate_readiness_snapshot
 from app.services.session_tracker import session_tracker
 from app.core.config import settings
 
@@ -1184,6 +1186,8 @@ class AdminDashboardService:
             return False, f"Invalid action: {action}"
 
         await self.db.commit()
+        await invalidate_readiness_snapshot()
+        await invalidate_demo_cache(self.db, [material])
         return True, f"Material {action}d successfully"
 
     async def get_moderation_queue(
@@ -0,0 +1,196 @@
+"""
+Blob-existence index for Material result media.
+
+``/demo/presets`` used to LIST four entire bucket prefixes into per-instance
+Python sets on every instance and filter rows by set membership; ``users/``
+grows with every subscriber's output, so memory and cold-listing latency grew
+with the customer base. The existence state now lives on the row
+(``Material.blob_missing`` / ``Material.blob_verified_at``) and the presets
+query filters with ``blob_missing IS NOT TRUE``.
+
+The index is maintained by:
+
+  - GCS upload/delete hooks — GCSStorageService records blob names it wrote
+    or deleted; ``apply_blob_events`` marks rows referencing an uploaded blob
+    live and queues rows referencing a deleted blob for re-verification.
+  - ``verify_batch`` — checks only the blobs referenced by active rows,
+    never-verified rows first, then the oldest verification, one
+    ``blob.exists()`` per distinct blob with bounded concurrency.
+  - ``blob_index_verifier_loop`` — started by the FastAPI lifespan; every
+    instance drains its own hook events, one instance (Redis lock) verifies.
+
+A row is live if ANY of its result URLs is external (assumed reachable) or
+points at an existing blob — the same rule the listing filter used. A GCS
+error leaves the row's state untouched.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.material import Material
+
+logger = logging.getLogger(__name__)
+
+_RESULT_URL_COLUMNS = ("result_image_url", "result_watermarked_url", "result_video_url")
+_VERIFIER_LOCK_KEY = "vidgo:blob_index:verifier_lock"
+_CHECK_CONCURRENCY = 16
+# Blob names per UPDATE when applying hook events (3 LIKE terms each).
+_EVENT_CHUNK = 50
+
+
+def result_blob_names(material: Material, bucket_name: str) -> Optional[List[str]]:
+    """In-bucket blob names of the row's result URLs.
+
+    Returns None when any result URL is external — such rows are always
+    considered live and need no GCS check.
+    """
+    from app.services.gcs_storage_service import GCSStorageService
+
+    names = []
+    for attr in _RESULT_URL_COLUMNS:
+        url = getattr(material, attr, None)
+        if not url:
+            continue
+        blob_name = GCSStorageService.extract_blob_name(url, bucket_name)
+        if blob_name is None:
+            return None
+        names.append(blob_name)
+    return names
+
+
+async def _check_blobs(gcs, names: Iterable[str]) -> Dict[str, Optional[bool]]:
+    """{blob_name: exists}; None when the check itself failed."""
+    semaphore = asyncio.Semaphore(_CHECK_CONCURRENCY)
+
+    async def _one(name: str):
+        async with semaphore:
+            try:
+                return name, await asyncio.to_thread(gcs.blob_exists, name)
+            except Exception as e:
+                logger.warning("[BlobIndex] exists() failed for %s: %s", name, e)
+                return name, None
+
+    return dict(await asyncio.gather(*(_one(n) for n in set(names))))
+
+
+async def verify_batch(db: AsyncSession, gcs=None, limit: Optional[int] = None) -> Dict[str, int]:
+    """Verify one batch of active rows; returns counters for logging."""
+    if gcs is None:
+        from app.services.gcs_storage_service import get_gcs_storage
+        gcs = get_gcs_storage()
+    counts = {"checked": 0, "missing": 0, "unknown": 0}
+    if not gcs.enabled:
+        return counts
+
+    now = datetime.now(timezone.utc)
+    stale_before = now - timedelta(hours=settings.BLOB_VERIFY_RECHECK_HOURS)
+    rows = (await db.execute(
+        select(Material)
+        .where(
+            Material.is_active == True,
+            or_(Material.blob_verified_at.is_(None), Material.blob_verified_at < stale_before),
+        )
+        .order_by(Material.blob_verified_at.asc().nullsfirst())
+        .limit(limit or settings.BLOB_VERIFY_BATCH_SIZE)
+    )).scalars().all()
+    if not rows:
+        return counts
+
+    names_by_row = {row.id: result_blob_names(row, gcs.bucket_name) for row in rows}
+    states = await _check_blobs(gcs, (n for names in names_by_row.values() if names for n in names))
+
+    for row in rows:
+        names = names_by_row[row.id]
+        if names:
+            found = [states.get(n) for n in names]
+            if not any(found) and None in found:
+                counts["unknown"] += 1
+                continue
+            missing = not any(found)
+        else:
+            missing = False  # external URL (or no URL at all) — nothing to check
+        if missing and not row.blob_missing:
+            logger.warning("[BlobIndex] Material %s (%s/%s) has no live result blob", row.id, row.tool_type, row.topic)
+        row.blob_missing = missing
+        row.blob_verified_at = now
+        counts["checked"] += 1
+        counts["missing"] += int(missing)
+
+    await db.commit()
+    return counts
+
+
+def _references_any(bucket_name: str, names: List[str]):
+    return or_(*(
+        getattr(Material, col).contains(f"/{bucket_name}/{name}", autoescape=True)
+        for name in names
+        for col in _RESULT_URL_COLUMNS
+    ))
+
+
+async def apply_blob_events(db: AsyncSession, gcs=None) -> int:
+    """Apply this instance's recorded uploads/deletes to Material rows."""
+    if gcs is None:
+        from app.services.gcs_storage_service import get_gcs_storage
+        gcs = get_gcs_storage()
+    uploaded, deleted = gcs.drain_blob_events()
+    if not gcs.enabled or not (uploaded or deleted):
+        return 0
+
+    now = datetime.now(timezone.utc)
+    touched = 0
+    for names, values in (
+        # An upload proves one result URL is live.
+        (sorted(uploaded), {"blob_missing": False, "blob_verified_at": now}),
+        # A delete may or may not orphan the row — re-verify it next round.
+        (sorted(deleted), {"blob_verified_at": None}),
+    ):
+        for i in range(0, len(names), _EVENT_CHUNK):
+            result = await db.execute(
+                update(Material)
+                .where(_references_any(gcs.bucket_name, names[i:i + _EVENT_CHUNK]))
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
+            touched += result.rowcount or 0
+    await db.commit()
+    return touched
+
+
+async def blob_index_verifier_loop() -> None:
+    """Long-running background task. Owned by the FastAPI lifespan —
+    cancelled on shutdown."""
+    from app.core.database import AsyncSessionLocal
+
+    interval = max(30, settings.BLOB_VERIFY_INTERVAL_SECONDS)
+    while True:
+        try:
+            await asyncio.sleep(interval)
+            async with AsyncSessionLocal() as db:
+                touched = await apply_blob_events(db)
+                if touched:
+                    logger.info("[BlobIndex] Applied upload/delete hooks to %d material row(s)", touched)
+                if await _acquire_verifier_lock(interval):
+                    counts = await verify_batch(db)
+                    if counts["checked"] or counts["unknown"]:
+                        logger.info("[BlobIndex] Verified %s", counts)
+        except asyncio.CancelledError:
+            break
+        except Exception as e:
+            logger.error(f"[BlobIndex] Verifier error: {e}")
+
+
+async def _acquire_verifier_lock(interval: int) -> bool:
+    """One instance verifies per round; without Redis every instance does
+    (harmless, just duplicated HEAD requests)."""
+    try:
+        from app.api.deps import get_redis
+        redis = await get_redis()
+        return bool(await redis.set(_VERIFIER_LOCK_KEY, "1", nx=True, ex=max(1, interval - 5)))
+    except Exception:
+        return True
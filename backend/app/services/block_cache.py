@@ -5,17 +5,23 @@ Uses Gemini API to analyze unknown prompts and update cache.
 
 Flow:
 1. User submits prompt
-2. Check Redis block cache for known illegal words
-3. If found in cache -> Block immediately
-4. If not in cache -> Use Gemini to analyze
+2. Scan it with the compiled keyword automaton (local, one linear pass)
+3. If a blocked word matches -> Block immediately
+4. If not -> Use Gemini to analyze
 5. If Gemini says unsafe -> Add to block cache + Block
 6. If Gemini says safe -> Allow (optionally cache as safe)
+
+The block list itself lives in ONE Redis hash (``block:words``) with a
+version counter (``block:words:version``) bumped on every change. Each
+instance compiles the list into a KeywordAutomaton and re-checks the version
+at most every PATTERN_SYNC_INTERVAL seconds — no per-prompt n-gram MGET, and
+unspaced CJK terms match inside running text.
 """
 import hashlib
 import json
 import logging
-import re
-from typing import Optional, List, Dict, Any, Set
+import time
+from typing import Optional, List, Dict, Any, Tuple
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from enum import Enum
@@ -28,10 +34,37 @@ except ImportError:
     import aioredis as redis
 
 from app.core.config import get_settings
+from app.services.keyword_automaton import KeywordAutomaton, normalize_text
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# HSET the learned words and bump the block-list version only when the match
+# set actually changed (a new word, or an existing word with a new reason).
+# Re-learning a known word just refreshes its cached_at, so it must not make
+# every instance re-fetch and recompile the whole list.
+# KEYS: words hash, version. ARGV: (word, json, reason) triples.
+# Returns the number of words that changed the match set.
+_LEARN_WORDS_LUA = """
+local changed = 0
+for i = 1, #ARGV, 3 do
+    local old = redis.call('HGET', KEYS[1], ARGV[i])
+    local same = false
+    if old then
+        local ok, data = pcall(cjson.decode, old)
+        same = ok and type(data) == 'table' and data['reason'] == ARGV[i + 2]
+    end
+    redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 1])
+    if not same then
+        changed = changed + 1
+    end
+end
+if changed > 0 then
+    redis.call('INCR', KEYS[2])
+end
+return changed
+"""
+
 
 class BlockReason(str, Enum):
     """Reasons for blocking content"""
@@ -64,7 +97,8 @@ class PromptBlockCache:
     Redis-based cache for blocking illegal prompts.
 
     Redis Keys:
-    - block:word:{word_hash} -> blocked word info (JSON)
+    - block:words -> hash of blocked word -> info (JSON)
+    - block:words:version -> bumped whenever the set of matched words changes
     - block:prompt:{prompt_hash} -> prompt analysis result (JSON)
     - block:stats -> statistics counter
     - safe:prompt:{prompt_hash} -> known safe prompts (for optimization)
@@ -74,6 +108,17 @@ class PromptBlockCache:
     BLOCKED_WORD_TTL = 60 * 60 * 24 * 30  # 30 days for blocked words
     SAFE_PROMPT_TTL = 60 * 60 * 24 * 7    # 7 days for safe prompts
     ANALYSIS_TTL = 60 * 60 * 24           # 24 hours for analysis results
+    # How stale another instance's view of the block list may get.
+    PATTERN_SYNC_INTERVAL = 5.0
+
+    WORDS_KEY = "block:words"
+    VERSION_KEY = "block:words:version"
+    # Pre-hash layout (one key per word); migrated once into WORDS_KEY.
+    LEGACY_WORD_PATTERN = "block:word:*"
+    # Fingerprint of SEED_BLOCKED_WORDS last written to Redis; seeding is
+    # skipped when it matches, so a warm Redis costs a cold instance one GET.
+    SEED_VERSION_KEY = "block:seed_version"
+    MIGRATED_KEY = "block:words:migrated"
 
     # Pre-seeded blocked words in multiple languages
     # Supported: English (en), Traditional Chinese (zh-TW), Japanese (ja), Korean (ko), Spanish (es)
@@ -196,6 +241,10 @@ class PromptBlockCache:
         self.gemini_url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent"
         self._redis: Optional[redis.Redis] = None
         self._initialized = False
+        self._automaton: Optional[KeywordAutomaton] = None
+        self._pattern_version: Optional[str] = None
+        self._next_sync_at = 0.0
+        self._legacy_checked = False
 
     async def _get_redis(self) -> redis.Redis:
         """Get or create Redis connection"""
@@ -214,19 +263,41 @@ class PromptBlockCache:
 
         try:
             r = await self._get_redis()
-
-            # Seed blocked words into cache
-            for reason, words in self.SEED_BLOCKED_WORDS.items():
-                for word in words:
-                    await self._cache_blocked_word(word, reason.value, "seed")
+            seed_version = self._seed_version()
+
+            # Seed check and the fleet-wide migration claim share a round-trip.
+            pipe = r.pipeline(transaction=False)
+            pipe.get(self.SEED_VERSION_KEY)
+            pipe.set(self.MIGRATED_KEY, "1", nx=True)
+            current_seed, claimed = await pipe.execute()
+            # Legacy words must land before seeding bumps the version, or
+            # instances that already compiled would never pick them up.
+            await self._migrate_legacy_words(r, claimed=bool(claimed))
+
+            if current_seed != seed_version:
+                # Seed blocked words into cache — one MULTI/EXEC round-trip
+                # (HSET of the whole list + version bump + stats).
+                seeded = await self._cache_blocked_words(
+                    [(word, reason.value) for reason, words in self.SEED_BLOCKED_WORDS.items() for word in words],
+                    "seed",
+                    extra=lambda pipe: pipe.set(self.SEED_VERSION_KEY, seed_version),
+                )
+                logger.info(f"Block cache seeded with {seeded} seed words (seed version {seed_version})")
 
             self._initialized = True
-            logger.info(f"Block cache initialized with {sum(len(w) for w in self.SEED_BLOCKED_WORDS.values())} seed words")
 
         except Exception as e:
             logger.error(f"Failed to initialize block cache: {e}")
             # Don't raise - continue without cache
 
+    def _seed_version(self) -> str:
+        payload = json.dumps(
+            {reason.value: words for reason, words in self.SEED_BLOCKED_WORDS.items()},
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
     def _hash_text(self, text: str) -> str:
         """Create hash for text (for cache keys)"""
         normalized = text.lower().strip()
@@ -235,29 +306,97 @@ class PromptBlockCache:
     def _normalize_prompt(self, prompt: str) -> str:
         """Normalize prompt for comparison"""
         # Lowercase, remove extra whitespace
-        normalized = prompt.lower().strip()
-        normalized = re.sub(r'\s+', ' ', normalized)
-        return normalized
-
-    def _extract_words(self, prompt: str) -> Set[str]:
-        """Extract individual words and phrases from prompt"""
-        normalized = self._normalize_prompt(prompt)
+        return normalize_text(prompt)
 
-        # Extract single words
-        words = set(re.findall(r'\b\w+\b', normalized))
-
-        # Extract 2-word phrases (for phrases like "child abuse")
-        word_list = normalized.split()
-        for i in range(len(word_list) - 1):
-            phrase = f"{word_list[i]} {word_list[i+1]}"
-            words.add(phrase)
+    def _seed_automaton(self) -> KeywordAutomaton:
+        return KeywordAutomaton(
+            ((word, reason.value) for reason, words in self.SEED_BLOCKED_WORDS.items() for word in words),
+            whole_words=True,
+        )
 
-        # Extract 3-word phrases (for phrases like "how to make bomb")
-        for i in range(len(word_list) - 2):
-            phrase = f"{word_list[i]} {word_list[i+1]} {word_list[i+2]}"
-            words.add(phrase)
+    async def _get_automaton(self) -> KeywordAutomaton:
+        """Compiled block list, rebuilt when ``block:words:version`` moves.
 
-        return words
+        The version is checked at most every PATTERN_SYNC_INTERVAL seconds;
+        when Redis is unreachable the last compiled list (or the seed list)
+        keeps serving.
+        """
+        now = time.monotonic()
+        if self._automaton is not None and now < self._next_sync_at:
+            return self._automaton
+        self._next_sync_at = now + self.PATTERN_SYNC_INTERVAL
+        try:
+            r = await self._get_redis()
+            if not self._legacy_checked:
+                await self._migrate_legacy_words(r)
+            version = await r.get(self.VERSION_KEY)
+            if self._automaton is None or version != self._pattern_version:
+                entries = await r.hgetall(self.WORDS_KEY)
+                self._automaton, expired = self._compile(entries)
+                if expired:
+                    await r.hdel(self.WORDS_KEY, *expired)
+                self._pattern_version = version
+                logger.info(f"Block list compiled: {len(self._automaton)} patterns (version {version})")
+        except Exception as e:
+            logger.error(f"Failed to sync block list: {e}")
+            if self._automaton is None:
+                self._automaton = self._seed_automaton()
+        return self._automaton
+
+    def _compile(self, entries: Dict[str, str]) -> Tuple[KeywordAutomaton, List[str]]:
+        """Compile hash entries; returns the automaton and the expired words."""
+        if not entries:
+            return self._seed_automaton(), []
+        cutoff = datetime.now(timezone.utc).timestamp() - self.BLOCKED_WORD_TTL
+        terms = []
+        expired = []
+        for word, raw in entries.items():
+            try:
+                data = json.loads(raw)
+                cached_at = data.get("cached_at")
+                # Seeds are only rewritten when the seed list changes, so
+                # they never age out.
+                if (
+                    data.get("source") != "seed"
+                    and cached_at
+                    and datetime.fromisoformat(cached_at).timestamp() < cutoff
+                ):
+                    expired.append(word)  # re-seeding or re-learning renews it
+                    continue
+                terms.append((data.get("word") or word, data.get("reason") or BlockReason.CUSTOM.value))
+            except (ValueError, TypeError):
+                continue
+        return KeywordAutomaton(terms, whole_words=True), expired
+
+    async def _migrate_legacy_words(self, r: redis.Redis, claimed: Optional[bool] = None) -> None:
+        """One-off copy of per-word ``block:word:{hash}`` keys into the hash.
+
+        Safe to call from every instance: only the one that wins the
+        ``MIGRATED_KEY`` SET NX (or was handed ``claimed=True``) copies.
+        """
+        self._legacy_checked = True
+        if claimed is None:
+            claimed = bool(await r.set(self.MIGRATED_KEY, "1", nx=True))
+        if claimed:
+            keys = [key async for key in r.scan_iter(self.LEGACY_WORD_PATTERN)]
+            moved = 0
+            for i in range(0, len(keys), 500):
+                values = await r.mget(keys[i:i + 500])
+                mapping = {}
+                for raw in values:
+                    try:
+                        data = json.loads(raw) if raw else None
+                    except (ValueError, TypeError):
+                        data = None
+                    if data and data.get("word"):
+                        mapping[data["word"]] = raw
+                if mapping:
+                    await r.hset(self.WORDS_KEY, mapping=mapping)
+                    moved += len(mapping)
+            if moved:
+                await r.incr(self.VERSION_KEY)
+                self._next_sync_at = 0.0
+                logger.info(f"Migrated {moved} legacy blocked words into {self.WORDS_KEY}")
 
     async def _cache_blocked_word(
         self,
@@ -265,37 +404,67 @@ class PromptBlockCache:
         reason: str,
         source: str = "gemini"
     ) -> None:
-        """Add a word to the block cache"""
+        """Add a word to the block list and bump its version"""
+        await self._cache_blocked_words([(word, reason)], source)
+
+    async def _cache_blocked_words(
+        self,
+        words: List[Tuple[str, str]],
+        source: str = "gemini",
+        extra=None,
+    ) -> int:
+        """Add ``(word, reason)`` pairs to the block list in one pipeline.
+
+        The version is only bumped when a word is new or its reason changed.
+        ``extra(pipe)`` may queue more commands into the same transaction.
+        Returns the number of distinct words written.
+        """
         try:
             r = await self._get_redis()
-            word_hash = self._hash_text(word)
-            key = f"block:word:{word_hash}"
-
-            data = {
-                "word": word.lower(),
-                "reason": reason,
-                "source": source,
-                "cached_at": datetime.now(timezone.utc).isoformat(),
-                "hit_count": 0
-            }
-
-            await r.set(key, json.dumps(data), ex=self.BLOCKED_WORD_TTL)
-
+            cached_at = datetime.now(timezone.utc).isoformat()
+            mapping = {}
+            for word, reason in words:
+                word = normalize_text(word)
+                if not word:
+                    continue
+                mapping[word] = (reason, json.dumps({
+                    "word": word,
+                    "reason": reason,
+                    "source": source,
+                    "cached_at": cached_at,
+                }))
+            if not mapping:
+                return 0
+
+            args = []
+            for word, (reason, payload) in mapping.items():
+                args.extend((word, payload, reason))
+            pipe = r.pipeline()
+            pipe.eval(_LEARN_WORDS_LUA, 2, self.WORDS_KEY, self.VERSION_KEY, *args)
             # Update stats
-            await r.hincrby("block:stats", "total_blocked_words", 1)
-            await r.hincrby("block:stats", f"blocked_by_{source}", 1)
+            pipe.hincrby("block:stats", "total_blocked_words", len(mapping))
+            pipe.hincrby("block:stats", f"blocked_by_{source}", len(mapping))
+            if extra is not None:
+                extra(pipe)
+            changed = (await pipe.execute())[0]
+            if changed:
+                # Recompile on the next check, here and (via the version) fleet-wide.
+                self._next_sync_at = 0.0
+            return len(mapping)
 
         except Exception as e:
-            logger.error(f"Failed to cache blocked word: {e}")
+            logger.error(f"Failed to cache blocked words: {e}")
+            return 0
 
     async def _cache_prompt_result(
         self,
         prompt: str,
         is_blocked: bool,
         reason: Optional[str] = None,
-        blocked_words: Optional[List[str]] = None
+        blocked_words: Optional[List[str]] = None,
+        hit_stat: Optional[str] = None
     ) -> None:
-        """Cache the analysis result for a prompt"""
+        """Cache the analysis result for a prompt (and bump ``hit_stat``)"""
         try:
             r = await self._get_redis()
             prompt_hash = self._hash_text(prompt)
@@ -315,79 +484,28 @@ class PromptBlockCache:
                 "cached_at": datetime.now(timezone.utc).isoformat()
             }
 
-            await r.set(key, json.dumps(data), ex=ttl)
+            pipe = r.pipeline(transaction=False)
+            pipe.set(key, json.dumps(data), ex=ttl)
+            if hit_stat:
+                pipe.hincrby("block:stats", hit_stat, 1)
+            await pipe.execute()
 
         except Exception as e:
             logger.error(f"Failed to cache prompt result: {e}")
 
-    async def _check_word_in_cache(self, word: str) -> Optional[Dict[str, Any]]:
-        """Check if a single word is in the block cache. Kept for callers that
-        check one word; the prompt hot path uses _check_words_in_cache (batch).
-        """
-        found = await self._check_words_in_cache([word])
-        return found.get(word)
-
-    async def _check_words_in_cache(self, words) -> Dict[str, Dict[str, Any]]:
-        """Batch word lookup (2026-07-12 cache audit #7).
-
-        The old per-word path did a GET **and** a SET (to bump hit_count) for
-        EVERY word / 2-gram / 3-gram of every prompt — dozens of sequential
-        round-trips + write-amplification on the moderation hot path (this
-        runs on every generation). Now: one MGET for all words, a single
-        HINCRBY of the aggregate hit counter, and NO per-word write-back
-        (hit_count on the word row was cosmetic and the TTL refresh it did was
-        not worth a write per hit — blocked words are re-seeded/renewed by the
-        admin flow, not by read traffic).
-
-        Returns {word: cached_dict} for the words that were found blocked.
-        """
-        out: Dict[str, Dict[str, Any]] = {}
-        words = list(words)
-        if not words:
-            return out
-        try:
-            r = await self._get_redis()
-            keys = [f"block:word:{self._hash_text(w)}" for w in words]
-            values = await r.mget(keys)
-            hits = 0
-            for w, data in zip(words, values):
-                if data:
-                    try:
-                        out[w] = json.loads(data)
-                        hits += 1
-                    except (ValueError, TypeError):
-                        continue
-            if hits:
-                try:
-                    await r.hincrby("block:stats", "cache_hits", hits)
-                except Exception:
-                    pass
-            return out
-        except Exception as e:
-            logger.error(f"Failed to batch-check words in cache: {e}")
-            return out
-
     async def _check_prompt_in_cache(self, prompt: str) -> Optional[Dict[str, Any]]:
         """Check if a prompt result is cached"""
         try:
             r = await self._get_redis()
             prompt_hash = self._hash_text(prompt)
 
-            # Check blocked prompts first
-            blocked_key = f"block:prompt:{prompt_hash}"
-            data = await r.get(blocked_key)
-            if data:
-                await r.hincrby("block:stats", "prompt_cache_hits", 1)
-                return json.loads(data)
-
-            # Check safe prompts
-            safe_key = f"safe:prompt:{prompt_hash}"
-            data = await r.get(safe_key)
-            if data:
-                await r.hincrby("block:stats", "prompt_cache_hits", 1)
-                return json.loads(data)
-
-            return None
+            # Blocked verdict wins over safe — both fetched in one MGET
+            blocked, safe = await r.mget(f"block:prompt:{prompt_hash}", f"safe:prompt:{prompt_hash}")
+            data = blocked or safe
+            if not data:
+                return None
+            await r.hincrby("block:stats", "prompt_cache_hits", 1)
+            return json.loads(data)
 
         except Exception as e:
             logger.error(f"Failed to check prompt in cache: {e}")
@@ -425,15 +543,15 @@ class PromptBlockCache:
                 cached_at=datetime.fromisoformat(cached_result["cached_at"]) if cached_result.get("cached_at") else None
             )
 
-        # Step 2: Check individual words — ONE MGET for all n-grams (audit #7).
-        words = self._extract_words(prompt)
+        # Step 2: Scan against the compiled block list — local, no Redis I/O.
+        automaton = await self._get_automaton()
         blocked_words = []
         block_reasons = []
-
-        found = await self._check_words_in_cache(words)
-        for cached_word in found.values():
-            blocked_words.append(cached_word["word"])
-            block_reasons.append(cached_word["reason"])
+        for word, reason in automaton.scan(normalized, normalized=True):
+            if word not in blocked_words:
+                blocked_words.append(word)
+            if reason not in block_reasons:
+                block_reasons.append(reason)
 
         if blocked_words:
             # Found blocked words in cache
@@ -444,7 +562,7 @@ class PromptBlockCache:
                 source="cache",
                 confidence=0.95
             )
-            await self._cache_prompt_result(normalized, True, result.reason, blocked_words)
+            await self._cache_prompt_result(normalized, True, result.reason, blocked_words, hit_stat="cache_hits")
             return result
 
         # Step 3: Use Gemini to analyze unknown prompt
@@ -461,12 +579,11 @@ class PromptBlockCache:
 
             # If blocked, add individual words to cache for future
             if gemini_result.is_blocked and gemini_result.blocked_words:
-                for word in gemini_result.blocked_words:
-                    await self._cache_blocked_word(
-                        word,
-                        gemini_result.reason or BlockReason.CUSTOM.value,
-                        "gemini"
-                    )
+                reason = gemini_result.reason or BlockReason.CUSTOM.value
+                await self._cache_blocked_words(
+                    [(word, reason) for word in gemini_result.blocked_words],
+                    "gemini"
+                )
 
             return gemini_result
 
@@ -614,15 +731,28 @@ Only output the JSON, no other text."""
             logger.error(f"Failed to add blocked word: {e}")
             return False
 
+    async def add_blocked_words(
+        self,
+        words: List[str],
+        reason: str = BlockReason.CUSTOM.value,
+        source: str = "manual"
+    ) -> bool:
+        """Add several words under one reason in a single pipeline."""
+        added = await self._cache_blocked_words([(word, reason) for word in words], source)
+        if added:
+            logger.info(f"Added {added} blocked words (reason: {reason}, source: {source})")
+        return added > 0
+
     async def remove_blocked_word(self, word: str) -> bool:
-        """Remove a word from the block cache"""
+        """Remove a word from the block list"""
         try:
             r = await self._get_redis()
-            word_hash = self._hash_text(word)
-            key = f"block:word:{word_hash}"
+            word = normalize_text(word)
 
-            deleted = await r.delete(key)
+            deleted = await r.hdel(self.WORDS_KEY, word)
             if deleted:
+                await r.incr(self.VERSION_KEY)
+                self._next_sync_at = 0.0
                 logger.info(f"Removed blocked word: {word}")
                 return True
             return False
@@ -637,13 +767,8 @@ Only output the JSON, no other text."""
             r = await self._get_redis()
             stats = await r.hgetall("block:stats")
 
-            # Count total blocked words
-            blocked_keys = []
-            async for key in r.scan_iter("block:word:*"):
-                blocked_keys.append(key)
-
             return {
-                "total_blocked_words": len(blocked_keys),
+                "total_blocked_words": int(await r.hlen(self.WORDS_KEY)),
                 "cache_hits": int(stats.get("cache_hits", 0)),
                 "prompt_cache_hits": int(stats.get("prompt_cache_hits", 0)),
                 "blocked_by_seed": int(stats.get("blocked_by_seed", 0)),
@@ -672,6 +797,9 @@ Only output the JSON, no other text."""
                 count += 1
 
             self._initialized = False
+            self._legacy_checked = False
+            self._automaton = None
+            self._pattern_version = None
             logger.warning(f"Cleared {count} cache entries")
             return count
 
@@ -0,0 +1,243 @@
+"""
+Bounded conversation history for InteriorDesignService.iterative_edit.
+
+History used to live in an unbounded per-instance dict holding every turn's
+full base64 image. Memory grew with the number of active designers, and a
+follow-up edit routed to another Cloud Run instance found no history.
+
+A turn is now stored as text plus an image *reference*:
+
+    {"role": "user" | "model", "text": str,
+     "image_url": Optional[str], "mime_type": Optional[str]}
+
+The service stores inline images privately first (never as public objects)
+under ``CONVERSATION_IMAGE_PREFIX`` and rehydrates them when it builds the
+Gemini request. They are deleted when the conversation is cleared or when
+trimming drops the turn that used them, and ``sweep_conversation_images`` (run
+with the media cleanup) removes those of conversations that expired. Every
+conversation is bounded the same way by ``trim_turns``: at most ``max_turns``
+turns and ``max_bytes`` serialized, dropping the oldest turns first, and
+always starting with a user turn. Conversations expire ``ttl_seconds`` after
+their last save.
+
+Backends:
+
+- ``RedisConversationStore`` — one JSON value per conversation at
+  ``vidgo:interior:conversation:<id>`` with SET EX, shared by every
+  instance. Redis errors fall back to a local in-memory store, so a single
+  instance keeps working while Redis is down.
+- ``InMemoryConversationStore`` — a per-process LRU capped at
+  ``max_entries`` conversations (tests, local dev).
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+REDIS_KEY_PREFIX = "vidgo:interior:conversation:"
+# Private (non-public) objects holding user-supplied edit sources, one
+# "directory" per conversation.
+CONVERSATION_IMAGE_PREFIX = "private/interior/conversations/"
+
+_SAFE_ID = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+Turn = Dict[str, Any]
+
+
+def make_turn(role: str, text: str, image_url: Optional[str] = None, mime_type: Optional[str] = None) -> Turn:
+    turn: Turn = {"role": role, "text": text or ""}
+    if image_url:
+        turn["image_url"] = image_url
+        turn["mime_type"] = mime_type or "image/png"
+    return turn
+
+
+def _turn_bytes(turn: Turn) -> int:
+    return len(json.dumps(turn, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+
+def trim_turns(turns: List[Turn], max_turns: int, max_bytes: int) -> List[Turn]:
+    """Keep the newest turns within both budgets, starting with a user turn."""
+    kept = list(turns[-max_turns:]) if max_turns > 0 else []
+    sizes = [_turn_bytes(t) for t in kept]
+    total = sum(sizes)
+    start = 0
+    while start < len(kept) and (total > max_bytes or kept[start].get("role") != "user"):
+        total -= sizes[start]
+        start += 1
+    return kept[start:]
+
+
+def conversation_image_dir(conversation_id: str) -> str:
+    """Path segment for a conversation's images. Client-chosen ids that
+    aren't plain tokens are hashed so they can't escape the prefix."""
+    if _SAFE_ID.fullmatch(conversation_id):
+        return conversation_id
+    return hashlib.sha256(conversation_id.encode("utf-8")).hexdigest()[:32]
+
+
+def image_refs(turns: List[Turn]) -> Set[str]:
+    return {t["image_url"] for t in turns if t.get("image_url")}
+
+
+class ConversationStore(ABC):
+    """Bounded, TTL'd conversation history keyed by conversation id."""
+
+    def __init__(self, max_turns: int = 20, max_bytes: int = 64 * 1024, ttl_seconds: int = 6 * 3600):
+        self.max_turns = max(1, max_turns)
+        self.max_bytes = max(1, max_bytes)
+        self.ttl_seconds = max(1, ttl_seconds)
+
+    def trim(self, turns: List[Turn]) -> List[Turn]:
+        return trim_turns(turns, self.max_turns, self.max_bytes)
+
+    @abstractmethod
+    async def load(self, conversation_id: str) -> List[Turn]:
+        """Stored turns for ``conversation_id`` ([] if unknown or expired)."""
+        pass
+
+    @abstractmethod
+    async def save(self, conversation_id: str, turns: List[Turn]) -> List[Turn]:
+        """Trim and store ``turns``; returns what was stored."""
+        pass
+
+    @abstractmethod
+    async def delete(self, conversation_id: str) -> bool:
+        """Drop a conversation; True if one existed."""
+        pass
+
+
+class InMemoryConversationStore(ConversationStore):
+    def __init__(self, max_entries: int = 1000, **kwargs):
+        super().__init__(**kwargs)
+        self.max_entries = max(1, max_entries)
+        self._data: "OrderedDict[str, Tuple[float, List[Turn]]]" = OrderedDict()
+
+    async def load(self, conversation_id: str) -> List[Turn]:
+        item = self._data.get(conversation_id)
+        if item is None:
+            return []
+        if item[0] <= time.monotonic():
+            del self._data[conversation_id]
+            return []
+        self._data.move_to_end(conversation_id)
+        return [dict(t) for t in item[1]]
+
+    async def save(self, conversation_id: str, turns: List[Turn]) -> List[Turn]:
+        turns = self.trim(turns)
+        self._data[conversation_id] = (time.monotonic() + self.ttl_seconds, [dict(t) for t in turns])
+        self._data.move_to_end(conversation_id)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+        return turns
+
+    async def delete(self, conversation_id: str) -> bool:
+        return self._data.pop(conversation_id, None) is not None
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class RedisConversationStore(ConversationStore):
+    def __init__(self, fallback: Optional[InMemoryConversationStore] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.fallback = fallback or InMemoryConversationStore(**kwargs)
+
+    @staticmethod
+    async def _redis():
+        from app.api.deps import get_redis
+
+        return await get_redis()
+
+    async def load(self, conversation_id: str) -> List[Turn]:
+        try:
+            redis = await self._redis()
+            raw = await redis.get(f"{REDIS_KEY_PREFIX}{conversation_id}")
+        except Exception as e:
+            logger.warning(f"[Conversations] Redis load failed, using local history: {e}")
+            return await self.fallback.load(conversation_id)
+        if not raw:
+            return []
+        try:
+            return json.loads(raw)
+        except ValueError:
+            return []
+
+    async def save(self, conversation_id: str, turns: List[Turn]) -> List[Turn]:
+        turns = self.trim(turns)
+        try:
+            redis = await self._redis()
+            await redis.set(
+                f"{REDIS_KEY_PREFIX}{conversation_id}",
+                json.dumps(turns, ensure_ascii=False, separators=(",", ":")),
+                ex=self.ttl_seconds,
+            )
+        except Exception as e:
+            logger.warning(f"[Conversations] Redis save failed, keeping history locally: {e}")
+            await self.fallback.save(conversation_id, turns)
+        return turns
+
+    async def delete(self, conversation_id: str) -> bool:
+        cleared = await self.fallback.delete(conversation_id)
+        try:
+            redis = await self._redis()
+            cleared = bool(await redis.delete(f"{REDIS_KEY_PREFIX}{conversation_id}")) or cleared
+        except Exception as e:
+            logger.warning(f"[Conversations] Redis delete failed: {e}")
+        return cleared
+
+
+async def sweep_conversation_images(gcs, store: ConversationStore, max_age_seconds: int) -> int:
+    """Delete the private images of conversations that are gone from
+    ``store`` and whose newest image is older than ``max_age_seconds``.
+    Returns the number of objects deleted."""
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=max_age_seconds)
+
+    def _list():
+        return [(b.name, b.time_created) for b in gcs.client.list_blobs(gcs.bucket_name, prefix=CONVERSATION_IMAGE_PREFIX)]
+
+    by_conversation: Dict[str, List[Tuple[str, datetime]]] = {}
+    for name, created in await asyncio.to_thread(_list):
+        conversation_dir = name[len(CONVERSATION_IMAGE_PREFIX):].split("/", 1)[0]
+        by_conversation.setdefault(conversation_dir, []).append((name, created))
+
+    doomed: List[str] = []
+    for conversation_dir, blobs in by_conversation.items():
+        newest = max((created for _, created in blobs if created), default=None)
+        if newest is not None and newest > cutoff:
+            continue
+        # Hashed dirs can't be mapped back to an id; age alone decides.
+        if _SAFE_ID.fullmatch(conversation_dir) and await store.load(conversation_dir):
+            continue
+        doomed.extend(name for name, _ in blobs)
+    return await gcs.delete_blobs(doomed) if doomed else 0
+
+
+_store: Optional[ConversationStore] = None
+
+
+def get_conversation_store() -> ConversationStore:
+    global _store
+    if _store is None:
+        s = get_settings()
+        limits = dict(
+            max_turns=s.INTERIOR_CONVERSATION_MAX_TURNS,
+            max_bytes=s.INTERIOR_CONVERSATION_MAX_BYTES,
+            ttl_seconds=s.INTERIOR_CONVERSATION_TTL_SECONDS,
+        )
+        local = InMemoryConversationStore(max_entries=s.INTERIOR_CONVERSATION_MEMORY_MAX_ENTRIES, **limits)
+        if (s.INTERIOR_CONVERSATION_STORE or "").lower() == "memory":
+            _store = local
+        else:
+            _store = RedisConversationStore(fallback=local, **limits)
+    return _store
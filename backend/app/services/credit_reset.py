@@ -0,0 +1,443 @@
+"""
+Set-based credit jobs: monthly subscription reset and bonus expiry.
+
+The old jobs loaded every eligible user and, per user, ran their own
+``SELECT Plan`` / ``SELECT Subscription`` / ``SELECT Order`` before adding
+ledger rows, which meant tens of thousands of round-trips per Cloud Scheduler
+call. Here users are processed in keyset-paginated chunks of
+``CREDIT_JOB_CHUNK_SIZE`` (``users.id > :after ORDER BY id LIMIT :n``). Each
+chunk is one transaction with a fixed number of statements:
+
+1. the chunk's upper bound (``max(id)`` over the next ``n`` candidates);
+2. ``UPDATE users ... FROM (users ⋈ plans ⋈ subscriptions ⋈ last order)
+   ⋈ grants ... RETURNING``. ``grants`` is a ``VALUES`` list of
+   ``(plan, ecpay?, yearly?) → credits`` built from
+   ``subscription_period_credits``, so amounts and rounding match the
+   activation and webhook paths exactly;
+3. one bulk ``INSERT`` of the ``CreditTransaction`` rows for the returned users.
+
+Runtime grows with the number of chunks, not the number of users.
+
+Idempotency is unchanged. The scheduled reset skips anyone whose
+``credits_reset_at`` is within ``RESET_GUARD_DAYS``, and a bonus batch drops
+out of the predicate once it is zeroed. The monthly resets also keep a
+progress cursor in Redis (``vidgo:credit_reset:<job>:<YYYY-MM>``), so a run
+that timed out resumes after the last committed chunk instead of rescanning.
+The cursor is cleared after a run with no failed chunks, and it stops
+advancing at the first failed chunk, so that chunk is retried on the next run.
+"""
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import Integer, and_, case, cast, column, func, insert, or_, select, true, update, values
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.models.billing import CreditTransaction, Order, Plan, Subscription
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+# Guard (a) 2026-07-10 — every grant path (activation, SALE-webhook renewal,
+# the scheduled reset) stamps credits_reset_at; anyone refreshed within this
+# window is skipped, so a double-fired reset can't re-fill mid-cycle spend.
+RESET_GUARD_DAYS = 25
+
+CHECKPOINT_PREFIX = "vidgo:credit_reset:"
+CHECKPOINT_TTL_SECONDS = 7 * 24 * 3600
+
+
+class ResetCheckpoint:
+    """Keyset cursor of the last committed chunk, kept in Redis (fail-open:
+    without Redis a rerun rescans, and the idempotency guards still hold)."""
+
+    def __init__(self, job: str, period: str):
+        self.key = f"{CHECKPOINT_PREFIX}{job}:{period}"
+
+    async def _redis(self):
+        from app.api.deps import get_redis
+        return await get_redis()
+
+    async def load(self) -> Optional[UUID]:
+        try:
+            raw = await (await self._redis()).get(self.key)
+            return UUID(raw.decode() if isinstance(raw, bytes) else raw) if raw else None
+        except Exception as e:
+            logger.warning("[CreditReset] checkpoint read failed (%s) — starting from the beginning", e)
+            return None
+
+    async def save(self, cursor: UUID) -> None:
+        try:
+            await (await self._redis()).set(self.key, str(cursor), ex=CHECKPOINT_TTL_SECONDS)
+        except Exception as e:
+            logger.debug("[CreditReset] checkpoint write failed: %s", e)
+
+    async def clear(self) -> None:
+        try:
+            await (await self._redis()).delete(self.key)
+        except Exception as e:
+            logger.debug("[CreditReset] checkpoint clear failed: %s", e)
+
+
+def _chunk_size() -> int:
+    return max(1, get_settings().CREDIT_JOB_CHUNK_SIZE)
+
+
+def grant_rows(plans) -> List[Tuple[Any, int, int, int]]:
+    """``(plan_id, ecpay, yearly, credits)`` for every plan/currency/cycle,
+    from the same helper the activation and webhook paths use. The flags are
+    0/1 integers: untyped boolean parameters in a VALUES list resolve to text."""
+    from app.services.subscription_service import subscription_period_credits
+
+    rows = []
+    for plan in plans:
+        for ecpay in (False, True):
+            for yearly in (False, True):
+                credits = subscription_period_credits(
+                    plan, "ecpay" if ecpay else None, "yearly" if yearly else "monthly"
+                )
+                rows.append((plan.id, int(ecpay), int(yearly), credits))
+    return rows
+
+
+def _grants_table(rows):
+    return values(
+        column("plan_id", PG_UUID(as_uuid=True)),
+        column("ecpay", Integer),
+        column("yearly", Integer),
+        column("credits", Integer),
+        name="grants",
+    ).data(rows)
+
+
+async def _load_grants(db: AsyncSession):
+    plans = (await db.execute(select(Plan))).scalars().all()
+    rows = grant_rows(plans)
+    return _grants_table(rows) if rows else None
+
+
+async def _next_chunk(db: AsyncSession, after: Optional[UUID], n: int, *criteria) -> Tuple[Optional[UUID], int]:
+    """(upper id, candidate count) of the next keyset chunk."""
+    query = select(User.id).where(*criteria)
+    if after is not None:
+        query = query.where(User.id > after)
+    chunk = query.order_by(User.id).limit(n).subquery("chunk")
+    upper, count = (await db.execute(select(func.max(chunk.c.id), func.count()).select_from(chunk))).one()
+    return upper, count or 0
+
+
+def _last_order_method(subscription_id):
+    return (
+        select(Order.payment_method)
+        .where(Order.subscription_id == subscription_id)
+        .order_by(Order.created_at.desc())
+        .limit(1)
+        .lateral("last_order")
+    )
+
+
+def scheduled_reset_stmt(grants, lower: Optional[UUID], upper: UUID, now: datetime):
+    """Worker reset for one chunk. Mirrors the per-user guards of the old
+    loop: active user, plan with monthly_credits, credits_reset_at outside
+    the guard window, a currently valid subscription (latest by start_date),
+    and not a monthly PayPal sub (those are granted per cycle by the
+    PAYMENT.SALE.COMPLETED webhook)."""
+    last_order = _last_order_method(Subscription.id)
+    method = func.lower(func.coalesce(last_order.c.payment_method, ""))
+    bounds = [User.id <= upper] + ([User.id > lower] if lower is not None else [])
+    eligible = (
+        select(
+            User.id.label("user_id"),
+            func.coalesce(User.subscription_credits, 0).label("old_credits"),
+            Plan.id.label("plan_id"),
+            func.coalesce(Plan.display_name, Plan.name).label("plan_label"),
+            (func.coalesce(Subscription.billing_cycle, "monthly") == "yearly").label("yearly"),
+            (method == "ecpay").label("ecpay"),
+            method.label("method"),
+        )
+        .select_from(User)
+        .join(Plan, Plan.id == User.current_plan_id)
+        .join(Subscription, and_(
+            Subscription.user_id == User.id,
+            Subscription.status == "active",
+            Subscription.end_date >= now,
+        ))
+        .outerjoin(last_order, true())
+        .where(
+            *bounds,
+            User.is_active == True,
+            Plan.monthly_credits > 0,
+            or_(User.credits_reset_at == None, User.credits_reset_at <= now - timedelta(days=RESET_GUARD_DAYS)),
+        )
+        .distinct(User.id)
+        .order_by(User.id, Subscription.start_date.desc())
+        .subquery("eligible")
+    )
+    return (
+        update(User)
+        .where(
+            User.id == eligible.c.user_id,
+            grants.c.plan_id == eligible.c.plan_id,
+            grants.c.ecpay == cast(eligible.c.ecpay, Integer),
+            grants.c.yearly == cast(eligible.c.yearly, Integer),
+            grants.c.credits > 0,
+            or_(eligible.c.yearly, eligible.c.method != "paypal"),
+        )
+        .values(subscription_credits=grants.c.credits, credits_reset_at=now)
+        .returning(
+            User.id,
+            eligible.c.old_credits,
+            func.coalesce(User.purchased_credits, 0),
+            func.coalesce(User.bonus_credits, 0),
+            grants.c.credits,
+            eligible.c.plan_label,
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def scheduled_reset_ledger(row) -> List[Dict[str, Any]]:
+    user_id, old_credits, purchased, bonus, new_credits, plan_label = row
+    balance = purchased + bonus + new_credits
+    entries = []
+    if old_credits > 0:
+        entries.append(dict(
+            user_id=user_id,
+            amount=-old_credits,
+            balance_after=balance,
+            transaction_type="expiry",
+            description=f"Monthly subscription credit reset — {old_credits} unused credits expired",
+        ))
+    entries.append(dict(
+        user_id=user_id,
+        amount=new_credits,
+        balance_after=balance,
+        transaction_type="subscription",
+        description=f"Monthly credit allocation — {plan_label} plan ({new_credits} credits)",
+    ))
+    return entries
+
+
+def admin_reset_stmt(grants, lower: Optional[UUID], upper: UUID, now: datetime, next_month: datetime):
+    """CreditService reset for one chunk: users whose plan_expires_at is in
+    the future, billing cycle from their latest active subscription (monthly
+    if none). Old credits always expire; monthly plans roll plan_expires_at to
+    the 1st of next month, yearly ones keep their year-out expiry."""
+    latest_sub = (
+        select(Subscription.id.label("id"), Subscription.billing_cycle.label("billing_cycle"))
+        .where(Subscription.user_id == User.id, Subscription.status == "active")
+        .order_by(Subscription.start_date.desc())
+        .limit(1)
+        .lateral("latest_sub")
+    )
+    last_order = _last_order_method(latest_sub.c.id)
+    method = func.lower(func.coalesce(last_order.c.payment_method, ""))
+    yearly = func.coalesce(latest_sub.c.billing_cycle, "monthly") == "yearly"
+    bounds = [User.id <= upper] + ([User.id > lower] if lower is not None else [])
+    eligible = (
+        select(
+            User.id.label("user_id"),
+            func.coalesce(User.subscription_credits, 0).label("old_credits"),
+            func.coalesce(grants.c.credits, 0).label("new_credits"),
+            yearly.label("yearly"),
+        )
+        .select_from(User)
+        .join(Plan, Plan.id == User.current_plan_id)
+        .outerjoin(latest_sub, true())
+        .outerjoin(last_order, true())
+        .outerjoin(grants, and_(
+            grants.c.plan_id == Plan.id,
+            grants.c.ecpay == cast(method == "ecpay", Integer),
+            grants.c.yearly == cast(yearly, Integer),
+        ))
+        .where(*bounds, User.plan_expires_at >= now)
+        .subquery("eligible")
+    )
+    return (
+        update(User)
+        .where(User.id == eligible.c.user_id)
+        .values(
+            subscription_credits=eligible.c.new_credits,
+            plan_expires_at=case((eligible.c.yearly, User.plan_expires_at), else_=next_month),
+        )
+        .returning(
+            User.id,
+            eligible.c.old_credits,
+            func.coalesce(User.purchased_credits, 0),
+            func.coalesce(User.bonus_credits, 0),
+            eligible.c.new_credits,
+            eligible.c.yearly,
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def admin_reset_ledger(row) -> List[Dict[str, Any]]:
+    user_id, old_credits, purchased, bonus, new_credits, yearly = row
+    entries = []
+    if old_credits > 0:
+        entries.append(dict(
+            user_id=user_id,
+            amount=-old_credits,
+            balance_after=purchased + bonus,
+            transaction_type="expiry",
+            description="Monthly subscription credits expired (no carryover)",
+        ))
+    if new_credits > 0:
+        entries.append(dict(
+            user_id=user_id,
+            amount=new_credits,
+            balance_after=purchased + bonus + new_credits,
+            transaction_type="subscription",
+            description=(
+                "Yearly subscription monthly top-up (11/12 prorated)"
+                if yearly
+                else "Monthly subscription credits added"
+            ),
+        ))
+    return entries
+
+
+def _empty_stats() -> Dict[str, Any]:
+    return {"candidates": 0, "updated": 0, "chunks": 0, "credits_expired": 0, "credits_added": 0, "errors": []}
+
+
+async def _run_chunked(
+    db: AsyncSession,
+    checkpoint: ResetCheckpoint,
+    candidates: tuple,
+    build_stmt: Callable[[Optional[UUID], UUID], Any],
+    ledger: Callable[[Any], List[Dict[str, Any]]],
+) -> Dict[str, Any]:
+    n = _chunk_size()
+    after = await checkpoint.load()
+    if after is not None:
+        logger.info("[CreditReset] resuming %s after %s", checkpoint.key, after)
+    stats = _empty_stats()
+    checkpointing = True
+
+    while True:
+        upper, count = await _next_chunk(db, after, n, *candidates)
+        if upper is None:
+            break
+        stats["chunks"] += 1
+        stats["candidates"] += count
+        try:
+            rows = (await db.execute(build_stmt(after, upper))).all()
+            entries = [e for row in rows for e in ledger(row)]
+            if entries:
+                await db.execute(insert(CreditTransaction), entries)
+            await db.commit()
+        except Exception as e:
+            logger.error("[CreditReset] chunk after %s failed: %s", after, e)
+            try:
+                await db.rollback()
+            except Exception:
+                pass
+            stats["errors"].append(f"Chunk after {after}: {e}")
+            checkpointing = False
+        else:
+            stats["updated"] += len(rows)
+            for e in entries:
+                if e["transaction_type"] == "expiry":
+                    stats["credits_expired"] -= e["amount"]
+                else:
+                    stats["credits_added"] += e["amount"]
+            if checkpointing:
+                await checkpoint.save(upper)
+        if count < n:
+            break
+        after = upper
+
+    if not stats["errors"]:
+        await checkpoint.clear()
+    return stats
+
+
+async def run_scheduled_monthly_reset(db: AsyncSession, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """The Cloud Scheduler / ARQ monthly reset (worker.monthly_credit_reset_task)."""
+    now = now or datetime.now(timezone.utc)
+    grants = await _load_grants(db)
+    if grants is None:
+        return _empty_stats()
+    return await _run_chunked(
+        db,
+        ResetCheckpoint("scheduled", now.strftime("%Y-%m")),
+        (User.current_plan_id != None, User.is_active == True),
+        lambda lo, hi: scheduled_reset_stmt(grants, lo, hi, now),
+        scheduled_reset_ledger,
+    )
+
+
+async def run_admin_monthly_reset(db: AsyncSession, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """CreditService.reset_monthly_credits_for_all_users."""
+    now = now or datetime.now(timezone.utc)
+    if now.month == 12:
+        next_month = now.replace(year=now.year + 1, month=1, day=1)
+    else:
+        next_month = now.replace(month=now.month + 1, day=1)
+    grants = await _load_grants(db)
+    if grants is None:  # no plans, so no user can have a current plan
+        return _empty_stats()
+    return await _run_chunked(
+        db,
+        ResetCheckpoint("admin", now.strftime("%Y-%m")),
+        (User.current_plan_id != None, User.plan_expires_at >= now),
+        lambda lo, hi: admin_reset_stmt(grants, lo, hi, now, next_month),
+        admin_reset_ledger,
+    )
+
+
+def bonus_expiry_stmt(after: Optional[UUID], n: int, now: datetime):
+    """Zero the next ``n`` expired bonus batches (row-locked, so the returned
+    amount is exactly what was removed)."""
+    query = select(User.id.label("user_id"), User.bonus_credits.label("expired")).where(
+        User.bonus_credits > 0,
+        User.bonus_credits_expiry != None,
+        User.bonus_credits_expiry < now,
+    )
+    if after is not None:
+        query = query.where(User.id > after)
+    victims = query.order_by(User.id).limit(n).with_for_update().subquery("victims")
+    return (
+        update(User)
+        .where(User.id == victims.c.user_id)
+        .values(bonus_credits=0, bonus_credits_expiry=None)
+        .returning(
+            User.id,
+            victims.c.expired,
+            func.coalesce(User.subscription_credits, 0) + func.coalesce(User.purchased_credits, 0),
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def run_bonus_expiry(db: AsyncSession, now: Optional[datetime] = None) -> int:
+    """Expire every past-due bonus batch, one chunk per transaction. No
+    checkpoint needed: expired rows leave the predicate, so a rerun simply
+    picks up whatever is left. Returns the number of users cleaned."""
+    now = now or datetime.now(timezone.utc)
+    n = _chunk_size()
+    after = None
+    cleaned = 0
+    while True:
+        rows = (await db.execute(bonus_expiry_stmt(after, n, now))).all()
+        if rows:
+            await db.execute(insert(CreditTransaction), [
+                dict(
+                    user_id=user_id,
+                    amount=-expired,
+                    balance_after=balance,
+                    transaction_type="expiry",
+                    description=f"Bonus credits expired ({expired} credits)",
+                )
+                for user_id, expired, balance in rows
+            ])
+        await db.commit()
+        cleaned += len(rows)
+        if len(rows) < n:
+            return cleaned
+        after = max(row[0] for row in rows)
@@ -784,117 +784,22 @@ class CreditService:
         - For yearly subscribers do NOT overwrite plan_expires_at — the
           old logic clamped it to next_month, silently truncating yearly
           plans into monthly rentals.
-        """
-        from app.models.billing import Subscription
 
-        # Get all users with active subscriptions
-        result = await self.db.execute(
-            select(User).where(
-                User.current_plan_id != None,
-                User.plan_expires_at >= datetime.now(timezone.utc)
-            )
-        )
-        users = result.scalars().all()
+        Runs set-based in keyset chunks (credit_reset.run_admin_monthly_reset),
+        committing per chunk; a timed-out call resumes where it stopped.
+        """
+        from app.services.credit_reset import run_admin_monthly_reset
 
-        stats = {
-            "total_users": len(users),
-            "credits_expired": 0,
-            "credits_added": 0,
-            "errors": []
+        stats = await run_admin_monthly_reset(self.db)
+        return {
+            "total_users": stats["candidates"],
+            "users_reset": stats["updated"],
+            "chunks": stats["chunks"],
+            "credits_expired": stats["credits_expired"],
+            "credits_added": stats["credits_added"],
+            "errors": stats["errors"],
         }
 
-        for user in users:
-            try:
-                # Get user's plan to know how many credits to add
-                plan_result = await self.db.execute(
-                    select(Plan).where(Plan.id == user.current_plan_id)
-                )
-                plan = plan_result.scalar_one_or_none()
-
-                # Determine billing cycle from the most recent active subscription.
-                sub_res = await self.db.execute(
-                    select(Subscription)
-                    .where(
-                        Subscription.user_id == user.id,
-                        Subscription.status == "active",
-                    )
-                    .order_by(desc(Subscription.start_date))
-                    .limit(1)
-                )
-                sub = sub_res.scalar_one_or_none()
-                billing_cycle = (getattr(sub, "billing_cycle", None) if sub else "monthly") or "monthly"
-                is_yearly = billing_cycle == "yearly"
-
-                if plan:
-                    # First, expire old credits
-                    old_credits = user.subscription_credits or 0
-                    if old_credits > 0:
-                        user.subscription_credits = 0
-                        stats["credits_expired"] += old_credits
-
-                        # Record expiry transaction
-                        transaction = CreditTransaction(
-                            user_id=user.id,
-                            amount=-old_credits,
-                            balance_after=(user.purchased_credits or 0) + (user.bonus_credits or 0),
-                            transaction_type="expiry",
-                            description="Monthly subscription credits expired (no carryover)"
-                        )
-                        self.db.add(transaction)
-
-                    # Add new credits. Currency-aware: ECPay (TWD) subscribers
-                    # get the smaller TWD allowance (anti-arbitrage); yearly
-                    # stays 11/12-prorated. See subscription_period_credits.
-                    from app.models.billing import Order as _Order
-                    from app.services.subscription_service import (
-                        subscription_period_credits as _period_credits,
-                    )
-                    _ord = None
-                    if sub is not None:
-                        _ord = (await self.db.execute(
-                            select(_Order)
-                            .where(_Order.subscription_id == sub.id)
-                            .order_by(_Order.created_at.desc())
-                        )).scalars().first()
-                    new_credits = _period_credits(
-                        plan, _ord.payment_method if _ord else None, billing_cycle
-                    )
-                    if new_credits > 0:
-                        user.subscription_credits = new_credits
-                        stats["credits_added"] += new_credits
-
-                        # Record new credits transaction
-                        transaction = CreditTransaction(
-                            user_id=user.id,
-                            amount=new_credits,
-                            balance_after=(user.purchased_credits or 0) + (user.bonus_credits or 0) + new_credits,
-                            transaction_type="subscription",
-                            description=(
-                                "Yearly subscription monthly top-up (11/12 prorated)"
-                                if is_yearly
-                                else "Monthly subscription credits added"
-                            )
-                        )
-                        self.db.add(transaction)
-
-                    # Only roll plan_expires_at forward for monthly subs.
-                    # Yearly subs already have a year-out expiry from
-                    # subscription activation; clamping to next_month here
-                    # turned annual contracts into rolling monthly ones.
-                    if not is_yearly:
-                        now = datetime.now(timezone.utc)
-                        if now.month == 12:
-                            next_month = now.replace(year=now.year + 1, month=1, day=1)
-                        else:
-                            next_month = now.replace(month=now.month + 1, day=1)
-                        user.plan_expires_at = next_month
-
-            except Exception as e:
-                stats["errors"].append(f"User {user.id}: {str(e)}")
-
-        await self.db.commit()
-        return stats
-
     async def handle_plan_change(self, user_id: str, new_plan_id: str, is_upgrade: bool) -> Dict[str, Any]:
         """
         Handle plan change (upgrade or downgrade).
@@ -10,17 +10,26 @@ Flow:
 
 Cache key: demo:{tool_type}:{topic} -> JSON list of demo results
 
+Generic lookups (tool_type, topic [, product_id, language]) are read-through:
+process-local LRU → Redis ``demo:best:{tool_type}:{topic}`` hash → Material
+DB, with single-flight so concurrent misses on one instance share ONE DB
+query. The cached value is exactly what _get_from_db returns (the
+deterministic best row), so caching never changes which demo is served.
+
 On-Demand Generation:
     - Uses provider_router to call appropriate AI API
     - Results are watermarked and stored in Material DB
     - Cached in Redis for subsequent requests
     - No credits consumed for demo generation (limited per session)
 """
+import asyncio
 import hashlib
 import json
 import logging
 import random
-from typing import Optional, List, Dict, Any
+import time
+from collections import OrderedDict
+from typing import Optional, List, Dict, Any, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import and_, or_, select, func
 
@@ -28,6 +37,7 @@ from app.models.material import (
     Material, ToolType, MaterialSource, MaterialStatus,
     demo_lookup_hash, demo_extra_context,
 )
+from app.services.material_readiness import invalidate_readiness_snapshot
 
 logger = logging.getLogger(__name__)
 
@@ -38,10 +48,59 @@ CACHE_PREFIX = "demo"
 # from Redis indefinitely. A 1h TTL makes the bucket self-heal — it re-warms
 # from the live DB on the next miss, exactly like the GCS blob-listing cache.
 DEMO_BUCKET_TTL_SEC = 3600
+# A generic lookup that found nothing is remembered this long, so a missing
+# preset under landing-page traffic doesn't turn into a DB query per request.
+DEMO_MISS_TTL_SEC = 60
+# Process-local layer in front of Redis. Per-instance, so invalidate_cache()
+# only clears the instance that served the admin write; other instances
+# converge within the TTL (same trade-off as payment_settings, audit #8).
+DEMO_LOCAL_TTL_SEC = 30
+DEMO_LOCAL_MAX_ENTRIES = 1024
+
+
 def _cache_key(tool_type: str, topic: str = "_all") -> str:
     return f"{CACHE_PREFIX}:{tool_type}:{topic}"
 
 
+def _tool_key(tool_type) -> str:
+    return tool_type.value if hasattr(tool_type, "value") else str(tool_type)
+
+
+def _best_key(tool_type, topic: Optional[str]) -> str:
+    """Redis hash of best-row lookups for one (tool_type, topic)."""
+    return f"{CACHE_PREFIX}:best:{_tool_key(tool_type)}:{topic or '_all'}"
+
+
+def _best_field(product_id: Optional[str], language: Optional[str]) -> str:
+    return f"{product_id or ''}|{language or ''}"
+
+
+# (best_key, field) → (expires_at monotonic, demo dict or None for a miss)
+_local_best: "OrderedDict[Tuple[str, str], Tuple[float, Optional[Dict[str, Any]]]]" = OrderedDict()
+# (best_key, field) → future resolved by the request that is loading it
+_best_inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+_LOAD_FAILED = object()
+
+
+def _local_get(key: Tuple[str, str]):
+    entry = _local_best.get(key)
+    if entry is None:
+        return _LOAD_FAILED
+    expires_at, value = entry
+    if time.monotonic() >= expires_at:
+        _local_best.pop(key, None)
+        return _LOAD_FAILED
+    _local_best.move_to_end(key)
+    return value
+
+
+def _local_put(key: Tuple[str, str], value: Optional[Dict[str, Any]]) -> None:
+    _local_best[key] = (time.monotonic() + DEMO_LOCAL_TTL_SEC, value)
+    _local_best.move_to_end(key)
+    while len(_local_best) > DEMO_LOCAL_MAX_ENTRIES:
+        _local_best.popitem(last=False)
+
+
 # Tool type string → ToolType enum mapping
 _TOOL_TYPE_MAP = {
     "background_removal": ToolType.BACKGROUND_REMOVAL,
@@ -94,9 +153,10 @@ class DemoCacheService:
     Cache-first demo service with on-demand generation.
 
     Lookup order:
-        1. Redis cache (fast, non-expiring)
-        2. Material DB (persistent)
-        3. On-demand generation via provider_router (if cache miss)
+        1. Process-local LRU (generic lookups, 30s)
+        2. Redis cache (1h TTL)
+        3. Material DB (persistent, single-flight per instance)
+        4. On-demand generation via provider_router (if cache miss)
 
     Generated results are cached in both Material DB and Redis
     so subsequent requests are served instantly.
@@ -172,12 +232,10 @@ class DemoCacheService:
         # expensive on-demand generation that could still pick the wrong
         # model.
         if not user_input or (tt_key in ("try_on", "short_video") and product_id):
-            demo = await self._get_from_db(
+            demo = await self._get_best(
                 tool_type, topic, product_id=product_id, language=language
             )
             if demo:
-                if self.redis and not product_id:
-                    await self._warm_cache(tool_type, topic)
                 return demo
 
             # 3. Redis bucket only for the generic (no user-picked input) path.
@@ -194,7 +252,7 @@ class DemoCacheService:
         # silently serves an unrelated demo.
         tt_lower = tt_key.lower()
         if tt_lower == "ai_avatar" and topic and not user_input:
-            generic = await self._get_from_db(tool_type, None, language=language)
+            generic = await self._get_best(tool_type, None, language=language)
             if generic:
                 return generic
 
@@ -204,10 +262,10 @@ class DemoCacheService:
         # model, then to ANY approved short-video clip, so the visitor still sees
         # a representative result. Scoped to short_video.
         if tt_lower == "short_video" and product_id:
-            relaxed = await self._get_from_db(tool_type, topic, language=language)
+            relaxed = await self._get_best(tool_type, topic, language=language)
             if relaxed:
                 return relaxed
-            generic = await self._get_from_db(tool_type, None, language=language)
+            generic = await self._get_best(tool_type, None, language=language)
             if generic:
                 return generic
 
@@ -263,6 +321,12 @@ class DemoCacheService:
             raw = await self.redis.get(key)
             if raw:
                 return json.loads(raw)[:limit]
+            # Miss (or TTL expiry): one 50-row query both warms the bucket
+            # and answers this request.
+            items = await self._get_many_from_db(tool_type, topic, limit=max(50, limit))
+            if items:
+                await self.redis.set(key, json.dumps(items[:50]), ex=DEMO_BUCKET_TTL_SEC)
+            return items[:limit]
 
         return await self._get_many_from_db(tool_type, topic, limit)
 
@@ -307,8 +371,10 @@ class DemoCacheService:
         self.db.add(material)
         await self.db.commit()
         await self.db.refresh(material)
+        await invalidate_readiness_snapshot()
 
         if self.redis:
+            await self.invalidate_cache(tool_type, topic)
             await self._warm_cache(tool_type, topic)
 
         return material
@@ -416,8 +482,10 @@ class DemoCacheService:
             )
 
             if material_dict:
-                # Warm cache
+                # A new row may now be the best match — drop cached lookups
+                # (including remembered misses) and re-warm the bucket.
                 if self.redis:
+                    await self.invalidate_cache(tool_type, topic)
                     await self._warm_cache(tool_type, topic)
                 return material_dict
 
@@ -1158,6 +1226,7 @@ class DemoCacheService:
             self.db.add(material)
             await self.db.commit()
             await self.db.refresh(material)
+            await invalidate_readiness_snapshot()
 
             logger.info(f"[DemoCache] Stored on-demand result: {tool_type}/{topic}")
             return self._material_to_dict(material)
@@ -1200,9 +1269,71 @@ class DemoCacheService:
         await self.redis.set(key, json.dumps(items), ex=DEMO_BUCKET_TTL_SEC)
 
     async def invalidate_cache(self, tool_type: str, topic: Optional[str] = None):
+        # The topic-less generic lookup can return a row from any topic, so
+        # it is dropped alongside the specific one.
+        best_keys = {_best_key(tool_type, topic), _best_key(tool_type, None)}
+        for key in [k for k in _local_best if k[0] in best_keys]:
+            _local_best.pop(key, None)
         if not self.redis:
             return
-        await self.redis.delete(_cache_key(tool_type, topic or "_all"))
+        await self.redis.delete(_cache_key(tool_type, topic or "_all"), *best_keys)
+
+    async def _get_best(
+        self,
+        tool_type: str,
+        topic: Optional[str],
+        product_id: Optional[str] = None,
+        language: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """_get_from_db behind the local LRU, Redis and single-flight.
+
+        Misses are cached too (DEMO_MISS_TTL_SEC) so a missing preset
+        doesn't cost a DB query per request.
+        """
+        key = (_best_key(tool_type, topic), _best_field(product_id, language))
+        value = _local_get(key)
+        if value is not _LOAD_FAILED:
+            return value
+
+        if self.redis:
+            try:
+                raw = await self.redis.hget(*key)
+                if raw:
+                    entry = json.loads(raw)
+                    ttl = DEMO_BUCKET_TTL_SEC if entry.get("demo") else DEMO_MISS_TTL_SEC
+                    if time.time() - entry.get("at", 0) < ttl:
+                        _local_put(key, entry.get("demo"))
+                        return entry.get("demo")
+            except Exception as e:
+                logger.warning("[DemoCache] Redis read failed for %s: %s", key, e)
+
+        waiting = _best_inflight.get(key)
+        if waiting is not None:
+            value = await asyncio.shield(waiting)
+            if value is not _LOAD_FAILED:
+                return value
+            # The loading request failed or was cancelled — load ourselves.
+
+        future = asyncio.get_running_loop().create_future()
+        _best_inflight[key] = future
+        try:
+            demo = await self._get_from_db(tool_type, topic, product_id=product_id, language=language)
+            future.set_result(demo)
+        except BaseException:
+            future.set_result(_LOAD_FAILED)
+            raise
+        finally:
+            if _best_inflight.get(key) is future:
+                del _best_inflight[key]
+
+        _local_put(key, demo)
+        if self.redis:
+            try:
+                await self.redis.hset(key[0], key[1], json.dumps({"demo": demo, "at": time.time()}))
+                await self.redis.expire(key[0], DEMO_BUCKET_TTL_SEC)
+            except Exception as e:
+                logger.warning("[DemoCache] Redis write failed for %s: %s", key, e)
+        return demo
 
     # ------------------------------------------------------------------
     # DB helpers
@@ -1328,3 +1459,19 @@ class DemoCacheService:
             "result_image_url": m.result_image_url,
             "result_video_url": m.result_video_url,
         }
+
+
+async def invalidate_demo_cache(db: AsyncSession, materials) -> None:
+    """Drop cached demos for each (tool_type, topic) of materials an admin
+    reviewed or deactivated, so they stop being served before the TTL."""
+    pairs = {(m.tool_type, m.topic) for m in materials}
+    if not pairs:
+        return
+    from app.api.deps import get_redis
+
+    service = DemoCacheService(db, await get_redis())
+    for tool_type, topic in pairs:
+        try:
+            await service.invalidate_cache(tool_type, topic)
+        except Exception as e:
+            logger.warning("[DemoCache] Invalidate failed for %s/%s: %s", tool_type, topic, e)
@@ -282,6 +282,7 @@ class DemoService:
 
         db.add(demo)
         await db.commit()
+        self.matcher.index.upsert(demo.id, demo.keywords, demo.category_slug, demo.style_slug)
 
         logger.info(f"Demo pipeline complete! Saved as: {demo.id}")
 
@@ -662,6 +663,8 @@ class DemoService:
             demo.is_active = False
 
         await db.commit()
+        for demo in expired:
+            self.matcher.index.remove(demo.id)
         logger.info(f"Cleaned up {count} expired demos")
 
         return count
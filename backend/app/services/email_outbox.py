@@ -0,0 +1,410 @@
+"""
+Durable email outbox and pooled SMTP delivery for EmailService.
+
+``EmailService.send_email`` used to open a fresh SMTP connection (TLS +
+login) per message with blocking smtplib, directly inside request handlers
+and webhooks, so a slow mail server stalled registration, password reset,
+refunds and provider alerts for up to SMTP_TIMEOUT_SECONDS per recipient.
+
+  - ``enqueue_email`` puts the message on a Redis sorted set (member = JSON
+    message, score = when it is due) and returns immediately.
+  - ``email_outbox_sender_loop`` — started by the FastAPI lifespan on every
+    instance — claims due messages and sends them through
+    ``SMTPConnectionPool``: a few long-lived connections reused across
+    batches, NOOP-checked after idling and recycled after
+    EMAIL_SMTP_MAX_MESSAGES_PER_CONNECTION messages. smtplib runs in a worker
+    thread, one thread hop per batch.
+  - Transient failures (4xx replies, dropped connections) are retried with
+    exponential backoff; permanent 5xx rejections and messages that exhaust
+    EMAIL_OUTBOX_MAX_ATTEMPTS go to a capped dead-letter list.
+  - Claimed messages sit in an in-flight set under a lease, moved there
+    atomically by a Lua script. The sender renews the lease while a batch
+    is still being delivered; if an instance dies mid-send the lease
+    expires and the message is re-queued, so delivery is at-least-once.
+
+Redis failures fail open: ``enqueue_email`` returns False and the caller
+sends inline through the same pool.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import smtplib
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_KEY = "vidgo:email:outbox"
+INFLIGHT_KEY = "vidgo:email:outbox:inflight"
+DEAD_LETTER_KEY = "vidgo:email:outbox:dead"
+_ALERT_DEDUP_PREFIX = "vidgo:email:alert:"
+_DEAD_LETTER_MAX = 1000
+
+SENT, RETRY, DEAD = "sent", "retry", "dead"
+
+# Re-queue expired leases, then move up to ARGV[3] due messages from the
+# outbox into the in-flight set — one atomic step, so a crash can't drop a
+# message between the two sets and two instances can't claim the same one.
+# KEYS: outbox, inflight. ARGV: now, lease_until, limit.
+_CLAIM_LUA = """
+local now = tonumber(ARGV[1])
+for _, raw in ipairs(redis.call('ZRANGEBYSCORE', KEYS[2], 0, now)) do
+  redis.call('ZREM', KEYS[2], raw)
+  redis.call('ZADD', KEYS[1], now, raw)
+end
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], 0, now, 'LIMIT', 0, tonumber(ARGV[3]))
+for _, raw in ipairs(due) do
+  redis.call('ZREM', KEYS[1], raw)
+  redis.call('ZADD', KEYS[2], ARGV[2], raw)
+end
+return due
+"""
+
+
+_wake: Optional[asyncio.Event] = None
+
+
+def _now() -> float:
+    return time.time()
+
+
+@dataclass
+class OutboxMessage:
+    to_email: str
+    subject: str
+    html_content: str
+    text_content: Optional[str] = None
+    attempts: int = 0
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), ensure_ascii=False, separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, raw: str) -> "OutboxMessage":
+        return cls(**json.loads(raw))
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# SMTP connection pool
+# ─────────────────────────────────────────────────────────────────────────────
+
+def classify_smtp_error(exc: BaseException) -> str:
+    """DEAD for permanent (5xx) rejections, RETRY for everything else."""
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        codes = [code for code, _ in exc.recipients.values()]
+        return DEAD if codes and all(500 <= code < 600 for code in codes) else RETRY
+    if isinstance(exc, smtplib.SMTPResponseException):
+        return DEAD if 500 <= exc.smtp_code < 600 else RETRY
+    return RETRY
+
+
+def _is_connection_error(exc: BaseException) -> bool:
+    """True once the connection can no longer be trusted. SMTPException
+    subclasses OSError, so server replies are told apart explicitly."""
+    if isinstance(exc, smtplib.SMTPServerDisconnected):
+        return True
+    return isinstance(exc, OSError) and not isinstance(exc, smtplib.SMTPException)
+
+
+class _Connection:
+    __slots__ = ("smtp", "sent", "last_used")
+
+    def __init__(self, smtp: smtplib.SMTP):
+        self.smtp = smtp
+        self.sent = 0
+        self.last_used = time.monotonic()
+
+
+def _close(conn: Optional[_Connection]) -> None:
+    if conn is None:
+        return
+    try:
+        conn.smtp.quit()
+    except Exception:
+        try:
+            conn.smtp.close()
+        except Exception:
+            pass
+
+
+class SMTPConnectionPool:
+    """Up to ``size`` reusable SMTP connections opened by ``connect``.
+
+    ``send`` delivers a batch of ``(from, to, payload)`` tuples over ONE
+    connection and returns ``(status, error)`` per message, in order.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], smtplib.SMTP],
+        size: int = 2,
+        max_messages: int = 100,
+        idle_check_seconds: float = 30.0,
+    ):
+        self._connect = connect
+        self._size = max(1, size)
+        self._max_messages = max(1, max_messages)
+        self._idle_check_seconds = idle_check_seconds
+        self._idle: List[_Connection] = []
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.opened = 0
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def _open(self) -> _Connection:
+        conn = _Connection(self._connect())
+        self.opened += 1
+        return conn
+
+    def _revive(self, conn: Optional[_Connection]) -> Optional[_Connection]:
+        """Keep a recently used connection; NOOP-check one that sat idle."""
+        if conn is None or time.monotonic() - conn.last_used < self._idle_check_seconds:
+            return conn
+        try:
+            if conn.smtp.noop()[0] == 250:
+                return conn
+        except Exception:
+            pass
+        _close(conn)
+        return None
+
+    def _send_on(
+        self,
+        conn: Optional[_Connection],
+        messages: Sequence[Tuple[str, str, str]],
+    ) -> Tuple[List[Tuple[str, Optional[str]]], Optional[_Connection]]:
+        """Blocking: send ``messages`` in order over ``conn`` (or a new one)."""
+        outcomes: List[Tuple[str, Optional[str]]] = []
+        conn = self._revive(conn)
+        for sender, recipient, payload in messages:
+            # A reused connection can drop between NOOP and send; give each
+            # message one retry on a fresh connection before backing off.
+            for fresh in (False, True):
+                try:
+                    if conn is None or conn.sent >= self._max_messages:
+                        _close(conn)
+                        conn = None
+                        conn = self._open()
+                    conn.smtp.sendmail(sender, recipient, payload)
+                    conn.sent += 1
+                    conn.last_used = time.monotonic()
+                    outcomes.append((SENT, None))
+                    break
+                except Exception as exc:
+                    error = f"{type(exc).__name__}: {exc}"
+                    if _is_connection_error(exc):
+                        _close(conn)
+                        conn = None
+                        if fresh:
+                            outcomes.append((RETRY, error))
+                        continue
+                    if conn is None:
+                        # Failed to connect or authenticate — not this message's fault.
+                        outcomes.append((RETRY, error))
+                    else:
+                        outcomes.append((classify_smtp_error(exc), error))
+                    break
+            if conn is None and outcomes[-1][0] == RETRY:
+                # The server is unreachable; don't hammer it for the rest.
+                error = outcomes[-1][1]
+                outcomes.extend((RETRY, error) for _ in range(len(messages) - len(outcomes)))
+                break
+        return outcomes, conn
+
+    async def send(self, messages: Sequence[Tuple[str, str, str]]) -> List[Tuple[str, Optional[str]]]:
+        if not messages:
+            return []
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self._size)
+        async with self._slots:
+            conn = self._idle.pop() if self._idle else None
+            outcomes, conn = await asyncio.to_thread(self._send_on, conn, messages)
+            if conn is not None:
+                self._idle.append(conn)
+            return outcomes
+
+    async def close(self) -> None:
+        idle, self._idle = self._idle, []
+        for conn in idle:
+            await asyncio.to_thread(_close, conn)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Outbox
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _get_wake() -> asyncio.Event:
+    global _wake
+    if _wake is None:
+        _wake = asyncio.Event()
+    return _wake
+
+
+def retry_delay(attempts: int) -> float:
+    settings = get_settings()
+    base = max(1, settings.EMAIL_OUTBOX_RETRY_BASE_SECONDS)
+    return float(min(base * 2 ** max(0, attempts - 1), settings.EMAIL_OUTBOX_RETRY_MAX_SECONDS))
+
+
+async def enqueue_email(message: OutboxMessage) -> bool:
+    """Queue ``message`` for the background sender. False if Redis is down."""
+    try:
+        from app.api.deps import get_redis
+
+        redis = await get_redis()
+        await redis.zadd(OUTBOX_KEY, {message.to_json(): _now()})
+    except Exception as e:
+        logger.warning(f"[EmailOutbox] Enqueue failed, sending inline: {e}")
+        return False
+    _get_wake().set()
+    return True
+
+
+async def claim_due(redis, limit: int) -> List[Tuple[str, OutboxMessage]]:
+    """Move up to ``limit`` due messages into the in-flight set.
+
+    In-flight messages whose lease expired are re-queued first; both moves
+    happen in one script call.
+    """
+    now = _now()
+    lease_until = now + get_settings().EMAIL_OUTBOX_LEASE_SECONDS
+    due = await redis.eval(_CLAIM_LUA, 2, OUTBOX_KEY, INFLIGHT_KEY, now, lease_until, max(1, limit))
+    claimed: List[Tuple[str, OutboxMessage]] = []
+    for raw in due:
+        try:
+            claimed.append((raw, OutboxMessage.from_json(raw)))
+        except Exception as e:
+            logger.error(f"[EmailOutbox] Dropping malformed message: {e}")
+            await redis.zrem(INFLIGHT_KEY, raw)
+    return claimed
+
+
+async def _renew_leases(redis, raws: List[str], done: asyncio.Event) -> None:
+    """Extend the lease of ``raws`` until ``done`` is set. A batch can take
+    longer than one lease (every message may wait out SMTP_TIMEOUT_SECONDS,
+    twice), and an expired lease would get the message sent again."""
+    lease = get_settings().EMAIL_OUTBOX_LEASE_SECONDS
+    while True:
+        try:
+            await asyncio.wait_for(done.wait(), timeout=max(0.05, lease / 3))
+            return
+        except asyncio.TimeoutError:
+            pass
+        try:
+            # XX: never resurrect a message another instance already re-queued.
+            await redis.zadd(INFLIGHT_KEY, {raw: _now() + lease for raw in raws}, xx=True)
+        except Exception as e:
+            logger.warning(f"[EmailOutbox] Lease renewal failed: {e}")
+
+
+async def _settle(redis, raw: str, message: OutboxMessage, status: str, error: Optional[str]) -> str:
+    """Record a delivery outcome; returns the final status (RETRY may become DEAD)."""
+    await redis.zrem(INFLIGHT_KEY, raw)
+    if status == SENT:
+        return SENT
+
+    message.attempts += 1
+    if status == RETRY and message.attempts < get_settings().EMAIL_OUTBOX_MAX_ATTEMPTS:
+        await redis.zadd(OUTBOX_KEY, {message.to_json(): _now() + retry_delay(message.attempts)})
+        logger.warning(
+            f"[EmailOutbox] Retry {message.attempts} for {message.to_email} "
+            f"in {retry_delay(message.attempts):.0f}s: {error}"
+        )
+        return RETRY
+
+    entry = {**json.loads(message.to_json()), "error": error, "failed_at": _now()}
+    await redis.rpush(DEAD_LETTER_KEY, json.dumps(entry, ensure_ascii=False))
+    await redis.ltrim(DEAD_LETTER_KEY, -_DEAD_LETTER_MAX, -1)
+    logger.error(f"[EmailOutbox] Giving up on email to {message.to_email} after {message.attempts} attempt(s): {error}")
+    return DEAD
+
+
+async def run_outbox_once(service=None, batch_size: Optional[int] = None) -> Dict[str, int]:
+    """Claim one batch of due messages and deliver it, one pooled
+    connection per slice. Returns claimed/sent/retried/dead counts."""
+    from app.api.deps import get_redis
+
+    if service is None:
+        from app.services.email_service import email_service as service
+
+    stats = {"claimed": 0, "sent": 0, "retried": 0, "dead": 0}
+    redis = await get_redis()
+    claimed = await claim_due(redis, batch_size or get_settings().EMAIL_OUTBOX_BATCH_SIZE)
+    stats["claimed"] = len(claimed)
+    if not claimed:
+        return stats
+
+    slices = service.smtp_pool.size
+    step = -(-len(claimed) // slices)
+    chunks = [claimed[i:i + step] for i in range(0, len(claimed), step)]
+    done = asyncio.Event()
+    renewer = asyncio.create_task(_renew_leases(redis, [raw for raw, _ in claimed], done))
+    try:
+        results = await asyncio.gather(
+            *(service.deliver([message for _, message in chunk]) for chunk in chunks)
+        )
+    finally:
+        done.set()
+        await renewer
+    counters = {SENT: "sent", RETRY: "retried", DEAD: "dead"}
+    for chunk, outcomes in zip(chunks, results):
+        for (raw, message), (status, error) in zip(chunk, outcomes):
+            final = await _settle(redis, raw, message, status, error)
+            stats[counters[final]] += 1
+    return stats
+
+
+async def email_outbox_sender_loop() -> None:
+    """Long-running background task: drain due messages in batches, then
+    wait for an enqueue on this instance or EMAIL_OUTBOX_POLL_SECONDS.
+    Owned by the FastAPI lifespan — cancelled on shutdown."""
+    settings = get_settings()
+    wake = _get_wake()
+    while True:
+        try:
+            stats = await run_outbox_once()
+            if stats["claimed"] >= settings.EMAIL_OUTBOX_BATCH_SIZE:
+                continue
+            try:
+                await asyncio.wait_for(wake.wait(), timeout=settings.EMAIL_OUTBOX_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            wake.clear()
+        except asyncio.CancelledError:
+            break
+        except Exception as e:
+            logger.error(f"[EmailOutbox] Sender error: {e}")
+            await asyncio.sleep(settings.EMAIL_OUTBOX_POLL_SECONDS)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Alert-storm dedup
+# ─────────────────────────────────────────────────────────────────────────────
+
+def alert_signature(*parts: str) -> str:
+    """Stable key for an alert: digits (ids, ports, timings) are masked so
+    the same failure with a different request id dedups."""
+    normalized = "|".join(re.sub(r"\d+", "#", (part or "").strip().lower())[:300] for part in parts)
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+async def claim_alert_slot(signature: str, ttl_seconds: int) -> bool:
+    """True if this alert hasn't fired fleet-wide within ``ttl_seconds``.
+    Fails open (True) when Redis is unavailable."""
+    try:
+        from app.api.deps import get_redis
+
+        redis = await get_redis()
+        return bool(await redis.set(f"{_ALERT_DEDUP_PREFIX}{signature}", "1", nx=True, ex=max(1, ttl_seconds)))
+    except Exception as e:
+        logger.warning(f"[EmailOutbox] Alert dedup unavailable: {e}")
+        return True
@@ -9,8 +9,16 @@ import time
 import traceback as _traceback
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from app.core.config import get_settings
+from app.services.email_outbox import (
+    SENT,
+    OutboxMessage,
+    SMTPConnectionPool,
+    alert_signature,
+    claim_alert_slot,
+    enqueue_email,
+)
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
@@ -30,6 +38,7 @@ class EmailService:
         self.use_ssl = settings.SMTP_SSL
         self.smtp_timeout = settings.SMTP_TIMEOUT_SECONDS
         self.frontend_url = settings.FRONTEND_URL
+        self._smtp_pool: Optional[SMTPConnectionPool] = None
 
     def _normalize_language(self, language: Optional[str] = None) -> str:
         lang = (language or "en").split(",", 1)[0].strip().lower()
@@ -64,6 +73,69 @@ class EmailService:
 
         return message
 
+    def _open_smtp(self) -> smtplib.SMTP:
+        """Open an SMTP connection (TLS + login as configured). Blocking."""
+        if self.smtp_host.lower() == "smtp.gmail.com" and self.smtp_user:
+            if self.from_email.lower() != self.smtp_user.lower():
+                logger.warning(
+                    "Gmail SMTP usually expects SMTP_FROM_EMAIL to match SMTP_USER "
+                    "or a verified Gmail alias. Current from=%s smtp_user=%s",
+                    self.from_email,
+                    self.smtp_user,
+                )
+
+        ssl_context = ssl.create_default_context()
+
+        if self.use_ssl:
+            server = smtplib.SMTP_SSL(
+                self.smtp_host,
+                self.smtp_port,
+                timeout=self.smtp_timeout,
+                context=ssl_context,
+            )
+        else:
+            server = smtplib.SMTP(
+                self.smtp_host,
+                self.smtp_port,
+                timeout=self.smtp_timeout,
+            )
+        try:
+            server.ehlo()
+            if self.use_tls and not self.use_ssl:
+                server.starttls(context=ssl_context)
+                server.ehlo()
+
+            # Only login if credentials are provided
+            if self.smtp_user and self.smtp_password:
+                server.login(self.smtp_user, self.smtp_password)
+        except Exception:
+            server.close()
+            raise
+        return server
+
+    @property
+    def smtp_pool(self) -> SMTPConnectionPool:
+        """Reused SMTP connections shared by the outbox sender and inline sends."""
+        if self._smtp_pool is None:
+            self._smtp_pool = SMTPConnectionPool(
+                self._open_smtp,
+                size=settings.EMAIL_SMTP_POOL_SIZE,
+                max_messages=settings.EMAIL_SMTP_MAX_MESSAGES_PER_CONNECTION,
+            )
+        return self._smtp_pool
+
+    async def deliver(self, messages: List[OutboxMessage]) -> List[Tuple[str, Optional[str]]]:
+        """Send ``messages`` over one pooled connection; ``(status, error)`` each."""
+        batch = [
+            (
+                self.from_email,
+                m.to_email,
+                self._create_message(m.to_email, m.subject, m.html_content, m.text_content).as_string(),
+            )
+            for m in messages
+        ]
+        return await self.smtp_pool.send(batch)
+
     async def send_email(
         self,
         to_email: str,
@@ -71,7 +143,12 @@ class EmailService:
         html_content: str,
         text_content: Optional[str] = None
     ) -> bool:
-        """Send an email."""
+        """Send an email.
+
+        Queued on the outbox for the background sender when enabled (True
+        means accepted for delivery); sent inline through the SMTP pool when
+        the outbox is disabled or Redis is unreachable.
+        """
         if not self._is_configured():
             logger.warning(f"SMTP not configured. Would send email to {to_email}: {subject}")
             # In development, log the email instead of sending
@@ -80,54 +157,20 @@ class EmailService:
                 return True
             return False
 
-        try:
-            message = self._create_message(to_email, subject, html_content, text_content)
-
-            if self.smtp_host.lower() == "smtp.gmail.com" and self.smtp_user:
-                if self.from_email.lower() != self.smtp_user.lower():
-                    logger.warning(
-                        "Gmail SMTP usually expects SMTP_FROM_EMAIL to match SMTP_USER "
-                        "or a verified Gmail alias. Current from=%s smtp_user=%s",
-                        self.from_email,
-                        self.smtp_user,
-                    )
-
-            ssl_context = ssl.create_default_context()
-
-            if self.use_ssl:
-                with smtplib.SMTP_SSL(
-                    self.smtp_host,
-                    self.smtp_port,
-                    timeout=self.smtp_timeout,
-                    context=ssl_context,
-                ) as server:
-                    if self.smtp_user and self.smtp_password:
-                        server.login(self.smtp_user, self.smtp_password)
-
-                    server.sendmail(self.from_email, to_email, message.as_string())
-            else:
-                with smtplib.SMTP(
-                    self.smtp_host,
-                    self.smtp_port,
-                    timeout=self.smtp_timeout,
-                ) as server:
-                    server.ehlo()
-                    if self.use_tls:
-                        server.starttls(context=ssl_context)
-                        server.ehlo()
-
-                    # Only login if credentials are provided
-                    if self.smtp_user and self.smtp_password:
-                        server.login(self.smtp_user, self.smtp_password)
-
-                    server.sendmail(self.from_email, to_email, message.as_string())
-
-            logger.info(f"Email sent successfully to {to_email}")
+        message = OutboxMessage(to_email, subject, html_content, text_content)
+        if settings.EMAIL_OUTBOX_ENABLED and await enqueue_email(message):
+            logger.info(f"Email to {to_email} queued")
             return True
 
+        try:
+            (status, error), = await self.deliver([message])
         except Exception as e:
-            logger.error(f"Failed to send email to {to_email}: {str(e)}")
-            return False
+            status, error = None, str(e)
+        if status == SENT:
+            logger.info(f"Email sent successfully to {to_email}")
+            return True
+        logger.error(f"Failed to send email to {to_email}: {error}")
+        return False
 
     def get_admin_recipients(self) -> List[str]:
         """Return configured administrator email recipients."""
@@ -162,6 +205,14 @@ class EmailService:
             logger.warning("No admin recipients configured for provider failure alerts.")
             return False
 
+        # Fleet-wide storm guard: every instance hitting the same outage
+        # would otherwise mail the same alert (the router's cooldown is
+        # per instance and per provider only).
+        signature = alert_signature(provider_name, task_type, error)
+        if not await claim_alert_slot(signature, settings.PROVIDER_ALERT_COOLDOWN_MINUTES * 60):
+            logger.info("Suppressing duplicate provider failure alert for %s (%s)", provider_name, task_type)
+            return False
+
         request_params = request_params or {}
         task_label = task_type.replace("_", " ").title()
         model_name = str(request_params.get("model") or "").strip() or "n/a"
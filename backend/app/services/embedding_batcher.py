@@ -0,0 +1,212 @@
+"""
+Micro-batched, content-addressed text embeddings for GeminiService.
+
+``get_embedding`` used to send one ``embed_content`` request per text, so
+similarity lookups, prompt-cache inserts and backfills of
+``PromptCache.prompt_embedding`` paid one HTTP round-trip per prompt.
+
+- **Batching** — ``EmbeddingBatcher.embed`` queues the text and the batcher
+  flushes after EMBEDDING_BATCH_MAX_WAIT_MS, or at once when
+  EMBEDDING_BATCH_MAX_SIZE texts are waiting, as ONE batched embed request;
+  each vector is routed back to its caller's future.
+- **Dedupe** — texts are keyed by sha256 of (model, whitespace-collapsed
+  text). A text that is already queued or in flight shares that future.
+- **Persistent cache** — vectors live in Redis (``vidgo:embedding:<sha>``,
+  packed float32, EMBEDDING_CACHE_TTL_DAYS) behind a small in-process LRU,
+  so the same prompt is embedded once across instances and restarts. A
+  flush looks up the whole batch with one MGET before calling the model.
+  Redis is best-effort: errors count as misses.
+
+A failed embed request fails every caller in that batch; GeminiService then
+falls back to its pseudo-embedding exactly as before.
+"""
+import asyncio
+import base64
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+REDIS_KEY_PREFIX = "vidgo:embedding:"
+
+EmbedMany = Callable[[List[str]], Awaitable[List[List[float]]]]
+
+
+def normalize_text(text: str) -> str:
+    return " ".join((text or "").split())
+
+
+def content_hash(model: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+
+def pack_vector(vec: Sequence[float]) -> str:
+    return base64.b64encode(np.asarray(vec, dtype="<f4").tobytes()).decode("ascii")
+
+
+def unpack_vector(raw: str) -> List[float]:
+    return np.frombuffer(base64.b64decode(raw), dtype="<f4").astype(float).tolist()
+
+
+class EmbeddingBatcher:
+    def __init__(
+        self,
+        embed_many: EmbedMany,
+        model: str,
+        max_batch: int = 100,
+        max_wait_ms: int = 10,
+        ttl_seconds: int = 90 * 86400,
+        local_entries: int = 2000,
+    ):
+        self._embed_many = embed_many
+        self.model = model
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0, max_wait_ms) / 1000
+        self.ttl_seconds = max(1, ttl_seconds)
+        self._local: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._local_entries = max(0, local_entries)
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._queue: List[Tuple[str, str]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flushes: Set[asyncio.Task] = set()
+        self.metrics = {
+            "requests": 0,
+            "local_hits": 0,
+            "redis_hits": 0,
+            "deduped": 0,
+            "embedded": 0,
+            "batches": 0,
+            "errors": 0,
+        }
+
+    # ------------------------------------------------------------ local LRU
+
+    def _local_get(self, key: str) -> Optional[List[float]]:
+        vec = self._local.get(key)
+        if vec is not None:
+            self._local.move_to_end(key)
+        return vec
+
+    def _local_set(self, key: str, vec: List[float]) -> None:
+        if not self._local_entries:
+            return
+        self._local[key] = vec
+        self._local.move_to_end(key)
+        while len(self._local) > self._local_entries:
+            self._local.popitem(last=False)
+
+    # ------------------------------------------------------------ public API
+
+    async def embed(self, text: str) -> List[float]:
+        """Embedding for ``text``; concurrent callers share one request."""
+        text = normalize_text(text)
+        key = content_hash(self.model, text)
+        self.metrics["requests"] += 1
+
+        vec = self._local_get(key)
+        if vec is not None:
+            self.metrics["local_hits"] += 1
+            return list(vec)
+
+        future = self._pending.get(key)
+        if future is not None:
+            self.metrics["deduped"] += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            self._pending[key] = future
+            self._queue.append((key, text))
+            if len(self._queue) >= self.max_batch:
+                self._flush_now()
+            elif self._timer is None:
+                self._timer = asyncio.get_running_loop().call_later(self.max_wait, self._flush_now)
+        return list(await asyncio.shield(future))
+
+    async def embed_all(self, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """Embed many texts (batched, deduped); None where a batch failed."""
+        results = await asyncio.gather(*(self.embed(t) for t in texts), return_exceptions=True)
+        return [None if isinstance(r, BaseException) else r for r in results]
+
+    def stats(self) -> Dict[str, int]:
+        return {**self.metrics, "local_entries": len(self._local), "pending": len(self._pending)}
+
+    # ------------------------------------------------------------ flushing
+
+    def _flush_now(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._queue:
+            batch, self._queue = self._queue[: self.max_batch], self._queue[self.max_batch:]
+            task = asyncio.get_running_loop().create_task(self._flush(batch))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    def _resolve(self, key: str, vec: Optional[List[float]] = None, error: Optional[BaseException] = None) -> None:
+        future = self._pending.pop(key, None)
+        if future is None or future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(vec)
+
+    async def _flush(self, batch: List[Tuple[str, str]]) -> None:
+        try:
+            cached = await self._redis_get_many([key for key, _ in batch])
+            misses = []
+            for key, text in batch:
+                if key in cached:
+                    self.metrics["redis_hits"] += 1
+                    self._local_set(key, cached[key])
+                    self._resolve(key, cached[key])
+                else:
+                    misses.append((key, text))
+            if not misses:
+                return
+
+            self.metrics["batches"] += 1
+            vectors = await self._embed_many([text for _, text in misses])
+            if len(vectors) != len(misses):
+                raise RuntimeError(f"embed request returned {len(vectors)} vectors for {len(misses)} texts")
+            self.metrics["embedded"] += len(misses)
+            fresh = {}
+            for (key, _), vec in zip(misses, vectors):
+                vec = [float(x) for x in vec]
+                fresh[key] = vec
+                self._local_set(key, vec)
+                self._resolve(key, vec)
+            await self._redis_set_many(fresh)
+        except Exception as e:
+            self.metrics["errors"] += 1
+            logger.warning(f"[Embeddings] Batch of {len(batch)} failed: {e}")
+            for key, _ in batch:
+                self._resolve(key, error=e)
+
+    # ------------------------------------------------------------ Redis tier
+
+    async def _redis_get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        try:
+            from app.api.deps import get_redis
+
+            redis = await get_redis()
+            raw = await redis.mget([f"{REDIS_KEY_PREFIX}{k}" for k in keys])
+        except Exception as e:
+            logger.debug(f"[Embeddings] Redis lookup failed: {e}")
+            return {}
+        return {k: unpack_vector(v) for k, v in zip(keys, raw) if v}
+
+    async def _redis_set_many(self, vectors: Dict[str, List[float]]) -> None:
+        try:
+            from app.api.deps import get_redis
+
+            redis = await get_redis()
+            pipe = redis.pipeline()
+            for key, vec in vectors.items():
+                pipe.set(f"{REDIS_KEY_PREFIX}{key}", pack_vector(vec), ex=self.ttl_seconds)
+            await pipe.execute()
+        except Exception as e:
+            logger.debug(f"[Embeddings] Redis store failed: {e}")
@@ -0,0 +1,257 @@
+"""
+Shared non-blocking FFmpeg runner.
+
+Every FFmpeg/ffprobe invocation in the backend goes through here so that:
+
+  - nothing blocks the event loop — processes are started with
+    ``asyncio.create_subprocess_exec`` (WatermarkService used
+    ``subprocess.run`` inside ``async def``, stalling the whole instance for
+    the length of each encode during the 2,000-row watermark backfill);
+  - concurrent encodes are capped per process by one semaphore sized to the
+    instance's CPUs (FFMPEG_MAX_CONCURRENCY), so a backfill can't fork fifty
+    encoders onto a 2-vCPU box;
+  - every job has a wall-clock limit; on expiry — or if the awaiting task is
+    cancelled — the process is killed and reaped;
+  - callers can follow progress: ``on_progress`` switches on
+    ``-progress pipe:1`` and receives parsed snapshots;
+  - the "is ffmpeg installed" probe runs once per process, not in every
+    WatermarkService constructor.
+
+ffprobe calls are cheap and skip the encode semaphore.
+"""
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional, Sequence
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Bytes of stderr kept per job — enough for FFmpeg's error summary without
+# buffering the whole per-frame log of a long encode.
+_STDERR_TAIL_BYTES = 64 * 1024
+
+
+@dataclass
+class FFmpegProgress:
+    """One ``-progress`` snapshot (FFmpeg emits one roughly per second)."""
+    frame: int = 0
+    out_time_s: float = 0.0
+    speed: Optional[float] = None
+    done: bool = False
+    raw: Dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class FFmpegResult:
+    returncode: int
+    stdout: bytes
+    stderr: bytes
+    elapsed_s: float
+    timed_out: bool = False
+    progress: Optional[FFmpegProgress] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0 and not self.timed_out
+
+    def detail(self, limit: int = 1200) -> str:
+        """Tail of stderr (or stdout) for error messages and logs."""
+        if self.timed_out:
+            return f"timed out after {self.elapsed_s:.0f}s"
+        return (self.stderr or self.stdout).decode("utf-8", errors="replace")[-limit:]
+
+
+_semaphore: Optional[asyncio.Semaphore] = None
+_semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+_capabilities: Dict[str, bool] = {}
+_stats = {"jobs": 0, "failed": 0, "timed_out": 0, "running": 0, "waiting": 0}
+
+
+def max_concurrency() -> int:
+    return settings.FFMPEG_MAX_CONCURRENCY or os.cpu_count() or 1
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _semaphore, _semaphore_loop
+    loop = asyncio.get_running_loop()
+    if _semaphore is None or _semaphore_loop is not loop:
+        _semaphore = asyncio.Semaphore(max_concurrency())
+        _semaphore_loop = loop
+    return _semaphore
+
+
+def _parse_progress(block: Dict[str, str]) -> FFmpegProgress:
+    def _num(key, cast, default):
+        try:
+            return cast(block[key])
+        except (KeyError, ValueError):
+            return default
+
+    # out_time_us is authoritative; out_time_ms is also microseconds in
+    # every FFmpeg release (historical misnomer).
+    out_us = _num("out_time_us", int, None)
+    if out_us is None:
+        out_us = _num("out_time_ms", int, 0)
+    speed = block.get("speed", "").rstrip("x").strip()
+    try:
+        speed_val = float(speed) if speed and speed != "N/A" else None
+    except ValueError:
+        speed_val = None
+    return FFmpegProgress(
+        frame=_num("frame", int, 0),
+        out_time_s=max(0, out_us) / 1_000_000,
+        speed=speed_val,
+        done=block.get("progress") == "end",
+        raw=dict(block),
+    )
+
+
+async def _read_progress(stream: asyncio.StreamReader, on_progress: Optional[Callable[[FFmpegProgress], None]],
+                         holder: list) -> None:
+    block: Dict[str, str] = {}
+    async for line in stream:
+        key, sep, value = line.decode("utf-8", errors="replace").strip().partition("=")
+        if not sep:
+            continue
+        block[key] = value
+        if key == "progress":
+            snapshot = _parse_progress(block)
+            holder[0] = snapshot
+            block = {}
+            if on_progress is not None:
+                try:
+                    on_progress(snapshot)
+                except Exception as e:  # a logging callback must not kill the job
+                    logger.debug("[ffmpeg] progress callback failed: %s", e)
+
+
+async def _read_tail(stream: asyncio.StreamReader, limit: int) -> bytes:
+    tail = bytearray()
+    while True:
+        chunk = await stream.read(65536)
+        if not chunk:
+            return bytes(tail)
+        tail += chunk
+        if len(tail) > limit:
+            del tail[:-limit]
+
+
+async def _kill(proc: asyncio.subprocess.Process) -> None:
+    try:
+        proc.kill()
+    except ProcessLookupError:
+        pass
+    # Reap it so no zombie is left; bounded in case the kill is ignored.
+    try:
+        await asyncio.wait_for(proc.wait(), timeout=5)
+    except Exception:
+        pass
+
+
+async def _exec(cmd: Sequence[str], timeout: float, progress: bool,
+                on_progress: Optional[Callable[[FFmpegProgress], None]]) -> FFmpegResult:
+    cmd = list(cmd)
+    if progress:
+        cmd[1:1] = ["-progress", "pipe:1", "-nostats"]
+    started = time.monotonic()
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    last_progress = [None]
+    stdout_task = asyncio.ensure_future(
+        _read_progress(proc.stdout, on_progress, last_progress) if progress
+        else _read_tail(proc.stdout, 16 * 1024 * 1024)
+    )
+    stderr_task = asyncio.ensure_future(_read_tail(proc.stderr, _STDERR_TAIL_BYTES))
+    timed_out = False
+    try:
+        await asyncio.wait_for(proc.wait(), timeout=timeout)
+    except asyncio.TimeoutError:
+        timed_out = True
+        logger.error("[ffmpeg] %s exceeded %ss; killing", cmd[0], timeout)
+        await _kill(proc)
+    except asyncio.CancelledError:
+        await _kill(proc)
+        stdout_task.cancel()
+        stderr_task.cancel()
+        raise
+    try:
+        stdout, stderr = await asyncio.wait_for(asyncio.gather(stdout_task, stderr_task), timeout=5)
+    except Exception:
+        stdout_task.cancel()
+        stderr_task.cancel()
+        stdout, stderr = b"", b""
+    return FFmpegResult(
+        returncode=proc.returncode if proc.returncode is not None else -1,
+        stdout=stdout if isinstance(stdout, bytes) else b"",
+        stderr=stderr,
+        elapsed_s=time.monotonic() - started,
+        timed_out=timed_out,
+        progress=last_progress[0],
+    )
+
+
+async def run_ffmpeg(
+    cmd: Sequence[str],
+    *,
+    timeout: Optional[float] = None,
+    on_progress: Optional[Callable[[FFmpegProgress], None]] = None,
+) -> FFmpegResult:
+    """Run an ``ffmpeg ...`` command under the shared concurrency limit.
+
+    ``cmd`` is the full argv (``cmd[0]`` is the binary). Never raises for a
+    non-zero exit or a timeout — check ``result.ok`` / ``result.detail()``.
+    Raises FileNotFoundError if the binary is missing.
+    """
+    timeout = timeout or settings.FFMPEG_DEFAULT_TIMEOUT_SECONDS
+    semaphore = _get_semaphore()
+    _stats["waiting"] += 1
+    try:
+        await semaphore.acquire()
+    finally:
+        _stats["waiting"] -= 1
+    _stats["running"] += 1
+    _stats["jobs"] += 1
+    try:
+        result = await _exec(cmd, timeout, on_progress is not None, on_progress)
+    finally:
+        _stats["running"] -= 1
+        semaphore.release()
+    if result.timed_out:
+        _stats["timed_out"] += 1
+    elif result.returncode != 0:
+        _stats["failed"] += 1
+    return result
+
+
+async def run_ffprobe(cmd: Sequence[str], *, timeout: float = 30) -> FFmpegResult:
+    """Run an ``ffprobe ...`` command. Not counted against the encode limit."""
+    return await _exec(cmd, timeout, False, None)
+
+
+async def ffmpeg_available(binary: str = "ffmpeg") -> bool:
+    """``<binary> -version`` succeeds. Probed once per process."""
+    if binary not in _capabilities:
+        try:
+            result = await _exec([binary, "-version"], 5, False, None)
+            _capabilities[binary] = result.ok
+        except (OSError, ValueError):
+            _capabilities[binary] = False
+        if not _capabilities[binary]:
+            logger.warning("%s not found. Video watermarking and transcodes will be disabled.", binary)
+    return _capabilities[binary]
+
+
+def cached_ffmpeg_available(binary: str = "ffmpeg") -> Optional[bool]:
+    """Result of a previous probe, or None if none has run yet."""
+    return _capabilities.get(binary)
+
+
+def stats() -> Dict[str, int]:
+    return {**_stats, "max_concurrency": max_concurrency()}
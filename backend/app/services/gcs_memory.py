@@ -0,0 +1,181 @@
+"""
+In-memory stand-in for the parts of ``google.cloud.storage`` that
+GCSStorageService uses, so storage code can be exercised offline:
+
+    gcs = GCSStorageService(client=InMemoryGCSClient(), bucket_name="test-bucket")
+
+Objects live in ``client.objects`` keyed by (bucket, name). Uploads honour
+``chunk_size`` the way the real SDK does (file sources are read one chunk at
+a time) and record the largest single read/write in ``client.max_io_bytes``,
+which lets tests assert that a streamed upload never held the whole object.
+"""
+import io
+import threading
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Dict, Iterable, Optional, Tuple
+from urllib.parse import quote
+
+
+class InMemoryGCSClient:
+    def __init__(self, uniform_bucket_level_access: bool = False):
+        self.objects: Dict[Tuple[str, str], "InMemoryObject"] = {}
+        self.uniform_bucket_level_access = uniform_bucket_level_access
+        self.max_io_bytes = 0
+        self.calls: list = []
+        self._lock = threading.Lock()
+
+    def bucket(self, name: str) -> "InMemoryBucket":
+        return InMemoryBucket(self, name)
+
+    def list_blobs(self, bucket_name: str, prefix: str = "") -> Iterable["InMemoryBlob"]:
+        with self._lock:
+            names = [n for (b, n) in self.objects if b == bucket_name and n.startswith(prefix)]
+        return [InMemoryBlob(self.bucket(bucket_name), n) for n in sorted(names)]
+
+    def _record(self, call: str, nbytes: int = 0) -> None:
+        with self._lock:
+            self.calls.append(call)
+            self.max_io_bytes = max(self.max_io_bytes, nbytes)
+
+
+class InMemoryObject:
+    def __init__(self, data: bytes, content_type: Optional[str], cache_control: Optional[str]):
+        self.data = data
+        self.content_type = content_type
+        self.cache_control = cache_control
+        self.public = False
+        self.time_created = datetime.now(timezone.utc)
+
+
+class InMemoryBucket:
+    def __init__(self, client: InMemoryGCSClient, name: str):
+        self.client = client
+        self.name = name
+        self.iam_configuration = SimpleNamespace(
+            uniform_bucket_level_access_enabled=client.uniform_bucket_level_access,
+        )
+
+    def blob(self, name: str) -> "InMemoryBlob":
+        return InMemoryBlob(self, name)
+
+
+class InMemoryBlob:
+    def __init__(self, bucket: InMemoryBucket, name: str):
+        self.bucket = bucket
+        self.name = name
+        self.cache_control: Optional[str] = None
+        self.content_type: Optional[str] = None
+        self.chunk_size: Optional[int] = None
+
+    @property
+    def _client(self) -> InMemoryGCSClient:
+        return self.bucket.client
+
+    @property
+    def _key(self) -> Tuple[str, str]:
+        return (self.bucket.name, self.name)
+
+    @property
+    def time_created(self) -> Optional[datetime]:
+        obj = self._client.objects.get(self._key)
+        return obj.time_created if obj is not None else None
+
+    @property
+    def public_url(self) -> str:
+        return f"https://storage.googleapis.com/{self.bucket.name}/{quote(self.name)}"
+
+    def _store(self, data: bytes, content_type: Optional[str]) -> None:
+        if content_type:
+            self.content_type = content_type
+        with self._client._lock:
+            self._client.objects[self._key] = InMemoryObject(data, self.content_type, self.cache_control)
+
+    def _object(self) -> InMemoryObject:
+        obj = self._client.objects.get(self._key)
+        if obj is None:
+            raise FileNotFoundError(f"No such object: {self.bucket.name}/{self.name}")
+        return obj
+
+    # -- uploads --------------------------------------------------------------
+
+    def upload_from_string(self, data, content_type: Optional[str] = None, **kwargs) -> None:
+        data = data.encode() if isinstance(data, str) else bytes(data)
+        self._client._record("upload_from_string", len(data))
+        self._store(data, content_type)
+
+    def upload_from_file(self, file_obj, size: Optional[int] = None, content_type: Optional[str] = None,
+                         **kwargs) -> None:
+        self._client._record("resumable" if self.chunk_size else "upload_from_file")
+        step = self.chunk_size or (size if size is not None else -1)
+        out = io.BytesIO()
+        remaining = size
+        while remaining is None or remaining > 0:
+            want = step if remaining is None else (min(step, remaining) if step > 0 else remaining)
+            chunk = file_obj.read(want)
+            if not chunk:
+                break
+            self._client._record("read", len(chunk))
+            out.write(chunk)
+            if remaining is not None:
+                remaining -= len(chunk)
+        self._store(out.getvalue(), content_type)
+
+    def upload_from_filename(self, filename: str, content_type: Optional[str] = None, **kwargs) -> None:
+        with open(filename, "rb") as f:
+            self.upload_from_file(f, content_type=content_type)
+
+    def open(self, mode: str = "r", chunk_size: Optional[int] = None, content_type: Optional[str] = None,
+             **kwargs) -> "_InMemoryWriter":
+        if mode != "wb":
+            raise NotImplementedError("only 'wb' is supported")
+        self._client._record("resumable")
+        return _InMemoryWriter(self, chunk_size or self.chunk_size or 256 * 1024, content_type)
+
+    def compose(self, sources) -> None:
+        self._client._record("compose")
+        self._store(b"".join(src._object().data for src in sources), None)
+
+    # -- everything else --------------------------------------------------------
+
+    def make_public(self) -> None:
+        self._object().public = True
+
+    def exists(self) -> bool:
+        return self._key in self._client.objects
+
+    def delete(self) -> None:
+        with self._client._lock:
+            if self._client.objects.pop(self._key, None) is None:
+                raise FileNotFoundError(f"No such object: {self.bucket.name}/{self.name}")
+
+    def download_as_bytes(self) -> bytes:
+        return self._object().data
+
+    def generate_signed_url(self, **kwargs) -> str:
+        return f"{self.public_url}?X-Goog-Signature=fake"
+
+
+class _InMemoryWriter:
+    """Mirrors the SDK's BlobWriter: data is sent in ``chunk_size`` pieces and
+    the object only appears on ``close()``."""
+
+    def __init__(self, blob: InMemoryBlob, chunk_size: int, content_type: Optional[str]):
+        self._blob = blob
+        self._chunk_size = chunk_size
+        self._content_type = content_type
+        self._pending = bytearray()
+        self._sent = io.BytesIO()
+
+    def write(self, data: bytes) -> int:
+        self._pending.extend(data)
+        self._blob._client._record("write", len(self._pending))
+        while len(self._pending) >= self._chunk_size:
+            self._sent.write(self._pending[: self._chunk_size])
+            del self._pending[: self._chunk_size]
+        return len(data)
+
+    def close(self) -> None:
+        self._sent.write(self._pending)
+        self._pending.clear()
+        self._blob._store(self._sent.getvalue(), self._content_type)
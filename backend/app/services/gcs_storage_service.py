@@ -9,6 +9,7 @@ so media URLs remain accessible beyond the provider's retention period.
 Uses Application Default Credentials on Cloud Run (via service account).
 For local dev, set GOOGLE_APPLICATION_CREDENTIALS or use `gcloud auth application-default login`.
 """
+import asyncio
 import hashlib
 import logging
 import mimetypes
@@ -17,13 +18,14 @@ import threading
 import time
 import uuid
 from datetime import timedelta
-from typing import Optional
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple, Union
 from urllib.parse import urlparse
 
 import httpx
 from google.cloud import storage
 
 from app.core.config import get_settings
+from app.services.signed_url_cache import IamSigner, SignedUrlLRU, redis_get_many, redis_set_many
 
 logger = logging.getLogger(__name__)
 
@@ -31,19 +33,24 @@ logger = logging.getLogger(__name__)
 class GCSStorageService:
     """Upload generated media to GCS and return public/signed URLs."""
 
-    def __init__(self):
+    def __init__(self, client=None, bucket_name: Optional[str] = None):
         settings = get_settings()
-        self.bucket_name = settings.GCS_BUCKET
+        self.bucket_name = settings.GCS_BUCKET if bucket_name is None else bucket_name
         self.enabled = bool(self.bucket_name)
-        self._client: Optional[storage.Client] = None
-        # In-instance cache of freshly-signed V4 URLs so repeat read paths
-        # (use-preset clicks, gallery thumbnails) don't re-run the IAM signBlob
-        # network calls every time. Keyed by (blob, disposition, response_type,
-        # expiration_hours). Cached for SIGNED_URL_CACHE_TTL — comfortably less
-        # than the 24h URL expiry, so a served URL always has hours of validity.
-        self._signed_url_cache: dict = {}
-        self._signed_url_cache_ttl = 12 * 3600  # 12h (URLs are valid 24h)
-        self._signed_url_cache_max = 10000
+        # ``client`` lets tests inject the in-memory stand-in (gcs_memory.py).
+        self._client: Optional[storage.Client] = client
+        # Freshly-signed V4 URLs so repeat read paths (use-preset clicks,
+        # gallery thumbnails) don't re-run the IAM signBlob network calls
+        # every time: an in-process LRU backed by a Redis tier shared across
+        # instances (signed_url_cache.py). Cached for at most half the URL's
+        # validity, so a served URL always has hours left.
+        self._signed_url_lru = SignedUrlLRU(settings.SIGNED_URL_CACHE_MAX_ENTRIES)
+        self._sign_stats = {"l1_hits": 0, "l2_hits": 0, "misses": 0, "errors": 0,
+                            "sign_ms_total": 0.0, "sign_ms_max": 0.0}
+        self._iam_signer = IamSigner()
+        # None until the first signature: whether the default credentials can
+        # sign locally (key file) or every signature needs IAM signBlob.
+        self._local_signing: Optional[bool] = None
         # Whether objects in this bucket carry per-object public ACLs (set by
         # persist's make_public()) → their bare storage.googleapis.com URL works
         # forever with no signing. Resolved once (a bucket property) and cached.
@@ -115,6 +122,7 @@ class GCSStorageService:
             blob = self.bucket.blob(blob_name)
             blob.cache_control = self.IMMUTABLE_CACHE_CONTROL
             blob.upload_from_string(content, content_type=content_type)
+            self._note_blob_event(blob_name, present=True)
 
             # Return public URL or signed URL
             if self.bucket.iam_configuration.uniform_bucket_level_access_enabled:
@@ -154,10 +162,148 @@ class GCSStorageService:
         blob = self.bucket.blob(blob_name)
         blob.cache_control = self.IMMUTABLE_CACHE_CONTROL
         blob.upload_from_string(data, content_type=content_type)
+        self._note_blob_event(blob_name, present=True)
         blob.make_public()
         logger.info(f"[GCS] Uploaded public: {blob_name} ({len(data)} bytes)")
         return blob.public_url
 
+    async def upload_public_async(
+        self,
+        data: bytes,
+        blob_name: str,
+        content_type: str = "image/png",
+    ) -> str:
+        """``upload_public`` with the blocking SDK call moved off the event loop."""
+        return await asyncio.to_thread(self.upload_public, data, blob_name, content_type)
+
+    async def upload_stream(
+        self,
+        source: Union[str, "os.PathLike[str]", AsyncIterator[bytes]],
+        blob_name: str,
+        content_type: str = "application/octet-stream",
+    ) -> str:
+        """
+        Upload a local file or an async byte iterator without holding it in
+        memory, make it public and return the permanent URL.
+
+        - Files of GCS_COMPOSITE_THRESHOLD_BYTES and up are uploaded as
+          GCS_COMPOSITE_PARTS parallel parts and composed server-side.
+        - Other files / streams over GCS_RESUMABLE_THRESHOLD_BYTES use a
+          resumable session sent GCS_UPLOAD_CHUNK_BYTES at a time (the SDK
+          retries a failed chunk instead of the whole object).
+        - Anything smaller is a single request.
+
+        All SDK calls run in worker threads.
+        """
+        if not self.enabled:
+            raise RuntimeError("GCS not configured — set GCS_BUCKET env var")
+
+        if isinstance(source, (str, os.PathLike)):
+            path = os.fspath(source)
+            size = os.path.getsize(path)
+            if size >= get_settings().GCS_COMPOSITE_THRESHOLD_BYTES and self._composite_parts() > 1:
+                blob = await self._upload_composite(path, size, blob_name, content_type)
+            else:
+                blob = await asyncio.to_thread(self._upload_file, path, size, blob_name, content_type)
+        else:
+            blob, size = await self._upload_iterator(source, blob_name, content_type)
+
+        await asyncio.to_thread(blob.make_public)
+        self._note_blob_event(blob_name, present=True)
+        logger.info(f"[GCS] Streamed public: {blob_name} ({size} bytes)")
+        return blob.public_url
+
+    def _new_blob(self, blob_name: str, content_type: str, chunked: bool):
+        blob = self.bucket.blob(blob_name)
+        blob.cache_control = self.IMMUTABLE_CACHE_CONTROL
+        blob.content_type = content_type
+        if chunked:
+            blob.chunk_size = get_settings().GCS_UPLOAD_CHUNK_BYTES
+        return blob
+
+    def _upload_file(self, path: str, size: int, blob_name: str, content_type: str):
+        chunked = size > get_settings().GCS_RESUMABLE_THRESHOLD_BYTES
+        blob = self._new_blob(blob_name, content_type, chunked)
+        blob.upload_from_filename(path, content_type=content_type)
+        return blob
+
+    @staticmethod
+    def _composite_parts() -> int:
+        # GCS compose accepts at most 32 source objects.
+        return max(1, min(32, get_settings().GCS_COMPOSITE_PARTS))
+
+    async def _upload_composite(self, path: str, size: int, blob_name: str, content_type: str):
+        parts = self._composite_parts()
+        # Part boundaries on 256 KiB multiples (the resumable chunk unit).
+        unit = 256 * 1024
+        part_size = -(-size // parts)
+        part_size = -(-part_size // unit) * unit
+        ranges = [(off, min(part_size, size - off)) for off in range(0, size, part_size)]
+        token = uuid.uuid4().hex[:8]
+        part_names = [f"{blob_name}.part-{token}-{i}" for i in range(len(ranges))]
+
+        def _upload_part(name: str, offset: int, length: int):
+            part = self._new_blob(name, content_type, chunked=True)
+            with open(path, "rb") as f:
+                f.seek(offset)
+                part.upload_from_file(f, size=length, content_type=content_type)
+            return part
+
+        def _compose(sources: List):
+            final = self._new_blob(blob_name, content_type, chunked=False)
+            final.compose(sources)
+            return final
+
+        uploaded: List = []
+        try:
+            results = await asyncio.gather(
+                *(asyncio.to_thread(_upload_part, name, off, length)
+                  for name, (off, length) in zip(part_names, ranges)),
+                return_exceptions=True,
+            )
+            uploaded = [r for r in results if not isinstance(r, BaseException)]
+            for r in results:
+                if isinstance(r, BaseException):
+                    raise r
+            return await asyncio.to_thread(_compose, uploaded)
+        finally:
+            for part in uploaded:
+                try:
+                    await asyncio.to_thread(part.delete)
+                except Exception as e:
+                    logger.warning(f"[GCS] Failed to delete composite part {part.name}: {e}")
+
+    async def _upload_iterator(self, chunks: AsyncIterator[bytes], blob_name: str, content_type: str):
+        """Buffer up to the resumable threshold; small streams go up in one
+        request, larger ones switch to a chunked resumable writer."""
+        threshold = get_settings().GCS_RESUMABLE_THRESHOLD_BYTES
+        buf = bytearray()
+        iterator = chunks.__aiter__()
+        async for chunk in iterator:
+            buf.extend(chunk)
+            if len(buf) > threshold:
+                break
+        else:
+            blob = self._new_blob(blob_name, content_type, chunked=False)
+            await asyncio.to_thread(blob.upload_from_string, bytes(buf), content_type=content_type)
+            return blob, len(buf)
+
+        blob = self._new_blob(blob_name, content_type, chunked=True)
+        chunk_size = blob.chunk_size
+        writer = await asyncio.to_thread(
+            blob.open, "wb", chunk_size=chunk_size, content_type=content_type, ignore_flush=True,
+        )
+        # Not closing the writer on failure abandons the resumable session,
+        # so a partial upload never becomes a visible object.
+        first = bytes(buf)
+        buf.clear()
+        size = 0
+        async for chunk in _prepend(first, iterator):
+            size += len(chunk)
+            await asyncio.to_thread(writer.write, chunk)
+        await asyncio.to_thread(writer.close)
+        return blob, size
+
     async def delete_blob(self, blob_name: str) -> bool:
         """Delete a blob from GCS."""
         if not self.enabled:
@@ -165,12 +311,36 @@ class GCSStorageService:
         try:
             blob = self.bucket.blob(blob_name)
             blob.delete()
+            self._note_blob_event(blob_name, present=False)
             logger.info(f"[GCS] Deleted: {blob_name}")
             return True
         except Exception as e:
             logger.error(f"[GCS] Failed to delete {blob_name}: {e}")
             return False
 
+    async def delete_blobs(self, blob_names: List[str], concurrency: int = 16) -> int:
+        """Delete many blobs with bounded concurrency, each in a worker thread.
+        An already-missing blob counts as deleted. Returns the deleted count."""
+        if not self.enabled or not blob_names:
+            return 0
+        from google.api_core.exceptions import NotFound
+
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def _one(name: str) -> bool:
+            async with semaphore:
+                try:
+                    await asyncio.to_thread(self.bucket.blob(name).delete)
+                except (NotFound, FileNotFoundError):
+                    pass
+                except Exception as e:
+                    logger.warning(f"[GCS] Failed to delete {name}: {e}")
+                    return False
+                self._note_blob_event(name, present=False)
+                return True
+
+        return sum(await asyncio.gather(*(_one(n) for n in set(blob_names))))
+
     async def safe_persist_url(
         self,
         url: Optional[str],
@@ -214,64 +384,37 @@ class GCSStorageService:
             logger.warning(f"[GCS] list_blob_names failed: {e}")
             return set()
 
-    # Class-level (singleton-shared) cache of {prefix: (set, expires_at_ts)} for
-    # the existence checks, plus a per-prefix "refresh in flight" guard and a
-    # lock to set it atomically.
-    _blob_listing_cache: dict = {}
-    _blob_refresh_inflight: dict = {}
-    _blob_listing_lock = threading.Lock()
-
-    def list_blob_names_cached(self, prefix: str = "generated/", ttl_seconds: int = 900) -> set:
-        """Cached variant of `list_blob_names` for hot read paths, with
-        stale-while-revalidate.
-
-        Production discovered stale Material rows pointing at GCS objects that
-        no longer exist (deleted by lifecycle, failed pregenerate uploads, etc.)
-        — signing succeeds but the resulting URL 404s, breaking the LandingPage
-        hero. The presets endpoint uses this set to drop dead rows.
-
-        The GCS LIST is multi-second, so we never let it block a request once
-        the cache is warm: a stale entry is returned IMMEDIATELY and refreshed
-        in a background daemon thread. Only the very first call per prefix per
-        instance pays the LIST cost. (The frontend also has an @error image
-        fallback, so a briefly-stale entry never shows a broken image.)
-        """
-        now = time.time()
-        cached = self._blob_listing_cache.get(prefix)
-        if cached:
-            names, expiry = cached
-            if expiry <= now:
-                # Stale → kick a single background refresh, serve stale now.
-                self._kick_blob_refresh(prefix, ttl_seconds)
-            return names
-        # Cold (no cache yet, e.g. fresh instance): block once to populate so we
-        # don't filter against an empty set and drop every row.
-        names = self.list_blob_names(prefix)
-        # Only cache non-empty results — an empty set might mean GCS error or
-        # genuine empty prefix; we don't want to mask transient errors.
-        if names:
-            self._blob_listing_cache[prefix] = (names, now + ttl_seconds)
-        return names
-
-    def _kick_blob_refresh(self, prefix: str, ttl_seconds: int) -> None:
-        """Refresh one prefix's blob listing in the background (at most one
-        refresh in flight per prefix)."""
-        with self._blob_listing_lock:
-            if self._blob_refresh_inflight.get(prefix):
-                return
-            self._blob_refresh_inflight[prefix] = True
-
-        def _run():
-            try:
-                names = self.list_blob_names(prefix)
-                if names:
-                    self._blob_listing_cache[prefix] = (names, time.time() + ttl_seconds)
-            except Exception as e:  # noqa: BLE001
-                logger.warning("[GCS] background blob-list refresh failed for %s: %s", prefix, e)
-            finally:
-                self._blob_refresh_inflight[prefix] = False
-
-        threading.Thread(target=_run, name=f"gcs-blob-refresh-{prefix.strip('/')}", daemon=True).start()
+    # Blob-existence index hooks. Uploads/deletes are recorded here and
+    # drained by app.services.blob_index, which updates the Material rows that
+    # reference them. Class-level + locked: upload_public is also called from
+    # worker threads. Bounded — if nothing drains (scripts, tests) the
+    # periodic verifier still catches up.
+    _blob_events_lock = threading.Lock()
+    _uploaded_blobs: Set[str] = set()
+    _deleted_blobs: Set[str] = set()
+    _BLOB_EVENTS_MAX = 10000
+
+    def _note_blob_event(self, blob_name: str, present: bool) -> None:
+        with self._blob_events_lock:
+            target, other = (
+                (self._uploaded_blobs, self._deleted_blobs) if present
+                else (self._deleted_blobs, self._uploaded_blobs)
+            )
+            other.discard(blob_name)
+            if len(target) < self._BLOB_EVENTS_MAX:
+                target.add(blob_name)
+
+    def drain_blob_events(self) -> Tuple[Set[str], Set[str]]:
+        """Return and clear (uploaded, deleted) blob names since the last drain."""
+        with self._blob_events_lock:
+            uploaded, deleted = set(self._uploaded_blobs), set(self._deleted_blobs)
+            self._uploaded_blobs.clear()
+            self._deleted_blobs.clear()
+        return uploaded, deleted
+
+    def blob_exists(self, blob_name: str) -> bool:
+        """Single-object existence check (blocking; raises on GCS errors)."""
+        return self.bucket.blob(blob_name).exists()
 
     @staticmethod
     def extract_blob_name(url: Optional[str], bucket_name: str) -> Optional[str]:
@@ -307,84 +450,226 @@ class GCSStorageService:
 
         When `download_filename` is set, the signed URL forces the browser to
         save the file as an attachment with that name (Content-Disposition).
+
+        Sync: consults only the in-process LRU and signs inline on a miss.
+        Async callers should use `refresh_signed_url_async` / `sign_urls`,
+        which add the shared Redis tier and sign off the event loop.
         """
         if not url or not self.enabled:
             return url
         try:
-            bucket_marker = f"/{self.bucket_name}/"
-            if bucket_marker not in url:
-                return url
-            # Strip query/fragment, then take everything after the bucket name.
-            clean = url.split("?", 1)[0].split("#", 1)[0]
-            blob_name = clean.split(bucket_marker, 1)[1]
-            if not blob_name:
+            target = self._sign_target(url, expiration_hours, download_filename, response_type)
+            if target is None:
                 return url
+            cache_key, blob_name, sign_kwargs = target
+            cached = self._signed_url_lru.get(cache_key)
+            if cached:
+                self._sign_stats["l1_hits"] += 1
+                return cached
+            self._sign_stats["misses"] += 1
+            started = time.perf_counter()
+            signed = self._sign_blocking(blob_name, sign_kwargs)
+            self._record_sign_latency(started)
+            self._signed_url_lru.set(cache_key, signed, self._signed_url_ttl(expiration_hours))
+            return signed
+        except Exception as e:
+            self._sign_stats["errors"] += 1
+            logger.warning(f"[GCS] refresh_signed_url failed for {url}: {e}")
+            return url
 
-            # Serve a recently-signed URL from the in-instance cache when one is
-            # still well within its validity window — skips the per-URL IAM
-            # signBlob round-trips (the dominant cost of use-preset/gallery
-            # reads). Keyed so different dispositions/types don't collide.
-            cache_key = (blob_name, download_filename or "", response_type or "", expiration_hours)
-            now = time.monotonic()
-            cached = self._signed_url_cache.get(cache_key)
-            if cached and cached[0] > now:
-                return cached[1]
+    async def refresh_signed_url_async(
+        self,
+        url: Optional[str],
+        expiration_hours: int = 24,
+        download_filename: Optional[str] = None,
+        response_type: Optional[str] = None,
+    ) -> Optional[str]:
+        """Async `refresh_signed_url` (LRU → Redis → sign in a thread)."""
+        return (await self.sign_urls([url], expiration_hours, download_filename, response_type))[0]
 
-            blob = self.bucket.blob(blob_name)
+    async def sign_urls(
+        self,
+        urls: List[Optional[str]],
+        expiration_hours: int = 24,
+        download_filename: Optional[str] = None,
+        response_type: Optional[str] = None,
+    ) -> List[Optional[str]]:
+        """Sign many URLs at once, in input order. Duplicates are signed once,
+        Redis is read with one MGET, and the remaining misses are signed
+        concurrently (SIGNED_URL_SIGN_CONCURRENCY) in worker threads. Any URL
+        that can't be signed is returned unchanged."""
+        results: List[Optional[str]] = list(urls)
+        if not self.enabled:
+            return results
+
+        pending: Dict[tuple, Tuple[str, dict, List[int]]] = {}
+        for idx, url in enumerate(urls):
+            if not url:
+                continue
+            target = self._sign_target(url, expiration_hours, download_filename, response_type)
+            if target is None:
+                continue
+            cache_key, blob_name, sign_kwargs = target
+            cached = self._signed_url_lru.get(cache_key)
+            if cached:
+                self._sign_stats["l1_hits"] += 1
+                results[idx] = cached
+            elif cache_key in pending:
+                pending[cache_key][2].append(idx)
+            else:
+                pending[cache_key] = (blob_name, sign_kwargs, [idx])
+        if not pending:
+            return results
 
-            sign_kwargs = {
-                "version": "v4",
-                "expiration": timedelta(hours=expiration_hours),
-                "method": "GET",
-            }
-            if download_filename:
-                # RFC 6266: quote the filename and provide UTF-8 fallback so
-                # non-ASCII names (e.g. Chinese tool names) survive download.
-                safe_ascii = download_filename.encode("ascii", "ignore").decode("ascii") or "vidgo-download"
-                from urllib.parse import quote
-                sign_kwargs["response_disposition"] = (
-                    f'attachment; filename="{safe_ascii}"; '
-                    f"filename*=UTF-8''{quote(download_filename)}"
-                )
-            if response_type:
-                sign_kwargs["response_type"] = response_type
-
-            # On Cloud Run the default credentials are GCE metadata tokens
-            # which cannot sign locally. Fall back to IAM signBlob via the
-            # service-account email + an OAuth access token so signed URLs
-            # work without a private-key JSON file.
-            def _store(signed: str) -> str:
-                # Cap the cache so a long-lived instance can't grow unbounded;
-                # a full clear is fine (worst case = a few re-signs).
-                if len(self._signed_url_cache) >= self._signed_url_cache_max:
-                    self._signed_url_cache.clear()
-                self._signed_url_cache[cache_key] = (now + self._signed_url_cache_ttl, signed)
-                return signed
+        now = time.time()
+        for cache_key, value in (await redis_get_many(list(pending))).items():
+            expires_at, _, signed = value.partition("|")
+            try:
+                remaining = float(expires_at) - now
+            except ValueError:
+                continue
+            if remaining <= 0 or not signed:
+                continue
+            self._sign_stats["l2_hits"] += 1
+            self._signed_url_lru.set(cache_key, signed, remaining)
+            for idx in pending.pop(cache_key)[2]:
+                results[idx] = signed
+        if not pending:
+            return results
+
+        semaphore = asyncio.Semaphore(max(1, get_settings().SIGNED_URL_SIGN_CONCURRENCY))
+        ttl = self._signed_url_ttl(expiration_hours)
+
+        async def _sign(cache_key, blob_name, sign_kwargs):
+            async with semaphore:
+                self._sign_stats["misses"] += 1
+                started = time.perf_counter()
+                try:
+                    signed = await self._sign_async(blob_name, sign_kwargs)
+                except Exception as e:
+                    self._sign_stats["errors"] += 1
+                    logger.warning(f"[GCS] signing failed for {blob_name}: {e}")
+                    return None
+                self._record_sign_latency(started)
+                self._signed_url_lru.set(cache_key, signed, ttl)
+                return cache_key, signed
+
+        signed_items = [
+            item for item in await asyncio.gather(
+                *(_sign(key, blob_name, kwargs) for key, (blob_name, kwargs, _) in pending.items())
+            ) if item
+        ]
+        for cache_key, signed in signed_items:
+            for idx in pending[cache_key][2]:
+                results[idx] = signed
+        expires_at = time.time() + ttl
+        await redis_set_many(((k, f"{expires_at:.0f}|{v}") for k, v in signed_items), int(ttl))
+        return results
+
+    async def prewarm_public_urls(self, urls: List[Optional[str]]) -> None:
+        """Before a sync response builder calls `public_url` for many rows:
+        when objects are not public (so `public_url` signs), sign them all
+        up front via `sign_urls` so the builder only hits the LRU."""
+        if not self.enabled:
+            return
+        if self._objects_public is None:
+            await asyncio.to_thread(lambda: self.objects_are_public)
+        if self._objects_public:
+            return
+        await self.sign_urls([u for u in urls if u])
 
+    def _sign_target(
+        self,
+        url: str,
+        expiration_hours: int,
+        download_filename: Optional[str],
+        response_type: Optional[str],
+    ) -> Optional[Tuple[tuple, str, dict]]:
+        """(cache_key, blob_name, sign_kwargs) for a URL in our bucket, else None."""
+        bucket_marker = f"/{self.bucket_name}/"
+        if bucket_marker not in url:
+            return None
+        # Strip query/fragment, then take everything after the bucket name.
+        clean = url.split("?", 1)[0].split("#", 1)[0]
+        blob_name = clean.split(bucket_marker, 1)[1]
+        if not blob_name:
+            return None
+
+        sign_kwargs = {
+            "version": "v4",
+            "expiration": timedelta(hours=expiration_hours),
+            "method": "GET",
+        }
+        if download_filename:
+            # RFC 6266: quote the filename and provide UTF-8 fallback so
+            # non-ASCII names (e.g. Chinese tool names) survive download.
+            safe_ascii = download_filename.encode("ascii", "ignore").decode("ascii") or "vidgo-download"
+            from urllib.parse import quote
+            sign_kwargs["response_disposition"] = (
+                f'attachment; filename="{safe_ascii}"; '
+                f"filename*=UTF-8''{quote(download_filename)}"
+            )
+        if response_type:
+            sign_kwargs["response_type"] = response_type
+        # Keyed so different dispositions/types don't collide.
+        cache_key = (self.bucket_name, blob_name, download_filename or "", response_type or "", expiration_hours)
+        return cache_key, blob_name, sign_kwargs
+
+    # On Cloud Run the default credentials are GCE metadata tokens which
+    # cannot sign locally. Fall back to IAM signBlob via the service-account
+    # email + an OAuth access token so signed URLs work without a private-key
+    # JSON file. Once local signing has failed we go straight to IAM.
+
+    def _sign_blocking(self, blob_name: str, sign_kwargs: dict) -> str:
+        blob = self.bucket.blob(blob_name)
+        if self._local_signing is not False:
             try:
-                return _store(blob.generate_signed_url(**sign_kwargs))
+                signed = blob.generate_signed_url(**sign_kwargs)
+                self._local_signing = True
+                return signed
             except Exception:
-                import google.auth
-                from google.auth.transport.requests import Request as AuthRequest
-
-                creds, _ = google.auth.default(
-                    scopes=["https://www.googleapis.com/auth/cloud-platform"]
-                )
-                creds.refresh(AuthRequest())
-                sa_email = (
-                    getattr(creds, "service_account_email", None)
-                    or os.getenv("GCS_SIGNER_SERVICE_ACCOUNT")
-                )
-                if not sa_email:
+                if self._local_signing:
                     raise
-                return _store(blob.generate_signed_url(
-                    **sign_kwargs,
-                    service_account_email=sa_email,
-                    access_token=creds.token,
-                ))
-        except Exception as e:
-            logger.warning(f"[GCS] refresh_signed_url failed for {url}: {e}")
-            return url
+                self._local_signing = False
+        sa_email, token = self._iam_signer.credentials_blocking()
+        return blob.generate_signed_url(**sign_kwargs, service_account_email=sa_email, access_token=token)
+
+    async def _sign_async(self, blob_name: str, sign_kwargs: dict) -> str:
+        if self._local_signing is not False:
+            return await asyncio.to_thread(self._sign_blocking, blob_name, sign_kwargs)
+        sa_email, token = await self._iam_signer.credentials()
+        blob = self.bucket.blob(blob_name)
+        return await asyncio.to_thread(
+            blob.generate_signed_url, **sign_kwargs, service_account_email=sa_email, access_token=token,
+        )
+
+    def _signed_url_ttl(self, expiration_hours: int) -> float:
+        # Never serve a URL from cache in the last half of its validity.
+        return min(get_settings().SIGNED_URL_CACHE_TTL_SECONDS, expiration_hours * 3600 / 2)
+
+    def _record_sign_latency(self, started: float) -> None:
+        ms = (time.perf_counter() - started) * 1000
+        self._sign_stats["sign_ms_total"] += ms
+        self._sign_stats["sign_ms_max"] = max(self._sign_stats["sign_ms_max"], ms)
+
+    def signed_url_stats(self) -> dict:
+        st = self._sign_stats
+        lookups = st["l1_hits"] + st["l2_hits"] + st["misses"]
+        return {
+            "entries": len(self._signed_url_lru),
+            "max_entries": self._signed_url_lru.max_entries,
+            "l1_hits": st["l1_hits"],
+            "l2_hits": st["l2_hits"],
+            "misses": st["misses"],
+            "errors": st["errors"],
+            "hit_ratio": round((st["l1_hits"] + st["l2_hits"]) / lookups, 3) if lookups else None,
+            "evictions": self._signed_url_lru.evictions,
+            "expirations": self._signed_url_lru.expirations,
+            "avg_sign_ms": round(st["sign_ms_total"] / st["misses"], 1) if st["misses"] else None,
+            "max_sign_ms": round(st["sign_ms_max"], 1),
+            "local_signing": self._local_signing,
+            "iam_token_refreshes": self._iam_signer.refreshes,
+        }
 
     @property
     def objects_are_public(self) -> bool:
@@ -480,6 +765,13 @@ class GCSStorageService:
         }.get(media_type, ".bin")
 
 
+async def _prepend(first: bytes, rest: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    if first:
+        yield first
+    async for chunk in rest:
+        yield chunk
+
+
 # ── Singleton ──
 
 _gcs_instance: Optional[GCSStorageService] = None
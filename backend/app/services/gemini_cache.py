@@ -0,0 +1,258 @@
+"""
+Content-keyed response cache for GeminiService text helpers.
+
+``enhance_prompt``, ``translate_text`` and ``describe_image`` made a live
+Gemini call (1-4 s, billed quota) every time, although their inputs repeat
+constantly: preset prompts, the same topic translations from the landing and
+demo flows, the same example images.
+
+- **Key** — sha256 over the method, the model id, the method's prompt
+  template version and the normalized arguments (ends stripped and runs of
+  spaces collapsed, newlines kept; long values such as base64 images are
+  hashed first). Bumping a template version in GeminiService retires every
+  entry produced by the old template.
+- **L1** is a per-process LRU; **L2** is Redis (``vidgo:gemini:<method>:<sha>``),
+  shared by every instance. Both use the per-method TTL from settings. Redis
+  is best-effort: any error counts as a miss.
+- **Single-flight** — concurrent identical requests await the one in-flight
+  call instead of each calling Gemini.
+- Only ``success`` results are stored, so a fail-open fallback (original text
+  echoed back) is never served to later callers; callers coalesced onto the
+  same flight do share it.
+
+``stats()`` reports hits per tier, coalesced callers, hit ratio and the
+Gemini latency the hits saved (each entry remembers how long its call took).
+"""
+import asyncio
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+REDIS_KEY_PREFIX = "vidgo:gemini:"
+# Values longer than this are replaced by their digest before keying.
+_INLINE_VALUE_CHARS = 512
+_SPACE_RUNS = re.compile(r"[ \t]+")
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        value = _SPACE_RUNS.sub(" ", value.strip())
+        if len(value) > _INLINE_VALUE_CHARS:
+            return "sha256:" + hashlib.sha256(value.encode("utf-8")).hexdigest()
+        return value
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in sorted(value.items())}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def cache_key(method: str, model: str, version: int, inputs: Dict[str, Any]) -> str:
+    payload = json.dumps(
+        [method, model, version, _normalize(inputs)],
+        ensure_ascii=False,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class _LRU:
+    """Thread-safe LRU of ``key -> (expires_at_monotonic, entry_json)``."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max(1, max_entries)
+        self._data: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            if item[0] <= now:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return item[1]
+
+    def set(self, key: str, entry: str, ttl: float) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, entry)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class GeminiResponseCache:
+    def __init__(self, max_entries: int):
+        self._lru = _LRU(max_entries)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._metrics: Dict[str, Dict[str, float]] = {}
+
+    def _count(self, method: str, field: str, amount: float = 1) -> None:
+        m = self._metrics.setdefault(
+            method,
+            {"l1_hits": 0, "l2_hits": 0, "coalesced": 0, "misses": 0, "saved_ms": 0.0, "call_ms": 0.0},
+        )
+        m[field] += amount
+
+    async def _redis_get(self, rkey: str) -> Optional[str]:
+        try:
+            from app.api.deps import get_redis
+
+            redis = await get_redis()
+            return await redis.get(rkey)
+        except Exception as e:
+            logger.debug(f"[GeminiCache] Redis get failed: {e}")
+            return None
+
+    async def _redis_set(self, rkey: str, entry: str, ttl: int) -> None:
+        try:
+            from app.api.deps import get_redis
+
+            redis = await get_redis()
+            await redis.set(rkey, entry, ex=ttl)
+        except Exception as e:
+            logger.debug(f"[GeminiCache] Redis set failed: {e}")
+
+    def _hit(self, method: str, tier: str, entry: str) -> Dict[str, Any]:
+        data = json.loads(entry)
+        self._count(method, tier)
+        self._count(method, "saved_ms", data["ms"])
+        return data["v"]
+
+    async def get_or_call(
+        self,
+        method: str,
+        key: str,
+        call: Callable[[], Awaitable[Dict[str, Any]]],
+        ttl: int,
+    ) -> Dict[str, Any]:
+        entry = self._lru.get(key)
+        if entry is not None:
+            return self._hit(method, "l1_hits", entry)
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            shared, error = await asyncio.shield(pending)
+            if error is not None:
+                raise error
+            if shared is not None:
+                return self._hit(method, "coalesced", shared)
+            return await call()
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        shared: Optional[str] = None
+        error: Optional[BaseException] = None
+        try:
+            rkey = f"{REDIS_KEY_PREFIX}{method}:{key}"
+            shared = await self._redis_get(rkey)
+            if shared is not None:
+                self._lru.set(key, shared, ttl)
+                return self._hit(method, "l2_hits", shared)
+
+            started = time.perf_counter()
+            result = await call()
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self._count(method, "misses")
+            self._count(method, "call_ms", elapsed_ms)
+            try:
+                shared = json.dumps({"v": result, "ms": round(elapsed_ms, 1)}, ensure_ascii=False)
+            except (TypeError, ValueError):
+                return result
+            # Followers share this flight's result either way; only
+            # successes are stored for later callers.
+            if isinstance(result, dict) and result.get("success"):
+                self._lru.set(key, shared, ttl)
+                await self._redis_set(rkey, shared, ttl)
+            # Callers get their own copy, as they would from a hit.
+            return json.loads(shared)["v"]
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self._inflight.pop(key, None)
+            future.set_result((shared, error))
+
+    def stats(self) -> Dict[str, Any]:
+        methods = {}
+        total_hits = total_calls = 0
+        for method, m in self._metrics.items():
+            hits = m["l1_hits"] + m["l2_hits"] + m["coalesced"]
+            calls = hits + m["misses"]
+            total_hits += hits
+            total_calls += calls
+            methods[method] = {
+                "l1_hits": int(m["l1_hits"]),
+                "l2_hits": int(m["l2_hits"]),
+                "coalesced": int(m["coalesced"]),
+                "misses": int(m["misses"]),
+                "hit_ratio": round(hits / calls, 3) if calls else 0.0,
+                "avg_call_ms": round(m["call_ms"] / m["misses"], 1) if m["misses"] else 0.0,
+                "saved_seconds": round(m["saved_ms"] / 1000, 1),
+            }
+        return {
+            "entries": len(self._lru),
+            "max_entries": self._lru.max_entries,
+            "inflight": len(self._inflight),
+            "hit_ratio": round(total_hits / total_calls, 3) if total_calls else 0.0,
+            "saved_seconds": round(sum(m["saved_ms"] for m in self._metrics.values()) / 1000, 1),
+            "methods": methods,
+        }
+
+
+_cache: Optional[GeminiResponseCache] = None
+
+
+def get_gemini_cache() -> GeminiResponseCache:
+    global _cache
+    if _cache is None:
+        _cache = GeminiResponseCache(get_settings().GEMINI_CACHE_MAX_ENTRIES)
+    return _cache
+
+
+def cached_response(method: str, version: int, ttl_setting: str):
+    """Serve a GeminiService helper through the response cache.
+
+    The wrapped coroutine's bound arguments form the key together with
+    ``self.model_name`` and ``version``. Calls bypass the cache when the
+    service reports ``_response_cache_enabled()`` False (no credentials, or
+    GEMINI_CACHE_ENABLED off).
+    """
+
+    def decorator(fn):
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        async def wrapper(self, *args, **kwargs):
+            if not self._response_cache_enabled():
+                return await fn(self, *args, **kwargs)
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            inputs = dict(list(bound.arguments.items())[1:])
+            key = cache_key(method, self.model_name, version, inputs)
+            ttl = max(1, int(getattr(get_settings(), ttl_setting)))
+            return await get_gemini_cache().get_or_call(
+                method, key, lambda: fn(self, *args, **kwargs), ttl
+            )
+
+        return wrapper
+
+    return decorator
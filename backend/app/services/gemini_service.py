@@ -24,6 +24,8 @@ from typing import Any, Dict, List, Optional
 import httpx
 
 from app.core.config import get_settings
+from app.services.embedding_batcher import EmbeddingBatcher
+from app.services.gemini_cache import cached_response
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -49,6 +51,15 @@ class GeminiService:
     Uses Gemini API (GEMINI_API_KEY) by default; falls back to Vertex AI if no key is set.
     """
 
+    # Prompt-template versions for the cached helpers (gemini_cache.py).
+    # Bump one whenever that helper's prompt or output parsing changes so
+    # entries produced by the old template stop being served.
+    ENHANCE_PROMPT_VERSION = 1
+    TRANSLATE_TEXT_VERSION = 1
+    DESCRIBE_IMAGE_VERSION = 1
+
+    EMBEDDING_MODEL = "text-embedding-004"
+
     # Legacy fallback endpoint (unused but kept for reference)
     LEGACY_BASE_URL = "https://generativelanguage.googleapis.com/v1beta"
 
@@ -65,6 +76,7 @@ class GeminiService:
         self.location = os.getenv("VERTEX_AI_GENAI_LOCATION", "us-central1")
         self.model_name = os.getenv("GEMINI_MODEL", "gemini-2.5-pro")
         self._genai_client = None
+        self._embedding_batcher: Optional[EmbeddingBatcher] = None
         # Vertex AI ADC takes priority when a project is configured. The
         # standalone Gemini API key path is only used as a fallback for local
         # dev where ADC isn't available — on Cloud Run we always have ADC via
@@ -91,10 +103,15 @@ class GeminiService:
                 logger.info("[GeminiService] Using Gemini API backend")
         return self._genai_client
 
+    def _response_cache_enabled(self) -> bool:
+        """Cache only live calls; the no-credentials fallbacks are instant."""
+        return settings.GEMINI_CACHE_ENABLED and bool(self.api_key or self._use_vertex)
+
     # =========================================================================
     # Prompt Enhancement
     # =========================================================================
 
+    @cached_response("enhance_prompt", ENHANCE_PROMPT_VERSION, "GEMINI_CACHE_TTL_ENHANCE_SECONDS")
     async def enhance_prompt(
         self,
         user_prompt: str,
@@ -237,6 +254,7 @@ class GeminiService:
                 "error": str(e),
             }
 
+    @cached_response("translate_text", TRANSLATE_TEXT_VERSION, "GEMINI_CACHE_TTL_TRANSLATE_SECONDS")
     async def translate_text(self, text: str, target_language: str) -> Dict[str, Any]:
         """Translate spoken-script text into ``target_language`` ('zh-TW' | 'en').
 
@@ -339,6 +357,7 @@ class GeminiService:
     # Image Description and Analysis (for Material System)
     # =========================================================================
 
+    @cached_response("describe_image", DESCRIBE_IMAGE_VERSION, "GEMINI_CACHE_TTL_DESCRIBE_SECONDS")
     async def describe_image(
         self,
         image_url: str = None,
@@ -865,8 +884,36 @@ class GeminiService:
     # Text Embedding for Similarity Matching
     # =========================================================================
 
+    @property
+    def embedding_batcher(self) -> EmbeddingBatcher:
+        """Shared micro-batcher + embedding cache (embedding_batcher.py)."""
+        if self._embedding_batcher is None:
+            self._embedding_batcher = EmbeddingBatcher(
+                self._embed_texts,
+                model=self.EMBEDDING_MODEL,
+                max_batch=settings.EMBEDDING_BATCH_MAX_SIZE,
+                max_wait_ms=settings.EMBEDDING_BATCH_MAX_WAIT_MS,
+                ttl_seconds=settings.EMBEDDING_CACHE_TTL_DAYS * 86400,
+                local_entries=settings.EMBEDDING_CACHE_LOCAL_ENTRIES,
+            )
+        return self._embedding_batcher
+
+    async def _embed_texts(self, texts: List[str]) -> List[List[float]]:
+        """One batched embed_content request; vectors in input order."""
+        client = self._get_genai_client()
+        response = await asyncio.to_thread(
+            client.models.embed_content,
+            model=self.EMBEDDING_MODEL,
+            contents=texts,
+        )
+        return [e.values for e in (response.embeddings or [])]
+
     async def get_embedding(self, text: str) -> Dict[str, Any]:
-        """Generate text embedding for similarity matching."""
+        """Generate text embedding for similarity matching.
+
+        Concurrent calls are coalesced into batched requests and repeated
+        texts are served from the embedding cache.
+        """
         if not self.api_key and not self._use_vertex:
             return {
                 "success": True,
@@ -875,15 +922,7 @@ class GeminiService:
             }
 
         try:
-            client = self._get_genai_client()
-
-            response = await asyncio.to_thread(
-                client.models.embed_content,
-                model="text-embedding-004",
-                contents=text,
-            )
-
-            embedding = response.embeddings[0].values if response.embeddings else []
+            embedding = await self.embedding_batcher.embed(text)
             return {
                 "success": True,
                 "embedding": embedding,
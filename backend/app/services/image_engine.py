@@ -0,0 +1,338 @@
+"""
+Process-pool image engine.
+
+Upload normalisation (LANCZOS resize, PNG optimize, JPEG re-encodes),
+cutout/scene composites and image watermarks used to decode and encode
+full-resolution images inline in async endpoints — one 12 MP HEIC upload
+froze every other request on the instance for hundreds of milliseconds.
+Those jobs now run in a shared ``ProcessPoolExecutor``; endpoints ``await``
+a typed job method and the event loop stays free.
+
+Jobs take and return plain bytes/values (everything crossing the pool is
+pickled), so callers do their own network I/O and hand the engine only the
+pixel work. Per-kind metrics (count, errors, timeouts, run time in the
+worker, time spent queued) are exposed via ``stats()`` and
+``GET /admin/image-engine``.
+
+Tiny inputs (under IMAGE_ENGINE_INLINE_BYTES, e.g. a 128 px thumbnail)
+run on a worker thread instead: pickling them across the pool costs more
+than the pixel work, and PIL releases the GIL while decoding/encoding.
+
+Backpressure: at most IMAGE_ENGINE_MAX_QUEUE jobs may be pending (running +
+queued); beyond that a job fails fast with HTTP 503 rather than growing an
+unbounded backlog. If a process pool cannot be created at all (restricted
+sandbox), jobs fall back to a worker thread — still off the event loop.
+"""
+from __future__ import annotations
+
+import asyncio
+import io
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException, status
+
+from app.core.config import settings
+from app.core.upload_validation import COMMON_IMAGE_DIMENSION_RULES, ImageDimensionRules
+from app.services.image_normalize_service import NormalizedImage
+
+logger = logging.getLogger(__name__)
+
+RGB = Tuple[int, int, int]
+
+
+# =============================================================================
+# Job bodies — run inside pool workers. Module-level so they pickle.
+# =============================================================================
+
+class _JobHTTPError(Exception):
+    """HTTPException raised in a worker, carried back across the pool
+    (HTTPException itself does not survive pickling)."""
+
+    def __init__(self, status_code: int, detail: Any):
+        super().__init__(status_code, detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def _timed(fn: Callable, *args, **kwargs) -> Tuple[Any, float]:
+    """Run ``fn`` and return (result, run_ms) so the parent can split run
+    time from time spent queued."""
+    started = time.perf_counter()
+    try:
+        result = fn(*args, **kwargs)
+    except HTTPException as exc:
+        raise _JobHTTPError(exc.status_code, exc.detail) from None
+    return result, (time.perf_counter() - started) * 1000
+
+
+def _normalize_job(content: bytes, rules: ImageDimensionRules, max_bytes: int) -> NormalizedImage:
+    from app.services.image_normalize_service import normalize_uploaded_image
+    return normalize_uploaded_image(content, rules=rules, max_bytes=max_bytes)
+
+
+def _composite_cutout_job(cutout_bytes: bytes, color: Optional[RGB], background_bytes: Optional[bytes]) -> bytes:
+    from PIL import Image
+
+    cutout = Image.open(io.BytesIO(cutout_bytes))
+    if cutout.mode != "RGBA":
+        cutout = cutout.convert("RGBA")
+    width, height = cutout.size
+
+    if background_bytes is not None:
+        bg = Image.open(io.BytesIO(background_bytes)).convert("RGB")
+        # Cover-fit: scale so the bg covers the cutout dimensions, then center-crop.
+        bw, bh = bg.size
+        scale = max(width / bw, height / bh)
+        new_w, new_h = int(bw * scale + 0.5), int(bh * scale + 0.5)
+        bg = bg.resize((new_w, new_h), Image.Resampling.LANCZOS)
+        left = (new_w - width) // 2
+        top = (new_h - height) // 2
+        canvas = bg.crop((left, top, left + width, top + height))
+    else:
+        canvas = Image.new("RGB", (width, height), color or (255, 255, 255))
+
+    canvas.paste(cutout, mask=cutout.split()[-1])
+    buf = io.BytesIO()
+    canvas.save(buf, format="JPEG", quality=92)
+    return buf.getvalue()
+
+
+def _composite_scene_job(product_bytes: bytes, scene_bytes: bytes, max_dimension: int) -> bytes:
+    from PIL import Image, ImageOps
+
+    def _prepare(data: bytes, mode: str) -> "Image.Image":
+        with Image.open(io.BytesIO(data)) as source:
+            prepared = ImageOps.exif_transpose(source)
+            if max(prepared.size) > max_dimension:
+                prepared.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+            return prepared.convert(mode)
+
+    product_img = _prepare(product_bytes, "RGBA")
+    scene_img = _prepare(scene_bytes, "RGB")
+
+    # Resize product to fit nicely in scene (60% of scene width, centered)
+    scene_w, scene_h = scene_img.size
+    prod_w, prod_h = product_img.size
+    scale = int(scene_w * 0.6) / prod_w
+    new_w, new_h = int(scene_w * 0.6), int(prod_h * scale)
+    # Ensure product doesn't exceed scene height
+    if new_h > scene_h * 0.8:
+        scale = (scene_h * 0.8) / prod_h
+        new_w, new_h = int(prod_w * scale), int(prod_h * scale)
+
+    product_resized = product_img.resize((new_w, new_h), Image.Resampling.LANCZOS)
+    # Center product on scene, compositing with the product alpha channel.
+    scene_img.paste(product_resized, ((scene_w - new_w) // 2, (scene_h - new_h) // 2), product_resized)
+
+    buf = io.BytesIO()
+    scene_img.save(buf, "PNG", optimize=True)
+    return buf.getvalue()
+
+
+def _watermark_text_job(image_bytes: bytes, text: str, font_size: int, opacity: float, position: str) -> Optional[bytes]:
+    from app.services.watermark import render_text_watermark
+    return render_text_watermark(image_bytes, text, font_size=font_size, opacity=opacity, position=position)
+
+
+def _watermark_logo_job(image_bytes: bytes, logo_bytes: bytes, opacity: float, position: str) -> bytes:
+    from PIL import Image
+    from app.services.watermark import overlay_logo
+
+    base = Image.open(io.BytesIO(image_bytes)).convert("RGBA")
+    logo = Image.open(io.BytesIO(logo_bytes)).convert("RGBA")
+    out = overlay_logo(base, logo, opacity=opacity, position=position)
+    buf = io.BytesIO()
+    out.convert("RGB").save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def _resize_job(image_bytes: bytes, size: Tuple[int, int], fmt: str, quality: int) -> bytes:
+    from PIL import Image
+
+    img = Image.open(io.BytesIO(image_bytes))
+    img = img.resize(size, Image.Resampling.LANCZOS)
+    if fmt.upper() == "JPEG" and img.mode != "RGB":
+        img = img.convert("RGB")
+    buf = io.BytesIO()
+    img.save(buf, format=fmt, quality=quality)
+    return buf.getvalue()
+
+
+# =============================================================================
+# Engine
+# =============================================================================
+
+def _new_metrics() -> Dict[str, float]:
+    return {"jobs": 0, "errors": 0, "timeouts": 0, "run_ms_total": 0.0, "run_ms_max": 0.0, "queued_ms_total": 0.0}
+
+
+class ImageEngine:
+    """Shared pool for CPU-bound image jobs. One per process — use
+    ``get_image_engine()``."""
+
+    def __init__(self, workers: Optional[int] = None, max_queue: Optional[int] = None,
+                 job_timeout: Optional[float] = None, inline_bytes: Optional[int] = None):
+        self.workers = workers or settings.IMAGE_ENGINE_WORKERS or min(4, os.cpu_count() or 1)
+        self.max_queue = max_queue or settings.IMAGE_ENGINE_MAX_QUEUE
+        self.job_timeout = job_timeout or settings.IMAGE_ENGINE_JOB_TIMEOUT_SECONDS
+        self.inline_bytes = settings.IMAGE_ENGINE_INLINE_BYTES if inline_bytes is None else inline_bytes
+        self._executor: Optional[Executor] = None
+        self._thread_fallback = False
+        self._pending = 0
+        self._rejected = 0
+        self._inline_jobs = 0
+        self._metrics: Dict[str, Dict[str, float]] = {}
+
+    def _get_executor(self) -> Optional[Executor]:
+        if self._executor is None and not self._thread_fallback:
+            try:
+                # spawn, not fork: the parent holds event-loop, GCS/gRPC and
+                # DB-driver threads that must not be duplicated into workers.
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+                logger.info("[ImageEngine] Started process pool with %d worker(s)", self.workers)
+            except (OSError, NotImplementedError) as e:
+                logger.warning("[ImageEngine] Process pool unavailable (%s); using worker threads", e)
+                self._thread_fallback = True
+        return self._executor
+
+    async def _run(self, kind: str, fn: Callable, *args) -> Any:
+        if self._pending >= self.max_queue:
+            self._rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Image processing is busy right now. Please retry in a moment.",
+                headers={"Retry-After": "2"},
+            )
+        metrics = self._metrics.setdefault(kind, _new_metrics())
+        metrics["jobs"] += 1
+        self._pending += 1
+        started = time.perf_counter()
+        try:
+            payload = sum(len(a) for a in args if isinstance(a, (bytes, bytearray)))
+            if payload < self.inline_bytes:
+                executor = None  # default thread pool
+                self._inline_jobs += 1
+            else:
+                executor = self._get_executor()
+            loop = asyncio.get_running_loop()
+            try:
+                call = loop.run_in_executor(executor, _timed, fn, *args)
+                result, run_ms = await asyncio.wait_for(call, timeout=self.job_timeout)
+            except BrokenProcessPool:
+                # A worker died (OOM on a huge image, killed). Replace the
+                # pool so later jobs aren't all failing; this one fails.
+                logger.error("[ImageEngine] Process pool broke during %s; restarting", kind)
+                self._executor = None
+                raise
+        except asyncio.TimeoutError:
+            metrics["timeouts"] += 1
+            raise
+        except _JobHTTPError as exc:
+            metrics["errors"] += 1
+            raise HTTPException(status_code=exc.status_code, detail=exc.detail) from None
+        except Exception:
+            metrics["errors"] += 1
+            raise
+        finally:
+            self._pending -= 1
+        total_ms = (time.perf_counter() - started) * 1000
+        metrics["run_ms_total"] += run_ms
+        metrics["run_ms_max"] = max(metrics["run_ms_max"], run_ms)
+        metrics["queued_ms_total"] += max(0.0, total_ms - run_ms)
+        return result
+
+    # ------------------------------------------------------------------ jobs
+
+    async def normalize(
+        self,
+        content: bytes,
+        *,
+        rules: ImageDimensionRules = COMMON_IMAGE_DIMENSION_RULES,
+        max_bytes: int = 20 * 1024 * 1024,
+    ) -> NormalizedImage:
+        """``normalize_uploaded_image`` off the event loop (same HTTP errors)."""
+        return await self._run("normalize", _normalize_job, content, rules, max_bytes)
+
+    async def composite_cutout(
+        self,
+        cutout_bytes: bytes,
+        *,
+        color: Optional[RGB] = None,
+        background_bytes: Optional[bytes] = None,
+    ) -> bytes:
+        """Transparent cutout over a solid color or a cover-fit background;
+        returns JPEG bytes."""
+        return await self._run("composite_cutout", _composite_cutout_job, cutout_bytes, color, background_bytes)
+
+    async def composite_scene(self, product_bytes: bytes, scene_bytes: bytes, *, max_dimension: int) -> bytes:
+        """Product cutout centred on a scene; returns PNG bytes."""
+        return await self._run("composite_scene", _composite_scene_job, product_bytes, scene_bytes, max_dimension)
+
+    async def watermark_text(self, image_bytes: bytes, text: str, *, font_size: int,
+                             opacity: float, position: str) -> Optional[bytes]:
+        """Text watermark; returns PNG bytes, or None if the image can't be read."""
+        return await self._run("watermark_text", _watermark_text_job, image_bytes, text, font_size, opacity, position)
+
+    async def watermark_logo(self, image_bytes: bytes, logo_bytes: bytes, *, opacity: float, position: str) -> bytes:
+        """Logo watermark; returns PNG bytes."""
+        return await self._run("watermark_logo", _watermark_logo_job, image_bytes, logo_bytes, opacity, position)
+
+    async def resize(self, image_bytes: bytes, size: Tuple[int, int], *, fmt: str = "JPEG", quality: int = 90) -> bytes:
+        """LANCZOS resize to exactly ``size``; returns encoded bytes."""
+        return await self._run("resize", _resize_job, image_bytes, size, fmt, quality)
+
+    # ------------------------------------------------------------ lifecycle
+
+    def stats(self) -> Dict[str, Any]:
+        jobs = {}
+        for kind, m in self._metrics.items():
+            done = max(1, m["jobs"] - m["errors"] - m["timeouts"])
+            jobs[kind] = {
+                "jobs": int(m["jobs"]),
+                "errors": int(m["errors"]),
+                "timeouts": int(m["timeouts"]),
+                "avg_run_ms": round(m["run_ms_total"] / done, 1),
+                "max_run_ms": round(m["run_ms_max"], 1),
+                "avg_queued_ms": round(m["queued_ms_total"] / done, 1),
+            }
+        return {
+            "mode": "thread" if self._thread_fallback else "process",
+            "workers": self.workers,
+            "pending": self._pending,
+            "max_queue": self.max_queue,
+            "rejected": self._rejected,
+            "inline_jobs": self._inline_jobs,
+            "jobs": jobs,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+_image_engine: Optional[ImageEngine] = None
+
+
+def get_image_engine() -> ImageEngine:
+    global _image_engine
+    if _image_engine is None:
+        _image_engine = ImageEngine()
+    return _image_engine
+
+
+def shutdown_image_engine() -> None:
+    """Called from the FastAPI lifespan on shutdown."""
+    global _image_engine
+    if _image_engine is not None:
+        _image_engine.shutdown()
+        _image_engine = None
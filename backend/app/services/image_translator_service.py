@@ -26,6 +26,12 @@ match decorative typography exactly — translated text is set in a
 neutral sans-serif. For e-commerce / signage / packaging this is the
 correct tradeoff: visible-broken Chinese is far worse than crisp
 sans-serif Chinese.
+
+Region statistics (background / text colour, texture test) are computed
+over NumPy views of the downscaled crops rather than per-pixel Python
+loops, and fonts plus per-line text widths are memoized by (path, size),
+so an infographic with dozens of boxes spends its time in the provider
+call, not in rendering.
 """
 from __future__ import annotations
 
@@ -35,8 +41,10 @@ import json
 import logging
 import os
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional, Tuple
+from functools import lru_cache
+from typing import Any, List, Optional, Tuple
 
+import numpy as np
 from PIL import Image, ImageDraw, ImageFont, ImageFilter
 
 logger = logging.getLogger(__name__)
@@ -232,8 +240,7 @@ def _sample_background_color(img: Image.Image, box: Tuple[int, int, int, int]) -
     # mostly-uniform backgrounds (sale cards, packaging, signage).
     small = crop.resize((min(crop.width, 64), min(crop.height, 64)))
     quantized = small.quantize(colors=8).convert("RGB")
-    pixels = list(quantized.getdata())
-    if not pixels:
+    if not quantized.width or not quantized.height:
         return (255, 255, 255)
     # Tally and pick the most common, but skip any pixel inside the text box
     # by recomputing relative bounds on the resized frame.
@@ -242,16 +249,9 @@ def _sample_background_color(img: Image.Image, box: Tuple[int, int, int, int]) -
     inner_y0 = int((y0 - fy0) / max(1, fy1 - fy0) * rh)
     inner_x1 = int((x1 - fx0) / max(1, fx1 - fx0) * rw)
     inner_y1 = int((y1 - fy0) / max(1, fy1 - fy0) * rh)
-    counts: Dict[Tuple[int, int, int], int] = {}
-    for y in range(rh):
-        for x in range(rw):
-            if inner_x0 <= x < inner_x1 and inner_y0 <= y < inner_y1:
-                continue
-            px = pixels[y * rw + x]
-            counts[px] = counts.get(px, 0) + 1
-    if not counts:
-        return (255, 255, 255)
-    return max(counts.items(), key=lambda kv: kv[1])[0]
+    keep = np.ones((rh, rw), dtype=bool)
+    keep[inner_y0:inner_y1, inner_x0:inner_x1] = False
+    return _dominant_color(np.asarray(quantized)[keep]) or (255, 255, 255)
 
 
 def _sample_text_color(img: Image.Image, box: Tuple[int, int, int, int], bg: Tuple[int, int, int]) -> Tuple[int, int, int]:
@@ -259,19 +259,27 @@ def _sample_text_color(img: Image.Image, box: Tuple[int, int, int, int], bg: Tup
     crop = img.crop(box).convert("RGB")
     small = crop.resize((min(crop.width, 48), min(crop.height, 48)))
     quantized = small.quantize(colors=8).convert("RGB")
-    counts: Dict[Tuple[int, int, int], int] = {}
-    for px in quantized.getdata():
-        if _color_distance(px, bg) < 40:
-            continue
-        counts[px] = counts.get(px, 0) + 1
-    if not counts:
+    px = np.asarray(quantized).reshape(-1, 3).astype(np.int32)
+    # Skip pixels within Euclidean distance 40 of the background.
+    far = ((px - np.asarray(bg, dtype=np.int32)) ** 2).sum(axis=1) >= 1600
+    color = _dominant_color(px[far])
+    if color is None:
         # Decide by overall lightness — dark bg → light text, vice versa.
         return (255, 255, 255) if sum(bg) < 384 else (24, 24, 24)
-    return max(counts.items(), key=lambda kv: kv[1])[0]
+    return color
 
 
-def _color_distance(a: Tuple[int, int, int], b: Tuple[int, int, int]) -> float:
-    return ((a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2 + (a[2] - b[2]) ** 2) ** 0.5
+def _dominant_color(pixels: np.ndarray) -> Optional[Tuple[int, int, int]]:
+    """Most frequent RGB value in an (N, 3) array; ties go to the colour
+    seen first in scan order. None for an empty array."""
+    if not len(pixels):
+        return None
+    px = pixels.astype(np.int32)
+    packed = (px[:, 0] << 16) | (px[:, 1] << 8) | px[:, 2]
+    values, first, counts = np.unique(packed, return_index=True, return_counts=True)
+    top = np.flatnonzero(counts == counts.max())
+    v = int(values[top[np.argmin(first[top])]])
+    return (v >> 16) & 0xFF, (v >> 8) & 0xFF, v & 0xFF
 
 
 def _background_is_textured(img: Image.Image, box: Tuple[int, int, int, int], threshold: float = 22.0) -> bool:
@@ -284,17 +292,12 @@ def _background_is_textured(img: Image.Image, box: Tuple[int, int, int, int], th
     fx0, fy0 = max(0, x0 - margin), max(0, y0 - margin)
     fx1, fy1 = min(width, x1 + margin), min(height, y1 + margin)
     crop = img.crop((fx0, fy0, fx1, fy1)).convert("RGB").resize((32, 32))
-    px = list(crop.getdata())
+    px = np.asarray(crop, dtype=np.float64).reshape(-1, 3)
     if len(px) < 8:
         return False
-    n = len(px)
-    mean = (
-        sum(p[0] for p in px) / n,
-        sum(p[1] for p in px) / n,
-        sum(p[2] for p in px) / n,
-    )
-    spread = sum(_color_distance(p, mean) for p in px) / n
-    return spread > threshold
+    # Mean Euclidean distance from the mean colour.
+    spread = np.sqrt(((px - px.mean(axis=0)) ** 2).sum(axis=1)).mean()
+    return bool(spread > threshold)
 
 
 def _outline_for(text_color: Tuple[int, int, int]) -> Tuple[int, int, int]:
@@ -304,6 +307,21 @@ def _outline_for(text_color: Tuple[int, int, int]) -> Tuple[int, int, int]:
     return (0, 0, 0) if luminance > 140 else (255, 255, 255)
 
 
+@lru_cache(maxsize=256)
+def _load_font(font_path: Optional[str], size: int) -> ImageFont.FreeTypeFont:
+    """Font for (path, size), read from disk once. Raises OSError when the
+    file can't be loaded (failures are not cached)."""
+    return ImageFont.truetype(font_path, size=size) if font_path else ImageFont.load_default()
+
+
+@lru_cache(maxsize=8192)
+def _line_width(font_path: Optional[str], size: int, line: str) -> int:
+    """Rendered width of one line; the fitting search re-measures the same
+    lines at the same sizes across regions and requests."""
+    bbox = _load_font(font_path, size).getbbox(line)
+    return bbox[2] - bbox[0]
+
+
 def _fit_font(
     text: str, box_width: int, box_height: int, font_path: Optional[str]
 ) -> ImageFont.FreeTypeFont:
@@ -319,28 +337,17 @@ def _fit_font(
     while lo <= hi:
         mid = (lo + hi) // 2
         try:
-            font = (
-                ImageFont.truetype(font_path, size=mid)
-                if font_path
-                else ImageFont.load_default()
-            )
+            widest = max(_line_width(font_path, mid, line) for line in lines)
         except (OSError, IOError):
-            font = ImageFont.load_default()
-            return font
-        widest = 0
-        total_h = 0
-        line_h = mid + 4
-        for line in lines:
-            bbox = font.getbbox(line)
-            widest = max(widest, bbox[2] - bbox[0])
-            total_h += line_h
+            return ImageFont.load_default()
+        total_h = (mid + 4) * len(lines)
         if widest <= box_width and total_h <= box_height:
             best = mid
             lo = mid + 1
         else:
             hi = mid - 1
     try:
-        return ImageFont.truetype(font_path, size=best) if font_path else ImageFont.load_default()
+        return _load_font(font_path, best)
     except (OSError, IOError):
         return ImageFont.load_default()
 
@@ -20,6 +20,15 @@ from typing import Optional, Dict, Any, List, Tuple
 import httpx
 
 from app.core.config import get_settings
+from app.services.conversation_store import (
+    CONVERSATION_IMAGE_PREFIX,
+    ConversationStore,
+    Turn,
+    conversation_image_dir,
+    get_conversation_store,
+    image_refs,
+    make_turn,
+)
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -251,9 +260,13 @@ class InteriorDesignService:
         )
         self.static_dir = Path("/app/static/generated/interior")
         self.static_dir.mkdir(parents=True, exist_ok=True)
+        # Local fallback for private edit sources; outside /app/static, so
+        # never served.
+        self.conversation_dir = Path("/app/private/interior_conversations")
 
-        # Conversation history for iterative editing
-        self._conversations: Dict[str, List[Dict]] = {}
+        # Conversation history for iterative editing (text + image URLs,
+        # bounded and shared across instances; see conversation_store.py)
+        self.conversations: ConversationStore = get_conversation_store()
 
     async def _get_vertex_token(self) -> Optional[str]:
         """Get OAuth2 access token via ADC (Application Default Credentials)."""
@@ -410,6 +423,86 @@ class InteriorDesignService:
                 return image_data, mime_type
             raise Exception(f"Failed to fetch image: {response.status_code}")
 
+    def _save_conversation_image(self, conversation_id: str, image_data: bytes, content_type: str) -> str:
+        """Store a user-supplied edit source privately (never a public object)
+        and return the reference kept in conversation history: ``gs://`` in
+        GCS, ``private:`` on local disk."""
+        ext = ".png" if content_type == "image/png" else ".jpg"
+        relative = f"{conversation_image_dir(conversation_id)}/{uuid.uuid4().hex[:12]}{ext}"
+
+        from app.services.gcs_storage_service import get_gcs_storage
+        gcs = get_gcs_storage()
+        if gcs.enabled:
+            blob_name = f"{CONVERSATION_IMAGE_PREFIX}{relative}"
+            gcs.bucket.blob(blob_name).upload_from_string(image_data, content_type=content_type)
+            return f"gs://{gcs.bucket_name}/{blob_name}"
+
+        path = self.conversation_dir / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(image_data)
+        return f"private:{relative}"
+
+    async def _delete_conversation_images(self, refs) -> None:
+        """Best-effort delete of private edit sources (other refs are ignored)."""
+        blob_names, paths = [], []
+        for ref in refs:
+            if ref.startswith("gs://"):
+                blob_names.append(ref.split("/", 3)[3])
+            elif ref.startswith("private:"):
+                paths.append(self.conversation_dir / ref[len("private:"):])
+        try:
+            if blob_names:
+                from app.services.gcs_storage_service import get_gcs_storage
+                await get_gcs_storage().delete_blobs(blob_names)
+            for path in paths:
+                await asyncio.to_thread(path.unlink, True)
+        except Exception as e:
+            logger.warning(f"[InteriorDesign] Failed to delete conversation images: {e}")
+
+    async def _load_image_ref(self, image_url: str) -> str:
+        """Base64 bytes for an image reference stored in conversation history."""
+        if image_url.startswith("gs://"):
+            from app.services.gcs_storage_service import get_gcs_storage
+            gcs = get_gcs_storage()
+            blob = gcs.bucket.blob(image_url.split("/", 3)[3])
+            data = await asyncio.to_thread(blob.download_as_bytes)
+            return base64.b64encode(data).decode()
+        if image_url.startswith("private:"):
+            path = self.conversation_dir / image_url[len("private:"):]
+            data = await asyncio.to_thread(path.read_bytes)
+            return base64.b64encode(data).decode()
+        local_prefix = "/static/generated/interior/"
+        if image_url.startswith(local_prefix):
+            path = self.static_dir / image_url[len(local_prefix):]
+            data = await asyncio.to_thread(path.read_bytes)
+            return base64.b64encode(data).decode()
+        image_data, _ = await self._fetch_image_as_base64(image_url)
+        return image_data
+
+    async def _conversation_contents(
+        self, turns: List[Turn], inline: Dict[str, str]
+    ) -> List[Dict[str, Any]]:
+        """Gemini ``contents`` for stored turns. Image references are
+        rehydrated once each; ``inline`` maps references whose bytes the
+        caller already holds."""
+        refs = {t["image_url"] for t in turns if t.get("image_url")} - set(inline)
+        loaded = await asyncio.gather(*(self._load_image_ref(url) for url in refs))
+        images = {**dict(zip(refs, loaded)), **inline}
+
+        contents = []
+        for turn in turns:
+            parts: List[Dict[str, Any]] = []
+            if turn.get("image_url"):
+                parts.append({
+                    "inline_data": {
+                        "mime_type": turn.get("mime_type", "image/png"),
+                        "data": images[turn["image_url"]],
+                    }
+                })
+            parts.append({"text": turn.get("text", "")})
+            contents.append({"role": turn["role"], "parts": parts})
+        return contents
+
     def _save_generated_image(self, image_data: bytes, prefix: str = "design", content_type: str = "image/png") -> str:
         """Save generated image to durable public storage when available."""
         filename = f"{prefix}_{uuid.uuid4().hex[:8]}.png"
@@ -1106,42 +1199,50 @@ Generate a photorealistic result."""
         """
         pass  # credentials resolved dynamically via _get_headers_and_url()
 
-        # Initialize or get conversation history
-        if conversation_id not in self._conversations:
-            self._conversations[conversation_id] = []
-
-        history = self._conversations[conversation_id]
+        history = await self.conversations.load(conversation_id)
 
-        # Build user message parts
-        user_parts = []
-
-        # Add image if provided (for first turn or new image)
+        # Add image if provided (for first turn or new image). History keeps
+        # a reference only: the caller's URL, or a private upload of inline bytes.
+        image_ref = None
+        mime_type = None
         if image_base64 or image_url:
             if image_url and not image_base64:
                 try:
                     image_base64, mime_type = await self._fetch_image_as_base64(image_url)
                 except Exception as e:
                     return {"success": False, "error": f"Failed to fetch image: {e}"}
+                image_ref = image_url
 
             if image_base64:
                 mime_type = "image/png" if image_base64.startswith("iVBOR") else "image/jpeg"
-                user_parts.append({
-                    "inline_data": {
-                        "mime_type": mime_type,
-                        "data": image_base64
-                    }
-                })
-
-        user_parts.append({"text": prompt})
+                if image_ref is None:
+                    try:
+                        image_ref = await asyncio.to_thread(
+                            self._save_conversation_image,
+                            conversation_id,
+                            base64.b64decode(image_base64),
+                            mime_type,
+                        )
+                    except Exception as e:
+                        return {"success": False, "error": f"Failed to store image: {e}"}
+
+        history.append(make_turn("user", prompt, image_ref, mime_type))
 
-        # Add to history
-        history.append({
-            "role": "user",
-            "parts": user_parts
-        })
+        try:
+            contents = await self._conversation_contents(
+                history, {image_ref: image_base64} if image_ref else {}
+            )
+        except Exception as e:
+            logger.warning(f"[InteriorDesign] Conversation {conversation_id[:8]} image unavailable: {e}")
+            if image_ref and image_ref != image_url:
+                await self._delete_conversation_images([image_ref])
+            return {
+                "success": False,
+                "error": "An earlier image in this conversation is no longer available. Start a new edit.",
+            }
 
         request_body = {
-            "contents": history,
+            "contents": contents,
             "generationConfig": {
                 "responseModalities": ["TEXT", "IMAGE"],
                 "temperature": 0.7,
@@ -1155,18 +1256,19 @@ Generate a photorealistic result."""
         result = await self._generate_image(request_body, f"edit_{conversation_id[:8]}")
 
         if result.get("success"):
-            # Add model response to history (text only, not the image)
-            history.append({
-                "role": "model",
-                "parts": [{"text": result.get("description", "Design updated.")}]
-            })
-
-            # Limit history to last 10 turns
-            if len(history) > 20:
-                self._conversations[conversation_id] = history[-20:]
+            # Add model response to history (text only, not the image).
+            # The store caps turns/bytes and refreshes the TTL.
+            history.append(make_turn("model", result.get("description", "Design updated.")))
+            stored = await self.conversations.save(conversation_id, history)
+            # Images of turns the store trimmed away are unreachable now.
+            await self._delete_conversation_images(image_refs(history) - image_refs(stored))
+            history = stored
 
             result["conversation_id"] = conversation_id
             result["turn_count"] = len(history) // 2
+        elif image_ref and image_ref != image_url:
+            # Nothing was saved, so nothing references the upload.
+            await self._delete_conversation_images([image_ref])
 
         return result
 
@@ -1261,12 +1363,12 @@ Generate a photorealistic result."""
 
         return result
 
-    def clear_conversation(self, conversation_id: str) -> bool:
-        """Clear conversation history for iterative editing."""
-        if conversation_id in self._conversations:
-            del self._conversations[conversation_id]
-            return True
-        return False
+    async def clear_conversation(self, conversation_id: str) -> bool:
+        """Clear conversation history (and its private source images)."""
+        history = await self.conversations.load(conversation_id)
+        cleared = await self.conversations.delete(conversation_id)
+        await self._delete_conversation_images(image_refs(history))
+        return cleared
 
 
 # Singleton instance
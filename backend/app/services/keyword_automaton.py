@@ -0,0 +1,129 @@
+"""
+Multi-pattern keyword matcher (Aho–Corasick) for prompt moderation.
+
+Compiles a block list once and scans a prompt in a single linear pass,
+returning every matched term with its category — independent of the number
+of terms, and without relying on whitespace, so unspaced CJK / kana terms
+("兒童色情", "爆弾の作り方") match inside running text.
+
+``whole_words=True`` keeps the old word-boundary behaviour for spaced
+scripts: a Latin match must not be glued to another Latin letter/digit
+("kill" does not fire inside "skill"). Terms whose edge character is
+CJK, kana or Hangul never need a boundary.
+"""
+import re
+from collections import deque
+from typing import Any, Dict, Iterable, List, Tuple
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+# Scripts written without spaces between words (plus Hangul, where particles
+# attach directly to the noun). Word boundaries are not meaningful there.
+_UNSPACED_RANGES = (
+    (0x1100, 0x11FF),  # Hangul Jamo
+    (0x2E80, 0x9FFF),  # CJK radicals, kana, CJK unified ideographs
+    (0xAC00, 0xD7AF),  # Hangul syllables
+    (0xF900, 0xFAFF),  # CJK compatibility ideographs
+    (0xFF00, 0xFFEF),  # Half-/full-width forms
+)
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase and collapse whitespace — applied to terms and prompts alike."""
+    return _WHITESPACE_RE.sub(" ", (text or "").lower().strip())
+
+
+def _is_unspaced(ch: str) -> bool:
+    code = ord(ch)
+    return any(lo <= code <= hi for lo, hi in _UNSPACED_RANGES)
+
+
+def _is_spaced_word_char(ch: str) -> bool:
+    return ch.isalnum() and not _is_unspaced(ch)
+
+
+class KeywordAutomaton:
+    """Immutable compiled matcher over ``(term, category)`` pairs.
+
+    The same term may be registered under several categories; each pair is
+    reported. Rebuild (construct a new instance) when the block list changes.
+    """
+
+    def __init__(self, terms: Iterable[Tuple[str, Any]], whole_words: bool = False):
+        self.whole_words = whole_words
+        # Trie as parallel arrays: node → {char: child}, failure link, and
+        # the pattern ids that end at this node (including via failure links).
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+        self._patterns: List[Tuple[str, Any]] = []
+
+        seen = set()
+        for term, category in terms:
+            term = normalize_text(term)
+            if not term or (term, category) in seen:
+                continue
+            seen.add((term, category))
+            self._insert(term, len(self._patterns))
+            self._patterns.append((term, category))
+        self._link()
+
+    def __len__(self) -> int:
+        return len(self._patterns)
+
+    def _insert(self, term: str, pattern_id: int) -> None:
+        node = 0
+        for ch in term:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append(pattern_id)
+
+    def _link(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child].extend(self._out[self._fail[child]])
+
+    def _on_boundary(self, text: str, start: int, end: int, term: str) -> bool:
+        if start > 0 and _is_spaced_word_char(term[0]) and _is_spaced_word_char(text[start - 1]):
+            return False
+        if end < len(text) and _is_spaced_word_char(term[-1]) and _is_spaced_word_char(text[end]):
+            return False
+        return True
+
+    def scan(self, text: str, normalized: bool = False) -> List[Tuple[str, Any]]:
+        """Unique ``(term, category)`` matches in order of first occurrence."""
+        if not self._patterns:
+            return []
+        if not normalized:
+            text = normalize_text(text)
+        goto, fail, out, patterns = self._goto, self._fail, self._out, self._patterns
+        found: List[Tuple[str, Any]] = []
+        reported = set()
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for pattern_id in out[node]:
+                if pattern_id in reported:
+                    continue
+                term = patterns[pattern_id][0]
+                if self.whole_words and not self._on_boundary(text, i + 1 - len(term), i + 1, term):
+                    continue
+                reported.add(pattern_id)
+                found.append(patterns[pattern_id])
+        return found
@@ -26,13 +26,35 @@ ProviderRouter.route():
   - Redis being down must never break generation: every Redis error fails
     open (falls back to a per-instance counter, and on repeated failure to
     no gating at all for 60s).
+
+Admission queue (2026-07): waiters used to poll ``_inflight_count()`` every
+2 s — a ZREMRANGEBYSCORE + ZCARD pipeline per waiter, hammering Redis
+exactly when the platform was busiest, with random admission order. Now:
+
+  - A waiter enqueues its member id on a per-priority Redis list (normal
+    drains before low) and then BLOCKS on its own ticket list — zero
+    round-trips while it waits.
+  - Releasing a slot runs a Lua script that pops the head live waiter,
+    RESERVES the freed slot for it (ZADD into the in-flight set, so a
+    newcomer can't steal it) and pushes its ticket. FIFO within a tier.
+  - A newcomer is admitted directly only when there is headroom AND nobody
+    is queued; otherwise it joins the back of its tier's line.
+  - A waiter whose budget runs out removes itself from the line and is
+    admitted anyway (never denied), same as before.
+  - ``queue_stats()`` reports depth per tier, expected wait (from the
+    observed slot hold time) and observed queue latency; surfaced at
+    /admin/generation-queue.
+When Redis is down the same FIFO/handoff semantics run in-process on asyncio
+futures.
 """
 import asyncio
 import logging
+import math
 import time
 import uuid
+from collections import deque
 from contextlib import asynccontextmanager
-from typing import Optional
+from typing import Deque, Dict, Optional
 
 import redis.asyncio as aioredis
 
@@ -41,15 +63,94 @@ from app.core.config import settings
 logger = logging.getLogger(__name__)
 
 _INFLIGHT_KEY = "vidgo:generation:inflight"
-_POLL_INTERVAL_S = 2.0
+_QUEUE_KEYS = {
+    "normal": "vidgo:generation:waitq:normal",
+    "low": "vidgo:generation:waitq:low",
+}
+# Per-waiter keys. The Lua scripts build these names from the member id, so
+# the governor assumes a single (non-cluster) Redis — true for Memorystore.
+_WAITER_PREFIX = "vidgo:generation:waiter:"
+_TICKET_PREFIX = "vidgo:generation:ticket:"
 _REDIS_RETRY_COOLDOWN_S = 60.0
+# Until a slot release has been observed, assume a generation holds its
+# slot this long when estimating queue wait.
+_DEFAULT_HOLD_S = 60.0
+_EWMA_ALPHA = 0.2
 
 _redis: Optional[aioredis.Redis] = None
+# Separate connection pool for BLPOP: the main pool's 2 s socket timeout
+# would abort any blocking pop longer than that.
+_blocking_redis: Optional[aioredis.Redis] = None
 _redis_down_until: float = 0.0
+_scripts: Dict[str, object] = {}
 
 # Per-instance fallback view of in-flight work, used when Redis is
 # unavailable. Also maintained when Redis is up so the fallback is warm.
 _local_inflight = 0
+# In-process admission queue used while Redis is down.
+_local_waiters: Dict[str, Deque[asyncio.Future]] = {"normal": deque(), "low": deque()}
+
+# Local observations for queue_stats().
+_avg_hold_s: Optional[float] = None
+_avg_wait_s: Dict[str, Optional[float]] = {"normal": None, "low": None}
+_admitted_after_wait: Dict[str, int] = {"normal": 0, "low": 0}
+_admitted_on_timeout: Dict[str, int] = {"normal": 0, "low": 0}
+
+
+# Hands freed slots to the oldest live waiters (normal tier first), reserving
+# each slot in the in-flight set before pushing the waiter's ticket.
+_DISPATCH_LUA = """
+local function dispatch(limit, now, ticket_ttl)
+  local granted = 0
+  while redis.call('ZCARD', KEYS[1]) < limit do
+    local member = redis.call('LPOP', KEYS[2])
+    if not member then member = redis.call('LPOP', KEYS[3]) end
+    if not member then break end
+    if redis.call('EXISTS', '""" + _WAITER_PREFIX + """' .. member) == 1 then
+      redis.call('ZADD', KEYS[1], now, member)
+      local ticket = '""" + _TICKET_PREFIX + """' .. member
+      redis.call('RPUSH', ticket, '1')
+      redis.call('EXPIRE', ticket, ticket_ttl)
+      granted = granted + 1
+    end
+  end
+  return granted
+end
+"""
+
+# KEYS: inflight, queue:normal, queue:low
+# ARGV: now, stale_before, soft_limit, inflight_ttl, ticket_ttl, member,
+#       priority, waiter_ttl
+# Returns {admitted (0/1), inflight_count, position_in_line}.
+_ADMIT_LUA = _DISPATCH_LUA + """
+local now = tonumber(ARGV[1])
+local limit = tonumber(ARGV[3])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], 0, tonumber(ARGV[2]))
+dispatch(limit, now, tonumber(ARGV[5]))
+local count = redis.call('ZCARD', KEYS[1])
+local queued = redis.call('LLEN', KEYS[2]) + redis.call('LLEN', KEYS[3])
+if count < limit and queued == 0 then
+  redis.call('ZADD', KEYS[1], now, ARGV[6])
+  redis.call('EXPIRE', KEYS[1], tonumber(ARGV[4]))
+  return {1, count, 0}
+end
+redis.call('SET', '""" + _WAITER_PREFIX + """' .. ARGV[6], '1', 'EX', tonumber(ARGV[8]))
+local position
+if ARGV[7] == 'normal' then
+  position = redis.call('RPUSH', KEYS[2], ARGV[6])
+else
+  position = redis.call('LLEN', KEYS[2]) + redis.call('RPUSH', KEYS[3], ARGV[6])
+end
+return {0, count, position}
+"""
+
+# KEYS: inflight, queue:normal, queue:low
+# ARGV: now, stale_before, soft_limit, member, ticket_ttl
+_RELEASE_LUA = _DISPATCH_LUA + """
+redis.call('ZREM', KEYS[1], ARGV[4])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], 0, tonumber(ARGV[2]))
+return dispatch(tonumber(ARGV[3]), tonumber(ARGV[1]), tonumber(ARGV[5]))
+"""
 
 
 def _wait_budget_seconds(priority: str) -> float:
@@ -60,6 +161,10 @@ def _wait_budget_seconds(priority: str) -> float:
     return float(settings.GEN_LOAD_LOW_MAX_WAIT_SECONDS)
 
 
+def _queue_tier(priority: str) -> str:
+    return "normal" if priority == "normal" else "low"
+
+
 async def _get_redis() -> Optional[aioredis.Redis]:
     global _redis, _redis_down_until
     if time.monotonic() < _redis_down_until:
@@ -80,6 +185,27 @@ async def _get_redis() -> Optional[aioredis.Redis]:
     return _redis
 
 
+def _get_blocking_redis() -> aioredis.Redis:
+    global _blocking_redis
+    if _blocking_redis is None:
+        longest = max(settings.GEN_LOAD_NORMAL_MAX_WAIT_SECONDS, settings.GEN_LOAD_LOW_MAX_WAIT_SECONDS)
+        _blocking_redis = aioredis.from_url(
+            settings.REDIS_URL,
+            encoding="utf-8",
+            decode_responses=True,
+            socket_connect_timeout=2,
+            socket_timeout=longest + 5,
+        )
+    return _blocking_redis
+
+
+def _script(r: aioredis.Redis, name: str, source: str):
+    key = f"{id(r)}:{name}"
+    if key not in _scripts:
+        _scripts[key] = r.register_script(source)
+    return _scripts[key]
+
+
 def _mark_redis_down(exc: Exception) -> None:
     global _redis_down_until
     _redis_down_until = time.monotonic() + _REDIS_RETRY_COOLDOWN_S
@@ -89,25 +215,19 @@ def _mark_redis_down(exc: Exception) -> None:
     )
 
 
-async def _inflight_count() -> int:
-    """Global in-flight generations; purges stale members first."""
-    r = await _get_redis()
-    if r is not None:
-        try:
-            stale_before = time.time() - settings.GEN_INFLIGHT_STALE_SECONDS
-            pipe = r.pipeline()
-            pipe.zremrangebyscore(_INFLIGHT_KEY, 0, stale_before)
-            pipe.zcard(_INFLIGHT_KEY)
-            _, count = await pipe.execute()
-            return int(count)
-        except Exception as exc:
-            _mark_redis_down(exc)
-    return _local_inflight
+def _ewma(prev: Optional[float], sample: float) -> float:
+    return sample if prev is None else prev + _EWMA_ALPHA * (sample - prev)
+
+
+def _expected_wait_seconds(position: int) -> float:
+    """Time until ``position``-th in line is admitted, assuming slots free
+    up at soft_limit / avg_hold per second."""
+    hold = _avg_hold_s or _DEFAULT_HOLD_S
+    return position * hold / max(1, settings.GEN_LOAD_SOFT_LIMIT)
 
 
 async def _register(member: str) -> None:
-    global _local_inflight
-    _local_inflight += 1
+    """Add ``member`` to the global in-flight set (idempotent)."""
     r = await _get_redis()
     if r is not None:
         try:
@@ -121,51 +241,237 @@ async def _register(member: str) -> None:
             _mark_redis_down(exc)
 
 
-async def _release(member: str) -> None:
-    global _local_inflight
+async def _release_and_dispatch(r: aioredis.Redis, member: str) -> None:
+    """Free ``member``'s slot and hand free slots to the head waiters."""
+    now = time.time()
+    await _script(r, "release", _RELEASE_LUA)(
+        keys=[_INFLIGHT_KEY, _QUEUE_KEYS["normal"], _QUEUE_KEYS["low"]],
+        args=[
+            now,
+            now - settings.GEN_INFLIGHT_STALE_SECONDS,
+            settings.GEN_LOAD_SOFT_LIMIT,
+            member,
+            _ticket_ttl(),
+        ],
+    )
+
+
+async def _release(member: str, held_for: float) -> None:
+    global _local_inflight, _avg_hold_s
     _local_inflight = max(0, _local_inflight - 1)
+    _avg_hold_s = _ewma(_avg_hold_s, held_for)
+    _local_dispatch()
     r = await _get_redis()
     if r is not None:
         try:
-            await r.zrem(_INFLIGHT_KEY, member)
+            await _release_and_dispatch(r, member)
         except Exception as exc:
             _mark_redis_down(exc)
 
 
-async def _wait_for_admission(priority: str, label: str) -> None:
+def _ticket_ttl() -> int:
+    return int(max(settings.GEN_LOAD_NORMAL_MAX_WAIT_SECONDS, settings.GEN_LOAD_LOW_MAX_WAIT_SECONDS)) + 10
+
+
+def _local_dispatch() -> None:
+    """Hand free local slots to the oldest in-process waiters (Redis down)."""
+    global _local_inflight
+    for tier in ("normal", "low"):
+        queue = _local_waiters[tier]
+        while queue and _local_inflight < settings.GEN_LOAD_SOFT_LIMIT:
+            fut = queue.popleft()
+            if fut.done():
+                continue
+            _local_inflight += 1
+            fut.set_result(True)
+
+
+def _record_wait(tier: str, waited: float, timed_out: bool) -> None:
+    _avg_wait_s[tier] = _ewma(_avg_wait_s[tier], waited)
+    if timed_out:
+        _admitted_on_timeout[tier] += 1
+    else:
+        _admitted_after_wait[tier] += 1
+
+
+async def _admit_local(priority: str, budget: float, label: str) -> None:
+    global _local_inflight
+    tier = _queue_tier(priority)
+    no_line = not any(not f.done() for q in _local_waiters.values() for f in q)
+    if budget <= 0 or (_local_inflight < settings.GEN_LOAD_SOFT_LIMIT and no_line):
+        _local_inflight += 1
+        return
+
+    fut = asyncio.get_running_loop().create_future()
+    _local_waiters[tier].append(fut)
+    started = time.monotonic()
+    try:
+        await asyncio.wait_for(asyncio.shield(fut), timeout=budget)
+        _record_wait(tier, time.monotonic() - started, timed_out=False)
+    except asyncio.TimeoutError:
+        if not fut.done():
+            fut.cancel()
+            _local_inflight += 1
+        _record_wait(tier, time.monotonic() - started, timed_out=True)
+        logger.info(
+            "load_governor: %s-priority caller admitted after full %.0fs wait "
+            "(local queue) task=%s",
+            priority, budget, label,
+        )
+    except asyncio.CancelledError:
+        if fut.done() and not fut.cancelled():
+            # Slot was handed to us just as we were cancelled — give it back.
+            _local_inflight = max(0, _local_inflight - 1)
+            _local_dispatch()
+        else:
+            fut.cancel()
+        raise
+
+
+async def _abandon(r: aioredis.Redis, member: str, tier: str) -> None:
+    try:
+        pipe = r.pipeline()
+        pipe.lrem(_QUEUE_KEYS[tier], 0, member)
+        pipe.delete(_WAITER_PREFIX + member)
+        pipe.delete(_TICKET_PREFIX + member)
+        await pipe.execute()
+        await _release_and_dispatch(r, member)
+    except Exception as exc:
+        _mark_redis_down(exc)
+
+
+async def _admit(priority: str, member: str, label: str) -> None:
+    """Admit ``member`` now or after queueing; never raises on Redis errors."""
+    global _local_inflight
     budget = _wait_budget_seconds(priority)
-    soft_limit = settings.GEN_LOAD_SOFT_LIMIT
-
-    count = await _inflight_count()
-    if count < soft_limit or budget <= 0:
-        if count >= soft_limit and priority == "high":
-            logger.info(
-                "load_governor: heavy load (%d in-flight ≥ %d) — priority "
-                "caller admitted immediately task=%s",
-                count, soft_limit, label,
-            )
+    r = await _get_redis()
+    if r is None:
+        await _admit_local(priority, budget, label)
+        return
+
+    tier = _queue_tier(priority)
+    now = time.time()
+    try:
+        if budget <= 0:
+            # High priority: admitted immediately, no queue.
+            await _register(member)
+            _local_inflight += 1
+            return
+        admitted, count, position = await _script(r, "admit", _ADMIT_LUA)(
+            keys=[_INFLIGHT_KEY, _QUEUE_KEYS["normal"], _QUEUE_KEYS["low"]],
+            args=[
+                now,
+                now - settings.GEN_INFLIGHT_STALE_SECONDS,
+                settings.GEN_LOAD_SOFT_LIMIT,
+                settings.GEN_INFLIGHT_STALE_SECONDS * 2,
+                _ticket_ttl(),
+                member,
+                tier,
+                int(math.ceil(budget)) + 5,
+            ],
+        )
+    except Exception as exc:
+        _mark_redis_down(exc)
+        await _admit_local(priority, budget, label)
+        return
+
+    _local_inflight += 1
+    if int(admitted):
         return
 
-    loop = asyncio.get_running_loop()
-    deadline = loop.time() + budget
     logger.info(
         "load_governor: heavy load (%d in-flight ≥ %d) — %s-priority caller "
-        "waiting up to %.0fs task=%s",
-        count, soft_limit, priority, budget, label,
+        "queued at position %d (expected wait %.0fs, budget %.0fs) task=%s",
+        int(count), settings.GEN_LOAD_SOFT_LIMIT, priority, int(position),
+        _expected_wait_seconds(int(position)), budget, label,
     )
-    while loop.time() < deadline:
-        await asyncio.sleep(min(_POLL_INTERVAL_S, max(0.1, deadline - loop.time())))
-        count = await _inflight_count()
-        if count < soft_limit:
-            return
-    # Budget exhausted — admit anyway (priority means delayed, never denied).
+    started = time.monotonic()
+    ticket_key = _TICKET_PREFIX + member
+    got_ticket = None
+    try:
+        # BLPOP's own timeout is whole seconds on older servers; the outer
+        # wait_for enforces the real (fractional) budget.
+        got_ticket = await asyncio.wait_for(
+            _get_blocking_redis().blpop([ticket_key], timeout=int(math.ceil(budget))),
+            timeout=budget,
+        )
+    except asyncio.TimeoutError:
+        pass
+    except asyncio.CancelledError:
+        # Client went away while queued. Leave the line in the background
+        # (and hand on a slot that may already have been reserved for us).
+        _local_inflight = max(0, _local_inflight - 1)
+        asyncio.ensure_future(_abandon(r, member, tier))
+        raise
+    except Exception as exc:
+        _mark_redis_down(exc)
+
+    waited = time.monotonic() - started
+    if got_ticket:
+        _record_wait(tier, waited, timed_out=False)
+        try:
+            await r.delete(_WAITER_PREFIX + member)
+        except Exception:
+            pass
+        return
+
+    # Budget exhausted — leave the line and admit anyway (priority means
+    # delayed, never denied). If a releaser popped us in the meantime our
+    # slot is already reserved; _register is idempotent either way.
+    _record_wait(tier, waited, timed_out=True)
+    try:
+        pipe = r.pipeline()
+        pipe.lrem(_QUEUE_KEYS[tier], 0, member)
+        pipe.delete(_WAITER_PREFIX + member)
+        pipe.delete(ticket_key)
+        await pipe.execute()
+    except Exception as exc:
+        _mark_redis_down(exc)
+    await _register(member)
     logger.info(
-        "load_governor: %s-priority caller admitted after full %.0fs wait "
-        "(still %d in-flight) task=%s",
-        priority, budget, count, label,
+        "load_governor: %s-priority caller admitted after full %.0fs wait task=%s",
+        priority, budget, label,
     )
 
 
+async def queue_stats() -> Dict[str, object]:
+    """Admission queue depth + latency for ops (/admin/generation-queue)."""
+    depth = {"normal": 0, "low": 0}
+    inflight = _local_inflight
+    source = "local"
+    r = await _get_redis()
+    if r is not None:
+        try:
+            pipe = r.pipeline()
+            pipe.zcard(_INFLIGHT_KEY)
+            pipe.llen(_QUEUE_KEYS["normal"])
+            pipe.llen(_QUEUE_KEYS["low"])
+            inflight, depth["normal"], depth["low"] = await pipe.execute()
+            source = "redis"
+        except Exception as exc:
+            _mark_redis_down(exc)
+    if source == "local":
+        for tier in depth:
+            depth[tier] = sum(1 for f in _local_waiters[tier] if not f.done())
+    return {
+        "source": source,
+        "inflight": int(inflight),
+        "soft_limit": settings.GEN_LOAD_SOFT_LIMIT,
+        "queued": depth,
+        # Expected wait for a caller joining the back of each line now.
+        "expected_wait_seconds": {
+            "normal": round(_expected_wait_seconds(depth["normal"] + 1), 1),
+            "low": round(_expected_wait_seconds(depth["normal"] + depth["low"] + 1), 1),
+        },
+        "observed_wait_seconds": {
+            tier: (round(v, 2) if v is not None else None) for tier, v in _avg_wait_s.items()
+        },
+        "admitted_after_wait": dict(_admitted_after_wait),
+        "admitted_on_timeout": dict(_admitted_on_timeout),
+        "avg_slot_hold_seconds": round(_avg_hold_s, 1) if _avg_hold_s is not None else None,
+    }
+
+
 @asynccontextmanager
 async def generation_slot(priority: str, label: str = ""):
     """Hold one global in-flight slot for the duration of a generation.
@@ -175,17 +481,19 @@ async def generation_slot(priority: str, label: str = ""):
     """
     member = uuid.uuid4().hex
     try:
-        await _wait_for_admission((priority or "normal").lower(), label)
-        await _register(member)
+        await _admit((priority or "normal").lower(), member, label)
+    except asyncio.CancelledError:
+        raise
     except Exception as exc:
         # The governor must never take generation down with it.
         logger.warning("load_governor: admission error (%s) — proceeding ungated", exc)
         member = None
+    admitted_at = time.monotonic()
     try:
         yield
     finally:
         if member is not None:
             try:
-                await _release(member)
+                await _release(member, time.monotonic() - admitted_at)
             except Exception:
                 pass
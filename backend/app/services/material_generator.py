@@ -20,19 +20,20 @@ import base64
 import time
 import uuid as uid_module
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import Optional, Dict, Any
 from datetime import datetime
-from sqlalchemy import select, delete, func, or_
+from sqlalchemy import select, delete, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import AsyncSessionLocal
 from app.models.demo import ToolShowcase
 from app.models.material import Material, ToolType, MaterialSource, MaterialStatus
+from app.services.material_readiness import get_readiness_snapshot, invalidate_readiness_snapshot
 from app.services.rescue_service import get_rescue_service
 from app.services.watermark import WatermarkService, get_watermark_service
 from app.providers.provider_router import get_provider_router, TaskType
 from app.core.config import get_settings
-from app.config.topic_registry import get_topic_ids_for_tool, get_landing_topic_ids
+from app.config.topic_registry import get_landing_topic_ids
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -498,59 +499,6 @@ class MaterialGenerator:
         if not self.watermark_service:
             self.watermark_service = get_watermark_service()
 
-    async def _count_by_topic(
-        self,
-        session: AsyncSession,
-        tool_type: ToolType,
-        topics: List[str]
-    ) -> Dict[str, int]:
-        result = await session.execute(
-            select(Material.topic, func.count(Material.id))
-            .where(Material.tool_type == tool_type)
-            .where(Material.is_active == True)
-            .where(Material.topic.in_(topics))
-            .group_by(Material.topic)
-        )
-        counts = {row[0]: row[1] for row in result.all()}
-        for topic in topics:
-            counts.setdefault(topic, 0)
-        return counts
-
-    async def _count_missing_prompts(
-        self,
-        session: AsyncSession,
-        tool_type: ToolType,
-        topics: Optional[List[str]] = None
-    ) -> int:
-        query = (
-            select(func.count(Material.id))
-            .where(Material.tool_type == tool_type)
-            .where(Material.is_active == True)
-            .where(or_(Material.prompt == None, Material.prompt == ""))
-        )
-        if topics:
-            query = query.where(Material.topic.in_(topics))
-        result = await session.execute(query)
-        return result.scalar() or 0
-
-    async def _count_missing_prompt_zh(
-        self,
-        session: AsyncSession,
-        tool_type: ToolType,
-        topics: Optional[List[str]] = None
-    ) -> int:
-        query = (
-            select(func.count(Material.id))
-            .where(Material.tool_type == tool_type)
-            .where(Material.is_active == True)
-            .where(Material.language.like("zh%"))
-            .where(or_(Material.prompt_zh == None, Material.prompt_zh == ""))
-        )
-        if topics:
-            query = query.where(Material.topic.in_(topics))
-        result = await session.execute(query)
-        return result.scalar() or 0
-
     async def check_materials_exist(
         self,
         session: AsyncSession,
@@ -634,76 +582,13 @@ class MaterialGenerator:
             logger.info(f"Category '{category}' has {count} materials (min: {min_count})")
             return count >= min_count
 
-    async def check_all_materials(self, session: AsyncSession) -> Dict[str, Dict[str, Any]]:
-        """Check material status with per-topic coverage and prompt validation."""
-        status: Dict[str, Dict[str, Any]] = {}
-
-        landing_topics = get_landing_topic_ids()
-        landing_video_counts = await self._count_by_topic(session, ToolType.SHORT_VIDEO, landing_topics)
-        landing_avatar_counts = await self._count_by_topic(session, ToolType.AI_AVATAR, landing_topics)
-
-        LANDING_VIDEO_PER_TOPIC = 6
-        LANDING_AVATAR_PER_TOPIC = 12  # 6 examples × 2 languages
-
-        landing_missing_videos = [t for t, c in landing_video_counts.items() if c < LANDING_VIDEO_PER_TOPIC]
-        landing_missing_avatars = [t for t, c in landing_avatar_counts.items() if c < LANDING_AVATAR_PER_TOPIC]
+    async def check_all_materials(self, session: AsyncSession, use_cache: bool = True) -> Dict[str, Dict[str, Any]]:
+        """Check material status with per-topic coverage and prompt validation.
 
-        landing_prompt_missing = (
-            await self._count_missing_prompts(session, ToolType.SHORT_VIDEO, landing_topics)
-            + await self._count_missing_prompts(session, ToolType.AI_AVATAR, landing_topics)
-        )
-        landing_prompt_zh_missing = await self._count_missing_prompt_zh(session, ToolType.AI_AVATAR, landing_topics)
-
-        status["landing"] = {
-            "ready": len(landing_missing_videos) == 0 and len(landing_missing_avatars) == 0 and landing_prompt_missing == 0 and landing_prompt_zh_missing == 0,
-            "missing_topics": {
-                "videos": landing_missing_videos,
-                "avatars": landing_missing_avatars
-            },
-            "counts": {
-                "videos": landing_video_counts,
-                "avatars": landing_avatar_counts
-            },
-            "prompt_issues": {
-                "missing_prompt": landing_prompt_missing,
-                "missing_prompt_zh": landing_prompt_zh_missing
-            }
-        }
-
-        # Per-topic coverage for all 8 core tools
-        MIN_PER_TOPIC_DEFAULT = 1
-        tool_checks = {
-            "background_removal": (ToolType.BACKGROUND_REMOVAL, get_topic_ids_for_tool("background_removal")),
-            "product_scene": (ToolType.PRODUCT_SCENE, get_topic_ids_for_tool("product_scene")),
-            "try_on": (ToolType.TRY_ON, get_topic_ids_for_tool("try_on")),
-            "room_redesign": (ToolType.ROOM_REDESIGN, get_topic_ids_for_tool("room_redesign")),
-            "short_video": (ToolType.SHORT_VIDEO, get_topic_ids_for_tool("short_video")),
-            "ai_avatar": (ToolType.AI_AVATAR, get_topic_ids_for_tool("ai_avatar")),
-            "pattern_generate": (ToolType.PATTERN_GENERATE, get_topic_ids_for_tool("pattern_generate")),
-            "effect": (ToolType.EFFECT, get_topic_ids_for_tool("effect")),
-        }
-
-        for category, (tool_type, topics) in tool_checks.items():
-            if not topics:
-                continue
-
-            counts = await self._count_by_topic(session, tool_type, topics)
-            missing_topics = [t for t, c in counts.items() if c < MIN_PER_TOPIC_DEFAULT]
-
-            prompt_missing = await self._count_missing_prompts(session, tool_type, topics)
-            prompt_zh_missing = await self._count_missing_prompt_zh(session, tool_type, topics)
-
-            status[category] = {
-                "ready": len(missing_topics) == 0 and prompt_missing == 0 and prompt_zh_missing == 0,
-                "missing_topics": missing_topics,
-                "counts": counts,
-                "prompt_issues": {
-                    "missing_prompt": prompt_missing,
-                    "missing_prompt_zh": prompt_zh_missing
-                }
-            }
-
-        return status
+        Reads the readiness snapshot (one grouped query, cached in Redis);
+        pass use_cache=False to force a fresh aggregate.
+        """
+        return await get_readiness_snapshot(session, use_cache=use_cache)
 
     async def generate_missing_materials(self, force: bool = False) -> Dict[str, Any]:
         """
@@ -761,6 +646,11 @@ class MaterialGenerator:
                     logger.error(f"Failed to generate '{category}': {e}")
                     results['failed'].append({'category': category, 'error': str(e)})
 
+        # Generators commit as they go, so even a failed category may have
+        # written (or deleted) rows.
+        if results['generated'] or results['failed']:
+            await invalidate_readiness_snapshot()
+
         return results
 
     async def _generate_landing_materials(self, session: AsyncSession):
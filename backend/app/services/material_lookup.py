@@ -145,6 +145,8 @@ class MaterialLookupService:
             Material.tool_type == tool_enum,
             Material.is_active == True,
             Material.status.in_([MaterialStatus.APPROVED, MaterialStatus.FEATURED]),
+            # Result blob known to be gone from GCS (see app.services.blob_index).
+            Material.blob_missing.isnot(True),
             or_(
                 _has_url(Material.result_watermarked_url),
                 _has_url(Material.result_video_url),
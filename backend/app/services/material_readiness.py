@@ -0,0 +1,167 @@
+"""
+Material readiness snapshot.
+
+``MaterialGenerator.check_all_materials`` used to run about 30 sequential
+queries: per-topic counts, missing ``prompt`` and missing ``prompt_zh`` for
+each of the 8 tools plus landing. On a cold Cloud SQL connection that could
+exceed the startup timeout.
+
+The snapshot is one grouped aggregate over active materials:
+
+    tool_type, topic, count(*), count(*) FILTER (missing prompt),
+    count(*) FILTER (zh row missing prompt_zh)
+
+It is cached in Redis (``vidgo:material_readiness:v1``). Only the raw rows are
+cached. Thresholds and topic lists from ``topic_registry`` are applied on
+read, so a deploy that changes the registry never serves a stale verdict.
+Code paths that insert, deactivate or approve materials call
+``invalidate_readiness_snapshot()``. Redis is best-effort: on any error the
+snapshot is read straight from the database.
+"""
+import json
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config.topic_registry import get_landing_topic_ids, get_topic_ids_for_tool
+from app.core.config import get_settings
+from app.models.material import Material, ToolType
+
+logger = logging.getLogger(__name__)
+
+REDIS_KEY = "vidgo:material_readiness:v1"
+
+LANDING_VIDEO_PER_TOPIC = 6
+LANDING_AVATAR_PER_TOPIC = 12  # 6 examples × 2 languages
+MIN_PER_TOPIC_DEFAULT = 1
+
+# Per-topic coverage for all 8 core tools
+TOOL_CHECKS = {
+    "background_removal": ToolType.BACKGROUND_REMOVAL,
+    "product_scene": ToolType.PRODUCT_SCENE,
+    "try_on": ToolType.TRY_ON,
+    "room_redesign": ToolType.ROOM_REDESIGN,
+    "short_video": ToolType.SHORT_VIDEO,
+    "ai_avatar": ToolType.AI_AVATAR,
+    "pattern_generate": ToolType.PATTERN_GENERATE,
+    "effect": ToolType.EFFECT,
+}
+
+# (tool_type value, topic, total, missing_prompt, missing_prompt_zh)
+Row = Sequence[Any]
+
+
+async def fetch_rows(session: AsyncSession) -> List[list]:
+    """The single aggregate query, as JSON-able rows."""
+    missing_prompt = or_(Material.prompt == None, Material.prompt == "")
+    missing_prompt_zh = and_(
+        Material.language.like("zh%"),
+        or_(Material.prompt_zh == None, Material.prompt_zh == ""),
+    )
+    result = await session.execute(
+        select(
+            Material.tool_type,
+            Material.topic,
+            func.count(Material.id),
+            func.count(Material.id).filter(missing_prompt),
+            func.count(Material.id).filter(missing_prompt_zh),
+        )
+        .where(Material.is_active == True)
+        .group_by(Material.tool_type, Material.topic)
+    )
+    return [
+        [getattr(tool_type, "value", tool_type), topic, total or 0, no_prompt or 0, no_zh or 0]
+        for tool_type, topic, total, no_prompt, no_zh in result.all()
+    ]
+
+
+def build_status(rows: Iterable[Row]) -> Dict[str, Dict[str, Any]]:
+    """Readiness per category, same shape check_all_materials always returned."""
+    index: Dict[tuple, Row] = {(r[0], r[1]): r for r in rows}
+
+    def counts(tool_type: ToolType, topics: List[str]) -> Dict[str, int]:
+        return {t: index[(tool_type.value, t)][2] if (tool_type.value, t) in index else 0 for t in topics}
+
+    def missing(tool_type: ToolType, topics: List[str], column: int) -> int:
+        return sum(index[(tool_type.value, t)][column] for t in topics if (tool_type.value, t) in index)
+
+    status: Dict[str, Dict[str, Any]] = {}
+
+    landing_topics = get_landing_topic_ids()
+    video_counts = counts(ToolType.SHORT_VIDEO, landing_topics)
+    avatar_counts = counts(ToolType.AI_AVATAR, landing_topics)
+    missing_videos = [t for t, c in video_counts.items() if c < LANDING_VIDEO_PER_TOPIC]
+    missing_avatars = [t for t, c in avatar_counts.items() if c < LANDING_AVATAR_PER_TOPIC]
+    prompt_missing = missing(ToolType.SHORT_VIDEO, landing_topics, 3) + missing(ToolType.AI_AVATAR, landing_topics, 3)
+    prompt_zh_missing = missing(ToolType.AI_AVATAR, landing_topics, 4)
+
+    status["landing"] = {
+        "ready": not missing_videos and not missing_avatars and prompt_missing == 0 and prompt_zh_missing == 0,
+        "missing_topics": {"videos": missing_videos, "avatars": missing_avatars},
+        "counts": {"videos": video_counts, "avatars": avatar_counts},
+        "prompt_issues": {"missing_prompt": prompt_missing, "missing_prompt_zh": prompt_zh_missing},
+    }
+
+    for category, tool_type in TOOL_CHECKS.items():
+        topics = get_topic_ids_for_tool(category)
+        if not topics:
+            continue
+        topic_counts = counts(tool_type, topics)
+        missing_topics = [t for t, c in topic_counts.items() if c < MIN_PER_TOPIC_DEFAULT]
+        prompt_missing = missing(tool_type, topics, 3)
+        prompt_zh_missing = missing(tool_type, topics, 4)
+        status[category] = {
+            "ready": not missing_topics and prompt_missing == 0 and prompt_zh_missing == 0,
+            "missing_topics": missing_topics,
+            "counts": topic_counts,
+            "prompt_issues": {"missing_prompt": prompt_missing, "missing_prompt_zh": prompt_zh_missing},
+        }
+
+    return status
+
+
+async def _redis():
+    from app.api.deps import get_redis
+    return await get_redis()
+
+
+async def _cached_rows() -> Optional[List[list]]:
+    try:
+        raw = await (await _redis()).get(REDIS_KEY)
+    except Exception as e:
+        logger.debug("[Readiness] Redis read failed: %s", e)
+        return None
+    if not raw:
+        return None
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return None
+
+
+async def _store_rows(rows: List[list]) -> None:
+    try:
+        ttl = get_settings().MATERIAL_READINESS_CACHE_TTL_SECONDS
+        await (await _redis()).set(REDIS_KEY, json.dumps(rows, ensure_ascii=False), ex=ttl)
+    except Exception as e:
+        logger.debug("[Readiness] Redis write failed: %s", e)
+
+
+async def get_readiness_snapshot(session: AsyncSession, use_cache: bool = True) -> Dict[str, Dict[str, Any]]:
+    """Readiness status from the cached aggregate (one Redis GET), falling
+    back to the aggregate query (one SQL round-trip), which refills the cache."""
+    rows = await _cached_rows() if use_cache else None
+    if rows is None:
+        rows = await fetch_rows(session)
+        await _store_rows(rows)
+    return build_status(rows)
+
+
+async def invalidate_readiness_snapshot() -> None:
+    """Drop the cached aggregate; the next read recomputes it."""
+    try:
+        await (await _redis()).delete(REDIS_KEY)
+    except Exception as e:
+        logger.debug("[Readiness] Redis invalidate failed: %s", e)
@@ -18,57 +18,168 @@ Usage:
     from app.services.media_cleanup_service import run_media_cleanup
     expired_count = await run_media_cleanup(db)
 """
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone
+from typing import List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update
+from sqlalchemy import func, select, update
 
+from app.core.config import get_settings
 from app.models.user_generation import UserGeneration
 
 logger = logging.getLogger(__name__)
 
+# pg advisory lock key for the cleanup run ("vidgomed" as 8 ASCII bytes), so
+# the hourly loop and the startup cleanup run on one instance at a time.
+_ADVISORY_LOCK_KEY = 0x766964676F6D6564
+# Only per-user output is deleted from GCS; generated/ blobs may also back
+# Material rows and are never removed here.
+_DELETABLE_PREFIX = "users/"
+
+
+@asynccontextmanager
+async def _single_instance():
+    """Session-level pg_try_advisory_lock on a dedicated connection (the
+    AsyncSession hands its connection back to the pool on every batch
+    commit, which would strand a session lock). Yields False when another
+    instance holds it."""
+    from app.core.database import engine
+
+    async with engine.connect() as conn:
+        acquired = bool(await conn.scalar(select(func.pg_try_advisory_lock(_ADVISORY_LOCK_KEY))))
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                await conn.scalar(select(func.pg_advisory_unlock(_ADVISORY_LOCK_KEY)))
+            await conn.commit()
+
+
+def expire_batch_stmt(now: datetime, limit: int):
+    """Clear the media of the next ``limit`` expired generations. SKIP LOCKED
+    lets a concurrent run (lock unavailable) take disjoint rows; the old URLs
+    come back through RETURNING for the blob-deletion stage."""
+    victims = (
+        select(
+            UserGeneration.id,
+            UserGeneration.result_image_url,
+            UserGeneration.result_video_url,
+        )
+        .where(
+            UserGeneration.media_expired == False,  # noqa: E712
+            UserGeneration.expires_at != None,       # noqa: E711
+            UserGeneration.expires_at <= now,
+        )
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .subquery("victims")
+    )
+    return (
+        update(UserGeneration)
+        .where(UserGeneration.id == victims.c.id)
+        .values(result_image_url=None, result_video_url=None, media_expired=True)
+        .returning(UserGeneration.id, victims.c.result_image_url, victims.c.result_video_url)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _deletable_blobs(rows, bucket_name: str) -> List[str]:
+    from app.services.gcs_storage_service import GCSStorageService
+
+    names = []
+    for _id, image_url, video_url in rows:
+        for url in (image_url, video_url):
+            name = GCSStorageService.extract_blob_name(url, bucket_name) if url else None
+            if name and name.startswith(_DELETABLE_PREFIX):
+                names.append(name)
+    return names
 
-async def run_media_cleanup(db: AsyncSession) -> dict:
+
+async def run_media_cleanup(
+    db: AsyncSession,
+    batch_size: Optional[int] = None,
+    delete_blobs: Optional[bool] = None,
+) -> dict:
     """
-    Find all generations past their expires_at date and clear their media URLs.
+    Clear the media URLs of every generation past its expires_at.
+
+    Works in committed batches of ``MEDIA_CLEANUP_BATCH_SIZE`` (one bulk
+    UPDATE ... RETURNING each) under a cluster-wide advisory lock. With
+    ``MEDIA_CLEANUP_DELETE_BLOBS`` the expired users/ blobs are deleted from
+    GCS, each batch's deletes overlapping the next batch's UPDATE.
 
     Returns a dict with:
     - expired_count: number of records processed
-    - already_expired: records already flagged (skipped)
+    - batches: UPDATE batches committed
+    - blobs_deleted: GCS objects removed (0 unless deletion is enabled)
+    - conversation_images_deleted: private interior edit sources of expired
+      conversations removed (always swept when GCS is configured)
+    - skipped: True when another instance holds the cleanup lock
     """
+    settings = get_settings()
     now = datetime.now(timezone.utc)
-
-    # Find generations that have passed their expiry date but haven't been cleaned yet
-    result = await db.execute(
-        select(UserGeneration).where(
-            UserGeneration.media_expired == False,  # noqa: E712
-            UserGeneration.expires_at != None,       # noqa: E711
-            UserGeneration.expires_at <= now,
-        )
-    )
-    to_expire = result.scalars().all()
-
-    expired_count = 0
-    for generation in to_expire:
-        # Clear media URLs but keep all other data
-        generation.result_image_url = None
-        generation.result_video_url = None
-        generation.media_expired = True
-        expired_count += 1
+    batch_size = max(1, batch_size or settings.MEDIA_CLEANUP_BATCH_SIZE)
+    if delete_blobs is None:
+        delete_blobs = settings.MEDIA_CLEANUP_DELETE_BLOBS
+    result = {"expired_count": 0, "batches": 0, "blobs_deleted": 0, "conversation_images_deleted": 0,
+              "skipped": False, "processed_at": now.isoformat()}
+
+    from app.services.gcs_storage_service import get_gcs_storage
+    storage = get_gcs_storage()
+    if not storage.enabled:
+        storage = None
+    gcs = storage if delete_blobs else None
+
+    async with _single_instance() as acquired:
+        if not acquired:
+            logger.info("[MediaCleanup] Another instance is running the cleanup — skipped")
+            result["skipped"] = True
+            return result
+
+        pending: Optional[asyncio.Task] = None
+        try:
+            while True:
+                rows = (await db.execute(expire_batch_stmt(now, batch_size))).all()
+                await db.commit()
+                if not rows:
+                    break
+                result["batches"] += 1
+                result["expired_count"] += len(rows)
+                logger.info(f"[MediaCleanup] Batch {result['batches']}: expired {len(rows)} generation(s)")
+
+                if gcs is not None:
+                    if pending is not None:
+                        result["blobs_deleted"] += await pending
+                    pending = asyncio.create_task(gcs.delete_blobs(
+                        _deletable_blobs(rows, gcs.bucket_name),
+                        concurrency=settings.MEDIA_CLEANUP_DELETE_CONCURRENCY,
+                    ))
+                if len(rows) < batch_size:
+                    break
+        finally:
+            if pending is not None:
+                result["blobs_deleted"] += await pending
+
+        if storage is not None:
+            # Private edit sources are referenced by no generation row, so
+            # they are swept on their own schedule: the conversation TTL.
+            from app.services.conversation_store import get_conversation_store, sweep_conversation_images
+            try:
+                result["conversation_images_deleted"] = await sweep_conversation_images(
+                    storage, get_conversation_store(), settings.INTERIOR_CONVERSATION_TTL_SECONDS
+                )
+            except Exception as e:
+                logger.warning(f"[MediaCleanup] Conversation image sweep failed: {e}")
+
+    if result["expired_count"] > 0:
         logger.info(
-            f"Expired media for generation {generation.id} "
-            f"(user={generation.user_id}, tool={generation.tool_type}, "
-            f"expired_at={generation.expires_at})"
+            f"Media cleanup complete: {result['expired_count']} generations expired "
+            f"in {result['batches']} batch(es), {result['blobs_deleted']} blob(s) deleted"
         )
 
-    if expired_count > 0:
-        await db.commit()
-        logger.info(f"Media cleanup complete: {expired_count} generations expired")
-    
-    return {
-        "expired_count": expired_count,
-        "processed_at": now.isoformat(),
-    }
+    return result
 
 
 async def set_expiry_for_new_generation(generation: UserGeneration) -> None:
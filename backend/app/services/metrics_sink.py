@@ -0,0 +1,145 @@
+"""
+Generation metrics sink — batched, off-the-critical-path writes to
+``generation_metrics``.
+
+ProviderRouter used to open a fresh AsyncSessionLocal() and commit one
+GenerationMetric row inline for every provider attempt, before the response
+went back to the user; a failed chain paid that round-trip (plus a pool
+checkout) once per provider tried. Now ``_record_metric`` only appends a
+dict to a bounded in-memory buffer and returns:
+
+  - ONE writer task per process drains the buffer with a single multi-row
+    ``INSERT`` every METRICS_SINK_BATCH_SIZE rows or METRICS_SINK_FLUSH_MS
+    milliseconds, whichever comes first.
+  - When the buffer is full the new row is DROPPED and counted — metrics
+    are best-effort and must never apply back-pressure to generation.
+  - A failed flush is logged and its rows discarded (counted as failed);
+    retrying would let a DB outage grow the buffer without bound.
+  - The FastAPI lifespan calls ``drain()`` on shutdown so a Cloud Run
+    SIGTERM doesn't lose the last partial batch.
+"""
+import asyncio
+import logging
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class GenerationMetricsSink:
+    """Bounded buffer + single background writer for GenerationMetric rows."""
+
+    def __init__(self):
+        self._buffer: Deque[Dict[str, Any]] = deque()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._closing = False
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def submit(self, row: Dict[str, Any]) -> bool:
+        """Queue one row (GenerationMetric column → value). Never blocks.
+
+        Returns False when the row was dropped because the buffer is full.
+        ``id`` and ``created_at`` are stamped here so batching delay doesn't
+        shift the recorded time.
+        """
+        if len(self._buffer) >= max(1, settings.METRICS_SINK_MAX_QUEUE):
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 1000 == 0:
+                logger.warning("metrics sink full — dropped %d row(s) so far", self.dropped)
+            return False
+        row.setdefault("id", uuid.uuid4())
+        row.setdefault("created_at", datetime.now(timezone.utc))
+        self._buffer.append(row)
+        self._ensure_running()
+        if len(self._buffer) >= settings.METRICS_SINK_BATCH_SIZE:
+            self._wakeup.set()
+        return True
+
+    async def drain(self, timeout: float = 10.0) -> None:
+        """Flush everything still buffered and stop the writer (shutdown)."""
+        self._closing = True
+        if self._wakeup is not None:
+            self._wakeup.set()
+        task = self._task
+        try:
+            if task is not None and not task.done():
+                await asyncio.wait_for(task, timeout=timeout)
+            elif self._buffer:
+                await asyncio.wait_for(self._flush_all(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning("metrics sink drain timed out with %d row(s) unwritten", len(self._buffer))
+        finally:
+            self._closing = False
+
+    def snapshot(self) -> Dict[str, int]:
+        return {
+            "queued": len(self._buffer),
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+    def _ensure_running(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._task = None
+            self._wakeup = asyncio.Event()
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._run())
+
+    async def _run(self) -> None:
+        interval = max(1, settings.METRICS_SINK_FLUSH_MS) / 1000.0
+        try:
+            while True:
+                if not self._closing and len(self._buffer) < settings.METRICS_SINK_BATCH_SIZE:
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=interval)
+                    except asyncio.TimeoutError:
+                        pass
+                self._wakeup.clear()
+                await self._flush_all()
+                if self._closing or not self._buffer:
+                    # Idle writer exits; the next submit() restarts it.
+                    return
+        finally:
+            self._task = None
+
+    async def _flush_all(self) -> None:
+        while self._buffer:
+            batch: List[Dict[str, Any]] = []
+            while self._buffer and len(batch) < settings.METRICS_SINK_BATCH_SIZE:
+                batch.append(self._buffer.popleft())
+            await self._write(batch)
+
+    async def _write(self, batch: List[Dict[str, Any]]) -> None:
+        try:
+            from sqlalchemy import insert
+            from app.core.database import AsyncSessionLocal
+            from app.models.model_registry import GenerationMetric
+
+            async with AsyncSessionLocal() as session:
+                await session.execute(insert(GenerationMetric).values(batch))
+                await session.commit()
+            self.written += len(batch)
+        except Exception as exc:
+            self.failed += len(batch)
+            logger.warning("metrics sink flush of %d row(s) failed: %s", len(batch), str(exc)[:200])
+
+
+_sink: Optional[GenerationMetricsSink] = None
+
+
+def get_metrics_sink() -> GenerationMetricsSink:
+    global _sink
+    if _sink is None:
+        _sink = GenerationMetricsSink()
+    return _sink
@@ -16,6 +16,7 @@ import httpx
 from app.core.config import get_settings
 from app.schemas.moderation import ModerationResult, ModerationCategory
 from app.services.block_cache import get_block_cache, BlockCacheResult
+from app.services.keyword_automaton import KeywordAutomaton
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -51,6 +52,20 @@ BLOCKED_KEYWORDS = {
     ],
 }
 
+# BLOCKED_KEYWORDS compiled once. Plain substring semantics (no word
+# boundaries), matching the original `keyword in prompt` loop.
+_keyword_automaton: Optional[KeywordAutomaton] = None
+
+
+def _get_keyword_automaton() -> KeywordAutomaton:
+    global _keyword_automaton
+    if _keyword_automaton is None:
+        _keyword_automaton = KeywordAutomaton(
+            (keyword, category) for category, keywords in BLOCKED_KEYWORDS.items() for keyword in keywords
+        )
+    return _keyword_automaton
+
+
 # Suspicious patterns that need review
 SUSPICIOUS_PATTERNS = [
     r"young\s*(girl|boy|child)",
@@ -180,9 +195,8 @@ class ModerationService:
         """Update block cache with keyword filter results"""
         try:
             if result.flagged_keywords:
-                for word in result.flagged_keywords:
-                    category = result.categories[0].value if result.categories else "custom"
-                    await self._block_cache.add_blocked_word(word, category, "keyword_filter")
+                category = result.categories[0].value if result.categories else "custom"
+                await self._block_cache.add_blocked_words(result.flagged_keywords, category, "keyword_filter")
         except Exception as e:
             logger.error(f"Failed to update cache from keyword filter: {e}")
 
@@ -190,9 +204,8 @@ class ModerationService:
         """Update block cache with Gemini results"""
         try:
             if not result.is_safe and result.flagged_keywords:
-                for word in result.flagged_keywords:
-                    category = result.categories[0].value if result.categories else "gemini_detected"
-                    await self._block_cache.add_blocked_word(word, category, "gemini")
+                category = result.categories[0].value if result.categories else "gemini_detected"
+                await self._block_cache.add_blocked_words(result.flagged_keywords, category, "gemini")
         except Exception as e:
             logger.error(f"Failed to update cache from Gemini: {e}")
 
@@ -201,11 +214,10 @@ class ModerationService:
         flagged_categories = []
         flagged_keywords = []
 
-        for category, keywords in BLOCKED_KEYWORDS.items():
-            for keyword in keywords:
-                if keyword in prompt_lower:
-                    flagged_categories.append(category)
-                    flagged_keywords.append(keyword)
+        # One linear pass over the prompt, however many keywords there are.
+        for keyword, category in _get_keyword_automaton().scan(prompt_lower):
+            flagged_categories.append(category)
+            flagged_keywords.append(keyword)
 
         if flagged_categories:
             # Determine primary category (most severe)
@@ -0,0 +1,340 @@
+"""
+Poll scheduler — one per-process loop for every in-flight provider task.
+
+Before this module (2026-07) each PiAPI / Pollo / A2E generation held its own
+coroutine doing a fixed ``GET status`` every 5 s. A Kling Omni / Veo render
+that legitimately takes 15-30 min therefore burned 180-360 status calls and
+pinned its own timer for the whole wait, and at our concurrency the poll
+traffic dwarfed the actual submits.
+
+Now callers hand the scheduler a zero-arg ``check`` coroutine factory and
+await a future:
+
+  - ONE scheduler task per process owns every in-flight task id. It sleeps
+    until the earliest job is due, then fires all due checks in the same
+    tick (bounded by POLL_MAX_CONCURRENT_CHECKS so a burst of completions
+    can't exhaust the provider's connection pool). None of the upstreams
+    expose a multi-id status endpoint, so "batched" means one tick, one
+    shared client, N concurrent GETs — not one HTTP request.
+  - The interval between checks follows a per-task-kind backoff curve
+    centred on the kind's expected duration: sparse while the job is far
+    from its typical finish time, tightening to the base cadence as it
+    approaches, then easing off again if it runs long. Expected durations
+    are seeded from the median successful ``generation_metrics.duration_ms``
+    per (provider, task_type) and refined in-process by an EWMA of observed
+    completions.
+  - A job whose ``check`` returns ``(True, value)`` resolves its future with
+    ``value``; a ``check`` that raises fails it (terminal upstream error).
+    Transient poll errors are the check's responsibility — return
+    ``(False, None)`` to keep polling.
+
+The task kind is ``"<provider>:<label>"`` where label comes from the
+``poll_task_label`` context variable (set by ProviderRouter.route to the
+router TaskType, so it lines up with generation_metrics.task_type) or the
+caller's own fallback label.
+"""
+import asyncio
+import contextvars
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Router TaskType label of the generation currently running in this context.
+# Set by ProviderRouter.route(); read when a provider registers a poll job.
+poll_task_label: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "poll_task_label", default=None
+)
+
+_PRIORS_TTL_S = 3600.0
+_PRIORS_LOOKBACK_DAYS = 7
+_PRIORS_MIN_SAMPLES = 5
+# Weight of each new observed duration in the in-process EWMA.
+_EWMA_ALPHA = 0.2
+
+CheckFn = Callable[[], Awaitable[Tuple[bool, Any]]]
+
+
+@dataclass
+class _PollJob:
+    key: str
+    kind: str
+    check: CheckFn
+    future: asyncio.Future
+    started_at: float
+    deadline: float
+    min_interval: float
+    next_at: float
+    checks: int = 0
+    in_flight: bool = False
+
+
+@dataclass
+class _Stats:
+    checks: int = 0
+    check_errors: int = 0
+    completed: int = 0
+    timed_out: int = 0
+    # checks a fixed 5 s cadence would have made for the jobs resolved so far
+    fixed_cadence_checks: int = 0
+    by_kind: Dict[str, int] = field(default_factory=dict)
+
+
+class PollScheduler:
+    """Shared per-process scheduler for provider task status polling."""
+
+    def __init__(self):
+        self._jobs: Dict[str, _PollJob] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._sem: Optional[asyncio.Semaphore] = None
+        # kind → expected duration in seconds
+        self._expected: Dict[str, float] = {}
+        self._priors_loaded_at: float = 0.0
+        self._priors_refreshing = False
+        self._stats = _Stats()
+        self._seq = 0
+
+    # ── public API ──────────────────────────────────────────────────────
+
+    async def wait(
+        self,
+        check: CheckFn,
+        *,
+        provider: str,
+        label: str,
+        timeout: float,
+        task_id: str = "",
+        min_interval: Optional[float] = None,
+    ) -> Any:
+        """Poll ``check`` on the shared schedule until it reports done.
+
+        Returns the value from the first ``(True, value)`` result; re-raises
+        whatever ``check`` raises; raises ``asyncio.TimeoutError`` once
+        ``timeout`` seconds pass without a terminal result.
+        """
+        self._bind_loop()
+        self._maybe_refresh_priors()
+
+        kind = f"{provider}:{poll_task_label.get() or label}"
+        now = self._loop.time()
+        base = float(min_interval or settings.POLL_MIN_INTERVAL_SECONDS)
+        self._seq += 1
+        job = _PollJob(
+            key=f"{provider}:{task_id or 'anon'}:{self._seq}",
+            kind=kind,
+            check=check,
+            future=self._loop.create_future(),
+            started_at=now,
+            deadline=now + max(1.0, float(timeout)),
+            min_interval=base,
+            next_at=now,
+        )
+        job.next_at = now + self._next_interval(job, 0.0)
+        self._jobs[job.key] = job
+        self._ensure_running()
+        self._wakeup.set()
+        try:
+            return await job.future
+        finally:
+            # Cancelled waiter (client disconnect) → drop the job so the
+            # scheduler stops polling an id nobody is waiting on.
+            self._jobs.pop(job.key, None)
+            self._wakeup.set()
+
+    def expected_duration(self, kind: str) -> Optional[float]:
+        return self._expected.get(kind)
+
+    def set_expected_duration(self, kind: str, seconds: float) -> None:
+        self._expected[kind] = max(1.0, float(seconds))
+
+    def snapshot(self) -> Dict[str, Any]:
+        s = self._stats
+        return {
+            "in_flight": len(self._jobs),
+            "checks": s.checks,
+            "check_errors": s.check_errors,
+            "completed": s.completed,
+            "timed_out": s.timed_out,
+            "fixed_cadence_checks": s.fixed_cadence_checks,
+            "checks_by_kind": dict(s.by_kind),
+            "expected_seconds": {k: round(v, 1) for k, v in self._expected.items()},
+        }
+
+    async def refresh_priors(self) -> int:
+        """Seed expected durations from recent successful generation_metrics.
+
+        Returns the number of kinds loaded. Best-effort — a DB failure keeps
+        whatever priors (or in-process EWMAs) are already in place.
+        """
+        try:
+            from datetime import datetime, timedelta, timezone
+            from sqlalchemy import select, func
+            from app.core.database import AsyncSessionLocal
+            from app.models.model_registry import GenerationMetric
+
+            since = datetime.now(timezone.utc) - timedelta(days=_PRIORS_LOOKBACK_DAYS)
+            median = func.percentile_cont(0.5).within_group(GenerationMetric.duration_ms)
+            stmt = (
+                select(GenerationMetric.provider_used, GenerationMetric.task_type, median)
+                .where(
+                    GenerationMetric.success.is_(True),
+                    GenerationMetric.duration_ms.isnot(None),
+                    GenerationMetric.created_at >= since,
+                )
+                .group_by(GenerationMetric.provider_used, GenerationMetric.task_type)
+                .having(func.count() >= _PRIORS_MIN_SAMPLES)
+            )
+            async with AsyncSessionLocal() as session:
+                rows = (await session.execute(stmt)).all()
+            loaded = 0
+            for provider, task_type, median_ms in rows:
+                if median_ms:
+                    kind = f"{provider}:{task_type}"
+                    # Keep an in-process EWMA if one exists — it's fresher.
+                    self._expected.setdefault(kind, float(median_ms) / 1000.0)
+                    loaded += 1
+            logger.info("poll_scheduler: loaded %d duration priors", loaded)
+            return loaded
+        except Exception as exc:
+            logger.warning("poll_scheduler: duration priors unavailable (%s)", str(exc)[:200])
+            return 0
+        finally:
+            self._priors_loaded_at = time.monotonic()
+            self._priors_refreshing = False
+
+    # ── scheduling ──────────────────────────────────────────────────────
+
+    def _next_interval(self, job: _PollJob, elapsed: float) -> float:
+        """Seconds until the job's next status check.
+
+        With a known expected duration E: while far from E, sleep half the
+        remaining distance (so checks converge geometrically on E); once
+        past E, back off by a tenth of the overrun. Without one, grow
+        linearly with elapsed time. Always clamped to
+        [job.min_interval, POLL_MAX_INTERVAL_SECONDS].
+        """
+        base = job.min_interval
+        ceiling = max(base, float(settings.POLL_MAX_INTERVAL_SECONDS))
+        expected = self._expected.get(job.kind)
+        if expected is None:
+            interval = base + elapsed * 0.1
+        elif elapsed < expected:
+            interval = (expected - elapsed) * 0.5
+        else:
+            interval = base + (elapsed - expected) * 0.1
+        return max(base, min(ceiling, interval))
+
+    def _bind_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # New event loop (tests, or a worker process re-entering): any
+            # state tied to the old loop is unusable.
+            self._loop = loop
+            self._jobs = {}
+            self._task = None
+            self._wakeup = asyncio.Event()
+            self._sem = asyncio.Semaphore(max(1, settings.POLL_MAX_CONCURRENT_CHECKS))
+
+    def _ensure_running(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = self._loop.create_task(self._run())
+
+    def _maybe_refresh_priors(self) -> None:
+        if self._priors_refreshing:
+            return
+        if time.monotonic() - self._priors_loaded_at < _PRIORS_TTL_S:
+            return
+        self._priors_refreshing = True
+        self._loop.create_task(self.refresh_priors())
+
+    async def _run(self) -> None:
+        try:
+            while self._jobs:
+                now = self._loop.time()
+                next_wake = None
+                for job in list(self._jobs.values()):
+                    if job.future.done() or job.in_flight:
+                        continue
+                    if now >= job.deadline:
+                        self._stats.timed_out += 1
+                        job.future.set_exception(asyncio.TimeoutError())
+                        continue
+                    if job.next_at <= now:
+                        job.in_flight = True
+                        self._loop.create_task(self._run_check(job))
+                        continue
+                    due = min(job.next_at, job.deadline)
+                    next_wake = due if next_wake is None else min(next_wake, due)
+
+                self._wakeup.clear()
+                delay = None if next_wake is None else max(0.0, next_wake - self._loop.time())
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:  # pragma: no cover - defensive
+            logger.error("poll_scheduler loop crashed: %s", exc, exc_info=True)
+            for job in self._jobs.values():
+                if not job.future.done():
+                    job.future.set_exception(exc)
+        finally:
+            self._task = None
+
+    async def _run_check(self, job: _PollJob) -> None:
+        try:
+            async with self._sem:
+                if job.future.done():
+                    return
+                self._stats.checks += 1
+                self._stats.by_kind[job.kind] = self._stats.by_kind.get(job.kind, 0) + 1
+                job.checks += 1
+                try:
+                    done, value = await asyncio.wait_for(
+                        job.check(), timeout=float(settings.POLL_CHECK_TIMEOUT_SECONDS)
+                    )
+                except asyncio.TimeoutError:
+                    self._stats.check_errors += 1
+                    done, value = False, None
+                except Exception as exc:
+                    if not job.future.done():
+                        job.future.set_exception(exc)
+                    return
+
+            elapsed = self._loop.time() - job.started_at
+            if done:
+                self._observe(job.kind, elapsed)
+                self._stats.completed += 1
+                self._stats.fixed_cadence_checks += max(1, int(elapsed // 5))
+                if not job.future.done():
+                    job.future.set_result(value)
+                return
+            job.next_at = self._loop.time() + self._next_interval(job, elapsed)
+        finally:
+            job.in_flight = False
+            if self._wakeup is not None:
+                self._wakeup.set()
+
+    def _observe(self, kind: str, elapsed: float) -> None:
+        prev = self._expected.get(kind)
+        if prev is None:
+            self._expected[kind] = max(1.0, elapsed)
+        else:
+            self._expected[kind] = max(1.0, prev + _EWMA_ALPHA * (elapsed - prev))
+
+
+_scheduler: Optional[PollScheduler] = None
+
+
+def get_poll_scheduler() -> PollScheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = PollScheduler()
+    return _scheduler
@@ -9,6 +9,7 @@ import logging
 from typing import Optional, Dict, Any, Tuple
 import httpx
 from app.core.config import get_settings
+from app.services.poll_scheduler import get_poll_scheduler
 from app.core.model_registry import POLLO_MODELS as _POLLO_REG
 
 logger = logging.getLogger(__name__)
@@ -423,33 +424,40 @@ class PolloAIClient:
             timeout: Max wait time in seconds (default 20 min — short-video
                 jobs on Kling / Seedance / Wan can idle 8-15 min before
                 yielding a video; lower defaults aborted healthy renders)
-            poll_interval: Seconds between status checks
+            poll_interval: Minimum seconds between status checks (the shared
+                poll scheduler widens the gap for long-running task kinds)
 
         Returns:
             Final task status with video_url
         """
-        elapsed = 0
         logger.info(f"Waiting for Pollo task {task_id} (timeout: {timeout}s)")
 
-        while elapsed < timeout:
+        async def _check():
             status = await self.get_task_status(task_id)
             task_status = status.get("status", "").lower()
-
-            logger.info(f"Task {task_id}: {task_status} ({elapsed}s elapsed)")
+            logger.info(f"Task {task_id}: {task_status}")
 
             if task_status == "succeed":
                 logger.info(f"Task {task_id} completed successfully")
-                return status
+                return True, status
             elif task_status == "failed":
                 error_msg = status.get("error", "Unknown error")
                 logger.error(f"Task {task_id} failed: {error_msg}")
-                return status
-
-            await asyncio.sleep(poll_interval)
-            elapsed += poll_interval
+                return True, status
+            return False, None
 
-        logger.error(f"Task {task_id} timed out after {timeout}s")
-        return {"success": False, "status": "timeout", "error": "Task timed out"}
+        try:
+            return await get_poll_scheduler().wait(
+                _check,
+                provider="pollo",
+                label="task",
+                timeout=timeout,
+                task_id=task_id,
+                min_interval=poll_interval,
+            )
+        except asyncio.TimeoutError:
+            logger.error(f"Task {task_id} timed out after {timeout}s")
+            return {"success": False, "status": "timeout", "error": "Task timed out"}
 
     async def generate_and_wait(
         self,
@@ -3,15 +3,28 @@ Multi-Language Prompt Matching Service
 Handles prompt normalization, translation, and similarity matching for demo images.
 
 Supports: English (en), Traditional Chinese (zh-TW), Japanese (ja), Korean (ko), Spanish (es)
+
+The keyword tables below are compiled once into ``KeywordMatcher`` (token
+hash maps plus one Aho–Corasick automaton per language), so normalizing a
+prompt costs one pass over its tokens instead of a scan of every
+translation per token. ``find_similar_demos`` scores against an in-process
+``DemoKeywordIndex`` (keyword → demo ids, with per-demo set sizes) and only
+touches demos that can reach ``min_score``; just the winning rows are
+loaded from Postgres.
 """
+import asyncio
 import re
 import hashlib
 import logging
-from typing import List, Dict, Any, Optional
+import time
+from typing import List, Dict, Any, Optional, Set, Tuple
 from dataclasses import dataclass
-from sqlalchemy import select, func, and_
+from sqlalchemy import select, func, and_, or_
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
+from app.services.keyword_automaton import KeywordAutomaton
+
 logger = logging.getLogger(__name__)
 
 
@@ -125,6 +138,262 @@ STYLE_KEYWORDS = {
 }
 
 
+class KeywordMatcher:
+    """
+    Compiled lookup tables for ``normalize_prompt`` and category/style
+    detection. Results are identical to scanning the tables in order: each
+    token maps to the FIRST English keyword (table order) that it equals,
+    is a word of, or whose translation it equals — or whose translation
+    appears anywhere in the prompt.
+    """
+
+    def __init__(
+        self,
+        translations: Dict[str, Dict[str, List[str]]],
+        categories: Dict[str, List[str]],
+        styles: Dict[str, List[str]],
+    ):
+        self.english = list(translations)
+        self._english_token: Dict[str, int] = {}
+        for idx, eng_word in enumerate(self.english):
+            lowered = eng_word.lower()
+            for token in [lowered] + lowered.split():
+                self._english_token.setdefault(token, idx)
+
+        self._translation_token: Dict[str, Dict[str, int]] = {}
+        self._translation_scan: Dict[str, KeywordAutomaton] = {}
+        languages = {lang for per_lang in translations.values() for lang in per_lang}
+        for lang in languages:
+            exact: Dict[str, int] = {}
+            terms = []
+            for idx, eng_word in enumerate(self.english):
+                for trans in translations[eng_word].get(lang, []):
+                    exact.setdefault(trans.lower(), idx)
+                    terms.append((trans, idx))
+            self._translation_token[lang] = exact
+            self._translation_scan[lang] = KeywordAutomaton(terms)
+
+        self.categories = list(categories)
+        self._category_of: Dict[str, List[int]] = {}
+        for idx, cat_keywords in enumerate(categories.values()):
+            for kw in set(cat_keywords):
+                self._category_of.setdefault(kw, []).append(idx)
+
+        self.styles = list(styles)
+        self._style_of: Dict[str, int] = {}
+        for idx, style_kws in enumerate(styles.values()):
+            for kw in style_kws:
+                self._style_of.setdefault(kw, idx)
+
+    def match_tokens(self, words: List[str], original: str, language: str) -> List[Optional[str]]:
+        """English keyword (or None) for each token of ``original``."""
+        exact = self._translation_token.get(language)
+        anywhere = None
+        if exact is not None:
+            hits = self._translation_scan[language].scan(original)
+            anywhere = min((idx for _, idx in hits), default=None)
+
+        matched: List[Optional[str]] = []
+        for word in words:
+            options = [self._english_token.get(word)]
+            if exact is not None:
+                options += [exact.get(word), anywhere]
+            best = min((idx for idx in options if idx is not None), default=None)
+            matched.append(self.english[best] if best is not None else None)
+        return matched
+
+    def detect_category(self, keywords: List[str]) -> Optional[str]:
+        scores: Dict[int, int] = {}
+        for kw in keywords:
+            for idx in self._category_of.get(kw.lower(), ()):
+                scores[idx] = scores.get(idx, 0) + 1
+        if not scores:
+            return None
+        # Highest score; ties go to the category listed first.
+        best = max(sorted(scores), key=scores.get)
+        return self.categories[best]
+
+    def detect_style(self, keywords: List[str]) -> Optional[str]:
+        hits = [self._style_of[kw.lower()] for kw in keywords if kw.lower() in self._style_of]
+        return self.styles[min(hits)] if hits else None
+
+
+class _IndexedDemo:
+    __slots__ = ("keywords", "lowered", "category", "style", "popularity")
+
+    def __init__(self, keywords, category, style, popularity):
+        self.keywords = frozenset(keywords or ())
+        self.lowered = frozenset(kw.lower() for kw in self.keywords)
+        self.category = category
+        self.style = style
+        self.popularity = popularity or 0
+
+
+class DemoKeywordIndex:
+    """
+    Per-process inverted index over active, completed ImageDemo rows.
+
+    Postings map a lowercased keyword to demo ids; category and style slugs
+    get their own postings so demos that can score on the category/style
+    bonus alone are still candidates. Scores are the exact
+    ``calculate_similarity`` values, computed from the postings'
+    intersection counts and each demo's precomputed keyword-set size.
+
+    Rows changed by other instances arrive through an incremental sweep on
+    ``updated_at``/``created_at`` every DEMO_KEYWORD_INDEX_REFRESH_SECONDS
+    (deactivated rows are dropped); this instance's own writes are applied
+    immediately via ``upsert``/``remove``.
+    """
+
+    FULL_REBUILD_SECONDS = 3600.0
+
+    def __init__(self):
+        self._reset()
+        self._refreshed_at = 0.0
+        self._rebuilt_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def _reset(self) -> None:
+        self._demos: Dict[str, _IndexedDemo] = {}
+        self._postings: Dict[str, Set[str]] = {}
+        self._by_category: Dict[str, Set[str]] = {}
+        self._by_style: Dict[str, Set[str]] = {}
+        self._watermark = None
+
+    def __len__(self) -> int:
+        return len(self._demos)
+
+    def upsert(self, demo_id, keywords, category, style, popularity=0) -> None:
+        demo_id = str(demo_id)
+        self.remove(demo_id)
+        entry = _IndexedDemo(keywords, category, style, popularity)
+        self._demos[demo_id] = entry
+        for kw in entry.lowered:
+            self._postings.setdefault(kw, set()).add(demo_id)
+        if category:
+            self._by_category.setdefault(category, set()).add(demo_id)
+        if style:
+            self._by_style.setdefault(style, set()).add(demo_id)
+
+    def remove(self, demo_id) -> None:
+        demo_id = str(demo_id)
+        entry = self._demos.pop(demo_id, None)
+        if entry is None:
+            return
+        for postings, keys in (
+            (self._postings, entry.lowered),
+            (self._by_category, (entry.category,) if entry.category else ()),
+            (self._by_style, (entry.style,) if entry.style else ()),
+        ):
+            for key in keys:
+                ids = postings.get(key)
+                if ids is not None:
+                    ids.discard(demo_id)
+                    if not ids:
+                        del postings[key]
+
+    def search(
+        self,
+        keywords: List[str],
+        category: Optional[str],
+        style: Optional[str],
+        min_score: float,
+    ) -> List[Tuple[str, float, List[str]]]:
+        """``(demo_id, score, matched_keywords)`` with score >= min_score,
+        best first (ties: higher indexed popularity)."""
+        query_raw = set(keywords)
+        query = {kw.lower() for kw in query_raw}
+
+        overlap: Dict[str, int] = {}
+        for kw in query:
+            for demo_id in self._postings.get(kw, ()):
+                overlap[demo_id] = overlap.get(demo_id, 0) + 1
+        candidates: Set[str] = set(overlap)
+        # Demos sharing no keyword can still reach min_score on the bonuses.
+        if min_score <= 0:
+            candidates = set(self._demos)
+        if category and 0.2 >= min_score:
+            candidates |= self._by_category.get(category, set())
+        if style and 0.2 >= min_score:
+            candidates |= self._by_style.get(style, set())
+        if category and style and 0.4 >= min_score:
+            candidates |= self._by_category.get(category, set()) & self._by_style.get(style, set())
+
+        results = []
+        for demo_id in candidates:
+            entry = self._demos[demo_id]
+            if not query_raw and not entry.keywords:
+                # calculate_similarity scores this 0.0 regardless of bonuses.
+                if 0.0 >= min_score:
+                    results.append((demo_id, 0.0, []))
+                continue
+            inter = overlap.get(demo_id, 0)
+            union = len(query) + len(entry.lowered) - inter
+            score = (inter / max(union, 1)) * 0.6
+            score += 0.2 if category and category == entry.category else 0.0
+            score += 0.2 if style and style == entry.style else 0.0
+            score = min(score, 1.0)
+            if score >= min_score:
+                results.append((demo_id, score, list(query_raw & entry.keywords)))
+        results.sort(key=lambda r: (r[1], self._demos[r[0]].popularity), reverse=True)
+        return results
+
+    async def ensure_fresh(self, db: AsyncSession) -> None:
+        """Load (first call), rebuild (hourly) or sweep changed rows (periodic)."""
+        now = time.monotonic()
+        if now - self._refreshed_at < settings.DEMO_KEYWORD_INDEX_REFRESH_SECONDS:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            if now - self._refreshed_at < settings.DEMO_KEYWORD_INDEX_REFRESH_SECONDS:
+                return
+            full = not self._rebuilt_at or now - self._rebuilt_at >= self.FULL_REBUILD_SECONDS
+            try:
+                await self._load(db, full=full)
+            except Exception as e:
+                logger.warning(f"Demo keyword index refresh failed (serving stale index): {e}")
+                if not self._rebuilt_at:
+                    raise
+            self._refreshed_at = now
+            if full:
+                self._rebuilt_at = now
+
+    async def _load(self, db: AsyncSession, full: bool) -> None:
+        from app.models.demo import ImageDemo
+
+        changed_at = func.coalesce(ImageDemo.updated_at, ImageDemo.created_at)
+        stmt = select(
+            ImageDemo.id,
+            ImageDemo.keywords,
+            ImageDemo.category_slug,
+            ImageDemo.style_slug,
+            ImageDemo.popularity_score,
+            ImageDemo.is_active,
+            ImageDemo.status,
+            changed_at,
+        )
+        if full:
+            stmt = stmt.where(and_(ImageDemo.is_active == True, ImageDemo.status == "completed"))
+        elif self._watermark is not None:
+            # >= re-reads the newest rows; upserts are idempotent.
+            stmt = stmt.where(or_(ImageDemo.updated_at >= self._watermark, ImageDemo.created_at >= self._watermark))
+        rows = (await db.execute(stmt)).all()
+
+        if full:
+            self._reset()
+        for demo_id, keywords, category, style, popularity, is_active, status, changed in rows:
+            if is_active and status == "completed":
+                self.upsert(demo_id, keywords, category, style, popularity)
+            else:
+                self.remove(demo_id)
+            if changed is not None and (self._watermark is None or changed > self._watermark):
+                self._watermark = changed
+        logger.info(
+            f"Demo keyword index {'rebuilt' if full else 'swept'}: {len(rows)} rows read, "
+            f"{len(self)} demos, {len(self._postings)} keywords"
+        )
+
+
 @dataclass
 class PromptAnalysis:
     """Result of prompt analysis"""
@@ -147,6 +416,8 @@ class PromptMatchingService:
         self.keyword_translations = KEYWORD_TRANSLATIONS
         self.category_keywords = CATEGORY_KEYWORDS
         self.style_keywords = STYLE_KEYWORDS
+        self.matcher = KeywordMatcher(KEYWORD_TRANSLATIONS, CATEGORY_KEYWORDS, STYLE_KEYWORDS)
+        self.index = DemoKeywordIndex()
 
     def detect_language(self, text: str) -> str:
         """
@@ -182,30 +453,11 @@ class PromptMatchingService:
         # Tokenize (simple word splitting)
         words = re.findall(r'\w+', original.lower())
 
-        for word in words:
-            matched = False
-
-            # Check if word matches any translation
-            for eng_word, translations in self.keyword_translations.items():
-                # Check English
-                if word == eng_word.lower() or word in eng_word.lower().split():
-                    normalized_words.append(eng_word)
-                    matched_keywords.append(eng_word)
-                    matched = True
-                    break
-
-                # Check translations for detected language
-                if language in translations:
-                    for trans in translations[language]:
-                        if word == trans.lower() or trans.lower() in original.lower():
-                            normalized_words.append(eng_word)
-                            matched_keywords.append(eng_word)
-                            matched = True
-                            break
-                if matched:
-                    break
-
-            if not matched and language == "en":
+        for word, eng_word in zip(words, self.matcher.match_tokens(words, original, language)):
+            if eng_word is not None:
+                normalized_words.append(eng_word)
+                matched_keywords.append(eng_word)
+            elif language == "en":
                 normalized_words.append(word)
 
         # Build normalized prompt
@@ -237,23 +489,11 @@ class PromptMatchingService:
 
     def _detect_category(self, keywords: List[str]) -> Optional[str]:
         """Detect category from keywords"""
-        scores = {}
-        for category, cat_keywords in self.category_keywords.items():
-            score = sum(1 for kw in keywords if kw.lower() in cat_keywords)
-            if score > 0:
-                scores[category] = score
-
-        if scores:
-            return max(scores, key=scores.get)
-        return None
+        return self.matcher.detect_category(keywords)
 
     def _detect_style(self, keywords: List[str]) -> Optional[str]:
         """Detect style from keywords"""
-        for style, style_kws in self.style_keywords.items():
-            for kw in keywords:
-                if kw.lower() in style_kws:
-                    return style
-        return None
+        return self.matcher.detect_style(keywords)
 
     def calculate_similarity(
         self,
@@ -311,33 +551,35 @@ class PromptMatchingService:
         # Analyze prompt
         analysis = self.normalize_prompt(prompt)
 
-        # Query active demos
-        query = select(ImageDemo).where(
-            and_(
-                ImageDemo.is_active == True,
-                ImageDemo.status == "completed"
-            )
-        )
-        result = await db.execute(query)
-        demos = result.scalars().all()
+        # Score against the in-process index; only winners are loaded.
+        await self.index.ensure_fresh(db)
+        ranked = self.index.search(analysis.keywords, analysis.category, analysis.style, min_score)
 
-        # Calculate scores
         scored_demos = []
-        for demo in demos:
-            score = self.calculate_similarity(
-                query_keywords=analysis.keywords,
-                demo_keywords=demo.keywords or [],
-                query_category=analysis.category,
-                demo_category=demo.category_slug,
-                query_style=analysis.style,
-                demo_style=demo.style_slug
+        position = 0
+        while len(scored_demos) < limit and position < len(ranked):
+            page = ranked[position:position + limit]
+            position += len(page)
+            result = await db.execute(
+                select(ImageDemo).where(
+                    and_(
+                        ImageDemo.id.in_([demo_id for demo_id, _, _ in page]),
+                        ImageDemo.is_active == True,
+                        ImageDemo.status == "completed"
+                    )
+                )
             )
-
-            if score >= min_score:
+            loaded = {str(demo.id): demo for demo in result.scalars().all()}
+            for demo_id, score, matched in page:
+                demo = loaded.get(demo_id)
+                if demo is None:
+                    # Deactivated or deleted since the last sweep.
+                    self.index.remove(demo_id)
+                    continue
                 scored_demos.append({
                     "demo": demo,
                     "score": score,
-                    "matched_keywords": list(set(analysis.keywords) & set(demo.keywords or []))
+                    "matched_keywords": matched
                 })
 
         # Sort by score (descending) and popularity
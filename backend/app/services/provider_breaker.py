@@ -0,0 +1,338 @@
+"""Cluster-wide provider circuit breaker + health cache for ProviderRouter.
+
+Problem: ProviderRouter's breaker lives in per-instance dicts
+(``_failure_counts`` / ``_status_cache``). With N Cloud Run instances each
+one has to burn its own PROVIDER_CIRCUIT_BREAKER_FAILURES generations
+against a dead PiAPI before failing over — and each of those can be a full
+600-1800 s poll timeout — so fleet-wide failover took N×threshold wasted
+renders.
+
+Fix (opt-in via PROVIDER_SHARED_BREAKER_ENABLED): Redis holds the state,
+pub/sub pushes it.
+  - Failures land in a per-(provider, task_type) sorted set scored by
+    timestamp; members older than PROVIDER_SHARED_BREAKER_WINDOW_SECONDS
+    are trimmed, so the threshold is "N failures in the window", fleet-wide.
+  - Crossing the threshold writes an ``open`` key (value = open-until
+    epoch, TTL = cooldown + probe grace) and publishes the transition on
+    ``provider_breaker:state``. Every instance runs
+    ``provider_breaker_subscriber_loop`` (spawned from the FastAPI lifespan)
+    and mirrors the state locally, so ``allow()`` is a dict lookup on the
+    hot path — no Redis round-trip while the circuit is closed.
+  - After the cooldown the circuit is half-open: exactly one instance wins
+    a ``SET NX`` election and sends a single probe request; everyone else
+    keeps skipping the provider. The probe's outcome closes (success) or
+    re-opens (failure) the circuit and is published to the fleet.
+  - Health-check results are shared with a TTL so N instances don't each
+    ping the provider's health endpoint.
+
+Redis being unavailable must never break routing: every Redis error fails
+open for _REDIS_RETRY_COOLDOWN_S and the router falls back to its
+per-instance breaker, exactly as before this module existed.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from typing import Dict, Optional, Tuple
+
+import redis.asyncio as redis
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+STATE_CHANNEL = "provider_breaker:state"
+
+_FAIL_KEY = "vidgo:breaker:fail:{provider}:{task}"
+_OPEN_KEY = "vidgo:breaker:open:{provider}:{task}"
+_PROBE_KEY = "vidgo:breaker:probe:{provider}:{task}"
+_HEALTH_KEY = "vidgo:provider_health:{provider}"
+_OPEN_KEY_PATTERN = "vidgo:breaker:open:*"
+
+_REDIS_RETRY_COOLDOWN_S = 60.0
+
+# Identifies this process in probe elections (debugging only).
+_INSTANCE_ID = uuid.uuid4().hex[:12]
+
+
+class SharedCircuitBreaker:
+    """Redis-coordinated breaker keyed by (provider, task_type)."""
+
+    def __init__(self):
+        # Local mirror of fleet state: (provider, task) → open-until epoch.
+        self._open_until: Dict[Tuple[str, str], float] = {}
+        # Half-open circuits this instance currently holds the probe for →
+        # monotonic deadline. A probe that ends without reaching
+        # record_success/record_failure (input error, cancellation) is
+        # forgotten once its Redis claim has lapsed, so it can't wedge here.
+        self._probing: Dict[Tuple[str, str], float] = {}
+        self._redis_down_until = 0.0
+
+    # ── redis plumbing ──────────────────────────────────────────────────
+
+    async def _redis(self) -> Optional[redis.Redis]:
+        if time.monotonic() < self._redis_down_until:
+            return None
+        try:
+            from app.api.deps import get_redis
+            return await get_redis()
+        except Exception as exc:
+            self._mark_redis_down(exc)
+            return None
+
+    def _mark_redis_down(self, exc: Exception) -> None:
+        self._redis_down_until = time.monotonic() + _REDIS_RETRY_COOLDOWN_S
+        logger.warning(
+            "provider_breaker: redis error (%s) — using per-instance breaker for %.0fs",
+            str(exc)[:200], _REDIS_RETRY_COOLDOWN_S,
+        )
+
+    async def _publish(self, r: redis.Redis, provider: str, task: str, state: str, until: float = 0.0) -> None:
+        try:
+            await r.publish(
+                STATE_CHANNEL,
+                json.dumps({
+                    "provider": provider,
+                    "task_type": task,
+                    "state": state,
+                    "until": until,
+                    "origin": _INSTANCE_ID,
+                }),
+            )
+        except Exception as exc:  # pragma: no cover
+            logger.warning("provider_breaker publish failed: %s", exc)
+
+    # ── routing hooks ───────────────────────────────────────────────────
+
+    async def allow(self, provider: str, task: str) -> bool:
+        """Whether this instance may send ``task`` to ``provider`` now.
+
+        Closed → True with no I/O. Open → False. Half-open → True only for
+        the single instance that wins the probe election.
+        """
+        key = (provider, task)
+        until = self._open_until.get(key)
+        if until is None:
+            return True
+        probe_deadline = self._probing.get(key)
+        if probe_deadline is not None:
+            if time.monotonic() < probe_deadline:
+                # Our own probe is still in flight — don't stack a second one.
+                return False
+            self._probing.pop(key, None)
+        if time.time() < until:
+            return False
+
+        r = await self._redis()
+        if r is None:
+            # Can't coordinate a single prober; degrade to the per-instance
+            # behaviour (cooldown elapsed → try again).
+            self._open_until.pop(key, None)
+            return True
+        probe_ttl = max(1, settings.PROVIDER_SHARED_BREAKER_PROBE_TTL_SECONDS)
+        try:
+            won = await r.set(
+                _PROBE_KEY.format(provider=provider, task=task),
+                _INSTANCE_ID,
+                nx=True,
+                ex=probe_ttl,
+            )
+        except Exception as exc:
+            self._mark_redis_down(exc)
+            self._open_until.pop(key, None)
+            return True
+        if won:
+            self._probing[key] = time.monotonic() + probe_ttl
+            logger.info("provider_breaker: half-open probe for %s/%s elected here", provider, task)
+            return True
+        return False
+
+    async def record_success(self, provider: str, task: str) -> None:
+        key = (provider, task)
+        if key not in self._open_until and key not in self._probing:
+            return  # closed circuit — nothing to reset fleet-wide
+        self._open_until.pop(key, None)
+        self._probing.pop(key, None)
+        r = await self._redis()
+        if r is None:
+            return
+        try:
+            pipe = r.pipeline()
+            pipe.delete(_OPEN_KEY.format(provider=provider, task=task))
+            pipe.delete(_PROBE_KEY.format(provider=provider, task=task))
+            pipe.delete(_FAIL_KEY.format(provider=provider, task=task))
+            await pipe.execute()
+        except Exception as exc:
+            self._mark_redis_down(exc)
+            return
+        logger.info("provider_breaker: %s/%s closed", provider, task)
+        await self._publish(r, provider, task, "closed")
+
+    async def record_failure(self, provider: str, task: str) -> bool:
+        """Count one failure; returns True if this call opened the circuit."""
+        key = (provider, task)
+        r = await self._redis()
+        if r is None:
+            self._probing.pop(key, None)
+            return False
+
+        now = time.time()
+        probe_failed = key in self._probing
+        fail_key = _FAIL_KEY.format(provider=provider, task=task)
+        window = max(1, settings.PROVIDER_SHARED_BREAKER_WINDOW_SECONDS)
+        try:
+            if probe_failed:
+                count = settings.PROVIDER_CIRCUIT_BREAKER_FAILURES
+            else:
+                pipe = r.pipeline()
+                pipe.zadd(fail_key, {f"{now}:{uuid.uuid4().hex[:8]}": now})
+                pipe.zremrangebyscore(fail_key, 0, now - window)
+                pipe.zcard(fail_key)
+                pipe.expire(fail_key, window)
+                _, _, count, _ = await pipe.execute()
+        except Exception as exc:
+            self._mark_redis_down(exc)
+            return False
+
+        if int(count) < max(1, settings.PROVIDER_CIRCUIT_BREAKER_FAILURES):
+            return False
+
+        cooldown = max(30, settings.PROVIDER_CIRCUIT_BREAKER_COOLDOWN_SECONDS)
+        until = now + cooldown
+        try:
+            pipe = r.pipeline()
+            # TTL outlives the cooldown by the probe grace so a late joiner's
+            # sync still sees the circuit as half-open rather than closed.
+            pipe.set(
+                _OPEN_KEY.format(provider=provider, task=task),
+                str(until),
+                ex=int(cooldown + max(1, settings.PROVIDER_SHARED_BREAKER_PROBE_TTL_SECONDS)),
+            )
+            pipe.delete(_PROBE_KEY.format(provider=provider, task=task))
+            pipe.delete(fail_key)
+            await pipe.execute()
+        except Exception as exc:
+            self._mark_redis_down(exc)
+            return False
+
+        self._open_until[key] = until
+        self._probing.pop(key, None)
+        logger.warning(
+            "provider_breaker: %s/%s OPEN for %ds (%s)",
+            provider, task, cooldown, "probe failed" if probe_failed else f"{count} failures",
+        )
+        await self._publish(r, provider, task, "open", until)
+        return True
+
+    # ── shared health cache ─────────────────────────────────────────────
+
+    async def get_health(self, provider: str) -> Optional[bool]:
+        r = await self._redis()
+        if r is None:
+            return None
+        try:
+            value = await r.get(_HEALTH_KEY.format(provider=provider))
+        except Exception as exc:
+            self._mark_redis_down(exc)
+            return None
+        if value is None:
+            return None
+        return value == "1"
+
+    async def set_health(self, provider: str, healthy: bool, ttl_seconds: int) -> None:
+        r = await self._redis()
+        if r is None:
+            return
+        try:
+            await r.set(_HEALTH_KEY.format(provider=provider), "1" if healthy else "0", ex=max(1, ttl_seconds))
+        except Exception as exc:
+            self._mark_redis_down(exc)
+
+    # ── fleet sync ──────────────────────────────────────────────────────
+
+    def apply_message(self, payload: dict) -> None:
+        provider = payload.get("provider")
+        task = payload.get("task_type")
+        if not provider or not task:
+            return
+        key = (provider, task)
+        if payload.get("state") == "open":
+            self._open_until[key] = float(payload.get("until") or 0.0)
+            if payload.get("origin") != _INSTANCE_ID:
+                self._probing.pop(key, None)
+        else:
+            self._open_until.pop(key, None)
+            self._probing.pop(key, None)
+
+    async def sync_from_redis(self) -> int:
+        """Load every open circuit into the local mirror (startup / resubscribe)."""
+        r = await self._redis()
+        if r is None:
+            return 0
+        loaded = 0
+        try:
+            async for raw_key in r.scan_iter(match=_OPEN_KEY_PATTERN, count=100):
+                value = await r.get(raw_key)
+                if value is None:
+                    continue
+                _, _, _, provider, task = raw_key.split(":", 4)
+                self._open_until[(provider, task)] = float(value)
+                loaded += 1
+        except Exception as exc:
+            self._mark_redis_down(exc)
+        return loaded
+
+    def snapshot(self) -> Dict[str, dict]:
+        now = time.time()
+        return {
+            f"{provider}/{task}": {
+                "state": "open" if now < until else "half_open",
+                "open_until": until,
+                "probing_here": (provider, task) in self._probing,
+            }
+            for (provider, task), until in self._open_until.items()
+        }
+
+
+_breaker: Optional[SharedCircuitBreaker] = None
+
+
+def get_provider_breaker() -> SharedCircuitBreaker:
+    global _breaker
+    if _breaker is None:
+        _breaker = SharedCircuitBreaker()
+    return _breaker
+
+
+async def provider_breaker_subscriber_loop(redis_client: redis.Redis) -> None:
+    """Long-running background task. Mirrors fleet breaker transitions into
+    this instance's SharedCircuitBreaker. Owned by the FastAPI lifespan —
+    cancelled on shutdown."""
+    breaker = get_provider_breaker()
+    pubsub = redis_client.pubsub()
+    try:
+        await pubsub.subscribe(STATE_CHANNEL)
+        loaded = await breaker.sync_from_redis()
+        logger.info("provider_breaker subscriber: listening on %s (%d open)", STATE_CHANNEL, loaded)
+        async for message in pubsub.listen():
+            if message.get("type") != "message":
+                continue
+            try:
+                payload = json.loads(message.get("data") or "{}")
+            except Exception:
+                continue
+            breaker.apply_message(payload)
+    except asyncio.CancelledError:
+        logger.info("provider_breaker subscriber: cancelled")
+        raise
+    except Exception as exc:
+        logger.warning("provider_breaker subscriber loop crashed: %s", exc)
+    finally:
+        try:
+            await pubsub.unsubscribe(STATE_CHANNEL)
+            await pubsub.close()
+        except Exception:  # pragma: no cover
+            pass
@@ -0,0 +1,223 @@
+"""
+Warm rembg worker pool for the local background-removal fallback.
+
+When PiAPI's remove-bg degrades, the router fails over to
+``VertexAIProvider.background_removal`` — which used to call
+``rembg.remove(image_data)`` in the default thread pool with no session, so
+every image re-resolved the ONNX model session and concurrent fallbacks
+fought over a handful of threads. Fallback throughput was bounded by model
+loading, not CPU.
+
+Here a small spawn-context process pool holds one rembg session per worker,
+created once by the worker initializer (and, with SEGMENTATION_PRELOAD, at
+app start-up). Callers ``await remove(image_bytes)``; requests go onto an
+asyncio queue and a dispatcher hands them to workers in micro-batches of up
+to SEGMENTATION_BATCH_SIZE — one batch in flight per worker, so batches form
+naturally while workers are busy (e.g. the concurrent images of
+``/tools/remove-bg/batch``) and a lone request is dispatched immediately.
+
+``stats()`` reports queue depth, batches, and per-image latency split into
+time queued and inference time in the worker.
+"""
+import asyncio
+import importlib.util
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+# =============================================================================
+# Worker side
+# =============================================================================
+
+_worker_session = None
+
+
+def _init_worker(model_name: str) -> None:
+    global _worker_session
+    from rembg import new_session
+    _worker_session = new_session(model_name)
+
+
+def _warmup() -> bool:
+    return _worker_session is not None
+
+
+def _segment_batch(images: List[bytes]) -> List[Tuple[Optional[bytes], float, Optional[str]]]:
+    """[(png_bytes | None, inference_ms, error | None)] per input image."""
+    from rembg import remove
+
+    results = []
+    for data in images:
+        started = time.perf_counter()
+        try:
+            out = remove(data, session=_worker_session)
+            results.append((out, (time.perf_counter() - started) * 1000, None))
+        except Exception as e:
+            results.append((None, (time.perf_counter() - started) * 1000, f"{type(e).__name__}: {e}"))
+    return results
+
+
+# =============================================================================
+# Pool
+# =============================================================================
+
+def rembg_installed() -> bool:
+    return importlib.util.find_spec("rembg") is not None
+
+
+class SegmentationPool:
+    def __init__(self, model: Optional[str] = None, workers: Optional[int] = None,
+                 batch_size: Optional[int] = None):
+        self.model = model or settings.SEGMENTATION_MODEL
+        self.workers = max(1, workers or settings.SEGMENTATION_WORKERS)
+        self.batch_size = max(1, batch_size or settings.SEGMENTATION_BATCH_SIZE)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._start_lock = asyncio.Lock()
+        self._in_flight = 0
+        self._stats = {"images": 0, "errors": 0, "batches": 0, "queued_ms_total": 0.0,
+                       "inference_ms_total": 0.0, "inference_ms_max": 0.0}
+
+    @property
+    def started(self) -> bool:
+        return self._dispatcher is not None and not self._dispatcher.done()
+
+    async def start(self, preload: bool = False) -> None:
+        """Create the pool and dispatcher. With ``preload`` also spawn every
+        worker now so the model is loaded before the first request."""
+        async with self._start_lock:
+            if self.started:
+                return
+            if not rembg_installed():
+                raise RuntimeError("rembg is not installed")
+            self._executor = self._create_executor()
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.workers)
+            self._dispatcher = asyncio.create_task(self._dispatch_loop())
+            logger.info("[Segmentation] Pool started: %d worker(s), model=%s", self.workers, self.model)
+        if preload:
+            loop = asyncio.get_running_loop()
+            started = time.monotonic()
+            await asyncio.gather(*(loop.run_in_executor(self._executor, _warmup) for _ in range(self.workers)))
+            logger.info("[Segmentation] Model %s preloaded in %.1fs", self.model, time.monotonic() - started)
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.model,),
+        )
+
+    async def remove(self, image_bytes: bytes) -> bytes:
+        """Cut out the foreground; returns RGBA PNG bytes. Raises on failure."""
+        await self.start()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((image_bytes, future, time.perf_counter()))
+        return await future
+
+    async def _dispatch_loop(self) -> None:
+        while True:
+            try:
+                # Wait for a free worker first, so requests that arrive while
+                # every worker is busy accumulate into the next batch.
+                await self._slots.acquire()
+                batch = [await self._queue.get()]
+                while len(batch) < self.batch_size and not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                self._in_flight += len(batch)
+                asyncio.create_task(self._run_batch(batch))
+            except asyncio.CancelledError:
+                break
+
+    async def _execute(self, images: List[bytes]) -> List[Tuple[Optional[bytes], float, Optional[str]]]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, _segment_batch, images)
+
+    async def _run_batch(self, batch: List[Tuple[bytes, asyncio.Future, float]]) -> None:
+        dispatched = time.perf_counter()
+        try:
+            results = await self._execute([data for data, _, _ in batch])
+        except Exception as e:
+            # Pool-level failure (worker crashed, rembg import failed in the
+            # initializer): fail the whole batch and rebuild the pool.
+            logger.error("[Segmentation] Batch of %d failed: %s", len(batch), e)
+            self._reset_executor()
+            results = [(None, 0.0, str(e))] * len(batch)
+        finally:
+            self._in_flight -= len(batch)
+            self._slots.release()
+
+        self._stats["batches"] += 1
+        for (_, future, enqueued), (output, inference_ms, error) in zip(batch, results):
+            self._stats["images"] += 1
+            self._stats["queued_ms_total"] += (dispatched - enqueued) * 1000
+            self._stats["inference_ms_total"] += inference_ms
+            self._stats["inference_ms_max"] = max(self._stats["inference_ms_max"], inference_ms)
+            if future.done():  # caller gave up
+                continue
+            if error is None:
+                future.set_result(output)
+            else:
+                self._stats["errors"] += 1
+                future.set_exception(RuntimeError(f"Background removal failed: {error}"))
+
+    def _reset_executor(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = self._create_executor()
+
+    def stats(self) -> Dict[str, Any]:
+        images = max(1, self._stats["images"])
+        return {
+            "started": self.started,
+            "model": self.model,
+            "workers": self.workers,
+            "batch_size": self.batch_size,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "in_flight": self._in_flight,
+            "images": self._stats["images"],
+            "errors": self._stats["errors"],
+            "batches": self._stats["batches"],
+            "avg_queued_ms": round(self._stats["queued_ms_total"] / images, 1),
+            "avg_inference_ms": round(self._stats["inference_ms_total"] / images, 1),
+            "max_inference_ms": round(self._stats["inference_ms_max"], 1),
+        }
+
+    async def shutdown(self) -> None:
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            try:
+                await self._dispatcher
+            except asyncio.CancelledError:
+                pass
+            self._dispatcher = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+_segmentation_pool: Optional[SegmentationPool] = None
+
+
+def get_segmentation_pool() -> SegmentationPool:
+    global _segmentation_pool
+    if _segmentation_pool is None:
+        _segmentation_pool = SegmentationPool()
+    return _segmentation_pool
+
+
+async def shutdown_segmentation_pool() -> None:
+    global _segmentation_pool
+    if _segmentation_pool is not None:
+        await _segmentation_pool.shutdown()
+        _segmentation_pool = None
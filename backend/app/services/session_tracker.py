@@ -6,7 +6,19 @@ Tracks:
 - Online users in real-time (via heartbeat)
 - Users by subscription tier
 - Active users today (HyperLogLog)
+
+A heartbeat is ONE Redis round-trip: a Lua script updates the user's
+last-seen score, plan and the per-tier counters atomically and returns the
+online count. Expiry is no longer done on the heartbeat path — a sweeper
+(session_sweeper_loop, started by the FastAPI lifespan) runs every
+SWEEP_INTERVAL seconds on whichever instance wins a short Redis lock.
+
+Invariant kept by both scripts: online_users_by_tier[plan] equals the number
+of online_users members whose user_plans entry is ``plan``. The old
+read-modify-write across separate commands let concurrent heartbeats and
+cleanups double-count or double-decrement a tier.
 """
+import asyncio
 import logging
 from typing import Optional, Dict, Any, List
 from datetime import datetime, timedelta
@@ -21,8 +33,55 @@ USER_PLANS_KEY = "user_plans"  # Hash: {user_id: plan}
 ONLINE_BY_TIER_KEY = "online_users_by_tier"  # Hash: {plan: count}
 ACTIVE_USERS_TODAY_KEY = "active_users_today"  # HyperLogLog
 
+SWEEPER_LOCK_KEY = "online_users:sweeper_lock"
+
 # Session timeout in seconds (5 minutes)
 SESSION_TIMEOUT = 300
+# Expired-session sweep cadence, and members removed per script call.
+SWEEP_INTERVAL = 60
+SWEEP_BATCH = 500
+# HyperLogLog retention (2 days to allow cross-day queries)
+ACTIVE_TODAY_TTL = 172800
+
+# KEYS: online_users, user_plans, online_users_by_tier, active_users_today:<date>
+# ARGV: user_id, plan, now, cutoff, hll_ttl
+# Returns the number of users seen since ``cutoff``.
+_HEARTBEAT_LUA = """
+local user, plan = ARGV[1], ARGV[2]
+local was_online = redis.call('ZSCORE', KEYS[1], user)
+local prev_plan = redis.call('HGET', KEYS[2], user)
+if not was_online or prev_plan ~= plan then
+  if was_online and prev_plan then
+    if redis.call('HINCRBY', KEYS[3], prev_plan, -1) <= 0 then
+      redis.call('HDEL', KEYS[3], prev_plan)
+    end
+  end
+  redis.call('HINCRBY', KEYS[3], plan, 1)
+end
+redis.call('ZADD', KEYS[1], ARGV[3], user)
+redis.call('HSET', KEYS[2], user, plan)
+redis.call('PFADD', KEYS[4], user)
+redis.call('EXPIRE', KEYS[4], ARGV[5])
+return redis.call('ZCOUNT', KEYS[1], '(' .. ARGV[4], '+inf')
+"""
+
+# KEYS: online_users, user_plans, online_users_by_tier
+# ARGV: cutoff, batch
+# Returns the number of sessions removed (at most ``batch``).
+_SWEEP_LUA = """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+for _, user in ipairs(expired) do
+  local plan = redis.call('HGET', KEYS[2], user)
+  if plan then
+    if redis.call('HINCRBY', KEYS[3], plan, -1) <= 0 then
+      redis.call('HDEL', KEYS[3], plan)
+    end
+    redis.call('HDEL', KEYS[2], user)
+  end
+  redis.call('ZREM', KEYS[1], user)
+end
+return #expired
+"""
 
 
 class SessionTracker:
@@ -38,6 +97,8 @@ class SessionTracker:
 
     def __init__(self):
         self.redis: Optional[redis.Redis] = None
+        self._heartbeat_script = None
+        self._sweep_script = None
 
     async def init_redis(self):
         """Initialize Redis connection"""
@@ -47,6 +108,11 @@ class SessionTracker:
                 encoding="utf-8",
                 decode_responses=True
             )
+            self._heartbeat_script = self.redis.register_script(_HEARTBEAT_LUA)
+            self._sweep_script = self.redis.register_script(_SWEEP_LUA)
+
+    def _cutoff(self) -> float:
+        return datetime.utcnow().timestamp() - SESSION_TIMEOUT
 
     async def heartbeat(
         self,
@@ -69,39 +135,16 @@ class SessionTracker:
         await self.init_redis()
 
         try:
-            await self.cleanup_expired()
-
             now = datetime.utcnow()
             timestamp = now.timestamp()
-
-            # Get previous plan for this user (if any)
-            prev_plan = await self.redis.hget(USER_PLANS_KEY, user_id)
-
-            # Check if user was already online
-            was_online = await self.redis.zscore(ONLINE_USERS_KEY, user_id) is not None
-
-            # Update user's last heartbeat in sorted set
-            await self.redis.zadd(ONLINE_USERS_KEY, {user_id: timestamp})
-
-            # Update user's plan in hash
-            await self.redis.hset(USER_PLANS_KEY, user_id, plan)
-
-            # Update tier counts if plan changed or user just came online
-            if not was_online or prev_plan != plan:
-                # Decrement old tier count
-                if was_online and prev_plan:
-                    await self.redis.hincrby(ONLINE_BY_TIER_KEY, prev_plan, -1)
-                # Increment new tier count
-                await self.redis.hincrby(ONLINE_BY_TIER_KEY, plan, 1)
-
-            # Add to today's active users (HyperLogLog)
             today_key = f"{ACTIVE_USERS_TODAY_KEY}:{now.strftime('%Y-%m-%d')}"
-            await self.redis.pfadd(today_key, user_id)
-            # Set expiry for HyperLogLog (2 days to allow cross-day queries)
-            await self.redis.expire(today_key, 172800)
 
-            # Get current online count
-            online_count = await self.redis.zcard(ONLINE_USERS_KEY)
+            # One atomic round-trip: last-seen, plan, tier counts, today's
+            # HyperLogLog, and the current online count.
+            online_count = await self._heartbeat_script(
+                keys=[ONLINE_USERS_KEY, USER_PLANS_KEY, ONLINE_BY_TIER_KEY, today_key],
+                args=[user_id, plan, timestamp, timestamp - SESSION_TIMEOUT, ACTIVE_TODAY_TTL],
+            )
 
             return {
                 "success": True,
@@ -116,7 +159,8 @@ class SessionTracker:
     async def cleanup_expired(self) -> int:
         """
         Remove expired sessions (users who haven't sent heartbeat).
-        Should be called periodically (every minute).
+        Run by session_sweeper_loop every SWEEP_INTERVAL seconds; each
+        script call handles SWEEP_BATCH users so Redis is never blocked long.
 
         Returns:
             Number of sessions removed
@@ -124,33 +168,19 @@ class SessionTracker:
         await self.init_redis()
 
         try:
-            cutoff = datetime.utcnow().timestamp() - SESSION_TIMEOUT
-
-            # Get expired user IDs
-            expired_users = await self.redis.zrangebyscore(
-                ONLINE_USERS_KEY,
-                "-inf",
-                cutoff
-            )
-
-            if not expired_users:
-                return 0
-
-            # Decrement tier counts for expired users
-            for user_id in expired_users:
-                plan = await self.redis.hget(USER_PLANS_KEY, user_id)
-                if plan:
-                    await self.redis.hincrby(ONLINE_BY_TIER_KEY, plan, -1)
-                    await self.redis.hdel(USER_PLANS_KEY, user_id)
-
-            # Remove expired users from sorted set
-            removed = await self.redis.zremrangebyscore(
-                ONLINE_USERS_KEY,
-                "-inf",
-                cutoff
-            )
-
-            logger.info(f"Cleaned up {removed} expired sessions")
+            cutoff = self._cutoff()
+            removed = 0
+            while True:
+                batch = await self._sweep_script(
+                    keys=[ONLINE_USERS_KEY, USER_PLANS_KEY, ONLINE_BY_TIER_KEY],
+                    args=[cutoff, SWEEP_BATCH],
+                )
+                removed += int(batch)
+                if int(batch) < SWEEP_BATCH:
+                    break
+
+            if removed:
+                logger.info(f"Cleaned up {removed} expired sessions")
             return removed
 
         except Exception as e:
@@ -161,8 +191,8 @@ class SessionTracker:
         """Get total number of online users"""
         await self.init_redis()
         try:
-            await self.cleanup_expired()
-            return await self.redis.zcard(ONLINE_USERS_KEY)
+            # Count by score rather than sweeping on the read path.
+            return await self.redis.zcount(ONLINE_USERS_KEY, f"({self._cutoff()}", "+inf")
         except Exception as e:
             logger.error(f"Get online count error: {e}")
             return 0
@@ -200,18 +230,21 @@ class SessionTracker:
         """
         await self.init_redis()
         try:
-            await self.cleanup_expired()
-            # Get users sorted by most recent heartbeat
-            users_with_scores = await self.redis.zrevrange(
+            # Get users sorted by most recent heartbeat (unexpired only)
+            users_with_scores = await self.redis.zrevrangebyscore(
                 ONLINE_USERS_KEY,
-                0,
-                limit - 1,
+                "+inf",
+                f"({self._cutoff()}",
+                start=0,
+                num=limit,
                 withscores=True
             )
+            if not users_with_scores:
+                return []
 
+            plans = await self.redis.hmget(USER_PLANS_KEY, [user_id for user_id, _ in users_with_scores])
             result = []
-            for user_id, timestamp in users_with_scores:
-                plan = await self.redis.hget(USER_PLANS_KEY, user_id)
+            for (user_id, timestamp), plan in zip(users_with_scores, plans):
                 result.append({
                     "user_id": user_id,
                     "plan": plan or "demo",
@@ -232,8 +265,7 @@ class SessionTracker:
             if score is None:
                 return False
             # Check if not expired
-            cutoff = datetime.utcnow().timestamp() - SESSION_TIMEOUT
-            return score > cutoff
+            return score > self._cutoff()
         except Exception as e:
             logger.error(f"Is user online error: {e}")
             return False
@@ -242,7 +274,6 @@ class SessionTracker:
         """Get comprehensive session statistics"""
         await self.init_redis()
         try:
-            await self.cleanup_expired()
             online_count = await self.get_online_count()
             by_tier = await self.get_online_by_tier()
             active_today = await self.get_active_today()
@@ -265,3 +296,21 @@ class SessionTracker:
 
 # Singleton instance
 session_tracker = SessionTracker()
+
+
+async def session_sweeper_loop() -> None:
+    """Long-running background task. Every SWEEP_INTERVAL seconds, the
+    instance that wins SWEEPER_LOCK_KEY removes expired sessions; the others
+    skip that round. Owned by the FastAPI lifespan — cancelled on shutdown."""
+    while True:
+        try:
+            await asyncio.sleep(SWEEP_INTERVAL)
+            await session_tracker.init_redis()
+            # The lock expires before the next round, so a dead winner never
+            # stalls the sweep.
+            if await session_tracker.redis.set(SWEEPER_LOCK_KEY, "1", nx=True, ex=max(1, int(SWEEP_INTERVAL) - 5)):
+                await session_tracker.cleanup_expired()
+        except asyncio.CancelledError:
+            break
+        except Exception as e:
+            logger.error(f"Session sweeper error: {e}")
@@ -0,0 +1,178 @@
+"""
+Two-level cache for V4 signed GCS URLs, plus an async credentials refresher
+for the IAM signBlob signing path.
+
+GCSStorageService used to keep a plain dict that was ``.clear()``-ed when it
+reached 10,000 entries. After a wipe, a gallery page re-signed hundreds of
+URLs in a row, and on Cloud Run each signature ran ``google.auth.default()``
+plus a blocking ``creds.refresh()`` inside the request handler.
+
+- **L1** (``SignedUrlLRU``) is a per-process LRU. An entry expires at its own
+  deadline. When the cache is full, expired entries are evicted before live
+  ones, oldest first.
+- **L2** is Redis (``vidgo:signed_url:<sha1>``), shared by every instance, so
+  a cold instance reuses signatures a warm one already paid for. It is
+  best-effort: any Redis error counts as a miss.
+- **IamSigner** keeps one credentials object and refreshes its token in a
+  worker thread, single-flight, only when the token is near expiry. All
+  concurrent signers share the token.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+REDIS_KEY_PREFIX = "vidgo:signed_url:"
+
+
+class SignedUrlLRU:
+    """Thread-safe LRU of ``key -> (expires_at_monotonic, url)``."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max(1, max_entries)
+        self._data: "OrderedDict[tuple, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: tuple, now: Optional[float] = None) -> Optional[str]:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= now:
+                del self._data[key]
+                self.expirations += 1
+                return None
+            self._data.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: tuple, url: str, ttl: float, now: Optional[float] = None) -> None:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._data[key] = (now + ttl, url)
+            self._data.move_to_end(key)
+            if len(self._data) > self.max_entries:
+                self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        # Expired entries go first, wherever they sit in recency order.
+        for key in [k for k, (exp, _) in self._data.items() if exp <= now]:
+            del self._data[key]
+            self.expirations += 1
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def redis_key(cache_key: tuple) -> str:
+    digest = hashlib.sha1(repr(cache_key).encode("utf-8")).hexdigest()
+    return f"{REDIS_KEY_PREFIX}{digest}"
+
+
+async def redis_get_many(keys: List[tuple]) -> Dict[tuple, str]:
+    """L2 lookup. Returns only the hits; fails open to ``{}``."""
+    if not keys:
+        return {}
+    try:
+        from app.api.deps import get_redis
+        redis = await get_redis()
+        values = await redis.mget([redis_key(k) for k in keys])
+    except Exception as e:
+        logger.debug("[SignedURL] Redis read failed: %s", e)
+        return {}
+    return {k: v for k, v in zip(keys, values) if v}
+
+
+async def redis_set_many(items: Iterable[Tuple[tuple, str]], ttl: int) -> None:
+    items = list(items)
+    if not items:
+        return
+    try:
+        from app.api.deps import get_redis
+        redis = await get_redis()
+        pipe = redis.pipeline(transaction=False)
+        for key, url in items:
+            pipe.set(redis_key(key), url, ex=ttl)
+        await pipe.execute()
+    except Exception as e:
+        logger.debug("[SignedURL] Redis write failed: %s", e)
+
+
+class IamSigner:
+    """Credentials for IAM signBlob signing (Cloud Run metadata credentials
+    can't sign locally). Loaded once; the token is refreshed when it is
+    within ``REFRESH_MARGIN`` of expiry."""
+
+    REFRESH_MARGIN = 300  # seconds
+
+    def __init__(self):
+        self._creds = None
+        self._lock = threading.Lock()
+        self._async_lock: Optional[asyncio.Lock] = None
+        self._async_lock_loop = None
+        self.refreshes = 0
+
+    def _needs_refresh(self) -> bool:
+        creds = self._creds
+        if creds is None or not getattr(creds, "token", None):
+            return True
+        expiry = getattr(creds, "expiry", None)
+        if expiry is None:
+            return False
+        if expiry.tzinfo is None:  # google-auth uses naive UTC
+            expiry = expiry.replace(tzinfo=timezone.utc)
+        return (expiry - datetime.now(timezone.utc)).total_seconds() < self.REFRESH_MARGIN
+
+    def _refresh_blocking(self) -> None:
+        with self._lock:
+            if not self._needs_refresh():
+                return
+            import google.auth
+            from google.auth.transport.requests import Request as AuthRequest
+
+            if self._creds is None:
+                self._creds, _ = google.auth.default(
+                    scopes=["https://www.googleapis.com/auth/cloud-platform"]
+                )
+            self._creds.refresh(AuthRequest())
+            self.refreshes += 1
+
+    def _identity(self) -> Tuple[str, str]:
+        sa_email = (
+            getattr(self._creds, "service_account_email", None)
+            or os.getenv("GCS_SIGNER_SERVICE_ACCOUNT")
+        )
+        if not sa_email:
+            raise RuntimeError("No service account available for IAM URL signing")
+        return sa_email, self._creds.token
+
+    def credentials_blocking(self) -> Tuple[str, str]:
+        """(service_account_email, access_token) for sync callers."""
+        if self._needs_refresh():
+            self._refresh_blocking()
+        return self._identity()
+
+    async def credentials(self) -> Tuple[str, str]:
+        """(service_account_email, access_token); refresh runs in a thread
+        and concurrent callers wait on the same refresh."""
+        if self._needs_refresh():
+            loop = asyncio.get_running_loop()
+            if self._async_lock is None or self._async_lock_loop is not loop:
+                self._async_lock = asyncio.Lock()
+                self._async_lock_loop = loop
+            async with self._async_lock:
+                if self._needs_refresh():
+                    await asyncio.to_thread(self._refresh_blocking)
+        return self._identity()
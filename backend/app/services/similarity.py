@@ -2,14 +2,28 @@
 Prompt Similarity Service
 Finds similar cached prompts to reuse generation results and save credits.
 Uses cosine similarity on text embeddings.
+
+Semantic lookups run against an in-process ``EmbeddingIndex``: every
+completed PromptCache embedding held as one contiguous float32 matrix with
+L2-normalised rows, so a lookup is a single matrix-vector product plus a
+top-k partition. The previous implementation scored only the top 100 rows
+by usage_count in a pure-Python loop, so anything outside that window could
+never be matched. Set SIMILARITY_INDEX_BACKEND=pgvector (or auto) to push
+the scoring into Postgres when the ``vector`` extension is installed.
 """
+import asyncio
 import logging
 import hashlib
 import math
+import time
 from typing import Optional, Dict, Any, List, Tuple
+from uuid import UUID
+
+import numpy as np
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
+from sqlalchemy import select, and_, text, update
 
+from app.core.config import settings
 from app.models.demo import PromptCache
 from app.services.gemini_service import get_gemini_service
 
@@ -62,6 +76,151 @@ def generate_prompt_hash(prompt: str) -> str:
     return hashlib.sha256(normalized.encode()).hexdigest()
 
 
+def _active_embedding_filter():
+    return and_(
+        PromptCache.prompt_embedding.isnot(None),
+        PromptCache.is_active == True,
+        PromptCache.status == "completed",
+        PromptCache.image_url.isnot(None),
+    )
+
+
+class EmbeddingIndex:
+    """
+    Per-process matrix of PromptCache embeddings for top-k cosine search.
+
+    Rows are L2-normalised on insert so cosine similarity is a plain dot
+    product. Storage grows by doubling so ``add`` (called from
+    cache_generation_result) is amortised O(d). Rows written by OTHER
+    instances are picked up by an incremental ``created_at`` sweep every
+    SIMILARITY_INDEX_REFRESH_SECONDS; deactivated rows are dropped lazily
+    when a lookup re-validates its candidate against the DB.
+    """
+
+    # Full rebuild cadence — catches embeddings re-written in place by
+    # cache_generation_result's update branch on another instance.
+    FULL_REBUILD_SECONDS = 3600.0
+
+    def __init__(self):
+        self._reset()
+        self._refreshed_at = 0.0
+        self._rebuilt_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def _reset(self) -> None:
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._matrix: Optional[np.ndarray] = None
+        self._size = 0
+        self._dim: Optional[int] = None
+        self._watermark = None  # max created_at seen by the last sweep
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @staticmethod
+    def _normalize(vec) -> Optional[np.ndarray]:
+        arr = np.asarray(vec, dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(arr))
+        if arr.size == 0 or norm == 0.0 or not np.isfinite(norm):
+            return None
+        return arr / norm
+
+    def add(self, cache_id: str, embedding: List[float]) -> bool:
+        """Insert or overwrite one row. Returns False for unusable vectors."""
+        vec = self._normalize(embedding)
+        if vec is None:
+            return False
+        if self._dim is None:
+            self._dim = vec.shape[0]
+            self._matrix = np.empty((64, self._dim), dtype=np.float32)
+        elif vec.shape[0] != self._dim:
+            return False
+
+        row = self._rows.get(cache_id)
+        if row is None:
+            if self._size == self._matrix.shape[0]:
+                grown = np.empty((self._matrix.shape[0] * 2, self._dim), dtype=np.float32)
+                grown[: self._size] = self._matrix[: self._size]
+                self._matrix = grown
+            row = self._size
+            self._size += 1
+            self._ids.append(cache_id)
+            self._rows[cache_id] = row
+        self._matrix[row] = vec
+        return True
+
+    def remove(self, cache_id: str) -> None:
+        """Swap-remove a row so the live block stays contiguous."""
+        row = self._rows.pop(cache_id, None)
+        if row is None:
+            return
+        last = self._size - 1
+        if row != last:
+            moved = self._ids[last]
+            self._matrix[row] = self._matrix[last]
+            self._ids[row] = moved
+            self._rows[moved] = row
+        self._ids.pop()
+        self._size = last
+
+    def top_k(self, query: List[float], k: int = 10) -> List[Tuple[str, float]]:
+        """Best ``k`` (cache_id, cosine) pairs, highest first."""
+        if not self._size:
+            return []
+        q = self._normalize(query)
+        if q is None or q.shape[0] != self._dim:
+            return []
+        scores = self._matrix[: self._size] @ q
+        k = min(k, self._size)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self._ids[i], float(scores[i])) for i in top]
+
+    async def ensure_fresh(self, db: AsyncSession) -> None:
+        """Load (first call), rebuild (hourly) or sweep new rows (periodic)."""
+        now = time.monotonic()
+        if now - self._refreshed_at < settings.SIMILARITY_INDEX_REFRESH_SECONDS:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            if now - self._refreshed_at < settings.SIMILARITY_INDEX_REFRESH_SECONDS:
+                return
+            full = not self._rebuilt_at or now - self._rebuilt_at >= self.FULL_REBUILD_SECONDS
+            try:
+                await self._load(db, full=full)
+            except Exception as e:
+                logger.warning(f"Embedding index refresh failed (serving stale index): {e}")
+            # Back off on failure too — don't hammer a struggling DB per request.
+            self._refreshed_at = now
+            if full:
+                self._rebuilt_at = now
+
+    async def _load(self, db: AsyncSession, full: bool) -> None:
+        stmt = select(PromptCache.id, PromptCache.prompt_embedding, PromptCache.created_at).where(
+            _active_embedding_filter()
+        )
+        if full:
+            stmt = stmt.order_by(PromptCache.usage_count.desc()).limit(settings.SIMILARITY_INDEX_MAX_ROWS)
+        elif self._watermark is not None:
+            stmt = stmt.where(PromptCache.created_at > self._watermark)
+        rows = (await db.execute(stmt)).all()
+
+        if full:
+            self._reset()
+        added = 0
+        for cache_id, embedding, created_at in rows:
+            if len(self._rows) >= settings.SIMILARITY_INDEX_MAX_ROWS:
+                break
+            if embedding and self.add(str(cache_id), embedding):
+                added += 1
+            if created_at is not None and (self._watermark is None or created_at > self._watermark):
+                self._watermark = created_at
+        logger.info(
+            f"Embedding index {'rebuilt' if full else 'swept'}: +{added} rows, {len(self)} total"
+        )
+
+
 class SimilarityService:
     """
     Service for finding similar prompts in cache.
@@ -73,6 +232,9 @@ class SimilarityService:
     def __init__(self, threshold: float = SIMILARITY_THRESHOLD):
         self.threshold = threshold
         self.gemini = get_gemini_service()
+        self.index = EmbeddingIndex()
+        # None = not probed yet; resolved once per process for backend=auto.
+        self._pgvector_available: Optional[bool] = None
 
     async def find_similar_prompt(
         self,
@@ -159,39 +321,35 @@ class SimilarityService:
         """
         Find similar prompts by embedding similarity.
 
-        We load recent cached prompts and compute similarity in Python.
-        For larger datasets, consider using pgvector extension.
+        Scores the whole cache (up to SIMILARITY_INDEX_MAX_ROWS) via the
+        in-process EmbeddingIndex, or via pgvector when that backend is
+        selected. The best candidates above threshold are re-validated
+        against the DB so a row deactivated elsewhere is never served.
         """
-        # Get recent cached prompts with embeddings
-        result = await db.execute(
-            select(PromptCache).where(
-                and_(
-                    PromptCache.prompt_embedding.isnot(None),
-                    PromptCache.is_active == True,
-                    PromptCache.status == "completed",
-                    PromptCache.image_url.isnot(None)
-                )
-            ).order_by(PromptCache.usage_count.desc()).limit(100)
-        )
-        cached_prompts = result.scalars().all()
-
-        best_match = None
-        best_similarity = 0.0
-
-        for cached in cached_prompts:
-            if cached.prompt_embedding:
-                # Calculate similarity
-                similarity = calculate_cosine_similarity(
-                    query_embedding,
-                    cached.prompt_embedding
-                )
-
-                if similarity > best_similarity:
-                    best_similarity = similarity
-                    best_match = cached
+        candidates = None
+        if await self._use_pgvector(db):
+            try:
+                candidates = await self._top_k_pgvector(query_embedding, db, limit)
+            except Exception as e:
+                logger.warning(f"pgvector similarity query failed, using in-process index: {e}")
+                await db.rollback()
+        if candidates is None:
+            await self.index.ensure_fresh(db)
+            candidates = self.index.top_k(query_embedding, limit)
+
+        for cache_id, similarity in candidates:
+            if similarity < self.threshold:
+                break
+            best_match = await db.get(PromptCache, UUID(cache_id))
+            if (
+                best_match is None
+                or not best_match.is_active
+                or best_match.status != "completed"
+                or not best_match.image_url
+            ):
+                self.index.remove(cache_id)
+                continue
 
-        # Check if best match exceeds threshold
-        if best_match and best_similarity >= self.threshold:
             # Update usage count
             best_match.usage_count += 1
             await db.commit()
@@ -199,7 +357,7 @@ class SimilarityService:
             return {
                 "found": True,
                 "exact_match": False,
-                "similarity": best_similarity,
+                "similarity": similarity,
                 "cached_id": str(best_match.id),
                 "prompt_original": best_match.prompt_original,
                 "prompt_enhanced": best_match.prompt_enhanced,
@@ -210,6 +368,52 @@ class SimilarityService:
 
         return None
 
+    async def _use_pgvector(self, db: AsyncSession) -> bool:
+        backend = (settings.SIMILARITY_INDEX_BACKEND or "numpy").lower()
+        if backend == "numpy":
+            return False
+        if self._pgvector_available is None:
+            try:
+                found = await db.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'vector'"))
+                self._pgvector_available = found.scalar() is not None
+            except Exception as e:
+                logger.warning(f"pgvector probe failed: {e}")
+                await db.rollback()
+                self._pgvector_available = False
+            if not self._pgvector_available:
+                logger.info("pgvector extension not installed — using in-process embedding index")
+        return self._pgvector_available
+
+    async def _top_k_pgvector(
+        self,
+        query_embedding: List[float],
+        db: AsyncSession,
+        limit: int,
+    ) -> List[Tuple[str, float]]:
+        """Cosine top-k in Postgres. prompt_embedding is JSONB, whose text
+        form ('[0.1, 0.2, ...]') is valid pgvector input, so no schema
+        change is needed; an expression HNSW index on the same cast makes it
+        an ANN lookup."""
+        literal = "[" + ",".join(f"{float(x):.7g}" for x in query_embedding) + "]"
+        result = await db.execute(
+            text(
+                """
+                SELECT id::text,
+                       1 - ((prompt_embedding::text)::vector <=> CAST(:q AS vector)) AS similarity
+                FROM prompt_cache
+                WHERE prompt_embedding IS NOT NULL
+                  AND is_active = true
+                  AND status = 'completed'
+                  AND image_url IS NOT NULL
+                  AND jsonb_array_length(prompt_embedding) = :dim
+                ORDER BY (prompt_embedding::text)::vector <=> CAST(:q AS vector)
+                LIMIT :k
+                """
+            ),
+            {"q": literal, "dim": len(query_embedding), "k": limit},
+        )
+        return [(row[0], float(row[1])) for row in result.all()]
+
     async def cache_generation_result(
         self,
         prompt: str,
@@ -256,6 +460,8 @@ class SimilarityService:
             cached.prompt_embedding = embedding
             cached.status = "completed"
             await db.commit()
+            if embedding:
+                self.index.add(str(cached.id), embedding)
 
             return {
                 "success": True,
@@ -281,6 +487,8 @@ class SimilarityService:
         db.add(new_cache)
         await db.commit()
         await db.refresh(new_cache)
+        if embedding:
+            self.index.add(str(new_cache.id), embedding)
 
         return {
             "success": True,
@@ -288,6 +496,70 @@ class SimilarityService:
             "is_update": False
         }
 
+    async def backfill_embeddings(
+        self,
+        db: AsyncSession,
+        chunk_size: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> Dict[str, int]:
+        """
+        Embed PromptCache rows that have no prompt_embedding yet.
+
+        Walks the rows in id order, CHUNK rows per transaction; each chunk's
+        prompts go through the embedding batcher (batched requests, cached
+        vectors reused) and are written back with one bulk UPDATE. Rows whose
+        embedding fails are left NULL for the next run.
+        """
+        chunk_size = max(1, chunk_size or settings.EMBEDDING_BACKFILL_CHUNK_SIZE)
+        stats = {"scanned": 0, "embedded": 0, "failed": 0, "chunks": 0}
+        after = None
+        while limit is None or stats["scanned"] < limit:
+            n = chunk_size if limit is None else min(chunk_size, limit - stats["scanned"])
+            stmt = (
+                select(
+                    PromptCache.id,
+                    PromptCache.prompt_normalized,
+                    PromptCache.is_active,
+                    PromptCache.status,
+                    PromptCache.image_url,
+                )
+                .where(PromptCache.prompt_embedding.is_(None))
+                .order_by(PromptCache.id)
+                .limit(n)
+            )
+            if after is not None:
+                stmt = stmt.where(PromptCache.id > after)
+            rows = (await db.execute(stmt)).all()
+            if not rows:
+                break
+            after = rows[-1][0]
+            stats["scanned"] += len(rows)
+            stats["chunks"] += 1
+
+            results = await asyncio.gather(*(self.gemini.get_embedding(row[1]) for row in rows))
+            updates, indexable = [], []
+            for row, result in zip(rows, results):
+                embedding = result.get("embedding") if result.get("success") else None
+                if not embedding:
+                    stats["failed"] += 1
+                    continue
+                updates.append({"id": row[0], "prompt_embedding": embedding})
+                if row[2] and row[3] == "completed" and row[4]:
+                    indexable.append((str(row[0]), embedding))
+            if updates:
+                await db.execute(update(PromptCache), updates)
+            await db.commit()
+            stats["embedded"] += len(updates)
+            for cache_id, embedding in indexable:
+                self.index.add(cache_id, embedding)
+            logger.info(
+                f"Embedding backfill chunk {stats['chunks']}: "
+                f"{len(updates)}/{len(rows)} embedded"
+            )
+            if len(rows) < n:
+                break
+        return stats
+
 
 # Singleton instance
 _similarity_service: Optional[SimilarityService] = None
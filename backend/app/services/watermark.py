@@ -7,18 +7,124 @@ import logging
 from typing import Optional, Tuple
 from pathlib import Path
 import tempfile
-import subprocess
 import shutil
 import httpx
+from functools import lru_cache
 from PIL import Image, ImageDraw, ImageFont
 
+from app.services.ffmpeg_runner import cached_ffmpeg_available, ffmpeg_available, run_ffmpeg
+from app.services.image_engine import get_image_engine
+
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=16)
+def _load_font(size: int) -> "ImageFont.ImageFont":
+    # Try to use a nice font, fall back to default
+    try:
+        return ImageFont.truetype("arial.ttf", size)
+    except OSError:
+        try:
+            return ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", size)
+        except OSError:
+            return ImageFont.load_default()
+
+
+def render_text_watermark(
+    image_data: bytes,
+    watermark_text: str,
+    *,
+    font_size: int = 24,
+    opacity: float = 0.7,
+    position: str = "bottom_right",
+) -> Optional[bytes]:
+    """Draw a shadowed text watermark onto image bytes; returns PNG bytes or
+    None on error. Pure (no service state) so it runs in image-engine
+    worker processes."""
+    try:
+        # Open image
+        image = Image.open(io.BytesIO(image_data)).convert("RGBA")
+        width, height = image.size
+
+        # Create watermark overlay
+        watermark = Image.new("RGBA", image.size, (0, 0, 0, 0))
+        draw = ImageDraw.Draw(watermark)
+        font = _load_font(font_size)
+
+        # Get text size
+        bbox = draw.textbbox((0, 0), watermark_text, font=font)
+        text_width = bbox[2] - bbox[0]
+        text_height = bbox[3] - bbox[1]
+
+        # Calculate position
+        padding = 20
+        positions = {
+            "top_left": (padding, padding),
+            "top_right": (width - text_width - padding, padding),
+            "bottom_left": (padding, height - text_height - padding),
+            "bottom_right": (width - text_width - padding, height - text_height - padding),
+            "center": ((width - text_width) // 2, (height - text_height) // 2),
+        }
+        x, y = positions.get(position, positions["bottom_right"])
+
+        # Draw shadow for better visibility
+        shadow_offset = 2
+        shadow_color = (0, 0, 0, int(255 * opacity * 0.7))
+        draw.text((x + shadow_offset, y + shadow_offset), watermark_text, font=font, fill=shadow_color)
+
+        # Draw text
+        text_color = (255, 255, 255, int(255 * opacity))
+        draw.text((x, y), watermark_text, font=font, fill=text_color)
+
+        # Composite watermark onto image, convert back to RGB for saving
+        watermarked_rgb = Image.alpha_composite(image, watermark).convert("RGB")
+        output = io.BytesIO()
+        watermarked_rgb.save(output, format="PNG", quality=95)
+        return output.getvalue()
+
+    except Exception as e:
+        logger.error(f"Error adding image watermark: {e}")
+        return None
+
+
+def overlay_logo(
+    base_rgba: "Image.Image",
+    logo_rgba: "Image.Image",
+    *,
+    opacity: float = 0.7,
+    position: str = "bottom_right",
+) -> "Image.Image":
+    """Composite the logo onto the base image at ``position``, scaled to ~18%
+    of the base width and faded to ``opacity``."""
+    bw, bh = base_rgba.size
+    target_w = max(1, int(bw * 0.18))
+    scale = target_w / logo_rgba.width
+    logo = logo_rgba.resize((target_w, max(1, int(logo_rgba.height * scale))))
+
+    # Apply opacity by scaling the logo's alpha channel.
+    if opacity < 1.0:
+        alpha = logo.split()[3].point(lambda a: int(a * opacity))
+        logo.putalpha(alpha)
+
+    lw, lh = logo.size
+    pad = max(12, int(bw * 0.02))
+    positions = {
+        "top_left": (pad, pad),
+        "top_right": (bw - lw - pad, pad),
+        "bottom_left": (pad, bh - lh - pad),
+        "bottom_right": (bw - lw - pad, bh - lh - pad),
+        "center": ((bw - lw) // 2, (bh - lh) // 2),
+    }
+    x, y = positions.get(position, positions["bottom_right"])
+    overlay = Image.new("RGBA", base_rgba.size, (0, 0, 0, 0))
+    overlay.paste(logo, (x, y), logo)
+    return Image.alpha_composite(base_rgba, overlay)
+
+
 class WatermarkService:
     """
     Service for adding watermarks to videos.
-    Uses FFmpeg for video processing.
+    Uses FFmpeg for video processing (via the shared ffmpeg_runner).
     """
 
     def __init__(
@@ -34,21 +140,13 @@ class WatermarkService:
         self.font_size = font_size
         self.opacity = opacity
         self.position = position
-        self._ffmpeg_available = self._check_ffmpeg()
 
-    def _check_ffmpeg(self) -> bool:
-        """Check if FFmpeg is available"""
-        try:
-            result = subprocess.run(
-                ["ffmpeg", "-version"],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            return result.returncode == 0
-        except (subprocess.SubprocessError, FileNotFoundError):
-            logger.warning("FFmpeg not found. Watermarking will be disabled.")
-            return False
+    @staticmethod
+    def _log_progress(progress) -> None:
+        if progress.done:
+            logger.debug(f"[watermark] ffmpeg finished {progress.out_time_s:.1f}s of video")
+        else:
+            logger.debug(f"[watermark] ffmpeg at {progress.out_time_s:.1f}s (speed {progress.speed}x)")
 
     def _get_position_filter(self, video_width: int = 1280, video_height: int = 720) -> str:
         """Get FFmpeg position filter string based on position setting"""
@@ -81,7 +179,7 @@ class WatermarkService:
         Returns:
             Tuple of (success, message)
         """
-        if not self._ffmpeg_available:
+        if not await ffmpeg_available():
             return False, "FFmpeg not available"
 
         text = custom_text or self.watermark_text
@@ -98,7 +196,7 @@ class WatermarkService:
         )
 
         try:
-            result = subprocess.run(
+            result = await run_ffmpeg(
                 [
                     "ffmpeg", "-y",
                     "-i", input_path,
@@ -107,19 +205,17 @@ class WatermarkService:
                     "-preset", "fast",
                     output_path
                 ],
-                capture_output=True,
-                text=True,
-                timeout=120  # 2 minute timeout
+                timeout=120,  # 2 minute timeout
+                on_progress=self._log_progress,
             )
 
-            if result.returncode == 0:
+            if result.ok:
                 return True, "Watermark added successfully"
-            else:
-                logger.error(f"FFmpeg error: {result.stderr}")
-                return False, f"FFmpeg error: {result.stderr[:200]}"
+            if result.timed_out:
+                return False, "Watermarking timed out"
+            logger.error(f"FFmpeg error: {result.detail()}")
+            return False, f"FFmpeg error: {result.detail(200)}"
 
-        except subprocess.TimeoutExpired:
-            return False, "Watermarking timed out"
         except Exception as e:
             logger.error(f"Watermarking error: {e}")
             return False, str(e)
@@ -141,7 +237,7 @@ class WatermarkService:
         Returns:
             Tuple of (success, message)
         """
-        if not self._ffmpeg_available:
+        if not await ffmpeg_available():
             return False, "FFmpeg not available"
 
         image_path = watermark_image or self.watermark_image_path
@@ -151,7 +247,7 @@ class WatermarkService:
         position = self._get_position_filter()
 
         try:
-            result = subprocess.run(
+            result = await run_ffmpeg(
                 [
                     "ffmpeg", "-y",
                     "-i", input_path,
@@ -163,19 +259,17 @@ class WatermarkService:
                     "-preset", "fast",
                     output_path
                 ],
-                capture_output=True,
-                text=True,
-                timeout=120
+                timeout=120,
+                on_progress=self._log_progress,
             )
 
-            if result.returncode == 0:
+            if result.ok:
                 return True, "Image watermark added successfully"
-            else:
-                logger.error(f"FFmpeg error: {result.stderr}")
-                return False, f"FFmpeg error: {result.stderr[:200]}"
+            if result.timed_out:
+                return False, "Watermarking timed out"
+            logger.error(f"FFmpeg error: {result.detail()}")
+            return False, f"FFmpeg error: {result.detail(200)}"
 
-        except subprocess.TimeoutExpired:
-            return False, "Watermarking timed out"
         except Exception as e:
             logger.error(f"Watermarking error: {e}")
             return False, str(e)
@@ -199,7 +293,7 @@ class WatermarkService:
         """
         import httpx
 
-        if not self._ffmpeg_available:
+        if not await ffmpeg_available():
             # Return original URL if FFmpeg not available
             return True, input_url, "FFmpeg not available - using original"
 
@@ -249,7 +343,8 @@ class WatermarkService:
             "font_size": self.font_size,
             "opacity": self.opacity,
             "position": self.position,
-            "ffmpeg_available": self._ffmpeg_available
+            # None until the first video job has probed for ffmpeg.
+            "ffmpeg_available": cached_ffmpeg_available()
         }
 
     # =========================================================================
@@ -280,10 +375,13 @@ class WatermarkService:
 
                 image_data = response.content
 
-            # Add watermark
-            watermarked_data = self._add_image_watermark(
+            # Add watermark (process pool — full-res decode/encode)
+            watermarked_data = await get_image_engine().watermark_text(
                 image_data,
-                watermark_text or self.watermark_text
+                watermark_text or self.watermark_text,
+                font_size=self.font_size,
+                opacity=self.opacity,
+                position=self.position,
             )
 
             if watermarked_data is None:
@@ -302,98 +400,19 @@ class WatermarkService:
             # Return original URL on error
             return True, image_url, None
 
-    def _add_image_watermark(
-        self,
-        image_data: bytes,
-        watermark_text: str
-    ) -> Optional[bytes]:
-        """
-        Add watermark to image bytes using PIL.
-
-        Args:
-            image_data: Raw image bytes
-            watermark_text: Text to add as watermark
-
-        Returns:
-            Watermarked image bytes or None on error
-        """
-        try:
-            # Open image
-            image = Image.open(io.BytesIO(image_data)).convert("RGBA")
-            width, height = image.size
-
-            # Create watermark overlay
-            watermark = Image.new("RGBA", image.size, (0, 0, 0, 0))
-            draw = ImageDraw.Draw(watermark)
-
-            # Try to use a nice font, fall back to default
-            try:
-                font = ImageFont.truetype("arial.ttf", self.font_size)
-            except OSError:
-                try:
-                    font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", self.font_size)
-                except OSError:
-                    font = ImageFont.load_default()
-
-            # Get text size
-            bbox = draw.textbbox((0, 0), watermark_text, font=font)
-            text_width = bbox[2] - bbox[0]
-            text_height = bbox[3] - bbox[1]
-
-            # Calculate position
-            padding = 20
-            if self.position == "top_left":
-                x, y = padding, padding
-            elif self.position == "top_right":
-                x, y = width - text_width - padding, padding
-            elif self.position == "bottom_left":
-                x, y = padding, height - text_height - padding
-            elif self.position == "bottom_right":
-                x, y = width - text_width - padding, height - text_height - padding
-            elif self.position == "center":
-                x, y = (width - text_width) // 2, (height - text_height) // 2
-            else:
-                x, y = width - text_width - padding, height - text_height - padding
-
-            # Draw shadow for better visibility
-            shadow_offset = 2
-            shadow_color = (0, 0, 0, int(255 * self.opacity * 0.7))
-            draw.text((x + shadow_offset, y + shadow_offset), watermark_text, font=font, fill=shadow_color)
-
-            # Draw text
-            text_color = (255, 255, 255, int(255 * self.opacity))
-            draw.text((x, y), watermark_text, font=font, fill=text_color)
-
-            # Composite watermark onto image
-            watermarked = Image.alpha_composite(image, watermark)
-
-            # Convert back to RGB for saving
-            watermarked_rgb = watermarked.convert("RGB")
-
-            # Save to bytes
-            output = io.BytesIO()
-            watermarked_rgb.save(output, format="PNG", quality=95)
-            output.seek(0)
-
-            return output.getvalue()
-
-        except Exception as e:
-            logger.error(f"Error adding image watermark: {e}")
-            return None
-
     # =========================================================================
     # Image LOGO watermarking (admin-uploaded PNG composited onto stills)
     # =========================================================================
 
-    async def _load_logo_rgba(self) -> Optional["Image.Image"]:
-        """Load the configured watermark logo (URL or local path) as RGBA.
+    async def _load_logo_bytes(self) -> Optional[bytes]:
+        """Load the configured watermark logo (URL or local path) as raw bytes.
 
         Cached on the instance so a backfill over hundreds of examples fetches
         the logo once. Returns None when no image watermark is configured.
         """
         if not self.watermark_image_path:
             return None
-        cached = getattr(self, "_logo_rgba_cache", None)
+        cached = getattr(self, "_logo_bytes_cache", None)
         if cached is not None:
             return cached
         try:
@@ -402,44 +421,17 @@ class WatermarkService:
                 async with httpx.AsyncClient(timeout=30.0) as client:
                     resp = await client.get(src)
                     resp.raise_for_status()
-                    logo = Image.open(io.BytesIO(resp.content)).convert("RGBA")
+                    logo = resp.content
             else:
                 if not Path(src).exists():
                     return None
-                logo = Image.open(src).convert("RGBA")
-            self._logo_rgba_cache = logo
+                logo = Path(src).read_bytes()
+            self._logo_bytes_cache = logo
             return logo
         except Exception as e:
             logger.error(f"Failed to load watermark logo {self.watermark_image_path!r}: {e}")
             return None
 
-    def _overlay_logo(self, base_rgba: "Image.Image", logo_rgba: "Image.Image") -> "Image.Image":
-        """Composite the logo onto the base image at the configured position,
-        scaled to ~18% of the base width and faded to the configured opacity."""
-        bw, bh = base_rgba.size
-        target_w = max(1, int(bw * 0.18))
-        scale = target_w / logo_rgba.width
-        logo = logo_rgba.resize((target_w, max(1, int(logo_rgba.height * scale))))
-
-        # Apply opacity by scaling the logo's alpha channel.
-        if self.opacity < 1.0:
-            alpha = logo.split()[3].point(lambda a: int(a * self.opacity))
-            logo.putalpha(alpha)
-
-        lw, lh = logo.size
-        pad = max(12, int(bw * 0.02))
-        positions = {
-            "top_left": (pad, pad),
-            "top_right": (bw - lw - pad, pad),
-            "bottom_left": (pad, bh - lh - pad),
-            "bottom_right": (bw - lw - pad, bh - lh - pad),
-            "center": ((bw - lw) // 2, (bh - lh) // 2),
-        }
-        x, y = positions.get(self.position, positions["bottom_right"])
-        overlay = Image.new("RGBA", base_rgba.size, (0, 0, 0, 0))
-        overlay.paste(logo, (x, y), logo)
-        return Image.alpha_composite(base_rgba, overlay)
-
     async def watermark_image_url_to_bytes(self, image_url: str) -> Optional[bytes]:
         """Download an image, overlay the admin logo (or text fallback), and
         return PNG bytes. Returns None on failure so callers can keep the
@@ -448,19 +440,16 @@ class WatermarkService:
             async with httpx.AsyncClient(timeout=60.0) as client:
                 resp = await client.get(image_url)
                 resp.raise_for_status()
-                base = Image.open(io.BytesIO(resp.content)).convert("RGBA")
 
-            logo = await self._load_logo_rgba()
-            if logo is not None:
-                out_img = self._overlay_logo(base, logo)
-            else:
+            engine = get_image_engine()
+            logo = await self._load_logo_bytes()
+            if logo is None:
                 # No logo configured → fall back to text watermark on the bytes.
-                text_bytes = self._add_image_watermark(resp.content, self.watermark_text)
-                return text_bytes
-
-            buf = io.BytesIO()
-            out_img.convert("RGB").save(buf, format="PNG", quality=95)
-            return buf.getvalue()
+                return await engine.watermark_text(
+                    resp.content, self.watermark_text,
+                    font_size=self.font_size, opacity=self.opacity, position=self.position,
+                )
+            return await engine.watermark_logo(resp.content, logo, opacity=self.opacity, position=self.position)
         except Exception as e:
             logger.error(f"watermark_image_url_to_bytes failed for {image_url}: {e}")
             return None
@@ -497,7 +486,7 @@ class WatermarkService:
         else text), upload the result to GCS, and return its public URL. Returns
         None on any failure so the caller keeps the original. Used by the
         example-video watermark backfill."""
-        if not self._ffmpeg_available:
+        if not await ffmpeg_available():
             logger.warning("watermark_video_url_to_gcs: ffmpeg unavailable")
             return None
         try:
@@ -525,7 +514,7 @@ class WatermarkService:
                     logger.error(f"video watermark failed for {video_url}: {msg}")
                     return None
 
-                return gcs.upload_public(out.read_bytes(), blob_name, content_type="video/mp4")
+                return await gcs.upload_stream(out, blob_name, content_type="video/mp4")
         except Exception as e:
             logger.error(f"watermark_video_url_to_gcs failed for {video_url}: {e}")
             return None
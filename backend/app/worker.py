@@ -411,143 +411,33 @@ async def monthly_credit_reset_task(ctx: Dict[str, Any]) -> Dict[str, Any]:
 
     Subscription credits DO NOT carry over — they reset to the plan's monthly_credits.
     Purchased credits and bonus credits are NOT affected.
+
+    Set-based and chunked (credit_reset.run_scheduled_monthly_reset): one
+    UPDATE ... RETURNING plus one bulk ledger INSERT per chunk of users, with
+    the same guards as before — credits_reset_at within 25 days, no currently
+    valid subscription, monthly PayPal subs (granted by the SALE webhook), and
+    currency-aware / yearly-prorated amounts. A timed-out run resumes from the
+    last committed chunk.
     """
     logger.info("Starting monthly credit reset task")
 
-    from sqlalchemy import select, and_, desc
-    from app.models.user import User
-    from app.models.billing import Plan, CreditTransaction, Subscription
+    from app.services.credit_reset import run_scheduled_monthly_reset
 
     async_session = WorkerSessionLocal
 
-    reset_count = 0
-    error_count = 0
-
     try:
         async with async_session() as db:
-            # Get all active users with a plan
-            result = await db.execute(
-                select(User).where(
-                    and_(
-                        User.current_plan_id != None,
-                        User.is_active == True,
-                    )
-                )
-            )
-            users = result.scalars().all()
-
-            for user in users:
-                try:
-                    # Get user's plan
-                    plan_result = await db.execute(
-                        select(Plan).where(Plan.id == user.current_plan_id)
-                    )
-                    plan = plan_result.scalar_one_or_none()
-
-                    if not plan or not plan.monthly_credits:
-                        continue
-
-                    now_utc = datetime.utcnow()
-
-                    # Guard (a) 2026-07-10 — idempotency + anniversary overlap:
-                    # every grant path (activation, SALE-webhook renewal, this
-                    # task) stamps credits_reset_at. Skipping anyone refreshed
-                    # in the last 25 days prevents (1) a double-fired reset
-                    # re-filling mid-cycle spend, and (2) the calendar reset
-                    # topping users up AGAIN days after an anniversary grant.
-                    _reset_at = user.credits_reset_at
-                    if _reset_at and _reset_at.replace(tzinfo=None) > now_utc - timedelta(days=25):
-                        continue
-
-                    # Guard (b) 2026-07-10 — entitlement: current_plan_id
-                    # survives natural expiry and cancel-at-period-end, so
-                    # filtering on it alone granted full free credits to lapsed
-                    # accounts forever. Require a currently-valid subscription.
-                    sub_res = await db.execute(
-                        select(Subscription)
-                        .where(
-                            Subscription.user_id == user.id,
-                            Subscription.status == "active",
-                            Subscription.end_date >= now_utc,
-                        )
-                        .order_by(desc(Subscription.start_date))
-                        .limit(1)
-                    )
-                    sub = sub_res.scalar_one_or_none()
-                    if sub is None:
-                        continue
-                    is_yearly = (getattr(sub, "billing_cycle", None) or "monthly") == "yearly"
-
-                    # Guard (c)/(d) 2026-07-10 — monthly PayPal subs get their
-                    # allotment per-cycle from PAYMENT.SALE.COMPLETED (this
-                    # reset was a second, uncoordinated top-up for them), and
-                    # amounts are currency-aware (TWD payers previously got
-                    # the larger USD allowance every month).
-                    from app.models.billing import Order as _Order
-                    from app.services.subscription_service import (
-                        subscription_period_credits as _period_credits,
-                    )
-                    _last_order = (await db.execute(
-                        select(_Order)
-                        .where(_Order.subscription_id == sub.id)
-                        .order_by(desc(_Order.created_at))
-                    )).scalars().first()
-                    _pay_method = (_last_order.payment_method if _last_order else "") or ""
-                    if not is_yearly and _pay_method.lower() == "paypal":
-                        continue
-
-                    old_credits = user.subscription_credits or 0
-                    month_base = _period_credits(plan, _pay_method, "monthly")
-                    if is_yearly:
-                        new_credits = int(round(month_base * 11 / 12))
-                    else:
-                        new_credits = month_base
-                    if new_credits <= 0:
-                        continue
-
-                    # Reset subscription credits to plan amount
-                    user.subscription_credits = new_credits
-                    user.credits_reset_at = now_utc
-
-                    # Record the reset as a transaction
-                    # First record expiry of old credits if any
-                    if old_credits > 0:
-                        expiry_tx = CreditTransaction(
-                            user_id=user.id,
-                            amount=-old_credits,
-                            balance_after=(user.purchased_credits or 0) + (user.bonus_credits or 0) + new_credits,
-                            transaction_type="expiry",
-                            description=f"Monthly subscription credit reset — {old_credits} unused credits expired",
-                        )
-                        db.add(expiry_tx)
-
-                    # Then record the new allocation
-                    alloc_tx = CreditTransaction(
-                        user_id=user.id,
-                        amount=new_credits,
-                        balance_after=(user.purchased_credits or 0) + (user.bonus_credits or 0) + new_credits,
-                        transaction_type="subscription",
-                        description=f"Monthly credit allocation — {plan.display_name or plan.name} plan ({new_credits} credits)",
-                    )
-                    db.add(alloc_tx)
-
-                    reset_count += 1
-
-                except Exception as e:
-                    logger.error(f"Failed to reset credits for user {user.id}: {e}")
-                    try:
-                        await db.rollback()
-                    except Exception:
-                        pass
-                    error_count += 1
-
-            await db.commit()
-            logger.info(f"Monthly credit reset completed: {reset_count} users reset, {error_count} errors")
+            stats = await run_scheduled_monthly_reset(db)
+        logger.info(
+            f"Monthly credit reset completed: {stats['updated']} users reset "
+            f"in {stats['chunks']} chunks, {len(stats['errors'])} errors"
+        )
 
         return {
             "status": "completed",
-            "users_reset": reset_count,
-            "errors": error_count,
+            "users_reset": stats["updated"],
+            "chunks": stats["chunks"],
+            "errors": len(stats["errors"]),
             "timestamp": datetime.utcnow().isoformat(),
         }
 
@@ -562,48 +452,19 @@ async def monthly_credit_reset_task(ctx: Dict[str, Any]) -> Dict[str, Any]:
 async def cleanup_expired_bonus_credits_task(ctx: Dict[str, Any]) -> Dict[str, Any]:
     """
     Daily task to clean up expired bonus credits.
-    Zeroes out bonus_credits where bonus_credits_expiry has passed.
+    Zeroes out bonus_credits where bonus_credits_expiry has passed, one
+    chunked UPDATE ... RETURNING + bulk ledger INSERT per batch of users.
     """
     logger.info("Starting expired bonus credits cleanup")
 
-    from sqlalchemy import select, and_
-    from app.models.user import User
-    from app.models.billing import CreditTransaction
+    from app.services.credit_reset import run_bonus_expiry
 
     async_session = WorkerSessionLocal
 
-    cleaned_count = 0
-
     try:
         async with async_session() as db:
-            result = await db.execute(
-                select(User).where(
-                    and_(
-                        User.bonus_credits > 0,
-                        User.bonus_credits_expiry != None,
-                        User.bonus_credits_expiry < datetime.utcnow(),
-                    )
-                )
-            )
-            users = result.scalars().all()
-
-            for user in users:
-                expired_amount = user.bonus_credits
-                user.bonus_credits = 0
-                user.bonus_credits_expiry = None
-
-                tx = CreditTransaction(
-                    user_id=user.id,
-                    amount=-expired_amount,
-                    balance_after=(user.subscription_credits or 0) + (user.purchased_credits or 0),
-                    transaction_type="expiry",
-                    description=f"Bonus credits expired ({expired_amount} credits)",
-                )
-                db.add(tx)
-                cleaned_count += 1
-
-            await db.commit()
-            logger.info(f"Cleaned up bonus credits for {cleaned_count} users")
+            cleaned_count = await run_bonus_expiry(db)
+        logger.info(f"Cleaned up bonus credits for {cleaned_count} users")
 
         return {"status": "completed", "users_cleaned": cleaned_count}
 
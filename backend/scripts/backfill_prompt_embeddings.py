@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""Embed PromptCache rows that are missing prompt_embedding.
+
+Rows are processed in id order, EMBEDDING_BACKFILL_CHUNK_SIZE per transaction,
+through GeminiService's embedding batcher, so prompts are sent in batched
+requests and any text already in the embedding cache is not embedded again.
+Safe to re-run: only rows still missing an embedding are touched.
+
+Usage:
+    python scripts/backfill_prompt_embeddings.py [--chunk-size N] [--limit N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+
+from app.core.database import AsyncSessionLocal
+from app.services.similarity import get_similarity_service
+
+
+async def main(chunk_size: int | None, limit: int | None) -> None:
+    async with AsyncSessionLocal() as session:
+        stats = await get_similarity_service().backfill_embeddings(
+            session, chunk_size=chunk_size, limit=limit
+        )
+    print(
+        f"scanned={stats['scanned']} embedded={stats['embedded']} "
+        f"failed={stats['failed']} chunks={stats['chunks']}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunk-size", type=int, default=None)
+    parser.add_argument("--limit", type=int, default=None)
+    args = parser.parse_args()
+    asyncio.run(main(args.chunk_size, args.limit))
@@ -11,8 +11,14 @@ WORKFLOW:
 =========
 1. CLI parses arguments (--tool, --limit, --dry-run, --all)
 2. Initialize API clients (PiAPI, Pollo, A2E)
-3. Run selected generator(s) based on tool mappings
-4. Store results locally first, then batch to DB
+3. Run selected generator(s) based on tool mappings. background_removal,
+   room_redesign, pattern_generate and effect run as a DAG of steps per
+   item (e.g. T2I → remove-bg → store) on a bounded executor with
+   per-provider limits (scripts/pregen_dag.py); each finished item is
+   written to the DB immediately and recorded in a checkpoint file, so an
+   interrupted run resumes where it stopped. With --all, those four run
+   concurrently once the model library exists; the rest follow one by one.
+4. The other tools store results locally first, then batch to DB
 5. Cleanup temp files and print summary
 
 SUPPORTED TOOLS (8 total):
@@ -32,6 +38,8 @@ Usage:
     python -m scripts.main_pregenerate --tool effect --limit 15
     python -m scripts.main_pregenerate --all --limit 20
     python -m scripts.main_pregenerate --dry-run
+    python -m scripts.main_pregenerate --all --concurrency 12   # resumes if interrupted
+    python -m scripts.main_pregenerate --all --fresh            # ignore the checkpoint
 """
 import asyncio
 import argparse
@@ -52,6 +60,7 @@ from app.core.database import AsyncSessionLocal
 from app.models.material import Material, ToolType, MaterialSource, MaterialStatus
 from app.core.config import get_settings
 from app.services.gcs_storage_service import GCSStorageService
+from app.services.material_readiness import invalidate_readiness_snapshot
 
 # Import Topic Registry - Single Source of Truth for topics
 from app.config.topic_registry import (
@@ -65,6 +74,7 @@ from app.config.topic_registry import (
 # Import service clients
 import httpx
 from scripts.services import PiAPIClient, PolloClient, A2EClient
+from scripts.pregen_dag import Checkpoint, DagExecutor, Node, ProviderLimit, StepFailed
 
 # Configure logging
 logging.basicConfig(
@@ -92,6 +102,61 @@ TOOL_LIMITS = {
     "ai_avatar": 8,            # A2E API, most expensive → 2 per category × 4 categories
 }
 
+TOOL_TYPE_MAP = {
+    "ai_avatar": ToolType.AI_AVATAR,
+    "background_removal": ToolType.BACKGROUND_REMOVAL,
+    "room_redesign": ToolType.ROOM_REDESIGN,
+    "short_video": ToolType.SHORT_VIDEO,
+    "product_scene": ToolType.PRODUCT_SCENE,
+    "try_on": ToolType.TRY_ON,
+    "pattern_generate": ToolType.PATTERN_GENERATE,
+    "effect": ToolType.EFFECT,
+}
+
+# DAG executor limits: (max concurrent calls, min seconds between call
+# starts) per provider. PiAPI accepts many concurrent tasks; "db" bounds the
+# concurrent store steps (watermark → GCS → one-row commit).
+PROVIDER_LIMITS = {
+    "piapi": (6, 0.5),
+    "pollo": (2, 1.0),
+    "a2e": (1, 2.0),
+    "db": (4, 0.0),
+}
+DEFAULT_CONCURRENCY = 8
+
+# Tools whose items run as step graphs on the shared DagExecutor. Their
+# checkpoint keys start with "<tool>:", so each tool's resume state can be
+# dropped on its own.
+DAG_TOOLS = ("background_removal", "room_redesign", "pattern_generate", "effect")
+
+# Completed DAG steps; outside TEMP_DIR so cleanup doesn't take it with it.
+CHECKPOINT_PATH = Path("/app/static/pregenerate_checkpoint.json")
+
+
+def build_executor(concurrency: int = DEFAULT_CONCURRENCY, checkpoint: Optional[Checkpoint] = None) -> DagExecutor:
+    limits = {name: ProviderLimit(c, interval) for name, (c, interval) in PROVIDER_LIMITS.items()}
+    return DagExecutor(limits, checkpoint, max_concurrency=concurrency)
+
+
+def _item_key(tool: str, *parts: str) -> str:
+    """Stable DAG/checkpoint key for one item (same inputs → same key)."""
+    digest = hashlib.sha1("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()[:10]
+    return f"{tool}:{parts[0]}:{digest}"
+
+
+def _i2i_result_url(i2i: Dict[str, Any]) -> str:
+    """Result URL from a PiAPI I2I response; raises StepFailed if missing."""
+    if not i2i.get("success"):
+        raise StepFailed(f"I2I failed: {i2i.get('error')}")
+    result_url = i2i.get("image_url") or i2i.get("output", {}).get("image_url")
+    if not result_url:
+        images = i2i.get("output", {}).get("images", [])
+        if images:
+            result_url = images[0].get("url") if isinstance(images[0], dict) else images[0]
+    if not result_url:
+        raise StepFailed("No result URL in I2I response")
+    return result_url
+
 
 # ============================================================================
 # TEMP LOCAL STORAGE
@@ -1095,6 +1160,11 @@ class VidGoPreGenerator:
 
         # Local results storage (batch to DB after generation)
         self.local_results: Dict[str, List[Dict]] = {}
+        # Step-graph executor for the DAG-based generators; run() swaps in
+        # one with the CLI's concurrency and a checkpoint file.
+        self.executor = build_executor()
+        # DAG tool → whether every one of its steps finished this run.
+        self.dag_clean: Dict[str, bool] = {}
 
     def _topic_can_generate(self, topic_key: str, topic_counts: Dict[str, int], limit: int, total_count: int) -> bool:
         """Check if we can generate another example for a topic."""
@@ -1406,14 +1476,14 @@ class VidGoPreGenerator:
         """
         Generate Background Removal examples.
 
-        Flow: Prompt → T2I → PiAPI Remove BG → Transparent PNG
+        Flow (per item): Prompt → T2I → PiAPI Remove BG → store (watermark → GCS → DB)
         """
         logger.info("=" * 60)
         logger.info("BACKGROUND REMOVAL - T2I + Rembg")
         logger.info("=" * 60)
 
         self.stats["by_tool"]["background_removal"] = {"success": 0, "failed": 0}
-        self.local_results["background_removal"] = []
+        nodes: List[Node] = []
         count = 0
         topic_counts: Dict[str, int] = {}
 
@@ -1424,61 +1494,45 @@ class VidGoPreGenerator:
             for prompt in topic_data["prompts"]:
                 if not self._topic_can_generate(topic, topic_counts, limit, count):
                     break
-
-                logger.info(f"[{count+1}] Topic: {topic}")
-                logger.info(f"  Prompt: {prompt[:50]}...")
-
-                # Step 1: Generate source image
-                logger.info("  Step 1: T2I...")
-                t2i = await self.piapi.generate_image(prompt=prompt, width=1024, height=1024)
-
-                if not t2i["success"]:
-                    logger.error(f"  T2I Failed: {t2i.get('error')}")
-                    self.stats["failed"] += 1
-                    self.stats["by_tool"]["background_removal"]["failed"] += 1
-                    count += 1
-                    self._topic_mark_generated(topic, topic_counts)
-                    continue
-
-                source_url = t2i["image_url"]
-                logger.info(f"  Source: {source_url}")
-
-                # Step 2: Remove background via PiAPI
-                logger.info("  Step 2: Remove BG (PiAPI)...")
-                rembg_result = await self.piapi.remove_background(source_url)
-
-                if not rembg_result["success"]:
-                    logger.error(f"  Remove BG Failed: {rembg_result.get('error')}")
-                    self.stats["failed"] += 1
-                    self.stats["by_tool"]["background_removal"]["failed"] += 1
-                    count += 1
-                    self._topic_mark_generated(topic, topic_counts)
-                    continue
-
-                result_url = rembg_result["image_url"]
-
-                # Store locally
-                local_entry = {
-                    "topic": topic,
-                    "prompt": prompt,
-                    "input_image_url": source_url,
-                    "result_image_url": result_url,
-                    "generation_steps": [
-                        {"step": 1, "api": "piapi", "action": "t2i", "result_url": source_url},
-                        {"step": 2, "api": "piapi", "action": "remove_bg", "result_url": result_url}
-                    ],
-                    "generation_cost": 0.005
-                }
-                self.local_results["background_removal"].append(local_entry)
-
-                logger.info(f"  Result: {result_url}")
-                self.stats["success"] += 1
-                self.stats["by_tool"]["background_removal"]["success"] += 1
+                nodes += self._background_removal_nodes(topic, prompt)
                 count += 1
                 self._topic_mark_generated(topic, topic_counts)
-                await asyncio.sleep(2)
 
-        await self._store_local_to_db("background_removal")
+        await self._run_dag("background_removal", nodes)
+
+    def _background_removal_nodes(self, topic: str, prompt: str) -> List[Node]:
+        item = _item_key("background_removal", topic, prompt)
+
+        async def t2i(_inputs):
+            logger.info(f"  [{item}] T2I: {prompt[:50]}...")
+            return await self._t2i(prompt)
+
+        async def remove_bg(inputs):
+            result = await self.piapi.remove_background(inputs[f"{item}:t2i"])
+            if not result["success"]:
+                raise StepFailed(f"Remove BG failed: {result.get('error')}")
+            return result["image_url"]
+
+        async def store(inputs):
+            source_url = inputs[f"{item}:t2i"]
+            result_url = inputs[f"{item}:remove_bg"]
+            return await self._store_entry_now("background_removal", {
+                "topic": topic,
+                "prompt": prompt,
+                "input_image_url": source_url,
+                "result_image_url": result_url,
+                "generation_steps": [
+                    {"step": 1, "api": "piapi", "action": "t2i", "result_url": source_url},
+                    {"step": 2, "api": "piapi", "action": "remove_bg", "result_url": result_url}
+                ],
+                "generation_cost": 0.005
+            })
+
+        return [
+            Node(f"{item}:t2i", t2i, provider="piapi"),
+            Node(f"{item}:remove_bg", remove_bg, [f"{item}:t2i"], provider="piapi"),
+            Node(f"{item}:store", store, [f"{item}:t2i", f"{item}:remove_bg"], provider="db", terminal=True),
+        ]
 
     # ========================================================================
     # ROOM REDESIGN GENERATOR
@@ -1491,6 +1545,7 @@ class VidGoPreGenerator:
         Combinations: Room × Style (style IDs match DESIGN_STYLES from interior API
         so frontend room+roomType+style matching works).
         Minimum production set: 7 rooms × 6 proposal styles = 42 examples.
+        Flow (per item): I2I style → store (watermark → GCS → DB)
         """
         from app.services.interior_design_service import DESIGN_STYLES
 
@@ -1499,7 +1554,7 @@ class VidGoPreGenerator:
         logger.info("=" * 60)
 
         self.stats["by_tool"]["room_redesign"] = {"success": 0, "failed": 0}
-        self.local_results["room_redesign"] = []
+        nodes: List[Node] = []
         count = 0
         topic_counts: Dict[str, int] = {}
 
@@ -1526,70 +1581,56 @@ class VidGoPreGenerator:
             for style_id, style_data in styles.items():
                 if not self._topic_can_generate(room_type, topic_counts, limit, count):
                     break
-
-                logger.info(f"[{count+1}] Room: {room_data['name']} -> Style: {style_data['name']}")
-
-                # Use I2I (image-to-image) so output is derived from the actual input room photo.
-                # Style prompt only describes the desired art style — the room photo drives the content.
-                style_prompt = f"{style_data['prompt']}, photorealistic interior design, architectural visualization, 8K"
-
-                i2i = await self.piapi.image_to_image(
-                    image_url=room_data["url"],
-                    prompt=style_prompt,
-                    strength=0.65  # preserves room structure while applying style
-                )
-
-                if not i2i.get("success"):
-                    logger.error(f"  I2I Failed: {i2i.get('error')}")
-                    self.stats["failed"] += 1
-                    self.stats["by_tool"]["room_redesign"]["failed"] += 1
-                    count += 1
-                    self._topic_mark_generated(style_id, topic_counts)
-                    continue
-
-                result_image_url = i2i.get("image_url") or i2i.get("output", {}).get("image_url")
-                if not result_image_url:
-                    images = i2i.get("output", {}).get("images", [])
-                    if images:
-                        result_image_url = images[0].get("url") if isinstance(images[0], dict) else images[0]
-
-                if not result_image_url:
-                    logger.error("  No result URL in I2I response")
-                    self.stats["failed"] += 1
-                    self.stats["by_tool"]["room_redesign"]["failed"] += 1
-                    count += 1
-                    self._topic_mark_generated(style_id, topic_counts)
-                    continue
-
-                local_entry = {
-                    "topic": room_type,  # so topic matches selectedRoomType in frontend
-                    "prompt": style_prompt,
-                    "prompt_en": f"Redesign this {room_data['name'].lower()} as a {style_data['name']} proposal render while preserving the core layout, daylight, and spatial proportion.",
-                    "prompt_zh": f"將{room_data['name_zh']}改造成{style_data['name_zh']}提案渲染，保留主要格局、採光與空間比例。",
-                    "title_en": f"{room_data['name']} x {style_data['name']} Proposal",
-                    "title_zh": f"{room_data['name_zh']} × {style_data['name_zh']}提案",
-                    "input_image_url": room_data["url"],  # actual room photo passed to I2I
-                    "result_image_url": result_image_url,  # I2I output derived from input photo
-                    "generation_steps": [
-                        {"step": 1, "api": "piapi", "action": "i2i_style", "input_url": room_data["url"], "result_url": result_image_url}
-                    ],
-                    "input_params": {
-                        "room_id": room_id,
-                        "style_id": style_id,  # matches DESIGN_STYLES e.g. modern_minimalist, scandinavian
-                        "room_type": room_type
-                    },
-                    "generation_cost": 0.005
-                }
-                self.local_results["room_redesign"].append(local_entry)
-
-                logger.info(f"  Result: {result_image_url}")
-                self.stats["success"] += 1
-                self.stats["by_tool"]["room_redesign"]["success"] += 1
+                nodes += self._room_redesign_nodes(room_id, room_data, style_id, style_data)
                 count += 1
                 self._topic_mark_generated(room_type, topic_counts)
-                await asyncio.sleep(2)
 
-        await self._store_local_to_db("room_redesign")
+        await self._run_dag("room_redesign", nodes)
+
+    def _room_redesign_nodes(
+        self, room_id: str, room_data: Dict[str, Any], style_id: str, style_data: Dict[str, Any]
+    ) -> List[Node]:
+        item = _item_key("room_redesign", room_id, style_id)
+        room_type = room_data["room_type"]
+        # Use I2I (image-to-image) so output is derived from the actual input room photo.
+        # Style prompt only describes the desired art style — the room photo drives the content.
+        style_prompt = f"{style_data['prompt']}, photorealistic interior design, architectural visualization, 8K"
+
+        async def i2i(_inputs):
+            logger.info(f"  [{item}] Room: {room_data['name']} -> Style: {style_data['name']}")
+            result = await self.piapi.image_to_image(
+                image_url=room_data["url"],
+                prompt=style_prompt,
+                strength=0.65  # preserves room structure while applying style
+            )
+            return _i2i_result_url(result)
+
+        async def store(inputs):
+            result_image_url = inputs[f"{item}:i2i"]
+            return await self._store_entry_now("room_redesign", {
+                "topic": room_type,  # so topic matches selectedRoomType in frontend
+                "prompt": style_prompt,
+                "prompt_en": f"Redesign this {room_data['name'].lower()} as a {style_data['name']} proposal render while preserving the core layout, daylight, and spatial proportion.",
+                "prompt_zh": f"將{room_data['name_zh']}改造成{style_data['name_zh']}提案渲染，保留主要格局、採光與空間比例。",
+                "title_en": f"{room_data['name']} x {style_data['name']} Proposal",
+                "title_zh": f"{room_data['name_zh']} × {style_data['name_zh']}提案",
+                "input_image_url": room_data["url"],  # actual room photo passed to I2I
+                "result_image_url": result_image_url,  # I2I output derived from input photo
+                "generation_steps": [
+                    {"step": 1, "api": "piapi", "action": "i2i_style", "input_url": room_data["url"], "result_url": result_image_url}
+                ],
+                "input_params": {
+                    "room_id": room_id,
+                    "style_id": style_id,  # matches DESIGN_STYLES e.g. modern_minimalist, scandinavian
+                    "room_type": room_type
+                },
+                "generation_cost": 0.005
+            })
+
+        return [
+            Node(f"{item}:i2i", i2i, provider="piapi"),
+            Node(f"{item}:store", store, [f"{item}:i2i"], provider="db", terminal=True),
+        ]
 
     # ========================================================================
     # SHORT VIDEO GENERATOR
@@ -2254,13 +2295,14 @@ class VidGoPreGenerator:
 
         Combinations: Style × Prompt
         Total: 5 styles × 2 prompts = 10
+        Flow (per item): T2I → store (watermark → GCS → DB)
         """
         logger.info("=" * 60)
         logger.info("PATTERN GENERATE - Style × Prompt")
         logger.info("=" * 60)
 
         self.stats["by_tool"]["pattern_generate"] = {"success": 0, "failed": 0}
-        self.local_results["pattern_generate"] = []
+        nodes: List[Node] = []
         count = 0
         topic_counts: Dict[str, int] = {}
 
@@ -2273,47 +2315,40 @@ class VidGoPreGenerator:
             for prompt_data in style_data["prompts"]:
                 if not self._topic_can_generate(style_id, topic_counts, limit, count):
                     break
-
-                prompt_en = prompt_data["en"]
-                prompt_zh = prompt_data["zh"]
-
-                logger.info(f"[{count+1}] Style: {style_data['name']} ({style_id})")
-                logger.info(f"  Prompt: {prompt_en[:50]}...")
-
-                full_prompt = f"Seamless pattern design, {prompt_en}, tileable, high quality, 8K"
-
-                t2i = await self.piapi.generate_image(prompt=full_prompt, width=1024, height=1024)
-
-                if not t2i["success"]:
-                    logger.error(f"  T2I Failed: {t2i.get('error')}")
-                    self.stats["failed"] += 1
-                    self.stats["by_tool"]["pattern_generate"]["failed"] += 1
-                    count += 1
-                    self._topic_mark_generated(style_id, topic_counts)
-                    continue
-
-                local_entry = {
-                    "topic": style_id,
-                    "prompt": prompt_en,
-                    "prompt_zh": prompt_zh,
-                    "result_image_url": t2i["image_url"],
-                    "input_params": {
-                        "style_id": style_id,
-                        "style_name": style_data["name"]
-                    },
-                    "style_tags": [style_id, "pattern", "seamless"],
-                    "generation_cost": 0.005
-                }
-                self.local_results["pattern_generate"].append(local_entry)
-
-                logger.info(f"  Success: {t2i['image_url']}")
-                self.stats["success"] += 1
-                self.stats["by_tool"]["pattern_generate"]["success"] += 1
+                nodes += self._pattern_nodes(style_id, style_data, prompt_data)
                 count += 1
                 self._topic_mark_generated(style_id, topic_counts)
-                await asyncio.sleep(1)
 
-        await self._store_local_to_db("pattern_generate")
+        await self._run_dag("pattern_generate", nodes)
+
+    def _pattern_nodes(self, style_id: str, style_data: Dict[str, Any], prompt_data: Dict[str, str]) -> List[Node]:
+        prompt_en = prompt_data["en"]
+        prompt_zh = prompt_data["zh"]
+        item = _item_key("pattern_generate", style_id, prompt_en)
+        full_prompt = f"Seamless pattern design, {prompt_en}, tileable, high quality, 8K"
+
+        async def t2i(_inputs):
+            logger.info(f"  [{item}] Style: {style_data['name']} | Prompt: {prompt_en[:50]}...")
+            return await self._t2i(full_prompt)
+
+        async def store(inputs):
+            return await self._store_entry_now("pattern_generate", {
+                "topic": style_id,
+                "prompt": prompt_en,
+                "prompt_zh": prompt_zh,
+                "result_image_url": inputs[f"{item}:t2i"],
+                "input_params": {
+                    "style_id": style_id,
+                    "style_name": style_data["name"]
+                },
+                "style_tags": [style_id, "pattern", "seamless"],
+                "generation_cost": 0.005
+            })
+
+        return [
+            Node(f"{item}:t2i", t2i, provider="piapi"),
+            Node(f"{item}:store", store, [f"{item}:t2i"], provider="db", terminal=True),
+        ]
 
     # ========================================================================
     # EFFECT (STYLE TRANSFER) GENERATOR
@@ -2331,131 +2366,109 @@ class VidGoPreGenerator:
 
         - Style prompts ONLY describe art style, NOT the product
         - I2I strength 0.6-0.7 preserves product identity
+
+        In the step graph every style of a product depends on ONE shared
+        source node, so the source is resolved once and the styles run in
+        parallel.
         """
         logger.info("=" * 60)
         logger.info("EFFECT - T2I + I2I Style Transfer")
         logger.info("=" * 60)
 
         self.stats["by_tool"]["effect"] = {"success": 0, "failed": 0}
-        self.local_results["effect"] = []
+        nodes: List[Node] = []
         count = 0
         topic_counts: Dict[str, int] = {}
 
         source_images = EFFECT_MAPPING["source_images"]
         styles = EFFECT_MAPPING["styles"]
 
+        def _all_topics_filled() -> bool:
+            return self.per_topic_limit is not None and all(
+                topic_counts.get(style_id, 0) >= self.per_topic_limit
+                for style_id in styles.keys()
+            )
+
         for source in source_images:
             if self.per_topic_limit is None and count >= limit:
                 break
-            if self.per_topic_limit is not None:
-                all_topics_filled = all(
-                    topic_counts.get(style_id, 0) >= self.per_topic_limit
-                    for style_id in styles.keys()
-                )
-                if all_topics_filled:
-                    logger.info("All style topics reached per-topic limit, stopping effect generation.")
-                    break
-
-            # Step 1: Resolve source image. If the entry has a frozen `url`
-            # (curated GCS asset), use it directly — no T2I. Otherwise fall
-            # back to T2I from prompt (legacy path, kept for safety).
-            logger.info(f"[{count+1}] Source: {source['name']} ({source['name_zh']})")
-            fixed_url = source.get("url")
-            if fixed_url:
-                source_image_url = fixed_url
-                logger.info(f"  Using frozen source: {source_image_url}")
-            else:
-                logger.info(f"  Generating source image via T2I (no fixed url)...")
-                t2i = await self.piapi.generate_image(
-                    prompt=source.get("prompt", ""),
-                    width=1024,
-                    height=1024,
-                )
-                if not t2i["success"]:
-                    logger.error(f"  T2I Failed: {t2i.get('error')}")
-                    self.stats["failed"] += 1
-                    self.stats["by_tool"]["effect"]["failed"] += 1
-                    continue
-                source_image_url = t2i["image_url"]
-                logger.info(f"  Source image: {source_image_url}")
+            if _all_topics_filled():
+                logger.info("All style topics reached per-topic limit, stopping effect generation.")
+                break
 
-            # Step 2: Apply each style via I2I
+            source_node = self._effect_source_node(source)
+            style_nodes: List[Node] = []
             for style_id, style_data in styles.items():
                 if not self._topic_can_generate(style_id, topic_counts, limit, count):
                     break
-
-                logger.info(f"  Applying style: {style_data['name']} ({style_id})")
-
-                # I2I style transfer - style prompt only describes art style
-                i2i_result = await self.piapi.image_to_image(
-                    image_url=source_image_url,
-                    prompt=style_data["prompt"],
-                    strength=style_data.get("strength", 0.65)
-                )
-
-                if not i2i_result.get("success"):
-                    logger.error(f"  I2I Failed: {i2i_result.get('error')}")
-                    self.stats["failed"] += 1
-                    self.stats["by_tool"]["effect"]["failed"] += 1
-                    count += 1
-                    self._topic_mark_generated(style_id, topic_counts)
-                    continue
-
-                result_url = i2i_result.get("image_url") or i2i_result.get("output", {}).get("image_url")
-                if not result_url:
-                    images = i2i_result.get("output", {}).get("images", [])
-                    if images:
-                        result_url = images[0].get("url") if isinstance(images[0], dict) else images[0]
-
-                if not result_url:
-                    logger.error("  No result URL in I2I response")
-                    self.stats["failed"] += 1
-                    self.stats["by_tool"]["effect"]["failed"] += 1
-                    count += 1
-                    self._topic_mark_generated(style_id, topic_counts)
-                    continue
-
-                local_entry = {
-                    "topic": style_id,
-                    "prompt": f"{source['name']} | Style: {style_data['prompt']}",
-                    "prompt_zh": f"{source['name_zh']} | 風格: {style_data['name_zh']}",
-                    "effect_prompt": style_data["prompt"],
-                    "input_image_url": source_image_url,  # Frozen product photo
-                    "result_image_url": result_url,  # Styled version
-                    "hash_context": f"product={source.get('product_id', source['name'])}",
-                    "input_params": {
-                        "product_id": source.get("product_id"),
-                        "source_name": source["name"],
-                        "style_id": style_id,
-                        "style_name": style_data["name"],
-                        "strength": style_data.get("strength", 0.65),
-                    },
-                    "generation_steps": [
-                        {"step": 1, "api": "piapi", "action": "t2i", "result_url": source_image_url},
-                        {"step": 2, "api": "piapi", "action": "i2i_style", "result_url": result_url}
-                    ],
-                    "style_tags": [style_id, "effect", "style_transfer"],
-                    "generation_cost": 0.01  # T2I + I2I cost
-                }
-                self.local_results["effect"].append(local_entry)
-
-                logger.info(f"  Success: {result_url}")
-                self.stats["success"] += 1
-                self.stats["by_tool"]["effect"]["success"] += 1
+                style_nodes += self._effect_style_nodes(source, source_node.key, style_id, style_data)
                 count += 1
                 self._topic_mark_generated(style_id, topic_counts)
-                await asyncio.sleep(2)
+            if style_nodes:
+                nodes += [source_node] + style_nodes
 
-            if self.per_topic_limit is not None:
-                all_topics_filled = all(
-                    topic_counts.get(style_id, 0) >= self.per_topic_limit
-                    for style_id in styles.keys()
-                )
-                if all_topics_filled:
-                    logger.info("All style topics reached per-topic limit, stopping effect generation.")
-                    break
+        await self._run_dag("effect", nodes)
+
+    def _effect_source_node(self, source: Dict[str, Any]) -> Node:
+        """Resolve the source image. If the entry has a frozen `url` (curated
+        GCS asset), use it directly — no T2I. Otherwise fall back to T2I from
+        prompt (legacy path, kept for safety)."""
+        key = _item_key("effect", "source", source.get("product_id") or source["name"]) + ":source"
+        fixed_url = source.get("url")
 
-        await self._store_local_to_db("effect")
+        async def resolve(_inputs):
+            if fixed_url:
+                return fixed_url
+            logger.info(f"  [{key}] Generating source image via T2I (no fixed url)...")
+            return await self._t2i(source.get("prompt", ""))
+
+        return Node(key, resolve, provider=None if fixed_url else "piapi")
+
+    def _effect_style_nodes(
+        self, source: Dict[str, Any], source_key: str, style_id: str, style_data: Dict[str, Any]
+    ) -> List[Node]:
+        item = _item_key("effect", source.get("product_id") or source["name"], style_id)
+
+        async def i2i(inputs):
+            logger.info(f"  [{item}] Applying style: {style_data['name']} ({style_id})")
+            # I2I style transfer - style prompt only describes art style
+            result = await self.piapi.image_to_image(
+                image_url=inputs[source_key],
+                prompt=style_data["prompt"],
+                strength=style_data.get("strength", 0.65)
+            )
+            return _i2i_result_url(result)
+
+        async def store(inputs):
+            source_image_url = inputs[source_key]
+            result_url = inputs[f"{item}:i2i"]
+            return await self._store_entry_now("effect", {
+                "topic": style_id,
+                "prompt": f"{source['name']} | Style: {style_data['prompt']}",
+                "prompt_zh": f"{source['name_zh']} | 風格: {style_data['name_zh']}",
+                "effect_prompt": style_data["prompt"],
+                "input_image_url": source_image_url,  # Frozen product photo
+                "result_image_url": result_url,  # Styled version
+                "hash_context": f"product={source.get('product_id', source['name'])}",
+                "input_params": {
+                    "product_id": source.get("product_id"),
+                    "source_name": source["name"],
+                    "style_id": style_id,
+                    "style_name": style_data["name"],
+                    "strength": style_data.get("strength", 0.65),
+                },
+                "generation_steps": [
+                    {"step": 1, "api": "piapi", "action": "t2i", "result_url": source_image_url},
+                    {"step": 2, "api": "piapi", "action": "i2i_style", "result_url": result_url}
+                ],
+                "style_tags": [style_id, "effect", "style_transfer"],
+                "generation_cost": 0.01  # T2I + I2I cost
+            })
+
+        return [
+            Node(f"{item}:i2i", i2i, [source_key], provider="piapi"),
+            Node(f"{item}:store", store, [source_key, f"{item}:i2i"], provider="db", terminal=True),
+        ]
 
     # ========================================================================
     # MODEL LIBRARY GENERATOR (NEW)
@@ -2893,17 +2906,6 @@ class VidGoPreGenerator:
 
     async def _store_local_to_db(self, tool_name: str):
         """Store locally collected results to database with watermarks applied."""
-        tool_type_map = {
-            "ai_avatar": ToolType.AI_AVATAR,
-            "background_removal": ToolType.BACKGROUND_REMOVAL,
-            "room_redesign": ToolType.ROOM_REDESIGN,
-            "short_video": ToolType.SHORT_VIDEO,
-            "product_scene": ToolType.PRODUCT_SCENE,
-            "try_on": ToolType.TRY_ON,
-            "pattern_generate": ToolType.PATTERN_GENERATE,
-            "effect": ToolType.EFFECT,
-        }
-
         if tool_name not in self.local_results:
             return
 
@@ -2917,131 +2919,185 @@ class VidGoPreGenerator:
         async with AsyncSessionLocal() as session:
             stored_count = 0
             for entry in entries:
-                lookup_hash = self._generate_lookup_hash(
-                    tool_type=tool_name,
-                    prompt=entry["prompt"],
-                    effect_prompt=entry.get("effect_prompt"),
-                    input_image_url=entry.get("input_image_url"),
-                    extra_context=entry.get("hash_context", ""),
-                )
+                if await self._upsert_entry(session, tool_name, entry):
+                    stored_count += 1
 
-                # Check if already exists
-                existing = await session.execute(
-                    select(Material).where(Material.lookup_hash == lookup_hash)
-                )
-                existing_material = existing.scalar_one_or_none()
-                # Skip only if the record is active, approved/featured, AND has a result.
-                # Rejected or result-less records are stale and should be overwritten.
-                if existing_material:
-                    has_result = (
-                        existing_material.result_image_url
-                        or existing_material.result_video_url
-                    )
-                    is_live = (
-                        existing_material.is_active
-                        and existing_material.status
-                        not in [MaterialStatus.REJECTED, MaterialStatus.PENDING]
-                        and has_result
-                    )
-                    if is_live:
-                        logger.debug(f"  Already exists (active+valid): {lookup_hash[:16]}...")
-                        continue
-                    logger.info(
-                        f"  Overwriting stale record "
-                        f"(status={existing_material.status.value}, "
-                        f"has_result={bool(has_result)}): {lookup_hash[:16]}..."
-                    )
+            await session.commit()
+            logger.info(f"  Stored {stored_count} new entries")
+        await invalidate_readiness_snapshot()
 
-                # Merge metadata into input_params if exists
-                input_params = entry.get("input_params", {})
-                if entry.get("metadata"):
-                    input_params.update(entry["metadata"])
+        # Clear local results after storing
+        self.local_results[tool_name] = []
 
-                # Apply watermark to result images (for image-based tools).
-                # This now returns a GCS URL directly — no more /static/*_wm.png.
-                raw_result_image_url = entry.get("result_image_url")
-                raw_result_video_url = entry.get("result_video_url")
-                result_watermarked_url: Optional[str] = None
+    async def _store_entry_now(self, tool_name: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Store ONE entry in its own transaction — the DAG's final step, so
+        rows land incrementally instead of in one pass at the end. Returns a
+        small JSON-able record for the checkpoint; raises StepFailed if the
+        entry has no persistable result."""
+        async with AsyncSessionLocal() as session:
+            stored = await self._upsert_entry(session, tool_name, entry)
+            if stored is None:
+                raise StepFailed("no persistable result URL")
+            await session.commit()
+        if stored:
+            await invalidate_readiness_snapshot()
+        return {"stored": stored}
+
+    async def _upsert_entry(self, session, tool_name: str, entry: Dict[str, Any]) -> Optional[bool]:
+        """Watermark + persist an entry's media to GCS and upsert its Material
+        row (not committed). True if written, False if a live row already
+        exists, None if the entry had no persistable result."""
+        lookup_hash = self._generate_lookup_hash(
+            tool_type=tool_name,
+            prompt=entry["prompt"],
+            effect_prompt=entry.get("effect_prompt"),
+            input_image_url=entry.get("input_image_url"),
+            extra_context=entry.get("hash_context", ""),
+        )
 
-                if raw_result_image_url and raw_result_image_url.startswith("/static/"):
-                    result_watermarked_url = await self._apply_watermark_to_local_image(
-                        raw_result_image_url
-                    )
+        # Check if already exists
+        existing = await session.execute(
+            select(Material).where(Material.lookup_hash == lookup_hash)
+        )
+        existing_material = existing.scalar_one_or_none()
+        # Skip only if the record is active, approved/featured, AND has a result.
+        # Rejected or result-less records are stale and should be overwritten.
+        if existing_material:
+            has_result = (
+                existing_material.result_image_url
+                or existing_material.result_video_url
+            )
+            is_live = (
+                existing_material.is_active
+                and existing_material.status
+                not in [MaterialStatus.REJECTED, MaterialStatus.PENDING]
+                and has_result
+            )
+            if is_live:
+                logger.debug(f"  Already exists (active+valid): {lookup_hash[:16]}...")
+                return False
+            logger.info(
+                f"  Overwriting stale record "
+                f"(status={existing_material.status.value}, "
+                f"has_result={bool(has_result)}): {lookup_hash[:16]}..."
+            )
 
-                # Persist every URL we're about to write to the DB to GCS.
-                # _to_gcs_url handles /static/ paths, temp CDN URLs, and no-ops
-                # GCS URLs that are already persistent.
-                raw_input_image_url = entry.get("input_image_url")
-                input_image_url = await self._to_gcs_url(raw_input_image_url, "image")
-                result_image_url = await self._to_gcs_url(raw_result_image_url, "image")
-                result_video_url = await self._to_gcs_url(raw_result_video_url, "video")
-
-                # Watermarked fallback: if we didn't make a watermark but we have
-                # a persisted result image/video, fall back to that.
-                if not result_watermarked_url:
-                    result_watermarked_url = result_video_url or result_image_url
-
-                # Refuse to write a row that has NO persistable result at all.
-                # Better to fail loudly in logs than publish a dead row to the DB.
-                if not result_image_url and not result_video_url:
-                    logger.error(
-                        f"  [{tool_name}] Refusing to store row {lookup_hash[:12]} "
-                        f"— no persistable result URL (raw image={raw_result_image_url}, "
-                        f"raw video={raw_result_video_url})"
-                    )
-                    continue
+        # Merge metadata into input_params if exists
+        input_params = entry.get("input_params", {})
+        if entry.get("metadata"):
+            input_params.update(entry["metadata"])
 
-                # Upsert: update stale record in-place, or create new.
-                if existing_material:
-                    existing_material.result_image_url = result_image_url
-                    existing_material.result_video_url = result_video_url
-                    existing_material.result_watermarked_url = result_watermarked_url
-                    if input_image_url:
-                        existing_material.input_image_url = input_image_url
-                    existing_material.prompt_en = entry.get("prompt_en") or existing_material.prompt_en
-                    existing_material.prompt_zh = entry.get("prompt_zh") or existing_material.prompt_zh
-                    existing_material.title_en = entry.get("title_en") or existing_material.title_en
-                    existing_material.title_zh = entry.get("title_zh") or existing_material.title_zh
-                    existing_material.status = MaterialStatus.APPROVED
-                    existing_material.is_active = True
-                    existing_material.is_featured = True
-                    stored_count += 1
-                    continue
+        # Apply watermark to result images (for image-based tools).
+        # This now returns a GCS URL directly — no more /static/*_wm.png.
+        raw_result_image_url = entry.get("result_image_url")
+        raw_result_video_url = entry.get("result_video_url")
+        result_watermarked_url: Optional[str] = None
 
-                material = Material(
-                    lookup_hash=lookup_hash,
-                    tool_type=tool_type_map[tool_name],
-                    topic=entry["topic"],
-                    language=entry.get("language", "en"),
-                    source=MaterialSource.SEED,
-                    status=MaterialStatus.APPROVED,
-                    prompt=entry["prompt"],
-                    prompt_en=entry.get("prompt_en"),
-                    prompt_zh=entry.get("prompt_zh"),
-                    effect_prompt=entry.get("effect_prompt"),
-                    effect_prompt_zh=entry.get("effect_prompt_zh"),
-                    title_en=entry.get("title_en"),
-                    title_zh=entry.get("title_zh"),
-                    input_image_url=input_image_url,
-                    input_params=input_params,
-                    generation_steps=entry.get("generation_steps", []),
-                    generation_cost_usd=entry.get("generation_cost", 0),
-                    result_image_url=result_image_url,
-                    result_video_url=result_video_url,
-                    result_watermarked_url=result_watermarked_url,
-                    tags=entry.get("style_tags", []),
-                    quality_score=0.9,
-                    is_featured=True,
-                    is_active=True
-                )
-                session.add(material)
-                stored_count += 1
+        if raw_result_image_url and raw_result_image_url.startswith("/static/"):
+            result_watermarked_url = await self._apply_watermark_to_local_image(
+                raw_result_image_url
+            )
 
-            await session.commit()
-            logger.info(f"  Stored {stored_count} new entries")
+        # Persist every URL we're about to write to the DB to GCS.
+        # _to_gcs_url handles /static/ paths, temp CDN URLs, and no-ops
+        # GCS URLs that are already persistent.
+        raw_input_image_url = entry.get("input_image_url")
+        input_image_url = await self._to_gcs_url(raw_input_image_url, "image")
+        result_image_url = await self._to_gcs_url(raw_result_image_url, "image")
+        result_video_url = await self._to_gcs_url(raw_result_video_url, "video")
+
+        # Watermarked fallback: if we didn't make a watermark but we have
+        # a persisted result image/video, fall back to that.
+        if not result_watermarked_url:
+            result_watermarked_url = result_video_url or result_image_url
+
+        # Refuse to write a row that has NO persistable result at all.
+        # Better to fail loudly in logs than publish a dead row to the DB.
+        if not result_image_url and not result_video_url:
+            logger.error(
+                f"  [{tool_name}] Refusing to store row {lookup_hash[:12]} "
+                f"— no persistable result URL (raw image={raw_result_image_url}, "
+                f"raw video={raw_result_video_url})"
+            )
+            return None
 
-        # Clear local results after storing
-        self.local_results[tool_name] = []
+        # Upsert: update stale record in-place, or create new.
+        if existing_material:
+            existing_material.result_image_url = result_image_url
+            existing_material.result_video_url = result_video_url
+            existing_material.result_watermarked_url = result_watermarked_url
+            if input_image_url:
+                existing_material.input_image_url = input_image_url
+            existing_material.prompt_en = entry.get("prompt_en") or existing_material.prompt_en
+            existing_material.prompt_zh = entry.get("prompt_zh") or existing_material.prompt_zh
+            existing_material.title_en = entry.get("title_en") or existing_material.title_en
+            existing_material.title_zh = entry.get("title_zh") or existing_material.title_zh
+            existing_material.status = MaterialStatus.APPROVED
+            existing_material.is_active = True
+            existing_material.is_featured = True
+            return True
+
+        material = Material(
+            lookup_hash=lookup_hash,
+            tool_type=TOOL_TYPE_MAP[tool_name],
+            topic=entry["topic"],
+            language=entry.get("language", "en"),
+            source=MaterialSource.SEED,
+            status=MaterialStatus.APPROVED,
+            prompt=entry["prompt"],
+            prompt_en=entry.get("prompt_en"),
+            prompt_zh=entry.get("prompt_zh"),
+            effect_prompt=entry.get("effect_prompt"),
+            effect_prompt_zh=entry.get("effect_prompt_zh"),
+            title_en=entry.get("title_en"),
+            title_zh=entry.get("title_zh"),
+            input_image_url=input_image_url,
+            input_params=input_params,
+            generation_steps=entry.get("generation_steps", []),
+            generation_cost_usd=entry.get("generation_cost", 0),
+            result_image_url=result_image_url,
+            result_video_url=result_video_url,
+            result_watermarked_url=result_watermarked_url,
+            tags=entry.get("style_tags", []),
+            quality_score=0.9,
+            is_featured=True,
+            is_active=True
+        )
+        session.add(material)
+        return True
+
+    # ========================================================================
+    # STEP GRAPH HELPERS
+    # ========================================================================
+
+    async def _run_dag(self, tool_name: str, nodes: List[Node]) -> None:
+        """Run a tool's step graph on the shared executor and tally its items."""
+        logger.info(f"{tool_name}: {sum(n.terminal for n in nodes)} items, {len(nodes)} steps")
+        results = await self.executor.run(nodes)
+        self.dag_clean[tool_name] = all(result.ok for result in results.values())
+        tool_stats = self.stats["by_tool"][tool_name]
+        resumed = 0
+        for node in nodes:
+            if not node.terminal:
+                continue
+            result = results[node.key]
+            if result.ok:
+                tool_stats["success"] += 1
+                self.stats["success"] += 1
+                resumed += result.status == "resumed"
+            else:
+                tool_stats["failed"] += 1
+                self.stats["failed"] += 1
+        logger.info(
+            f"{tool_name}: {tool_stats['success']} stored "
+            f"({resumed} from checkpoint), {tool_stats['failed']} failed"
+        )
+
+    async def _t2i(self, prompt: str) -> str:
+        t2i = await self.piapi.generate_image(prompt=prompt, width=1024, height=1024)
+        if not t2i["success"]:
+            raise StepFailed(f"T2I failed: {t2i.get('error')}")
+        return t2i["image_url"]
 
     # ========================================================================
     # MAIN ENTRY
@@ -3053,7 +3109,10 @@ class VidGoPreGenerator:
         limit: int = 10,
         dry_run: bool = False,
         per_topic_limit: Optional[int] = None,
-        topic_filter: Optional[List[str]] = None
+        topic_filter: Optional[List[str]] = None,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        checkpoint_path: Optional[Path] = CHECKPOINT_PATH,
+        fresh: bool = False,
     ):
         """Run pre-generation pipeline."""
         logger.info("=" * 60)
@@ -3083,6 +3142,12 @@ class VidGoPreGenerator:
         # Ensure temp directory
         ensure_temp_dir()
 
+        checkpoint = Checkpoint(checkpoint_path)
+        if fresh:
+            # --tool X --fresh only forgets X; other tools keep their resume state.
+            checkpoint.discard(prefix=f"{tool}:" if tool else None)
+        self.executor = build_executor(concurrency, checkpoint)
+
         # Tool mapping
         tools = {
             "model_library": self.generate_model_library,  # Run first to generate models
@@ -3112,18 +3177,37 @@ class VidGoPreGenerator:
             # Generate model library first so try_on can use it
             await self.generate_model_library(limit=6)
 
-            for name, func in tools.items():
-                if name == "model_library":
-                    continue  # Already ran
+            async def _run_tool(name, func):
                 try:
-                    tool_limit = TOOL_LIMITS.get(name, limit)
-                    await func(limit=tool_limit)
+                    await func(limit=TOOL_LIMITS.get(name, limit))
                 except Exception as e:
                     logger.error(f"Error in {name}: {e}")
 
+            # DAG-based tools share self.executor, so PROVIDER_LIMITS hold
+            # across all of them: run them concurrently.
+            await asyncio.gather(*(_run_tool(name, tools[name]) for name in DAG_TOOLS))
+
+            # The rest call their providers directly, outside the executor's
+            # limits, so they run one after another as before.
+            for name, func in tools.items():
+                if name != "model_library" and name not in DAG_TOOLS:
+                    await _run_tool(name, func)
+
         # Cleanup temp
         cleanup_temp_dir()
 
+        # A tool whose steps all finished leaves nothing to resume, so drop
+        # only its entries; interrupted or failed tools (this run's or an
+        # earlier run's) keep theirs for the next invocation.
+        for name, clean in self.dag_clean.items():
+            if clean:
+                checkpoint.discard(prefix=f"{name}:")
+        if self.executor.failures:
+            logger.info(
+                f"{self.executor.failures} step(s) failed — re-run the same command "
+                f"to resume from {checkpoint_path}"
+            )
+
         # Summary
         logger.info("\n" + "=" * 60)
         logger.info("SUMMARY")
@@ -3209,6 +3293,23 @@ Workflow for Virtual Try-On:
         default=None,
         help="Comma-separated topic/scene IDs to generate (e.g. 'spring,valentines,christmas'). Only generates these topics."
     )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help=f"Max pipeline steps in flight across tools (default: {DEFAULT_CONCURRENCY}); per-provider limits still apply"
+    )
+    parser.add_argument(
+        "--checkpoint",
+        type=Path,
+        default=CHECKPOINT_PATH,
+        help=f"Checkpoint file for resuming interrupted runs (default: {CHECKPOINT_PATH})"
+    )
+    parser.add_argument(
+        "--fresh",
+        action="store_true",
+        help="Ignore and delete an existing checkpoint instead of resuming from it"
+    )
 
     args = parser.parse_args()
 
@@ -3218,17 +3319,7 @@ Workflow for Virtual Try-On:
         logger.info(f"Topic filter: {topic_filter}")
 
     if args.clean and args.tool and not args.dry_run:
-        tool_type_map = {
-            "ai_avatar": ToolType.AI_AVATAR,
-            "background_removal": ToolType.BACKGROUND_REMOVAL,
-            "room_redesign": ToolType.ROOM_REDESIGN,
-            "short_video": ToolType.SHORT_VIDEO,
-            "product_scene": ToolType.PRODUCT_SCENE,
-            "try_on": ToolType.TRY_ON,
-            "pattern_generate": ToolType.PATTERN_GENERATE,
-            "effect": ToolType.EFFECT,
-        }
-        target = tool_type_map.get(args.tool)
+        target = TOOL_TYPE_MAP.get(args.tool)
         if target is None:
             logger.error(f"--clean: unknown tool '{args.tool}'")
         else:
@@ -3242,6 +3333,7 @@ Workflow for Virtual Try-On:
                 await session.commit()
                 scope = f" (topics={topic_filter})" if topic_filter else ""
                 logger.info(f"--clean: deleted {res.rowcount} existing {args.tool} rows{scope}")
+            await invalidate_readiness_snapshot()
 
     generator = VidGoPreGenerator()
     await generator.run(
@@ -3249,7 +3341,10 @@ Workflow for Virtual Try-On:
         limit=args.limit,
         dry_run=args.dry_run,
         per_topic_limit=args.per_topic_limit,
-        topic_filter=topic_filter
+        topic_filter=topic_filter,
+        concurrency=args.concurrency,
+        checkpoint_path=args.checkpoint,
+        fresh=args.fresh,
     )
 
 
@@ -0,0 +1,217 @@
+"""
+DAG executor for the pre-generation pipeline (main_pregenerate.py).
+
+Each generated example is modelled as a small graph of steps, for example
+
+    bg:<topic>:<n>:t2i ──► bg:<topic>:<n>:remove_bg ──► bg:<topic>:<n>:store
+                                                        (watermark → GCS → DB)
+
+and steps may be shared between items: every effect style of a product hangs
+off the same product source image. ``DagExecutor`` runs the whole graph:
+
+- a node starts as soon as all of its dependencies have succeeded. If a
+  dependency fails, the node is skipped;
+- at most ``max_concurrency`` nodes run at once. Each node also takes a slot
+  from its provider's ``ProviderLimit``, which caps concurrency and spaces
+  out request starts;
+- every successful node's output is written to a JSON ``Checkpoint``. On
+  resume, checkpointed nodes are not re-run and their outputs feed their
+  dependents, so an interrupted run does not regenerate finished work.
+
+Node functions receive ``{dep_key: dep_output}`` and return a JSON-serialisable
+output. They raise (``StepFailed`` for expected provider failures) to fail.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class StepFailed(Exception):
+    """A step's provider call returned a failure (logged, not a crash)."""
+
+
+@dataclass
+class Node:
+    key: str
+    fn: Callable[[Dict[str, Any]], Awaitable[Any]]
+    deps: List[str] = field(default_factory=list)
+    provider: Optional[str] = None
+    # Terminal nodes represent one finished example (counted in stats).
+    terminal: bool = False
+
+
+@dataclass
+class NodeResult:
+    status: str  # "done" | "resumed" | "failed" | "skipped"
+    output: Any = None
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.status in ("done", "resumed")
+
+
+class ProviderLimit:
+    """At most ``concurrency`` calls in flight and starts spaced at least
+    ``min_interval`` seconds apart (replaces the fixed ``sleep(2)``)."""
+
+    def __init__(self, concurrency: int, min_interval: float = 0.0):
+        self.concurrency = max(1, concurrency)
+        self.min_interval = min_interval
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._spacing_lock: Optional[asyncio.Lock] = None
+        self._next_start = 0.0
+
+    @asynccontextmanager
+    async def slot(self):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._spacing_lock = asyncio.Lock()
+        async with self._semaphore:
+            if self.min_interval > 0:
+                async with self._spacing_lock:
+                    wait = self._next_start - time.monotonic()
+                    if wait > 0:
+                        await asyncio.sleep(wait)
+                    self._next_start = time.monotonic() + self.min_interval
+            yield
+
+
+class Checkpoint:
+    """Completed node outputs, persisted as JSON after every completion.
+    Written atomically (tmp + rename) so a kill mid-write can't corrupt it."""
+
+    def __init__(self, path: Optional[Path]):
+        self.path = Path(path) if path else None
+        self.outputs: Dict[str, Any] = {}
+        if self.path and self.path.exists():
+            try:
+                self.outputs = json.loads(self.path.read_text(encoding="utf-8")).get("nodes", {})
+                logger.info(f"Resuming from checkpoint {self.path} ({len(self.outputs)} completed steps)")
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable checkpoint {self.path}: {e}")
+
+    def get(self, key: str) -> Any:
+        return self.outputs.get(key)
+
+    def has(self, key: str) -> bool:
+        return key in self.outputs
+
+    def record(self, key: str, output: Any) -> None:
+        self.outputs[key] = output
+        self._write()
+
+    def discard(self, prefix: Optional[str] = None) -> None:
+        """Drop every entry, or only the keys starting with ``prefix`` (one
+        tool's steps) so other tools' resume state survives."""
+        if prefix is not None:
+            self.outputs = {k: v for k, v in self.outputs.items() if not k.startswith(prefix)}
+        else:
+            self.outputs = {}
+        if self.outputs:
+            self._write()
+        elif self.path and self.path.exists():
+            self.path.unlink()
+
+    def _write(self) -> None:
+        if not self.path:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(json.dumps({"version": 1, "nodes": self.outputs}, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+class DagExecutor:
+    def __init__(
+        self,
+        limits: Optional[Dict[str, ProviderLimit]] = None,
+        checkpoint: Optional[Checkpoint] = None,
+        max_concurrency: int = 8,
+    ):
+        self.limits = limits or {}
+        self.checkpoint = checkpoint or Checkpoint(None)
+        self.max_concurrency = max(1, max_concurrency)
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.failures = 0
+
+    async def run(self, nodes: Iterable[Node]) -> Dict[str, NodeResult]:
+        """Run every node; returns ``{key: NodeResult}``. Raises ValueError
+        for unknown dependencies or cycles before anything runs."""
+        by_key: Dict[str, Node] = {}
+        for node in nodes:
+            if node.key in by_key:
+                raise ValueError(f"Duplicate DAG node: {node.key}")
+            by_key[node.key] = node
+        order = _topological_order(by_key)
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+
+        tasks: Dict[str, asyncio.Task] = {}
+        for key in order:
+            node = by_key[key]
+            tasks[key] = asyncio.create_task(self._run_node(node, [tasks[d] for d in node.deps]))
+        results = await asyncio.gather(*tasks.values())
+        return dict(zip(tasks.keys(), results))
+
+    async def _run_node(self, node: Node, dep_tasks: List[asyncio.Task]) -> NodeResult:
+        dep_results = await asyncio.gather(*dep_tasks)
+        if not all(r.ok for r in dep_results):
+            return NodeResult("skipped", error="dependency failed")
+        if self.checkpoint.has(node.key):
+            return NodeResult("resumed", output=self.checkpoint.get(node.key))
+
+        inputs = {dep: r.output for dep, r in zip(node.deps, dep_results)}
+        limit = self.limits.get(node.provider) if node.provider else None
+        async with self._slots:
+            try:
+                if limit is not None:
+                    async with limit.slot():
+                        output = await node.fn(inputs)
+                else:
+                    output = await node.fn(inputs)
+            except StepFailed as e:
+                logger.error(f"  [{node.key}] failed: {e}")
+                self.failures += 1
+                return NodeResult("failed", error=str(e))
+            except Exception as e:
+                logger.error(f"  [{node.key}] error: {e}", exc_info=True)
+                self.failures += 1
+                return NodeResult("failed", error=str(e))
+        self.checkpoint.record(node.key, output)
+        return NodeResult("done", output=output)
+
+
+def _topological_order(by_key: Dict[str, Node]) -> List[str]:
+    order: List[str] = []
+    state: Dict[str, int] = {}  # 1 = visiting, 2 = done
+
+    for root in by_key:
+        stack = [(root, iter(by_key[root].deps))]
+        if state.get(root) == 2:
+            continue
+        state[root] = 1
+        while stack:
+            key, deps = stack[-1]
+            dep = next(deps, None)
+            if dep is None:
+                stack.pop()
+                state[key] = 2
+                order.append(key)
+                continue
+            if dep not in by_key:
+                raise ValueError(f"DAG node {key} depends on unknown node {dep}")
+            if state.get(dep) == 1:
+                raise ValueError(f"DAG cycle through {dep}")
+            if state.get(dep) != 2:
+                state[dep] = 1
+                stack.append((dep, iter(by_key[dep].deps)))
+    return order
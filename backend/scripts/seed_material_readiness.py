@@ -22,6 +22,7 @@ from app.config.topic_registry import (
 from app.core.database import AsyncSessionLocal
 from app.models.material import Material, MaterialSource, MaterialStatus, ToolType
 from app.models.user_upload import UploadStatus, UserUpload
+from app.services.material_readiness import invalidate_readiness_snapshot
 
 IMAGE_TOOLS = {
     ToolType.BACKGROUND_REMOVAL,
@@ -244,7 +245,8 @@ async def main() -> None:
             )
 
         await session.commit()
-        print(f"Seeded {total_inserted} readiness material rows")
+    await invalidate_readiness_snapshot()
+    print(f"Seeded {total_inserted} readiness material rows")
 
 
 if __name__ == "__main__":
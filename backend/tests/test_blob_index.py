@@ -0,0 +1,105 @@
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.services import blob_index
+from app.services.gcs_storage_service import GCSStorageService
+
+BUCKET = "vidgo-media"
+
+
+def _url(name):
+    return f"https://storage.googleapis.com/{BUCKET}/{name}"
+
+
+def _row(id, **urls):
+    return SimpleNamespace(
+        id=id, tool_type="product_scene", topic="studio", blob_missing=False, blob_verified_at=None,
+        result_image_url=urls.get("image"), result_watermarked_url=urls.get("watermarked"),
+        result_video_url=urls.get("video"),
+    )
+
+
+class FakeGCS:
+    enabled = True
+    bucket_name = BUCKET
+
+    def __init__(self, existing, broken=()):
+        self.existing = set(existing)
+        self.broken = set(broken)
+        self.checked = []
+
+    def blob_exists(self, name):
+        self.checked.append(name)
+        if name in self.broken:
+            raise RuntimeError("503")
+        return name in self.existing
+
+
+def _db(rows):
+    result = MagicMock()
+    result.scalars.return_value.all.return_value = rows
+    return SimpleNamespace(execute=AsyncMock(return_value=result), commit=AsyncMock())
+
+
+def test_result_blob_names_treats_external_urls_as_live():
+    assert blob_index.result_blob_names(_row(1, image=_url("generated/a.png?X-Goog=1")), BUCKET) == ["generated/a.png"]
+    assert blob_index.result_blob_names(_row(2, image=_url("generated/a.png"), video="https://cdn.example/v.mp4"), BUCKET) is None
+
+
+@pytest.mark.asyncio
+async def test_verify_batch_marks_rows_by_blob_existence():
+    live = _row(1, image=_url("generated/live.png"), watermarked=_url("generated/gone_wm.png"))
+    gone = _row(2, image=_url("users/u1/gone.png"))
+    external = _row(3, image="https://images.unsplash.com/x.jpg")
+    unknown = _row(4, image=_url("static/flaky.png"))
+    gcs = FakeGCS(existing={"generated/live.png"}, broken={"static/flaky.png"})
+    db = _db([live, gone, external, unknown])
+
+    counts = await blob_index.verify_batch(db, gcs=gcs)
+
+    assert counts == {"checked": 3, "missing": 1, "unknown": 1}
+    assert (live.blob_missing, gone.blob_missing, external.blob_missing) == (False, True, False)
+    assert all(r.blob_verified_at is not None for r in (live, gone, external))
+    # A failed check leaves the row to be retried rather than guessing.
+    assert unknown.blob_verified_at is None and unknown.blob_missing is False
+    assert "images.unsplash.com/x.jpg" not in " ".join(gcs.checked)
+    db.commit.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_verify_batch_is_a_noop_without_gcs():
+    gcs = FakeGCS(existing=())
+    gcs.enabled = False
+    db = _db([_row(1, image=_url("generated/a.png"))])
+    assert await blob_index.verify_batch(db, gcs=gcs) == {"checked": 0, "missing": 0, "unknown": 0}
+    db.execute.assert_not_awaited()
+
+
+def test_gcs_hooks_record_latest_event_per_blob(monkeypatch):
+    monkeypatch.setattr(GCSStorageService, "_uploaded_blobs", set())
+    monkeypatch.setattr(GCSStorageService, "_deleted_blobs", set())
+    gcs = GCSStorageService.__new__(GCSStorageService)
+
+    gcs._note_blob_event("generated/a.png", present=True)
+    gcs._note_blob_event("generated/b.png", present=True)
+    gcs._note_blob_event("generated/a.png", present=False)
+
+    assert gcs.drain_blob_events() == ({"generated/b.png"}, {"generated/a.png"})
+    assert gcs.drain_blob_events() == (set(), set())
+
+
+@pytest.mark.asyncio
+async def test_apply_blob_events_updates_referencing_rows():
+    gcs = FakeGCS(existing=())
+    gcs.drain_blob_events = lambda: ({"generated/new.png"}, {"generated/old.png"})
+    db = SimpleNamespace(execute=AsyncMock(return_value=SimpleNamespace(rowcount=2)), commit=AsyncMock())
+
+    assert await blob_index.apply_blob_events(db, gcs=gcs) == 4
+
+    uploaded_stmt, deleted_stmt = (call.args[0] for call in db.execute.await_args_list)
+    assert "new.png" in str(uploaded_stmt.compile(compile_kwargs={"literal_binds": True}))
+    assert "blob_missing" in str(uploaded_stmt)
+    assert "blob_missing" not in str(deleted_stmt)
+    db.commit.assert_awaited_once()
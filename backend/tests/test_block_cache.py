@@ -0,0 +1,195 @@
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from app.services.block_cache import PromptBlockCache
+
+
+class _FakePipeline:
+    def __init__(self, redis):
+        self._redis = redis
+        self._ops = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self._ops.append((name, args, kwargs))
+            return self
+        return queue
+
+    async def execute(self):
+        self._redis.round_trips += 1
+        return [await getattr(self._redis, name)(*a, _counted=False, **kw) for name, a, kw in self._ops]
+
+
+class FakeRedis:
+    """In-memory subset of redis.asyncio that counts round-trips."""
+
+    def __init__(self):
+        self.kv = {}
+        self.hashes = {}
+        self.round_trips = 0
+
+    def pipeline(self, transaction=True):
+        return _FakePipeline(self)
+
+    def _count(self, counted):
+        if counted:
+            self.round_trips += 1
+
+    async def get(self, key, _counted=True):
+        self._count(_counted)
+        return self.kv.get(key)
+
+    async def mget(self, *keys, _counted=True):
+        self._count(_counted)
+        if len(keys) == 1 and isinstance(keys[0], list):
+            keys = keys[0]
+        return [self.kv.get(k) for k in keys]
+
+    async def set(self, key, value, ex=None, nx=False, _counted=True):
+        self._count(_counted)
+        if nx and key in self.kv:
+            return None
+        self.kv[key] = value
+        return True
+
+    async def incr(self, key, _counted=True):
+        self._count(_counted)
+        self.kv[key] = str(int(self.kv.get(key, 0)) + 1)
+        return int(self.kv[key])
+
+    async def hset(self, key, field=None, value=None, mapping=None, _counted=True):
+        self._count(_counted)
+        h = self.hashes.setdefault(key, {})
+        if mapping:
+            h.update(mapping)
+        if field is not None:
+            h[field] = value
+
+    async def eval(self, script, numkeys, *keys_and_args, _counted=True):
+        """Python stand-in for block_cache._LEARN_WORDS_LUA."""
+        self._count(_counted)
+        words_key, version_key = keys_and_args[:numkeys]
+        args = keys_and_args[numkeys:]
+        h = self.hashes.setdefault(words_key, {})
+        changed = 0
+        for i in range(0, len(args), 3):
+            word, payload, reason = args[i:i + 3]
+            old = h.get(word)
+            if old is None or json.loads(old).get("reason") != reason:
+                changed += 1
+            h[word] = payload
+        if changed:
+            await self.incr(version_key, _counted=False)
+        return changed
+
+    async def hincrby(self, key, field, amount=1, _counted=True):
+        self._count(_counted)
+        h = self.hashes.setdefault(key, {})
+        h[field] = int(h.get(field, 0)) + amount
+
+    async def hgetall(self, key, _counted=True):
+        self._count(_counted)
+        return dict(self.hashes.get(key, {}))
+
+    async def hdel(self, key, *fields, _counted=True):
+        self._count(_counted)
+        return sum(1 for f in fields if self.hashes.get(key, {}).pop(f, None) is not None)
+
+    async def scan_iter(self, match, count=100):
+        for key in list(self.kv):
+            if key.startswith(match.rstrip("*")):
+                yield key
+
+
+def _cache(redis):
+    cache = PromptBlockCache(gemini_api_key="")
+
+    async def _get_redis():
+        return redis
+    cache._get_redis = _get_redis
+    return cache
+
+
+@pytest.mark.asyncio
+async def test_cold_start_seeds_in_one_round_trip_and_warm_start_skips():
+    redis = FakeRedis()
+
+    first = _cache(redis)
+    await first.initialize()
+    # GET seed_version + one pipelined seed write.
+    assert redis.round_trips == 2
+    seeded = len(redis.hashes["block:words"])
+    assert seeded > 200
+    assert redis.hashes["block:stats"]["blocked_by_seed"] == seeded
+
+    redis.round_trips = 0
+    second = _cache(redis)
+    await second.initialize()
+    assert redis.round_trips == 1
+    assert redis.hashes["block:stats"]["blocked_by_seed"] == seeded
+
+
+@pytest.mark.asyncio
+async def test_blocked_prompt_found_locally_and_verdict_cached():
+    redis = FakeRedis()
+    cache = _cache(redis)
+
+    result = await cache.check_prompt("一張血腥的照片")
+    assert result.is_blocked
+    assert result.blocked_words == ["血腥"]
+    assert redis.hashes["block:stats"]["cache_hits"] == 1
+
+    # The next identical prompt is answered from the verdict cache.
+    again = await cache.check_prompt("一張血腥的照片")
+    assert again.is_blocked and again.source == "cache"
+    assert redis.hashes["block:stats"]["prompt_cache_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_learned_words_written_in_one_pipeline_and_visible_immediately():
+    redis = FakeRedis()
+    cache = _cache(redis)
+    await cache.initialize()
+
+    redis.round_trips = 0
+    assert await cache.add_blocked_words(["glorbnax", "zorblat"], "custom_rule", "manual")
+    assert redis.round_trips == 1
+
+    result = await cache.check_prompt("a glorbnax on a hill")
+    assert result.is_blocked and result.blocked_words == ["glorbnax"]
+
+
+@pytest.mark.asyncio
+async def test_legacy_words_survive_initialize_seeding():
+    redis = FakeRedis()
+    redis.kv["block:word:0f3a"] = json.dumps({
+        "word": "glorbnax",
+        "reason": "custom_rule",
+        "source": "gemini",
+        "cached_at": datetime.now(timezone.utc).isoformat(),
+    })
+    cache = _cache(redis)
+    await cache.initialize()
+
+    assert redis.kv["block:words:migrated"] == "1"
+    assert "glorbnax" in redis.hashes["block:words"]
+    result = await cache.check_prompt("a glorbnax on a hill")
+    assert result.is_blocked and result.blocked_words == ["glorbnax"]
+
+
+@pytest.mark.asyncio
+async def test_relearning_known_word_does_not_bump_version():
+    redis = FakeRedis()
+    cache = _cache(redis)
+    await cache.initialize()
+    await cache.add_blocked_words(["glorbnax"], "custom_rule", "gemini")
+    version = redis.kv["block:words:version"]
+
+    # Same word, same reason: timestamp refreshed, no fleet-wide recompile.
+    await cache.add_blocked_words(["glorbnax"], "custom_rule", "gemini")
+    assert redis.kv["block:words:version"] == version
+
+    await cache.add_blocked_words(["glorbnax"], "violence", "gemini")
+    assert int(redis.kv["block:words:version"]) == int(version) + 1
@@ -0,0 +1,172 @@
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.sql.dml import Insert, Update
+
+from app.services import credit_reset
+from app.services.subscription_service import subscription_period_credits
+
+IDS = sorted(uuid.uuid4() for _ in range(5))
+
+
+class FakeRedis:
+    def __init__(self):
+        self.store = {}
+
+    async def get(self, key):
+        return self.store.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.store[key] = value
+
+    async def delete(self, key):
+        self.store.pop(key, None)
+
+
+class _Result:
+    def __init__(self, rows=None, one=None):
+        self._rows, self._one = rows or [], one
+
+    def all(self):
+        return self._rows
+
+    def one(self):
+        return self._one
+
+    def scalars(self):
+        return self
+
+
+class FakeSession:
+    """Serves a plan list and the UPDATE ... RETURNING rows from
+    ``returning(lower, upper)``; keyset chunks come from ``_fake_next_chunk``."""
+
+    def __init__(self, plans, ids, returning, fail_on=()):
+        self.plans, self.ids = plans, ids
+        self.returning, self.fail_on = returning, set(fail_on)
+        self.bounds = None
+        self.statements, self.inserted = [], []
+        self.commits = self.rollbacks = 0
+
+    async def execute(self, stmt, params=None):
+        self.statements.append(stmt)
+        if isinstance(stmt, Insert):
+            self.inserted.extend(params)
+            return _Result()
+        if isinstance(stmt, Update):
+            bounds = self.bounds
+            if bounds[1] in self.fail_on:
+                raise RuntimeError("deadlock detected")
+            return _Result(self.returning(*bounds))
+        return _Result(self.plans)
+
+    async def commit(self):
+        self.commits += 1
+
+    async def rollback(self):
+        self.rollbacks += 1
+
+
+async def _fake_next_chunk(db, after, n, *criteria):
+    db.statements.append("chunk")
+    chunk = [i for i in db.ids if after is None or i > after][:n]
+    db.bounds = (after, chunk[-1] if chunk else None)
+    return db.bounds[1], len(chunk)
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    fake = FakeRedis()
+
+    async def _get_redis():
+        return fake
+
+    monkeypatch.setattr("app.api.deps.get_redis", _get_redis)
+    monkeypatch.setattr(credit_reset.get_settings(), "CREDIT_JOB_CHUNK_SIZE", 2)
+    monkeypatch.setattr(credit_reset, "_next_chunk", _fake_next_chunk)
+    return fake
+
+
+def _plan(**kw):
+    defaults = dict(id=uuid.uuid4(), name="pro", display_name="Pro", monthly_credits=18,
+                    monthly_credits_twd=10, weekly_credits=0, credits_per_month=0)
+    return SimpleNamespace(**{**defaults, **kw})
+
+
+def _reset_rows(lower, upper):
+    # (user_id, old_credits, purchased, bonus, new_credits, plan_label)
+    ids = [i for i in IDS if (lower is None or i > lower) and i <= upper]
+    return [(i, 7 if n % 2 else 0, 100, 5, 18, "Pro") for n, i in enumerate(ids)]
+
+
+def test_grants_match_subscription_period_credits():
+    plan = _plan()
+    rows = credit_reset.grant_rows([plan])
+    for plan_id, ecpay, yearly, credits in rows:
+        assert credits == subscription_period_credits(
+            plan, "ecpay" if ecpay else "paypal", "yearly" if yearly else "monthly"
+        )
+    assert (plan.id, 0, 1, 16) in rows  # round(16.5) stays banker's-rounded
+
+
+@pytest.mark.asyncio
+async def test_scheduled_reset_runs_a_fixed_number_of_statements_per_chunk(redis):
+    db = FakeSession([_plan()], IDS, _reset_rows)
+    stats = await credit_reset.run_scheduled_monthly_reset(db)
+
+    assert (stats["chunks"], stats["updated"], stats["errors"]) == (3, 5, [])
+    # plans + 3 × (chunk bound, UPDATE ... RETURNING, bulk INSERT)
+    assert len(db.statements) == 1 + 3 * 3 and db.commits == 3
+    sql = str(db.statements[2].compile(dialect=postgresql.dialect()))
+    assert "FROM (SELECT DISTINCT ON (users.id)" in sql and "AS grants" in sql and "RETURNING" in sql
+    expiries = [e for e in db.inserted if e["transaction_type"] == "expiry"]
+    grants = [e for e in db.inserted if e["transaction_type"] == "subscription"]
+    assert len(grants) == 5 and len(expiries) == 2
+    assert grants[0]["balance_after"] == 100 + 5 + 18
+    assert stats["credits_expired"] == 14 and stats["credits_added"] == 90
+    assert redis.store == {}  # clean run: checkpoint cleared
+
+
+@pytest.mark.asyncio
+async def test_failed_chunk_keeps_checkpoint_and_next_run_resumes(redis, monkeypatch):
+    first = FakeSession([_plan()], IDS, _reset_rows, fail_on={IDS[3]})
+    stats = await credit_reset.run_scheduled_monthly_reset(first)
+
+    assert stats["updated"] == 3 and len(stats["errors"]) == 1 and first.rollbacks == 1
+    (cursor,) = redis.store.values()
+    assert cursor == str(IDS[1])  # stops advancing at the failed chunk
+
+    seen = []
+    original = credit_reset.scheduled_reset_stmt
+    monkeypatch.setattr(
+        credit_reset, "scheduled_reset_stmt",
+        lambda g, lo, hi, now: seen.append((lo, hi)) or original(g, lo, hi, now),
+    )
+    second = FakeSession([_plan()], IDS, _reset_rows)
+    await credit_reset.run_scheduled_monthly_reset(second)
+    assert seen[0] == (IDS[1], IDS[3])
+    assert redis.store == {}
+
+
+@pytest.mark.asyncio
+async def test_bonus_expiry_loops_until_a_short_chunk(redis):
+    batches = [
+        [(IDS[0], 30, 10), (IDS[1], 5, 0)],
+        [(IDS[2], 8, 1)],
+    ]
+
+    class BonusSession(FakeSession):
+        async def execute(self, stmt, params=None):
+            self.statements.append(stmt)
+            if isinstance(stmt, Insert):
+                self.inserted.extend(params)
+                return _Result()
+            return _Result(batches.pop(0))
+
+    db = BonusSession([], [], None)
+    assert await credit_reset.run_bonus_expiry(db) == 3
+    assert db.commits == 2
+    assert [e["amount"] for e in db.inserted] == [-30, -5, -8]
+    assert db.inserted[0]["balance_after"] == 10
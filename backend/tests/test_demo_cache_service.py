@@ -0,0 +1,130 @@
+import asyncio
+import json
+import time
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.services import demo_cache_service as demo_module
+from app.services.demo_cache_service import DemoCacheService
+
+DEMO = {"id": "m-1", "tool_type": "product_scene", "topic": "studio", "result_url": "https://cdn/x.png"}
+
+
+class FakeRedis:
+    def __init__(self):
+        self.hashes = {}
+        self.kv = {}
+
+    async def hget(self, key, field):
+        return self.hashes.get(key, {}).get(field)
+
+    async def hset(self, key, field, value):
+        self.hashes.setdefault(key, {})[field] = value
+
+    async def expire(self, key, seconds):
+        return True
+
+    async def get(self, key):
+        return self.kv.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.kv[key] = value
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.hashes.pop(key, None)
+            self.kv.pop(key, None)
+
+
+@pytest.fixture(autouse=True)
+def _clean_local_cache():
+    demo_module._local_best.clear()
+    demo_module._best_inflight.clear()
+    yield
+    demo_module._local_best.clear()
+
+
+@pytest.mark.asyncio
+async def test_redis_hit_skips_db():
+    redis = FakeRedis()
+    redis.hashes["demo:best:product_scene:studio"] = {"|": json.dumps({"demo": DEMO, "at": time.time()})}
+    service = DemoCacheService(db=None, redis=redis)
+    service._get_from_db = AsyncMock()
+
+    assert await service.get_or_generate("product_scene", "studio") == DEMO
+    service._get_from_db.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_db_load_then_serve_locally():
+    redis = FakeRedis()
+    calls = 0
+
+    async def slow_db(*args, **kwargs):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return DEMO
+
+    services = []
+    for _ in range(10):
+        service = DemoCacheService(db=None, redis=redis)
+        service._get_from_db = slow_db
+        services.append(service)
+
+    results = await asyncio.gather(*(s.get_or_generate("product_scene", "studio") for s in services))
+
+    assert results == [DEMO] * 10
+    assert calls == 1
+    assert "demo:best:product_scene:studio" in redis.hashes
+
+    # Later requests on this instance don't even reach Redis.
+    redis.hashes.clear()
+    assert await services[0].get_or_generate("product_scene", "studio") == DEMO
+    assert calls == 1
+
+
+@pytest.mark.asyncio
+async def test_miss_is_remembered_and_invalidation_clears_it():
+    redis = FakeRedis()
+    service = DemoCacheService(db=None, redis=redis)
+    service._get_from_db = AsyncMock(return_value=None)
+
+    assert await service._get_best("product_scene", "studio") is None
+    assert await service._get_best("product_scene", "studio") is None
+    assert service._get_from_db.await_count == 1
+
+    await service.invalidate_cache("product_scene", "studio")
+    service._get_from_db.return_value = DEMO
+    assert await service._get_best("product_scene", "studio") == DEMO
+    assert service._get_from_db.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_rejected_material_stops_being_served(monkeypatch):
+    from types import SimpleNamespace
+
+    from app.api import deps
+    from app.models.material import MaterialStatus, ToolType
+    from app.services import admin_dashboard
+
+    redis = FakeRedis()
+    monkeypatch.setattr(deps, "get_redis", AsyncMock(return_value=redis))
+    monkeypatch.setattr(admin_dashboard, "invalidate_readiness_snapshot", AsyncMock())
+
+    service = DemoCacheService(db=None, redis=redis)
+    service._get_from_db = AsyncMock(return_value=DEMO)
+    assert await service._get_best("product_scene", "studio") == DEMO
+
+    material = SimpleNamespace(status=MaterialStatus.APPROVED, tool_type=ToolType.PRODUCT_SCENE, topic="studio")
+    db = SimpleNamespace(
+        execute=AsyncMock(return_value=SimpleNamespace(scalar_one_or_none=lambda: material)),
+        commit=AsyncMock(),
+    )
+    ok, _ = await admin_dashboard.AdminDashboardService(db).review_material("m-1", "reject", "admin-1")
+    assert ok and material.status == MaterialStatus.REJECTED
+
+    service._get_from_db.return_value = None
+    assert await service._get_best("product_scene", "studio") is None
+    assert service._get_from_db.await_count == 2
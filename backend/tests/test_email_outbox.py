@@ -0,0 +1,188 @@
+import asyncio
+import json
+
+import pytest
+
+from app.services import email_outbox
+from app.services.email_service import EmailService
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")
+
+
+class LocalSMTP:
+    """Minimal SMTP stand-in on 127.0.0.1. ``reject`` maps a recipient to
+    the reply codes its next RCPT TO commands get (e.g. [451] once)."""
+
+    def __init__(self, reject=None):
+        self.reject = {k: list(v) for k, v in (reject or {}).items()}
+        self.connections = 0
+        self.delivered = []
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        writer.write(b"220 localhost ESMTP\r\n")
+        rcpts, data, in_data = [], [], False
+        while line := await reader.readline():
+            if in_data:
+                if line == b".\r\n":
+                    self.delivered.extend((r, b"".join(data)) for r in rcpts)
+                    rcpts, data, in_data = [], [], False
+                    writer.write(b"250 queued\r\n")
+                else:
+                    data.append(line)
+            else:
+                cmd = line[:4].upper()
+                if cmd == b"EHLO":
+                    writer.write(b"250 localhost\r\n")
+                elif cmd == b"RCPT":
+                    addr = line.split(b"<", 1)[1].split(b">", 1)[0].decode()
+                    codes = self.reject.get(addr)
+                    if codes:
+                        writer.write(f"{codes.pop(0)} mailbox unavailable\r\n".encode())
+                    else:
+                        rcpts.append(addr)
+                        writer.write(b"250 ok\r\n")
+                elif cmd == b"DATA":
+                    in_data = True
+                    writer.write(b"354 go ahead\r\n")
+                elif cmd == b"QUIT":
+                    writer.write(b"221 bye\r\n")
+                    await writer.drain()
+                    break
+                else:  # MAIL, RSET, NOOP
+                    writer.write(b"250 ok\r\n")
+            await writer.drain()
+        writer.close()
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+
+async def _zset(redis, key):
+    return dict(await redis.zrange(key, 0, -1, withscores=True))
+
+
+@pytest.fixture
+async def env(monkeypatch):
+    smtp = LocalSMTP(reject={"flaky@example.com": [451], "gone@example.com": [550]})
+    port = await smtp.start()
+    redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+
+    async def _get_redis():
+        return redis
+
+    monkeypatch.setattr("app.api.deps.get_redis", _get_redis)
+    service = EmailService()
+    service.smtp_host, service.smtp_port, service.use_tls = "127.0.0.1", port, False
+    service.smtp_user = service.smtp_password = ""
+    yield smtp, redis, service
+    await service.smtp_pool.close()
+    await smtp.stop()
+
+
+@pytest.mark.asyncio
+async def test_send_email_enqueues_and_sender_reuses_one_connection(env):
+    smtp, redis, service = env
+    for n in range(3):
+        assert await service.send_email(f"user{n}@example.com", "Hi", "<p>hi</p>", "hi")
+    assert smtp.delivered == [] and len(await _zset(redis, email_outbox.OUTBOX_KEY)) == 3
+
+    stats = await email_outbox.run_outbox_once(service)
+    await service.send_email("late@example.com", "Hi", "<p>hi</p>")
+    await email_outbox.run_outbox_once(service)
+
+    assert stats == {"claimed": 3, "sent": 3, "retried": 0, "dead": 0}
+    assert sorted(r for r, _ in smtp.delivered[:3]) == [f"user{n}@example.com" for n in range(3)]
+    assert smtp.delivered[3][0] == "late@example.com"
+    # Two batches, split across the pool's two slots, then reused.
+    assert service.smtp_pool.opened == smtp.connections <= service.smtp_pool.size
+    assert not await _zset(redis, email_outbox.OUTBOX_KEY)
+    assert not await _zset(redis, email_outbox.INFLIGHT_KEY)
+
+
+@pytest.mark.asyncio
+async def test_transient_failure_backs_off_and_permanent_one_dead_letters(env, monkeypatch):
+    smtp, redis, service = env
+    clock = [1000.0]
+    monkeypatch.setattr(email_outbox, "_now", lambda: clock[0])
+    await service.send_email("flaky@example.com", "Code", "<p>1</p>")
+    await service.send_email("gone@example.com", "Code", "<p>2</p>")
+
+    stats = await email_outbox.run_outbox_once(service)
+    assert (stats["retried"], stats["dead"]) == (1, 1)
+    ((raw, due),) = (await _zset(redis, email_outbox.OUTBOX_KEY)).items()
+    assert json.loads(raw)["attempts"] == 1 and due == 1000.0 + email_outbox.retry_delay(1)
+    dead = json.loads((await redis.lrange(email_outbox.DEAD_LETTER_KEY, 0, -1))[0])
+    assert dead["to_email"] == "gone@example.com" and "550" in dead["error"]
+
+    assert (await email_outbox.run_outbox_once(service))["claimed"] == 0  # not due yet
+    clock[0] = due
+    assert (await email_outbox.run_outbox_once(service))["sent"] == 1
+    assert [r for r, _ in smtp.delivered] == ["flaky@example.com"]
+
+
+@pytest.mark.asyncio
+async def test_expired_inflight_lease_is_requeued(env, monkeypatch):
+    _, redis, service = env
+    clock = [1000.0]
+    monkeypatch.setattr(email_outbox, "_now", lambda: clock[0])
+    await service.send_email("a@example.com", "Hi", "<p>hi</p>")
+    assert len(await email_outbox.claim_due(redis, 10)) == 1  # instance dies here
+
+    assert await email_outbox.claim_due(redis, 10) == []
+    clock[0] += email_outbox.get_settings().EMAIL_OUTBOX_LEASE_SECONDS + 1
+    assert [m.to_email for _, m in await email_outbox.claim_due(redis, 10)] == ["a@example.com"]
+
+
+@pytest.mark.asyncio
+async def test_lease_is_renewed_while_a_slow_batch_is_sending(env, monkeypatch):
+    smtp, redis, service = env
+    monkeypatch.setattr(email_outbox.get_settings(), "EMAIL_OUTBOX_LEASE_SECONDS", 0.3)
+    deliver = service.deliver
+
+    async def slow_deliver(messages):
+        await asyncio.sleep(0.8)  # several leases' worth of SMTP timeouts
+        return await deliver(messages)
+
+    monkeypatch.setattr(service, "deliver", slow_deliver)
+    await service.send_email("a@example.com", "Hi", "<p>hi</p>")
+
+    sending = asyncio.create_task(email_outbox.run_outbox_once(service))
+    await asyncio.sleep(0.5)
+    # Another instance polling mid-batch must not reclaim the message.
+    assert await email_outbox.claim_due(redis, 10) == []
+    assert (await sending)["sent"] == 1
+    assert [r for r, _ in smtp.delivered] == ["a@example.com"]
+    assert not await _zset(redis, email_outbox.OUTBOX_KEY)
+
+
+@pytest.mark.asyncio
+async def test_provider_alert_storm_is_deduplicated(env, monkeypatch):
+    smtp, redis, service = env
+    monkeypatch.setattr(service, "get_admin_recipients", lambda: ["ops@example.com"])
+
+    assert await service.send_provider_failure_alert("piapi", "t2i", "HTTP 500 (request 123)")
+    assert not await service.send_provider_failure_alert("piapi", "t2i", "HTTP 500 (request 456)")
+    assert await service.send_provider_failure_alert("piapi", "t2v", "HTTP 500 (request 456)")
+    assert len(await _zset(redis, email_outbox.OUTBOX_KEY)) == 2
+
+
+@pytest.mark.asyncio
+async def test_redis_outage_sends_inline_through_pool(env, monkeypatch):
+    smtp, _, service = env
+
+    async def _down():
+        raise ConnectionError("redis down")
+
+    monkeypatch.setattr("app.api.deps.get_redis", _down)
+    assert await service.send_email("a@example.com", "Hi", "<p>hi</p>")
+    assert await service.send_email("b@example.com", "Hi", "<p>hi</p>")
+    assert [r for r, _ in smtp.delivered] == ["a@example.com", "b@example.com"]
+    assert smtp.connections == 1
@@ -0,0 +1,144 @@
+import asyncio
+import hashlib
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.sql.dml import Update
+
+from app.services.embedding_batcher import EmbeddingBatcher
+from app.services.similarity import EmbeddingIndex, SimilarityService
+
+
+class FakeEmbedder:
+    """Deterministic local embedder: 4-d vector derived from the text hash."""
+
+    def __init__(self, fail=False):
+        self.requests = []
+        self.fail = fail
+
+    async def __call__(self, texts):
+        self.requests.append(list(texts))
+        await asyncio.sleep(0)
+        if self.fail:
+            raise RuntimeError("quota exceeded")
+        return [[b / 255 for b in hashlib.sha256(t.encode()).digest()[:4]] for t in texts]
+
+
+class FakeRedis:
+    def __init__(self):
+        self.store = {}
+        self.mgets = 0
+
+    async def mget(self, keys):
+        self.mgets += 1
+        return [self.store.get(k) for k in keys]
+
+    def pipeline(self):
+        redis = self
+
+        class _Pipe:
+            def set(self, key, value, ex=None):
+                redis.store[key] = value
+
+            async def execute(self):
+                return []
+
+        return _Pipe()
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    fake = FakeRedis()
+
+    async def _get_redis():
+        return fake
+
+    monkeypatch.setattr("app.api.deps.get_redis", _get_redis)
+    return fake
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_one_batched_request(redis):
+    embedder = FakeEmbedder()
+    batcher = EmbeddingBatcher(embedder, "m", max_batch=10, max_wait_ms=5)
+    texts = ["red shoes", "blue  hat", "red shoes", "green bag", "blue hat"]
+
+    vectors = await asyncio.gather(*(batcher.embed(t) for t in texts))
+
+    assert embedder.requests == [["red shoes", "blue hat", "green bag"]]
+    assert vectors[0] == vectors[2] and vectors[1] == vectors[4]
+    assert batcher.stats()["deduped"] == 2
+
+
+@pytest.mark.asyncio
+async def test_full_batch_flushes_without_waiting_and_splits(redis):
+    embedder = FakeEmbedder()
+    batcher = EmbeddingBatcher(embedder, "m", max_batch=3, max_wait_ms=10_000)
+
+    # Two full batches go out immediately despite the 10 s window.
+    vectors = await asyncio.wait_for(batcher.embed_all([f"p{i}" for i in range(6)]), timeout=1)
+
+    assert all(vectors)
+    assert embedder.requests == [["p0", "p1", "p2"], ["p3", "p4", "p5"]]
+    assert redis.mgets == 2
+
+
+@pytest.mark.asyncio
+async def test_persistent_cache_survives_a_new_batcher(redis):
+    first = FakeEmbedder()
+    vec = await EmbeddingBatcher(first, "m", max_wait_ms=0).embed("sunset beach")
+
+    second = FakeEmbedder()
+    batcher = EmbeddingBatcher(second, "m", max_wait_ms=0)
+    assert await batcher.embed("sunset   beach") == pytest.approx(vec, abs=1e-6)
+    assert second.requests == [] and batcher.stats()["redis_hits"] == 1
+    # Other model, other key.
+    await EmbeddingBatcher(second, "other-model", max_wait_ms=0).embed("sunset beach")
+    assert second.requests == [["sunset beach"]]
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_fails_every_caller_and_is_not_cached(redis):
+    batcher = EmbeddingBatcher(FakeEmbedder(fail=True), "m", max_wait_ms=0)
+    results = await batcher.embed_all(["a", "b"])
+    assert results == [None, None] and redis.store == {}
+    assert batcher.stats()["pending"] == 0
+
+
+@pytest.mark.asyncio
+async def test_backfill_embeds_missing_rows_in_chunks(redis):
+    ids = sorted(uuid.uuid4() for _ in range(5))
+    rows = [(i, f"prompt {n}", True, "completed", "https://x/i.png" if n else None) for n, i in enumerate(ids)]
+    embedder = FakeEmbedder()
+    batcher = EmbeddingBatcher(embedder, "m", max_wait_ms=1)
+
+    class FakeSession:
+        def __init__(self):
+            self.updates, self.commits, self.selects = [], 0, 0
+
+        async def execute(self, stmt, params=None):
+            if isinstance(stmt, Update):
+                self.updates.extend(params)
+                return None
+            chunk = rows[self.selects * 2:(self.selects + 1) * 2]
+            self.selects += 1
+            return SimpleNamespace(all=lambda: chunk)
+
+        async def commit(self):
+            self.commits += 1
+
+    async def get_embedding(text):
+        return {"success": True, "embedding": await batcher.embed(text)}
+
+    service = SimilarityService.__new__(SimilarityService)
+    service.gemini = SimpleNamespace(get_embedding=get_embedding)
+    service.index = EmbeddingIndex()
+    db = FakeSession()
+
+    stats = await service.backfill_embeddings(db, chunk_size=2)
+
+    assert stats == {"scanned": 5, "embedded": 5, "failed": 0, "chunks": 3}
+    assert [u["id"] for u in db.updates] == ids and db.commits == 3
+    assert [len(r) for r in embedder.requests] == [2, 2, 1]
+    assert len(service.index) == 4  # the row without an image isn't servable
@@ -0,0 +1,75 @@
+import asyncio
+import sys
+import time
+
+import pytest
+
+from app.services import ffmpeg_runner
+
+
+@pytest.fixture(autouse=True)
+def fresh_runner(monkeypatch):
+    monkeypatch.setattr(ffmpeg_runner, "_semaphore", None)
+    monkeypatch.setattr(ffmpeg_runner, "_capabilities", {})
+    monkeypatch.setattr(ffmpeg_runner, "_stats", {"jobs": 0, "failed": 0, "timed_out": 0, "running": 0, "waiting": 0})
+
+
+def _python(code):
+    return [sys.executable, "-c", code]
+
+
+@pytest.mark.asyncio
+async def test_runs_without_blocking_and_captures_output():
+    result = await ffmpeg_runner.run_ffmpeg(_python("import sys; sys.stderr.write('boom'); sys.exit(3)"))
+    assert result.returncode == 3 and not result.ok
+    assert result.detail() == "boom"
+    assert ffmpeg_runner.stats()["failed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_wall_clock_limit_kills_the_process():
+    started = time.monotonic()
+    result = await ffmpeg_runner.run_ffmpeg(_python("import time; time.sleep(30)"), timeout=0.3)
+    assert result.timed_out and not result.ok
+    assert time.monotonic() - started < 5
+    stats = ffmpeg_runner.stats()
+    assert (stats["timed_out"], stats["failed"], stats["running"]) == (1, 0, 0)
+
+
+@pytest.mark.asyncio
+async def test_global_semaphore_limits_concurrent_jobs(monkeypatch):
+    monkeypatch.setattr(ffmpeg_runner.settings, "FFMPEG_MAX_CONCURRENCY", 1)
+    sleep = _python("import time; time.sleep(0.3)")
+    started = time.monotonic()
+    first = asyncio.create_task(ffmpeg_runner.run_ffmpeg(sleep))
+    second = asyncio.create_task(ffmpeg_runner.run_ffmpeg(sleep))
+    await asyncio.sleep(0.1)
+    assert ffmpeg_runner.stats()["running"] == 1
+    assert ffmpeg_runner.stats()["waiting"] == 1
+    await asyncio.gather(first, second)
+    assert time.monotonic() - started >= 0.6
+
+
+@pytest.mark.asyncio
+async def test_progress_blocks_are_parsed():
+    stream = asyncio.StreamReader()
+    stream.feed_data(
+        b"frame=48\nout_time_us=2000000\nspeed=1.5x\nprogress=continue\n"
+        b"frame=96\nout_time_ms=4000000\nspeed=N/A\nprogress=end\n"
+    )
+    stream.feed_eof()
+    seen, last = [], [None]
+    await ffmpeg_runner._read_progress(stream, seen.append, last)
+
+    assert [(p.frame, p.out_time_s, p.speed, p.done) for p in seen] == [
+        (48, 2.0, 1.5, False),
+        (96, 4.0, None, True),
+    ]
+    assert last[0] is seen[-1]
+
+
+@pytest.mark.asyncio
+async def test_capability_probe_is_cached():
+    assert ffmpeg_runner.cached_ffmpeg_available("vidgo-no-such-binary") is None
+    assert await ffmpeg_runner.ffmpeg_available("vidgo-no-such-binary") is False
+    assert ffmpeg_runner.cached_ffmpeg_available("vidgo-no-such-binary") is False
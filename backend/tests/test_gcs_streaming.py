@@ -0,0 +1,98 @@
+import os
+
+import pytest
+
+from app.services import gcs_storage_service
+from app.services.gcs_memory import InMemoryGCSClient
+from app.services.gcs_storage_service import GCSStorageService
+
+CHUNK = 256 * 1024
+
+
+@pytest.fixture
+def client():
+    return InMemoryGCSClient()
+
+
+@pytest.fixture
+def gcs(client, monkeypatch):
+    s = gcs_storage_service.get_settings()
+    monkeypatch.setattr(s, "GCS_RESUMABLE_THRESHOLD_BYTES", 2 * CHUNK)
+    monkeypatch.setattr(s, "GCS_UPLOAD_CHUNK_BYTES", CHUNK)
+    monkeypatch.setattr(s, "GCS_COMPOSITE_THRESHOLD_BYTES", 16 * CHUNK)
+    monkeypatch.setattr(s, "GCS_COMPOSITE_PARTS", 4)
+    service = GCSStorageService(client=client, bucket_name="test-bucket")
+    service.drain_blob_events()
+    return service
+
+
+def _write(tmp_path, size):
+    data = os.urandom(size)
+    path = tmp_path / "video.mp4"
+    path.write_bytes(data)
+    return path, data
+
+
+async def _chunks(data, step):
+    for i in range(0, len(data), step):
+        yield data[i:i + step]
+
+
+@pytest.mark.asyncio
+async def test_large_file_uploads_in_chunks(gcs, client, tmp_path):
+    path, data = _write(tmp_path, 5 * CHUNK + 123)
+    url = await gcs.upload_stream(path, "uploads/videos/u1/a.mp4", content_type="video/mp4")
+
+    assert url == "https://storage.googleapis.com/test-bucket/uploads/videos/u1/a.mp4"
+    obj = client.objects[("test-bucket", "uploads/videos/u1/a.mp4")]
+    assert obj.data == data and obj.public
+    assert obj.content_type == "video/mp4"
+    assert obj.cache_control == GCSStorageService.IMMUTABLE_CACHE_CONTROL
+    assert "resumable" in client.calls
+    assert client.max_io_bytes == CHUNK
+    assert gcs.drain_blob_events() == ({"uploads/videos/u1/a.mp4"}, set())
+
+
+@pytest.mark.asyncio
+async def test_small_file_is_a_single_request(gcs, client, tmp_path):
+    path, data = _write(tmp_path, 1000)
+    await gcs.upload_stream(str(path), "small.mp4", content_type="video/mp4")
+    assert client.objects[("test-bucket", "small.mp4")].data == data
+    assert "resumable" not in client.calls
+
+
+@pytest.mark.asyncio
+async def test_big_file_is_a_parallel_composite(gcs, client, tmp_path):
+    path, data = _write(tmp_path, 17 * CHUNK + 7)
+    await gcs.upload_stream(path, "big.mp4", content_type="video/mp4")
+
+    assert client.objects[("test-bucket", "big.mp4")].data == data
+    assert client.calls.count("compose") == 1
+    # Parts are cleaned up; only the final object remains.
+    assert list(client.objects) == [("test-bucket", "big.mp4")]
+    assert client.max_io_bytes == CHUNK
+
+
+@pytest.mark.asyncio
+async def test_async_iterator_switches_to_resumable_past_threshold(gcs, client):
+    data = os.urandom(6 * CHUNK)
+    await gcs.upload_stream(_chunks(data, 64 * 1024), "stream.bin")
+    assert client.objects[("test-bucket", "stream.bin")].data == data
+    assert "resumable" in client.calls
+
+    client.calls.clear()
+    await gcs.upload_stream(_chunks(b"tiny", 2), "tiny.bin")
+    assert client.objects[("test-bucket", "tiny.bin")].data == b"tiny"
+    assert client.calls == ["upload_from_string"]
+
+
+@pytest.mark.asyncio
+async def test_failed_stream_leaves_no_object(gcs, client):
+    async def broken():
+        yield os.urandom(3 * CHUNK)
+        raise ConnectionError("source went away")
+
+    with pytest.raises(ConnectionError):
+        await gcs.upload_stream(broken(), "partial.bin")
+    assert ("test-bucket", "partial.bin") not in client.objects
+    assert gcs.drain_blob_events() == (set(), set())
@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+
+from app.services import gemini_cache
+from app.services.gemini_service import GeminiService
+
+
+class FakeRedis:
+    def __init__(self):
+        self.store = {}
+        self.ttls = {}
+
+    async def get(self, key):
+        return self.store.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.store[key] = value
+        self.ttls[key] = ex
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    fake = FakeRedis()
+
+    async def _get_redis():
+        return fake
+
+    monkeypatch.setattr("app.api.deps.get_redis", _get_redis)
+    monkeypatch.setattr(gemini_cache, "_cache", gemini_cache.GeminiResponseCache(100))
+    return fake
+
+
+class CountingGemini(GeminiService):
+    """Stands in for the live call: the cache wraps this override, so the
+    counter records real upstream calls."""
+
+    def __init__(self, delay=0.0, fail=False):
+        super().__init__(api_key="test-key")
+        self.model_name = "gemini-test"
+        self.calls = 0
+        self.delay, self.fail = delay, fail
+
+    @gemini_cache.cached_response("translate_text", 1, "GEMINI_CACHE_TTL_TRANSLATE_SECONDS")
+    async def translate_text(self, text, target_language):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            return {"success": False, "translated": text}
+        return {"success": True, "translated": f"[{target_language}] {text.strip()}"}
+
+
+@pytest.mark.asyncio
+async def test_repeat_inputs_hit_lru_then_redis_across_instances(redis):
+    svc = CountingGemini()
+    first = await svc.translate_text("Hello   world", "zh-TW")
+    again = await svc.translate_text(" Hello world ", target_language="zh-TW")
+    assert first == again and svc.calls == 1
+
+    # A fresh process: empty LRU, warm Redis.
+    gemini_cache._cache = gemini_cache.GeminiResponseCache(100)
+    other = CountingGemini()
+    assert (await other.translate_text("Hello world", "zh-TW")) == first
+    assert other.calls == 0
+    stats = gemini_cache.get_gemini_cache().stats()["methods"]["translate_text"]
+    assert stats["l2_hits"] == 1 and stats["hit_ratio"] == 1.0
+    (ttl,) = set(redis.ttls.values())
+    assert ttl == gemini_cache.get_settings().GEMINI_CACHE_TTL_TRANSLATE_SECONDS
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_calls_share_one_flight(redis):
+    svc = CountingGemini(delay=0.05)
+    results = await asyncio.gather(*(svc.translate_text("Good morning", "en") for _ in range(5)))
+
+    assert svc.calls == 1 and all(r == results[0] for r in results)
+    results[0]["translated"] = "mutated"
+    assert (await svc.translate_text("Good morning", "en"))["translated"] == "[en] Good morning"
+    stats = gemini_cache.get_gemini_cache().stats()
+    assert stats["methods"]["translate_text"]["coalesced"] == 4
+    assert stats["saved_seconds"] >= 0.05 * 5 - 0.01
+
+
+@pytest.mark.asyncio
+async def test_key_covers_model_version_and_failures_are_not_stored(redis):
+    svc = CountingGemini()
+    await svc.translate_text("Hi", "en")
+    svc.model_name = "gemini-next"
+    await svc.translate_text("Hi", "en")
+    assert svc.calls == 2
+    assert gemini_cache.cache_key("m", "x", 1, {"a": "b"}) != gemini_cache.cache_key("m", "x", 2, {"a": "b"})
+    assert gemini_cache.cache_key("m", "x", 1, {"a": " b\n"}) == gemini_cache.cache_key("m", "x", 1, {"a": "b"})
+    assert gemini_cache.cache_key("m", "x", 1, {"a": "b\nc"}) != gemini_cache.cache_key("m", "x", 1, {"a": "b c"})
+
+    failing = CountingGemini(fail=True)
+    await failing.translate_text("Bye", "en")
+    await failing.translate_text("Bye", "en")
+    assert failing.calls == 2 and len(redis.store) == 2
+
+
+@pytest.mark.asyncio
+async def test_cache_bypassed_without_credentials(redis):
+    svc = CountingGemini()
+    svc.api_key, svc._use_vertex = "", False
+    await svc.translate_text("Hi", "en")
+    await svc.translate_text("Hi", "en")
+    assert svc.calls == 2 and redis.store == {}
@@ -0,0 +1,74 @@
+import io
+
+import pytest
+from fastapi import HTTPException
+from PIL import Image
+
+from app.services.image_engine import ImageEngine
+
+
+def _png(size=(300, 200), mode="RGB", color=(10, 20, 30)):
+    buf = io.BytesIO()
+    Image.new(mode, size, color).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+@pytest.fixture
+def engine():
+    # inline_bytes=0: even the tiny test images go through the process pool.
+    eng = ImageEngine(workers=1, max_queue=4, job_timeout=30, inline_bytes=0)
+    yield eng
+    eng.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_jobs_run_in_worker_process_and_record_metrics(engine):
+    normalized = await engine.normalize(_png())
+    assert (normalized.width, normalized.height) == (300, 200)
+    assert normalized.content_type == "image/png"
+
+    cutout = _png(mode="RGBA", color=(255, 0, 0, 0))
+    composite = await engine.composite_cutout(cutout, background_bytes=_png(size=(90, 60)))
+    with Image.open(io.BytesIO(composite)) as out:
+        assert (out.format, out.size) == ("JPEG", (300, 200))
+
+    resized = await engine.resize(_png(), (600, 400), fmt="JPEG")
+    with Image.open(io.BytesIO(resized)) as out:
+        assert out.size == (600, 400)
+
+    stats = engine.stats()
+    assert stats["mode"] == "process"
+    assert stats["pending"] == 0
+    assert stats["inline_jobs"] == 0
+    assert set(stats["jobs"]) == {"normalize", "composite_cutout", "resize"}
+    assert all(job["jobs"] == 1 and job["errors"] == 0 for job in stats["jobs"].values())
+
+
+@pytest.mark.asyncio
+async def test_normalize_http_errors_survive_the_pool(engine):
+    with pytest.raises(HTTPException) as exc_info:
+        await engine.normalize(b"<html>not an image</html>")
+    assert exc_info.value.status_code == 415
+    assert engine.stats()["jobs"]["normalize"]["errors"] == 1
+
+
+@pytest.mark.asyncio
+async def test_full_queue_fails_fast_with_503():
+    eng = ImageEngine(workers=1, max_queue=2, job_timeout=5)
+    eng._pending = 2  # two jobs already running/queued
+
+    with pytest.raises(HTTPException) as exc_info:
+        await eng.resize(_png(), (10, 10))
+    assert exc_info.value.status_code == 503
+    assert eng.stats()["rejected"] == 1
+    # Rejected before touching the pool.
+    assert eng._executor is None
+
+
+@pytest.mark.asyncio
+async def test_small_inputs_skip_the_pool():
+    eng = ImageEngine(workers=1, max_queue=4, job_timeout=5, inline_bytes=1024 * 1024)
+    normalized = await eng.normalize(_png())
+    assert normalized.width == 300
+    assert eng.stats()["inline_jobs"] == 1
+    assert eng._executor is None
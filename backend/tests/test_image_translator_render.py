@@ -0,0 +1,71 @@
+import io
+import os
+
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+
+from app.services import image_translator_service as translator
+
+DEJAVU = "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"
+
+
+def _card(bg=(200, 30, 40), fg=(255, 255, 255)):
+    img = Image.new("RGB", (400, 240), bg)
+    ImageDraw.Draw(img).rectangle((120, 90, 280, 150), fill=fg)
+    return img
+
+
+def test_region_colours_ignore_the_text_box_and_the_background():
+    img = _card()
+    box = (110, 80, 290, 160)
+    bg = translator._sample_background_color(img, box)
+    assert bg == (200, 30, 40)
+    assert translator._sample_text_color(img, box, bg) == (255, 255, 255)
+    # Nothing but background inside the box: lightness fallback.
+    assert translator._sample_text_color(_card(fg=(200, 30, 40)), box, bg) == (255, 255, 255)
+
+    # Ties go to the colour seen first in scan order.
+    px = np.array([[9, 9, 9], [1, 2, 3], [1, 2, 3], [9, 9, 9]], dtype=np.uint8)
+    assert translator._dominant_color(px) == (9, 9, 9)
+    assert translator._dominant_color(px[:0]) is None
+
+
+def test_texture_test_separates_flat_fills_from_noise():
+    box = (50, 50, 150, 100)
+    flat = Image.new("RGB", (200, 150), (240, 240, 240))
+    noise = Image.fromarray(np.random.default_rng(0).integers(0, 256, (150, 200, 3), dtype=np.uint8))
+    assert translator._background_is_textured(flat, box) is False
+    assert translator._background_is_textured(noise, box) is True
+
+
+@pytest.mark.skipif(not os.path.exists(DEJAVU), reason="DejaVu font not installed")
+def test_fit_font_reuses_cached_fonts_and_measurements():
+    translator._load_font.cache_clear()
+    translator._line_width.cache_clear()
+    text = "Summer Sale\n50% Off"
+
+    font = translator._fit_font(text, 300, 120, DEJAVU)
+    widest = max(font.getbbox(line)[2] - font.getbbox(line)[0] for line in text.split("\n"))
+    assert widest <= 300 and (font.size + 4) * 2 <= 120
+    bigger = translator._load_font(DEJAVU, font.size + 1)
+    assert max(bigger.getbbox(line)[2] - bigger.getbbox(line)[0] for line in text.split("\n")) > 300 \
+        or (font.size + 5) * 2 > 120
+
+    loads = translator._load_font.cache_info().misses
+    assert translator._fit_font(text, 300, 120, DEJAVU) is font
+    assert translator._load_font.cache_info().misses == loads
+
+
+@pytest.mark.skipif(not os.path.exists(DEJAVU), reason="DejaVu font not installed")
+def test_render_translation_is_deterministic(monkeypatch):
+    monkeypatch.setattr(translator, "CJK_FONT_PATH", DEJAVU)
+    buf = io.BytesIO()
+    _card().save(buf, format="PNG")
+    regions = [translator.TextRegion("SALE", "Sale", 375, 300, 625, 700)]
+
+    first = translator.render_translation(buf.getvalue(), regions)
+    assert translator.render_translation(buf.getvalue(), regions) == first
+    out = Image.open(io.BytesIO(first)).convert("RGB")
+    assert out.getpixel((10, 10)) == (200, 30, 40)
+    assert out.getpixel((122, 92)) != (255, 255, 255)  # original glyph area covered
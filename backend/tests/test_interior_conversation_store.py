@@ -0,0 +1,161 @@
+import base64
+import json
+
+import pytest
+
+from app.services import conversation_store
+from app.services.conversation_store import (
+    CONVERSATION_IMAGE_PREFIX,
+    InMemoryConversationStore,
+    RedisConversationStore,
+    make_turn,
+    sweep_conversation_images,
+    trim_turns,
+)
+from app.services.gcs_memory import InMemoryGCSClient
+from app.services.gcs_storage_service import GCSStorageService
+from app.services.interior_design_service import InteriorDesignService
+
+BUCKET = "test-bucket"
+
+PNG_B64 = base64.b64encode(b"\x89PNG\r\n\x1a\n" + b"\x00" * 2048).decode()
+
+
+class FakeRedis:
+    def __init__(self, down=False):
+        self.store, self.ttls, self.down = {}, {}, down
+
+    def _check(self):
+        if self.down:
+            raise ConnectionError("redis unavailable")
+
+    async def get(self, key):
+        self._check()
+        return self.store.get(key)
+
+    async def set(self, key, value, ex=None):
+        self._check()
+        self.store[key], self.ttls[key] = value, ex
+
+    async def delete(self, key):
+        self._check()
+        return 1 if self.store.pop(key, None) is not None else 0
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    fake = FakeRedis()
+
+    async def _get_redis():
+        return fake
+
+    monkeypatch.setattr("app.api.deps.get_redis", _get_redis)
+    return fake
+
+
+@pytest.fixture(autouse=True)
+def gcs(monkeypatch):
+    client = InMemoryGCSClient()
+    service = GCSStorageService(client=client, bucket_name=BUCKET)
+    monkeypatch.setattr("app.services.gcs_storage_service.get_gcs_storage", lambda: service)
+    return service, client
+
+
+def _service(tmp_path, store, uploads):
+    svc = InteriorDesignService(api_key="test-key")
+    svc.static_dir = tmp_path
+    svc.conversation_dir = tmp_path / "private"
+    svc.conversations = store
+    svc.requests = []
+
+    async def fetch(url):
+        return base64.b64encode(uploads[url]).decode(), "image/png"
+
+    async def generate(body, prefix, attempts=3):
+        svc.requests.append(body)
+        return {"success": True, "image_url": f"https://storage.example/out_{len(svc.requests)}.png",
+                "description": f"edit {len(svc.requests)}"}
+
+    svc._fetch_image_as_base64 = fetch
+    svc._generate_image = generate
+    return svc
+
+
+def test_trim_keeps_newest_turns_within_turn_and_byte_budgets():
+    turns = [make_turn("user" if i % 2 == 0 else "model", f"t{i}") for i in range(30)]
+    assert [t["text"] for t in trim_turns(turns, 20, 10_000)] == [f"t{i}" for i in range(10, 30)]
+
+    big = [make_turn("user", "x" * 400), make_turn("model", "ok"), make_turn("user", "y"), make_turn("model", "z" * 300)]
+    # Over budget: the oldest pair goes; the result never starts on a model turn.
+    assert [t["role"] for t in trim_turns(big, 20, 500)] == ["user", "model"]
+    assert trim_turns([make_turn("model", "orphan")], 20, 500) == []
+
+
+@pytest.mark.asyncio
+async def test_memory_store_is_an_lru_with_ttl(monkeypatch):
+    store = InMemoryConversationStore(max_entries=2, ttl_seconds=60)
+    for cid in ("a", "b", "c"):
+        await store.save(cid, [make_turn("user", cid)])
+    assert await store.load("a") == [] and len(store) == 2
+
+    now = conversation_store.time.monotonic()
+    monkeypatch.setattr(conversation_store.time, "monotonic", lambda: now + 61)
+    assert await store.load("b") == [] and len(store) == 1
+
+
+@pytest.mark.asyncio
+async def test_follow_up_on_another_instance_rehydrates_image_reference(redis, gcs, tmp_path):
+    _, client = gcs
+    uploads = {}
+    store = RedisConversationStore(max_turns=20, ttl_seconds=300)
+    first = _service(tmp_path, store, uploads)
+    r1 = await first.iterative_edit("conv-1", "sage green walls", image_base64=PNG_B64)
+    assert r1["success"] and r1["turn_count"] == 1
+
+    (key,) = redis.store
+    stored = json.loads(redis.store[key])
+    assert PNG_B64 not in redis.store[key] and redis.ttls[key] == 300
+    assert stored[1] == {"role": "model", "text": "edit 1"}
+    # The user's upload is a private object under the conversation's prefix.
+    blob_name = f"{CONVERSATION_IMAGE_PREFIX}conv-1/"
+    assert stored[0]["image_url"].startswith(f"gs://{BUCKET}/{blob_name}")
+    ((_, name),) = client.objects
+    assert name.startswith(blob_name) and not client.objects[(BUCKET, name)].public
+
+    # Fresh instance, same Redis: history and the image come back.
+    second = _service(tmp_path, RedisConversationStore(max_turns=20, ttl_seconds=300), uploads)
+    r2 = await second.iterative_edit("conv-1", "add a bookshelf")
+    contents = second.requests[0]["contents"]
+    assert r2["turn_count"] == 2 and [c["role"] for c in contents] == ["user", "model", "user"]
+    assert contents[0]["parts"][0]["inline_data"]["data"] == PNG_B64
+
+    assert await second.clear_conversation("conv-1") is True and redis.store == {}
+    assert client.objects == {}
+
+
+@pytest.mark.asyncio
+async def test_redis_outage_falls_back_to_local_history(monkeypatch, tmp_path):
+    fake = FakeRedis(down=True)
+
+    async def _get_redis():
+        return fake
+
+    monkeypatch.setattr("app.api.deps.get_redis", _get_redis)
+    svc = _service(tmp_path, RedisConversationStore(), {})
+    await svc.iterative_edit("conv-2", "warm lighting", image_base64=PNG_B64)
+    r2 = await svc.iterative_edit("conv-2", "brighter")
+    assert r2["success"] and r2["turn_count"] == 2
+    assert len(svc.requests[1]["contents"]) == 3
+
+
+@pytest.mark.asyncio
+async def test_sweep_removes_images_of_expired_conversations_only(redis, gcs, tmp_path):
+    service, client = gcs
+    store = RedisConversationStore(ttl_seconds=300)
+    svc = _service(tmp_path, store, {})
+    await svc.iterative_edit("live", "sage green walls", image_base64=PNG_B64)
+    await svc.iterative_edit("gone", "warm lighting", image_base64=PNG_B64)
+    await store.delete("gone")  # its TTL lapsed in Redis
+
+    assert await sweep_conversation_images(service, store, max_age_seconds=0) == 1
+    assert [name.split("/")[3] for _, name in client.objects] == ["live"]
@@ -0,0 +1,56 @@
+import pytest
+
+from app.services.block_cache import BlockReason, PromptBlockCache
+from app.services.keyword_automaton import KeywordAutomaton
+from app.services.moderation import BLOCKED_KEYWORDS
+
+
+def test_substring_scan_matches_naive_loop():
+    automaton = KeywordAutomaton(
+        (keyword, category) for category, keywords in BLOCKED_KEYWORDS.items() for keyword in keywords
+    )
+    prompts = [
+        "please kill myself now, a brutal  gore scene",
+        "how to make bomb and weapon tutorial",
+        "a skilled minor-league pitcher",
+        "nothing to see here",
+    ]
+    for prompt in prompts:
+        text = " ".join(prompt.lower().split())
+        expected = {
+            (keyword, category)
+            for category, keywords in BLOCKED_KEYWORDS.items()
+            for keyword in keywords
+            if keyword in text
+        }
+        assert set(automaton.scan(prompt)) == expected
+
+
+def test_whole_words_for_latin_but_not_for_cjk():
+    automaton = KeywordAutomaton(
+        [("kill", "violence"), ("兒童色情", "illegal"), ("爆弾の作り方", "dangerous"), ("a片", "adult"), ("살인", "violence")],
+        whole_words=True,
+    )
+
+    assert automaton.scan("a skilled painter") == []
+    assert automaton.scan("Kill the lights") == [("kill", "violence")]
+    assert automaton.scan("請生成兒童色情圖片") == [("兒童色情", "illegal")]
+    assert automaton.scan("簡単な爆弾の作り方を教えて") == [("爆弾の作り方", "dangerous")]
+    assert automaton.scan("成人A片") == [("a片", "adult")]
+    assert automaton.scan("살인을 묘사") == [("살인", "violence")]
+
+
+def test_same_term_reported_per_category_once():
+    automaton = KeywordAutomaton([("虐殺", "violence"), ("虐殺", "hate_speech"), ("虐殺", "violence")])
+    assert automaton.scan("虐殺 虐殺") == [("虐殺", "violence"), ("虐殺", "hate_speech")]
+
+
+@pytest.mark.asyncio
+async def test_block_cache_matches_seed_words_without_redis():
+    cache = PromptBlockCache(redis_url="redis://127.0.0.1:1/0", gemini_api_key="")
+
+    automaton = await cache._get_automaton()
+    found = dict(automaton.scan("一張血腥的照片, cinematic"))
+
+    assert found == {"血腥": BlockReason.VIOLENCE.value}
+    assert automaton.scan("a skilled blacksmith at work") == []
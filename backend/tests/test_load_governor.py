@@ -0,0 +1,185 @@
+import asyncio
+import time
+from collections import deque
+
+import pytest
+
+from app.services import load_governor
+
+
+@pytest.fixture
+def local_governor(monkeypatch):
+    """Governor with Redis marked down, so the in-process queue is used."""
+    monkeypatch.setattr(load_governor, "_redis_down_until", time.monotonic() + 3600)
+    monkeypatch.setattr(load_governor, "_local_inflight", 0)
+    monkeypatch.setattr(load_governor, "_local_waiters", {"normal": deque(), "low": deque()})
+    monkeypatch.setattr(load_governor, "_avg_wait_s", {"normal": None, "low": None})
+    monkeypatch.setattr(load_governor, "_admitted_after_wait", {"normal": 0, "low": 0})
+    monkeypatch.setattr(load_governor, "_admitted_on_timeout", {"normal": 0, "low": 0})
+    monkeypatch.setattr(load_governor.settings, "GEN_LOAD_SOFT_LIMIT", 1)
+    monkeypatch.setattr(load_governor.settings, "GEN_LOAD_NORMAL_MAX_WAIT_SECONDS", 5)
+    monkeypatch.setattr(load_governor.settings, "GEN_LOAD_LOW_MAX_WAIT_SECONDS", 5)
+    return load_governor
+
+
+async def _hold(order, name, priority, release):
+    async with load_governor.generation_slot(priority, name):
+        order.append(name)
+        await release.wait()
+
+
+@pytest.mark.asyncio
+async def test_release_hands_slot_to_waiters_fifo_normal_before_low(local_governor):
+    order = []
+    gate = asyncio.Event()
+    holder = asyncio.create_task(_hold(order, "holder", "high", gate))
+    await asyncio.sleep(0)
+
+    tasks = []
+    for name, priority in [("low-1", "low"), ("normal-1", "normal"), ("low-2", "low"), ("normal-2", "normal")]:
+        tasks.append(asyncio.create_task(_hold(order, name, priority, gate)))
+        await asyncio.sleep(0)
+
+    stats = await local_governor.queue_stats()
+    assert stats["source"] == "local"
+    assert stats["queued"] == {"normal": 2, "low": 2}
+
+    gate.set()
+    await asyncio.wait_for(asyncio.gather(holder, *tasks), timeout=2)
+
+    assert order == ["holder", "normal-1", "normal-2", "low-1", "low-2"]
+    assert local_governor._local_inflight == 0
+    assert local_governor._admitted_after_wait == {"normal": 2, "low": 2}
+
+
+@pytest.mark.asyncio
+async def test_waiter_is_admitted_anyway_when_budget_runs_out(local_governor, monkeypatch):
+    monkeypatch.setattr(local_governor.settings, "GEN_LOAD_NORMAL_MAX_WAIT_SECONDS", 0.05)
+    gate = asyncio.Event()
+    holder = asyncio.create_task(_hold([], "holder", "high", gate))
+    await asyncio.sleep(0)
+
+    started = time.monotonic()
+    async with local_governor.generation_slot("normal", "late"):
+        assert local_governor._local_inflight == 2
+    assert time.monotonic() - started < 1
+    assert local_governor._admitted_on_timeout["normal"] == 1
+
+    gate.set()
+    await holder
+    assert local_governor._local_inflight == 0
+    assert not any(not f.done() for f in local_governor._local_waiters["normal"])
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_leak_a_slot(local_governor):
+    gate = asyncio.Event()
+    holder = asyncio.create_task(_hold([], "holder", "high", gate))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(_hold([], "gone", "low", gate))
+    await asyncio.sleep(0)
+
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    gate.set()
+    await holder
+
+    assert local_governor._local_inflight == 0
+    stats = await local_governor.queue_stats()
+    assert stats["queued"] == {"normal": 0, "low": 0}
+
+
+@pytest.fixture
+def redis_governor(monkeypatch):
+    """Governor on a Lua-capable fake Redis, exercising the real scripts."""
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(load_governor, "_redis", fakeredis.aioredis.FakeRedis(server=server, decode_responses=True))
+    monkeypatch.setattr(
+        load_governor, "_blocking_redis", fakeredis.aioredis.FakeRedis(server=server, decode_responses=True)
+    )
+    monkeypatch.setattr(load_governor, "_redis_down_until", 0.0)
+    monkeypatch.setattr(load_governor, "_scripts", {})
+    monkeypatch.setattr(load_governor, "_local_inflight", 0)
+    monkeypatch.setattr(load_governor, "_avg_wait_s", {"normal": None, "low": None})
+    monkeypatch.setattr(load_governor, "_admitted_after_wait", {"normal": 0, "low": 0})
+    monkeypatch.setattr(load_governor, "_admitted_on_timeout", {"normal": 0, "low": 0})
+    monkeypatch.setattr(load_governor.settings, "GEN_LOAD_SOFT_LIMIT", 1)
+    monkeypatch.setattr(load_governor.settings, "GEN_LOAD_NORMAL_MAX_WAIT_SECONDS", 5)
+    monkeypatch.setattr(load_governor.settings, "GEN_LOAD_LOW_MAX_WAIT_SECONDS", 5)
+    return load_governor
+
+
+async def _wait_for_queue_depth(governor, tier, depth):
+    for _ in range(200):
+        if (await governor.queue_stats())["queued"][tier] == depth:
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"{tier} queue never reached {depth}")
+
+
+@pytest.mark.asyncio
+async def test_redis_admits_directly_within_capacity(redis_governor, monkeypatch):
+    monkeypatch.setattr(redis_governor.settings, "GEN_LOAD_SOFT_LIMIT", 2)
+    r = redis_governor._redis
+
+    async with redis_governor.generation_slot("normal", "a"):
+        async with redis_governor.generation_slot("low", "b"):
+            stats = await redis_governor.queue_stats()
+            assert stats["source"] == "redis"
+            assert stats["inflight"] == 2
+            assert stats["queued"] == {"normal": 0, "low": 0}
+
+    assert await r.zcard(redis_governor._INFLIGHT_KEY) == 0
+    assert redis_governor._admitted_after_wait == {"normal": 0, "low": 0}
+
+
+@pytest.mark.asyncio
+async def test_redis_release_hands_reserved_slot_to_queued_waiter(redis_governor):
+    order = []
+    gate = asyncio.Event()
+    holder = asyncio.create_task(_hold(order, "holder", "normal", gate))
+    await asyncio.sleep(0.01)
+    waiter = asyncio.create_task(_hold(order, "waiter", "normal", asyncio.Event()))
+    await _wait_for_queue_depth(redis_governor, "normal", 1)
+    assert order == ["holder"]
+
+    gate.set()
+    await holder
+    for _ in range(200):
+        if order == ["holder", "waiter"]:
+            break
+        await asyncio.sleep(0.01)
+    assert order == ["holder", "waiter"]
+    # The freed slot was reserved for the waiter, not left open to newcomers.
+    stats = await redis_governor.queue_stats()
+    assert stats["inflight"] == 1
+    assert stats["queued"] == {"normal": 0, "low": 0}
+    assert redis_governor._admitted_after_wait["normal"] == 1
+
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert await redis_governor._redis.zcard(redis_governor._INFLIGHT_KEY) == 0
+
+
+@pytest.mark.asyncio
+async def test_redis_waiter_timeout_leaves_the_line(redis_governor, monkeypatch):
+    monkeypatch.setattr(redis_governor.settings, "GEN_LOAD_NORMAL_MAX_WAIT_SECONDS", 0.2)
+    r = redis_governor._redis
+    gate = asyncio.Event()
+    holder = asyncio.create_task(_hold([], "holder", "high", gate))
+    await asyncio.sleep(0.01)
+
+    async with redis_governor.generation_slot("normal", "late"):
+        assert redis_governor._admitted_on_timeout["normal"] == 1
+        assert await r.llen(redis_governor._QUEUE_KEYS["normal"]) == 0
+        assert await r.keys(redis_governor._WAITER_PREFIX + "*") == []
+        assert await r.zcard(redis_governor._INFLIGHT_KEY) == 2
+
+    gate.set()
+    await holder
+    assert await r.zcard(redis_governor._INFLIGHT_KEY) == 0
+    assert await r.keys(redis_governor._TICKET_PREFIX + "*") == []
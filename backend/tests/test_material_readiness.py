@@ -0,0 +1,120 @@
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.services import material_readiness
+from app.services.material_readiness import (
+    REDIS_KEY,
+    build_status,
+    get_readiness_snapshot,
+    invalidate_readiness_snapshot,
+)
+
+
+class FakeRedis:
+    def __init__(self, fail=False):
+        self.store = {}
+        self.fail = fail
+
+    async def get(self, key):
+        if self.fail:
+            raise ConnectionError("redis down")
+        return self.store.get(key)
+
+    async def set(self, key, value, ex=None):
+        if self.fail:
+            raise ConnectionError("redis down")
+        self.store[key] = value
+
+    async def delete(self, key):
+        if self.fail:
+            raise ConnectionError("redis down")
+        self.store.pop(key, None)
+
+
+class FakeSession:
+    def __init__(self, rows):
+        self.rows = rows
+        self.statements = []
+
+    async def execute(self, stmt):
+        self.statements.append(stmt)
+        rows = self.rows
+
+        class _Result:
+            def all(self):
+                return rows
+
+        return _Result()
+
+
+@pytest.fixture(autouse=True)
+def registry(monkeypatch):
+    topics = {"background_removal": ["food", "tech"], "ai_avatar": ["spokes"]}
+    monkeypatch.setattr(material_readiness, "get_landing_topic_ids", lambda: ["ads"])
+    monkeypatch.setattr(material_readiness, "get_topic_ids_for_tool", lambda tool: topics.get(tool, []))
+
+
+def _redis(monkeypatch, fake):
+    async def _get_redis():
+        return fake
+
+    monkeypatch.setattr("app.api.deps.get_redis", _get_redis)
+    return fake
+
+
+def test_build_status_applies_thresholds_per_topic():
+    rows = [
+        ["short_video", "ads", 6, 0, 0],
+        ["ai_avatar", "ads", 12, 1, 2],
+        ["ai_avatar", "spokes", 3, 0, 0],
+        ["background_removal", "food", 4, 0, 1],
+        ["background_removal", "retired-topic", 9, 5, 5],  # not in the registry
+    ]
+    status = build_status(rows)
+
+    assert list(status) == ["landing", "background_removal", "ai_avatar"]
+    landing = status["landing"]
+    assert landing["counts"] == {"videos": {"ads": 6}, "avatars": {"ads": 12}}
+    assert landing["missing_topics"] == {"videos": [], "avatars": []}
+    assert landing["prompt_issues"] == {"missing_prompt": 1, "missing_prompt_zh": 2}
+    assert landing["ready"] is False
+
+    bg = status["background_removal"]
+    assert bg["counts"] == {"food": 4, "tech": 0}
+    assert bg["missing_topics"] == ["tech"]
+    assert bg["prompt_issues"] == {"missing_prompt": 0, "missing_prompt_zh": 1}
+    assert status["ai_avatar"]["ready"] is True
+
+
+@pytest.mark.asyncio
+async def test_snapshot_is_cached_until_invalidated(monkeypatch):
+    redis = _redis(monkeypatch, FakeRedis())
+    session = FakeSession([("background_removal", "food", 1, 0, 0)])
+
+    first = await get_readiness_snapshot(session)
+    assert first["background_removal"]["missing_topics"] == ["tech"]
+    assert REDIS_KEY in redis.store
+
+    session.rows = [("background_removal", "food", 1, 0, 0), ("background_removal", "tech", 2, 0, 0)]
+    assert await get_readiness_snapshot(session) == first
+    assert len(session.statements) == 1
+
+    await invalidate_readiness_snapshot()
+    refreshed = await get_readiness_snapshot(session)
+    assert refreshed["background_removal"]["ready"] is True
+    assert len(session.statements) == 2
+
+
+@pytest.mark.asyncio
+async def test_redis_outage_falls_back_to_one_query(monkeypatch):
+    _redis(monkeypatch, FakeRedis(fail=True))
+    session = FakeSession([("ai_avatar", "spokes", 1, 0, 0)])
+
+    status = await get_readiness_snapshot(session)
+    await invalidate_readiness_snapshot()
+
+    assert status["ai_avatar"]["ready"] is True
+    assert len(session.statements) == 1
+    sql = str(session.statements[0].compile(dialect=postgresql.dialect()))
+    assert "GROUP BY materials.tool_type, materials.topic" in sql
+    assert sql.count("FILTER (WHERE") == 2
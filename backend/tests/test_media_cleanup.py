@@ -0,0 +1,98 @@
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.services import media_cleanup_service
+from app.services.gcs_memory import InMemoryGCSClient
+from app.services.gcs_storage_service import GCSStorageService
+
+BUCKET = "test-bucket"
+
+
+def _url(name):
+    return f"https://storage.googleapis.com/{BUCKET}/{name}"
+
+
+class FakeSession:
+    def __init__(self, batches):
+        self.batches = list(batches)
+        self.executed = 0
+        self.commits = 0
+
+    async def execute(self, stmt):
+        self.executed += 1
+        rows = self.batches.pop(0) if self.batches else []
+
+        class _Result:
+            def all(self):
+                return rows
+
+        return _Result()
+
+    async def commit(self):
+        self.commits += 1
+
+
+def _lock(acquired):
+    @asynccontextmanager
+    async def _single_instance():
+        yield acquired
+
+    return _single_instance
+
+
+@pytest.fixture
+def gcs(monkeypatch):
+    client = InMemoryGCSClient()
+    service = GCSStorageService(client=client, bucket_name=BUCKET)
+    monkeypatch.setattr("app.services.gcs_storage_service.get_gcs_storage", lambda: service)
+    monkeypatch.setattr(media_cleanup_service, "_single_instance", _lock(True))
+    return service, client
+
+
+def _row(image=None, video=None):
+    return (uuid.uuid4(), image, video)
+
+
+@pytest.mark.asyncio
+async def test_expires_in_bounded_batches_until_a_short_one(gcs):
+    db = FakeSession([[_row(), _row()], [_row(), _row()], [_row()]])
+    result = await media_cleanup_service.run_media_cleanup(db, batch_size=2, delete_blobs=False)
+
+    assert (result["expired_count"], result["batches"], result["blobs_deleted"]) == (5, 3, 0)
+    assert db.executed == 3 and db.commits == 3
+
+
+@pytest.mark.asyncio
+async def test_blob_deletion_only_touches_per_user_output(gcs):
+    service, client = gcs
+    for name in ("users/u1/image/a.png", "users/u1/video/b.mp4", "generated/image/shared.png"):
+        client.bucket(BUCKET).blob(name).upload_from_string(b"x")
+    service.drain_blob_events()
+
+    db = FakeSession([
+        [_row(_url("users/u1/image/a.png"), _url("users/u1/video/b.mp4")), _row(_url("generated/image/shared.png"))],
+        [_row("https://cdn.example/x.png"), _row(_url("users/u1/gone.png"))],  # already missing: counts as deleted
+    ])
+    result = await media_cleanup_service.run_media_cleanup(db, batch_size=2, delete_blobs=True)
+
+    assert result["expired_count"] == 4 and result["blobs_deleted"] == 3
+    assert list(client.objects) == [(BUCKET, "generated/image/shared.png")]
+    assert service.drain_blob_events()[1] == {"users/u1/image/a.png", "users/u1/video/b.mp4", "users/u1/gone.png"}
+
+
+@pytest.mark.asyncio
+async def test_second_instance_skips_without_touching_rows(monkeypatch):
+    monkeypatch.setattr(media_cleanup_service, "_single_instance", _lock(False))
+    db = FakeSession([[_row()]])
+    result = await media_cleanup_service.run_media_cleanup(db)
+
+    assert result["skipped"] is True and result["expired_count"] == 0
+    assert db.executed == 0
+
+    sql = str(media_cleanup_service.expire_batch_stmt(datetime.now(timezone.utc), 500)
+              .compile(dialect=postgresql.dialect()))
+    assert "FOR UPDATE SKIP LOCKED" in sql and "RETURNING user_generations.id" in sql
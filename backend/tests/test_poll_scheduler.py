@@ -0,0 +1,103 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services import poll_scheduler as poll_scheduler_module
+from app.services.poll_scheduler import PollScheduler, _PollJob
+
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    monkeypatch.setattr(poll_scheduler_module.settings, "POLL_MIN_INTERVAL_SECONDS", 0.01)
+    monkeypatch.setattr(poll_scheduler_module.settings, "POLL_MAX_INTERVAL_SECONDS", 0.05)
+    sched = PollScheduler()
+    # No DB in unit tests — skip the generation_metrics prior lookup.
+    sched._priors_loaded_at = time.monotonic()
+    return sched
+
+
+def _job(sched, kind="piapi:image_to_video", base=5.0):
+    return _PollJob(
+        key="k", kind=kind, check=None, future=None,
+        started_at=0.0, deadline=10_000.0, min_interval=base, next_at=0.0,
+    )
+
+
+def test_backoff_curve_converges_on_expected_duration(monkeypatch):
+    monkeypatch.setattr(poll_scheduler_module.settings, "POLL_MAX_INTERVAL_SECONDS", 60)
+    sched = PollScheduler()
+    sched.set_expected_duration("piapi:image_to_video", 900)
+    job = _job(sched)
+
+    assert sched._next_interval(job, 0) == 60          # far from done → ceiling
+    assert sched._next_interval(job, 880) == 10        # half the remaining 20 s
+    assert sched._next_interval(job, 899) == 5         # at the finish line → base
+    assert sched._next_interval(job, 1100) == 25       # overrun eases off again
+
+
+def test_unknown_kind_grows_linearly_from_base(monkeypatch):
+    monkeypatch.setattr(poll_scheduler_module.settings, "POLL_MAX_INTERVAL_SECONDS", 60)
+    sched = PollScheduler()
+    job = _job(sched, kind="pollo:task")
+
+    assert sched._next_interval(job, 0) == 5
+    assert sched._next_interval(job, 100) == 15
+    assert sched._next_interval(job, 10_000) == 60
+
+
+@pytest.mark.asyncio
+async def test_concurrent_waiters_share_one_loop(scheduler):
+    calls = {"a": 0, "b": 0}
+
+    def make_check(name, done_after):
+        async def check():
+            calls[name] += 1
+            if calls[name] >= done_after:
+                return True, {"task": name}
+            return False, None
+        return check
+
+    a, b = await asyncio.gather(
+        scheduler.wait(make_check("a", 2), provider="piapi", label="t2i", timeout=5, min_interval=0.01),
+        scheduler.wait(make_check("b", 3), provider="piapi", label="t2i", timeout=5, min_interval=0.01),
+    )
+
+    assert a == {"task": "a"} and b == {"task": "b"}
+    assert scheduler.snapshot()["completed"] == 2
+    assert scheduler.snapshot()["in_flight"] == 0
+    # Completion feeds the in-process duration estimate for the kind.
+    assert scheduler.expected_duration("piapi:t2i") is not None
+
+
+@pytest.mark.asyncio
+async def test_task_label_context_overrides_fallback_label(scheduler):
+    async def check():
+        return True, "ok"
+
+    token = poll_scheduler_module.poll_task_label.set("image_to_video")
+    try:
+        await scheduler.wait(check, provider="piapi", label="fallback", timeout=5, min_interval=0.01)
+    finally:
+        poll_scheduler_module.poll_task_label.reset(token)
+
+    assert "piapi:image_to_video" in scheduler.snapshot()["checks_by_kind"]
+
+
+@pytest.mark.asyncio
+async def test_check_exception_propagates_to_waiter(scheduler):
+    async def check():
+        raise Exception("content policy violation")
+
+    with pytest.raises(Exception, match="content policy"):
+        await scheduler.wait(check, provider="piapi", label="t2i", timeout=5, min_interval=0.01)
+
+
+@pytest.mark.asyncio
+async def test_wait_times_out(scheduler):
+    async def check():
+        return False, None
+
+    with pytest.raises(asyncio.TimeoutError):
+        await scheduler.wait(check, provider="a2e", label="task", timeout=0.1, min_interval=0.01)
+    assert scheduler.snapshot()["timed_out"] == 1
@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+from scripts.pregen_dag import Checkpoint, DagExecutor, Node, ProviderLimit, StepFailed
+
+
+def _step(calls, value=None, fail=False, delay=0.0, track=None):
+    async def fn(inputs):
+        calls.append(inputs)
+        if track is not None:
+            track["now"] += 1
+            track["max"] = max(track["max"], track["now"])
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            if track is not None:
+                track["now"] -= 1
+        if fail:
+            raise StepFailed("provider said no")
+        return value
+    return fn
+
+
+@pytest.mark.asyncio
+async def test_shared_dependency_runs_once_and_failures_skip_dependents():
+    source_calls, ok_calls, bad_calls, after_bad = [], [], [], []
+    nodes = [
+        Node("store-ok", _step(ok_calls, "stored"), ["style-ok"], terminal=True),
+        Node("style-ok", _step(ok_calls, "styled"), ["source"]),
+        Node("style-bad", _step(bad_calls, fail=True), ["source"]),
+        Node("store-bad", _step(after_bad, "stored"), ["style-bad"], terminal=True),
+        Node("source", _step(source_calls, "src.png")),
+    ]
+    results = await DagExecutor().run(nodes)
+
+    assert len(source_calls) == 1
+    assert ok_calls[0] == {"source": "src.png"}
+    assert results["store-ok"].status == "done"
+    assert results["style-bad"].status == "failed"
+    assert results["store-bad"].status == "skipped" and after_bad == []
+
+
+@pytest.mark.asyncio
+async def test_checkpoint_resumes_without_rerunning_finished_steps(tmp_path):
+    path = tmp_path / "ck.json"
+    t2i_calls, rembg_calls = [], []
+
+    def graph(rembg_fails):
+        return [
+            Node("item:t2i", _step(t2i_calls, "a.png")),
+            Node("item:rembg", _step(rembg_calls, "a-cut.png", fail=rembg_fails), ["item:t2i"]),
+        ]
+
+    first = DagExecutor(checkpoint=Checkpoint(path))
+    await first.run(graph(rembg_fails=True))
+    assert first.failures == 1
+
+    second = DagExecutor(checkpoint=Checkpoint(path))
+    results = await second.run(graph(rembg_fails=False))
+
+    assert len(t2i_calls) == 1  # not regenerated
+    assert rembg_calls[-1] == {"item:t2i": "a.png"}
+    assert results["item:t2i"].status == "resumed"
+    assert results["item:rembg"].status == "done"
+    assert Checkpoint(path).get("item:rembg") == "a-cut.png"
+
+
+
+def test_discarding_one_tool_keeps_other_tools_resume_state(tmp_path):
+    path = tmp_path / "ck.json"
+    checkpoint = Checkpoint(path)
+    checkpoint.record("effect:abc:t2i", "a.png")
+    checkpoint.record("room_redesign:def:i2i", "b.png")
+
+    checkpoint.discard(prefix="effect:")
+
+    assert Checkpoint(path).outputs == {"room_redesign:def:i2i": "b.png"}
+    checkpoint.discard(prefix="room_redesign:")
+    assert not path.exists()
+
+
+@pytest.mark.asyncio
+async def test_provider_limit_caps_concurrency():
+    calls, track = [], {"now": 0, "max": 0}
+    limits = {"piapi": ProviderLimit(concurrency=2)}
+    nodes = [Node(f"n{i}", _step(calls, i, delay=0.02, track=track), provider="piapi") for i in range(6)]
+
+    await DagExecutor(limits, max_concurrency=10).run(nodes)
+    assert len(calls) == 6 and track["max"] == 2
+
+
+@pytest.mark.asyncio
+async def test_invalid_graphs_are_rejected_before_running():
+    calls = []
+    with pytest.raises(ValueError, match="unknown node"):
+        await DagExecutor().run([Node("a", _step(calls), ["missing"])])
+    with pytest.raises(ValueError, match="cycle"):
+        await DagExecutor().run([Node("a", _step(calls), ["b"]), Node("b", _step(calls), ["a"])])
+    assert calls == []
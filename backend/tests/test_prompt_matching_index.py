@@ -0,0 +1,90 @@
+import uuid
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.prompt_matching import DemoKeywordIndex, PromptMatchingService
+
+
+def _demo(keywords, category=None, style=None, popularity=0, active=True):
+    return SimpleNamespace(
+        id=uuid.uuid4(), keywords=keywords, category_slug=category, style_slug=style,
+        popularity_score=popularity, is_active=active, status="completed",
+    )
+
+
+class FakeSession:
+    """First execute: index load rows; later executes: ImageDemo lookups."""
+
+    def __init__(self, demos):
+        self.demos = demos
+        self.indexed = False
+        self.loaded_ids = []
+
+    async def execute(self, stmt):
+        if not self.indexed:
+            self.indexed = True
+            now = datetime.now(timezone.utc)
+            rows = [(d.id, d.keywords, d.category_slug, d.style_slug, d.popularity_score,
+                     d.is_active, d.status, now) for d in self.demos if d.is_active]
+            return SimpleNamespace(all=lambda: rows)
+        ids = {str(v) for v in stmt.whereclause.clauses[0].right.value}
+        self.loaded_ids.append(ids)
+        found = [d for d in self.demos if str(d.id) in ids and d.is_active]
+        return SimpleNamespace(scalars=lambda: SimpleNamespace(all=lambda: found))
+
+
+def test_translation_matcher_keeps_first_match_semantics():
+    service = PromptMatchingService()
+    zh = service.normalize_prompt("一隻貓在日落時分的海邊")
+    assert (zh.language, zh.keywords, zh.normalized, zh.category) == ("zh-TW", ["cat"], "cat", "animals")
+
+    en = service.normalize_prompt("Cherry blossom in Tokyo, anime style")
+    assert set(en.keywords) == {"cherry blossom", "tokyo", "anime"}
+    assert en.style == "anime" and en.normalized == "cherry blossom in tokyo, anime style"
+
+
+def test_index_scores_equal_calculate_similarity_and_skip_unrelated_demos():
+    service = PromptMatchingService()
+    index = DemoKeywordIndex()
+    demos = [
+        _demo(["cat", "night"], "animals", "anime"),
+        _demo(["Cat"], "animals"),
+        _demo(["robot"], "sci-fi", "anime"),     # bonus-only: 0.2, below 0.3
+        _demo(["ramen"], "animals", "anime"),    # bonus-only: 0.4
+        _demo([], None, None),
+    ]
+    for d in demos:
+        index.upsert(d.id, d.keywords, d.category_slug, d.style_slug)
+
+    results = index.search(["cat", "street"], "animals", "anime", 0.3)
+    expected = {
+        str(d.id): service.calculate_similarity(["cat", "street"], d.keywords, "animals", d.category_slug, "anime", d.style_slug)
+        for d in demos
+    }
+    assert {i: s for i, s, _ in results} == {i: s for i, s in expected.items() if s >= 0.3}
+    assert str(demos[2].id) not in {i for i, _, _ in results}
+
+    index.remove(demos[0].id)
+    assert str(demos[0].id) not in {i for i, _, _ in index.search(["cat"], None, None, 0.1)}
+    assert "night" not in index._postings
+
+
+@pytest.mark.asyncio
+async def test_find_similar_demos_loads_only_winners_and_drops_stale_ids(monkeypatch):
+    service = PromptMatchingService()
+    winner = _demo(["cat", "night"], "animals", popularity=5)
+    stale = _demo(["cat"], "animals", popularity=50)
+    unrelated = [_demo(["pizza"], "food") for _ in range(20)]
+    db = FakeSession([winner, stale, *unrelated])
+
+    await service.index.ensure_fresh(db)
+    stale.is_active = False  # deactivated on another instance after the load
+
+    found = await service.find_similar_demos(db, "a cat at night", limit=5)
+
+    assert [r["demo"] for r in found] == [winner]
+    assert found[0]["score"] == pytest.approx(0.6 + 0.2) and set(found[0]["matched_keywords"]) == {"cat", "night"}
+    assert db.loaded_ids == [{str(winner.id), str(stale.id)}]
+    assert len(service.index) == 21  # stale row evicted on sight
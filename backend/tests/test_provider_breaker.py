@@ -0,0 +1,187 @@
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import provider_breaker as breaker_module
+from app.services.provider_breaker import SharedCircuitBreaker
+
+
+class _FakePipeline:
+    def __init__(self, redis):
+        self._redis = redis
+        self._ops = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self._ops.append((name, args, kwargs))
+            return self
+        return queue
+
+    async def execute(self):
+        return [await getattr(self._redis, name)(*a, **kw) for name, a, kw in self._ops]
+
+
+class FakeRedis:
+    """Just enough of redis.asyncio for the breaker, shared across 'instances'."""
+
+    def __init__(self):
+        self.kv = {}
+        self.zsets = {}
+        self.published = []
+
+    def pipeline(self):
+        return _FakePipeline(self)
+
+    async def zadd(self, key, mapping):
+        self.zsets.setdefault(key, {}).update(mapping)
+
+    async def zremrangebyscore(self, key, lo, hi):
+        z = self.zsets.get(key, {})
+        for member in [m for m, score in z.items() if lo <= score <= hi]:
+            del z[member]
+
+    async def zcard(self, key):
+        return len(self.zsets.get(key, {}))
+
+    async def expire(self, key, seconds):
+        return True
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.kv:
+            return None
+        self.kv[key] = value
+        return True
+
+    async def get(self, key):
+        return self.kv.get(key)
+
+    async def delete(self, key):
+        self.kv.pop(key, None)
+        self.zsets.pop(key, None)
+
+    async def publish(self, channel, message):
+        self.published.append((channel, message))
+
+    async def scan_iter(self, match, count=100):
+        prefix = match.rstrip("*")
+        for key in list(self.kv):
+            if key.startswith(prefix):
+                yield key
+
+
+@pytest.fixture
+def fleet(monkeypatch):
+    redis = FakeRedis()
+    monkeypatch.setattr(breaker_module.settings, "PROVIDER_CIRCUIT_BREAKER_FAILURES", 3)
+    monkeypatch.setattr(breaker_module.settings, "PROVIDER_CIRCUIT_BREAKER_COOLDOWN_SECONDS", 60)
+
+    def make():
+        b = SharedCircuitBreaker()
+
+        async def _redis():
+            return redis
+        b._redis = _redis
+        return b
+
+    return redis, make
+
+
+@pytest.mark.asyncio
+async def test_failures_from_different_instances_open_circuit_fleet_wide(fleet):
+    redis, make = fleet
+    a, b, c = make(), make(), make()
+
+    assert not await a.record_failure("piapi", "image_to_video")
+    assert not await b.record_failure("piapi", "image_to_video")
+    assert await c.record_failure("piapi", "image_to_video")
+
+    # The opening instance blocks immediately; peers block once the pub/sub
+    # message is applied — without having burned any failures themselves.
+    assert not await c.allow("piapi", "image_to_video")
+    for _, message in redis.published:
+        a.apply_message(json.loads(message))
+    assert not await a.allow("piapi", "image_to_video")
+    # Other task types on the same provider are unaffected.
+    assert await a.allow("piapi", "text_to_image")
+
+
+@pytest.mark.asyncio
+async def test_half_open_elects_single_prober_and_success_closes(fleet):
+    redis, make = fleet
+    a, b = make(), make()
+    expired = time.time() - 1
+    for inst in (a, b):
+        inst.apply_message({"provider": "piapi", "task_type": "upscale", "state": "open", "until": expired})
+
+    assert await a.allow("piapi", "upscale")
+    assert not await b.allow("piapi", "upscale")
+    # The prober doesn't stack a second probe while its first is in flight.
+    assert not await a.allow("piapi", "upscale")
+
+    await a.record_success("piapi", "upscale")
+    assert json.loads(redis.published[-1][1])["state"] == "closed"
+    b.apply_message({"provider": "piapi", "task_type": "upscale", "state": "closed"})
+    assert await b.allow("piapi", "upscale")
+
+
+@pytest.mark.asyncio
+async def test_failed_probe_reopens_immediately(fleet):
+    _, make = fleet
+    a = make()
+    a.apply_message({"provider": "pollo", "task_type": "text_to_image", "state": "open", "until": time.time() - 1})
+
+    assert await a.allow("pollo", "text_to_image")
+    assert await a.record_failure("pollo", "text_to_image")
+    assert not await a.allow("pollo", "text_to_image")
+
+
+@pytest.mark.asyncio
+async def test_sync_from_redis_loads_open_circuits(fleet):
+    redis, make = fleet
+    redis.kv["vidgo:breaker:open:piapi:avatar"] = str(time.time() + 120)
+    b = make()
+
+    assert await b.sync_from_redis() == 1
+    assert not await b.allow("piapi", "avatar")
+
+
+@pytest.mark.asyncio
+async def test_redis_outage_fails_open():
+    b = SharedCircuitBreaker()
+
+    async def _no_redis():
+        return None
+    b._redis = _no_redis
+    b.apply_message({"provider": "piapi", "task_type": "upscale", "state": "open", "until": time.time() - 1})
+
+    assert not await b.record_failure("piapi", "upscale")
+    assert await b.allow("piapi", "upscale")
+
+
+@pytest.mark.asyncio
+async def test_probe_ending_in_non_alert_error_is_released_after_ttl(fleet, monkeypatch):
+    from app.providers.provider_router import ProviderRouter, TaskType
+
+    redis, make = fleet
+    monkeypatch.setattr(breaker_module.settings, "PROVIDER_SHARED_BREAKER_PROBE_TTL_SECONDS", 30)
+    clock = {"now": 1000.0}
+    monkeypatch.setattr(
+        breaker_module, "time", SimpleNamespace(time=time.time, monotonic=lambda: clock["now"])
+    )
+    a = make()
+    a.apply_message({"provider": "piapi", "task_type": "upscale", "state": "open", "until": time.time() - 1})
+    router = ProviderRouter.__new__(ProviderRouter)
+    router._shared_breaker = a
+
+    assert await a.allow("piapi", "upscale")
+    # An input error neither closes nor re-opens the circuit.
+    await router._record_shared_outcome("piapi", TaskType.UPSCALE, "Invalid image: prompt required")
+    assert not await a.allow("piapi", "upscale")
+
+    # Once the probe TTL has passed (and Redis dropped the claim), a new probe
+    # can be elected instead of the circuit staying blocked on this instance.
+    clock["now"] += 31
+    await redis.delete("vidgo:breaker:probe:piapi:upscale")
+    assert await a.allow("piapi", "upscale")
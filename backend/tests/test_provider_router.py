@@ -359,4 +359,61 @@ async def test_check_provider_health_alerts_when_provider_is_unhealthy(monkeypat
     is_healthy = await ProviderRouter._check_provider_health(router, "pollo")
 
     assert is_healthy is False
-    email_mock.assert_awaited_once()
\ No newline at end of file
+    email_mock.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_record_metric_enqueues_without_db_round_trip(monkeypatch):
+    from app.services import metrics_sink as metrics_sink_module
+
+    sink = metrics_sink_module.GenerationMetricsSink()
+    written = []
+
+    async def fake_write(batch):
+        written.extend(batch)
+        sink.written += len(batch)
+
+    sink._write = fake_write
+    monkeypatch.setattr(metrics_sink_module, "_sink", sink)
+    monkeypatch.setattr(metrics_sink_module.settings, "METRICS_SINK_BATCH_SIZE", 2)
+
+    router = ProviderRouter.__new__(ProviderRouter)
+    for success in (True, False, True):
+        await router._record_metric(
+            task_type=TaskType.T2I,
+            provider="piapi",
+            params={"model": "flux-dev"},
+            duration_ms=1200,
+            success=success,
+            used_backup=False,
+            error_message=None if success else "HTTP 500",
+        )
+
+    # Nothing is written inline — the call only queued rows.
+    assert sink.snapshot()["queued"] == 3
+    await sink.drain()
+
+    assert [row["success"] for row in written] == [True, False, True]
+    assert written[1]["error_message"] == "HTTP 500"
+    assert all(row["model_used"] == "flux-dev" and row["id"] for row in written)
+    assert sink.snapshot() == {"queued": 0, "written": 3, "dropped": 0, "failed": 0}
+
+
+@pytest.mark.asyncio
+async def test_metrics_sink_drops_on_overflow(monkeypatch):
+    from app.services import metrics_sink as metrics_sink_module
+
+    monkeypatch.setattr(metrics_sink_module.settings, "METRICS_SINK_MAX_QUEUE", 2)
+    sink = metrics_sink_module.GenerationMetricsSink()
+
+    async def fake_write(batch):
+        sink.written += len(batch)
+
+    sink._write = fake_write
+
+    assert sink.submit({"task_type": "a"})
+    assert sink.submit({"task_type": "b"})
+    assert not sink.submit({"task_type": "c"})
+    await sink.drain()
+
+    assert sink.snapshot()["dropped"] == 1
+    assert sink.snapshot()["written"] == 2
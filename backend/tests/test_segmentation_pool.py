@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from app.services import segmentation_pool
+from app.services.segmentation_pool import SegmentationPool
+
+
+class FakePool(SegmentationPool):
+    """Runs "inference" in-process: upper-cases the bytes, fails on b"bad"."""
+
+    def __init__(self, **kwargs):
+        super().__init__(model="u2net", **kwargs)
+        self.batches = []
+        self.release = asyncio.Event()
+        self.release.set()
+
+    def _create_executor(self):
+        return None
+
+    async def _execute(self, images):
+        self.batches.append(list(images))
+        await self.release.wait()
+        return [
+            (None, 5.0, "ValueError: cannot identify image") if data == b"bad" else (data.upper(), 10.0, None)
+            for data in images
+        ]
+
+
+@pytest.fixture(autouse=True)
+def rembg_present(monkeypatch):
+    monkeypatch.setattr(segmentation_pool, "rembg_installed", lambda: True)
+
+
+@pytest.mark.asyncio
+async def test_requests_queued_behind_a_busy_worker_are_batched():
+    pool = FakePool(workers=1, batch_size=4)
+    pool.release.clear()
+    first = asyncio.create_task(pool.remove(b"a"))
+    while pool._in_flight == 0:
+        await asyncio.sleep(0)
+    rest = [asyncio.create_task(pool.remove(x)) for x in (b"b", b"c", b"d", b"e")]
+    await asyncio.sleep(0.01)
+    assert pool.stats()["queue_depth"] == 4
+
+    pool.release.set()
+    results = await asyncio.gather(first, *rest)
+
+    assert results == [b"A", b"B", b"C", b"D", b"E"]
+    assert pool.batches == [[b"a"], [b"b", b"c", b"d", b"e"]]
+    stats = pool.stats()
+    assert (stats["images"], stats["batches"], stats["queue_depth"], stats["in_flight"]) == (5, 2, 0, 0)
+    assert stats["avg_inference_ms"] == 10.0
+    await pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_one_bad_image_fails_alone():
+    pool = FakePool(workers=1, batch_size=4)
+    results = await asyncio.gather(
+        pool.remove(b"ok"), pool.remove(b"bad"), pool.remove(b"fine"), return_exceptions=True,
+    )
+    assert results[0] == b"OK" and results[2] == b"FINE"
+    assert isinstance(results[1], RuntimeError) and "cannot identify image" in str(results[1])
+    assert pool.stats()["errors"] == 1
+    await pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_pool_failure_fails_the_batch_and_rebuilds(monkeypatch):
+    pool = FakePool(workers=2, batch_size=2)
+    rebuilt = []
+
+    async def broken(images):
+        raise RuntimeError("A process in the process pool was terminated abruptly")
+
+    monkeypatch.setattr(pool, "_execute", broken)
+    monkeypatch.setattr(pool, "_create_executor", lambda: rebuilt.append(1))
+    with pytest.raises(RuntimeError, match="terminated abruptly"):
+        await pool.remove(b"x")
+    assert len(rebuilt) == 2  # initial start + reset
+    assert pool.stats()["in_flight"] == 0
+    await pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_start_without_rembg_raises(monkeypatch):
+    monkeypatch.setattr(segmentation_pool, "rembg_installed", lambda: False)
+    pool = FakePool(workers=1)
+    with pytest.raises(RuntimeError, match="rembg is not installed"):
+        await pool.remove(b"x")
+    assert pool.stats()["started"] is False
@@ -0,0 +1,58 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.services import session_tracker as tracker_module
+from app.services.session_tracker import SessionTracker
+
+
+def _tracker(redis, heartbeat_result=3, sweep_results=(0,)):
+    tracker = SessionTracker()
+    tracker.redis = redis
+    tracker._heartbeat_script = AsyncMock(return_value=heartbeat_result)
+    tracker._sweep_script = AsyncMock(side_effect=list(sweep_results))
+    return tracker
+
+
+@pytest.mark.asyncio
+async def test_heartbeat_is_a_single_script_call():
+    redis = AsyncMock()
+    tracker = _tracker(redis, heartbeat_result=7)
+
+    result = await tracker.heartbeat("user-1", plan="paid")
+
+    assert result["success"] and result["online_users"] == 7
+    tracker._heartbeat_script.assert_awaited_once()
+    kwargs = tracker._heartbeat_script.await_args.kwargs
+    assert kwargs["keys"][:3] == ["online_users", "user_plans", "online_users_by_tier"]
+    assert kwargs["args"][:2] == ["user-1", "paid"]
+    # No sweep and no other Redis command on the heartbeat path.
+    tracker._sweep_script.assert_not_awaited()
+    assert redis.method_calls == []
+
+
+@pytest.mark.asyncio
+async def test_cleanup_sweeps_in_batches_until_short_batch(monkeypatch):
+    monkeypatch.setattr(tracker_module, "SWEEP_BATCH", 2)
+    tracker = _tracker(AsyncMock(), sweep_results=(2, 2, 1))
+
+    assert await tracker.cleanup_expired() == 5
+    assert tracker._sweep_script.await_count == 3
+
+
+@pytest.mark.asyncio
+async def test_sweeper_loop_only_sweeps_when_it_wins_the_lock(monkeypatch):
+    monkeypatch.setattr(tracker_module, "SWEEP_INTERVAL", 0.01)
+    redis = AsyncMock()
+    redis.set = AsyncMock(side_effect=[True, None, None, None, None, None, None, None])
+    tracker = _tracker(redis, sweep_results=[0] * 8)
+    monkeypatch.setattr(tracker_module, "session_tracker", tracker)
+
+    task = asyncio.create_task(tracker_module.session_sweeper_loop())
+    while redis.set.await_count < 3:
+        await asyncio.sleep(0.01)
+    task.cancel()
+    await task
+
+    assert tracker._sweep_script.await_count == 1
@@ -0,0 +1,143 @@
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.gcs_memory import InMemoryGCSClient
+from app.services.gcs_storage_service import GCSStorageService
+from app.services.signed_url_cache import IamSigner, SignedUrlLRU
+
+URL = "https://storage.googleapis.com/test-bucket/generated/a.png"
+
+
+class FakeRedis:
+    def __init__(self):
+        self.store = {}
+        self.mget_calls = 0
+
+    async def mget(self, keys):
+        self.mget_calls += 1
+        return [self.store.get(k) for k in keys]
+
+    def pipeline(self, transaction=False):
+        redis = self
+
+        class _Pipe:
+            def __init__(self):
+                self.ops = []
+
+            def set(self, key, value, ex=None):
+                self.ops.append((key, value))
+
+            async def execute(self):
+                redis.store.update(self.ops)
+
+        return _Pipe()
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    fake = FakeRedis()
+
+    async def _get_redis():
+        return fake
+
+    monkeypatch.setattr("app.api.deps.get_redis", _get_redis)
+    return fake
+
+
+def _service(signer=None):
+    gcs = GCSStorageService(client=InMemoryGCSClient(), bucket_name="test-bucket")
+    signs = []
+
+    def _sign(blob_name, sign_kwargs):
+        signs.append(blob_name)
+        return f"https://storage.googleapis.com/test-bucket/{blob_name}?sig={len(signs)}"
+
+    gcs._sign_blocking = signer or _sign
+    return gcs, signs
+
+
+def test_lru_evicts_expired_entries_before_live_ones():
+    lru = SignedUrlLRU(max_entries=3)
+    lru.set(("old-live",), "a", ttl=100, now=0)
+    lru.set(("expired",), "b", ttl=5, now=0)
+    lru.set(("recent",), "c", ttl=100, now=0)
+    lru.set(("new",), "d", ttl=100, now=10)
+
+    assert lru.get(("expired",), now=10) is None
+    assert lru.get(("old-live",), now=10) == "a"
+    assert (lru.evictions, lru.expirations) == (0, 1)
+
+    lru.get(("recent",), now=10)
+    lru.set(("newer",), "e", ttl=100, now=11)  # full: least recently used goes
+    assert lru.get(("new",), now=11) is None
+    assert lru.get(("old-live",), now=11) == "a"
+    assert len(lru) == 3 and lru.evictions == 1
+
+
+@pytest.mark.asyncio
+async def test_batch_signs_each_blob_once_and_keeps_order(redis):
+    gcs, signs = _service()
+    other = "https://storage.googleapis.com/test-bucket/generated/b.png?X-Goog-Signature=old"
+    external = "https://images.unsplash.com/photo.jpg"
+
+    result = await gcs.sign_urls([URL, external, other, URL, None])
+
+    assert sorted(signs) == ["generated/a.png", "generated/b.png"]
+    assert result[0] == result[3] and "?sig=" in result[0]
+    assert result[1] == external and result[4] is None
+    assert redis.mget_calls == 1 and len(redis.store) == 2
+
+    # Second call: served from the in-process LRU, no Redis round-trip.
+    assert await gcs.sign_urls([URL]) == [result[0]]
+    assert redis.mget_calls == 1
+    stats = gcs.signed_url_stats()
+    assert (stats["l1_hits"], stats["l2_hits"], stats["misses"]) == (1, 0, 2)
+
+
+@pytest.mark.asyncio
+async def test_cold_instance_reuses_signature_from_redis(redis):
+    warm, _ = _service()
+    signed = await warm.refresh_signed_url_async(URL)
+
+    cold, cold_signs = _service()
+    assert await cold.refresh_signed_url_async(URL) == signed
+    assert cold_signs == []
+    assert cold.signed_url_stats()["l2_hits"] == 1
+    # ...and the sync path now hits the LRU filled from Redis.
+    assert cold.refresh_signed_url(URL) == signed
+
+
+@pytest.mark.asyncio
+async def test_signing_failure_returns_original_url(redis):
+    def _fail(blob_name, sign_kwargs):
+        raise RuntimeError("signBlob 403")
+
+    gcs, _ = _service(signer=_fail)
+    assert await gcs.sign_urls([URL]) == [URL]
+    assert gcs.refresh_signed_url(URL) == URL
+    assert gcs.signed_url_stats()["errors"] == 2
+    assert redis.store == {}
+
+
+@pytest.mark.asyncio
+async def test_iam_token_refresh_is_single_flight(monkeypatch):
+    signer = IamSigner()
+    refreshed = []
+
+    def _refresh():
+        refreshed.append(1)
+        signer._creds = SimpleNamespace(
+            token="tok", expiry=datetime.utcnow() + timedelta(hours=1), service_account_email="sa@x",
+        )
+
+    monkeypatch.setattr(signer, "_refresh_blocking", _refresh)
+    results = await asyncio.gather(*(signer.credentials() for _ in range(10)))
+    assert results == [("sa@x", "tok")] * 10
+    assert len(refreshed) == 1
+
+    signer._creds.expiry = datetime.utcnow() + timedelta(seconds=30)  # inside the margin
+    await signer.credentials()
+    assert len(refreshed) == 2
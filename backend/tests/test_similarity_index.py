@@ -0,0 +1,84 @@
+import uuid
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import numpy as np
+import pytest
+
+from app.services.similarity import EmbeddingIndex, SimilarityService, calculate_cosine_similarity
+
+
+def _vec(seed, dim=16):
+    return np.random.default_rng(seed).normal(size=dim).tolist()
+
+
+def test_top_k_matches_python_cosine():
+    index = EmbeddingIndex()
+    vectors = {str(uuid.uuid4()): _vec(i) for i in range(200)}
+    for cache_id, vec in vectors.items():
+        assert index.add(cache_id, vec)
+
+    query = _vec(7)
+    expected = sorted(
+        ((cid, calculate_cosine_similarity(query, v)) for cid, v in vectors.items()),
+        key=lambda pair: pair[1],
+        reverse=True,
+    )[:5]
+    got = index.top_k(query, k=5)
+
+    assert [cid for cid, _ in got] == [cid for cid, _ in expected]
+    for (_, a), (_, b) in zip(got, expected):
+        assert a == pytest.approx(b, abs=1e-5)
+
+
+def test_add_grows_past_initial_capacity_and_remove_keeps_rows_contiguous():
+    index = EmbeddingIndex()
+    ids = [str(uuid.uuid4()) for _ in range(150)]
+    for i, cache_id in enumerate(ids):
+        index.add(cache_id, _vec(i))
+    assert len(index) == 150
+
+    index.remove(ids[0])
+    assert len(index) == 149
+    # The exact vector of the removed row no longer matches itself...
+    assert index.top_k(_vec(0), k=1)[0][0] != ids[0]
+    # ...and the row swapped into its slot is still found.
+    assert index.top_k(_vec(149), k=1)[0][0] == ids[149]
+
+
+def test_add_rejects_zero_and_mismatched_vectors():
+    index = EmbeddingIndex()
+    assert not index.add("zero", [0.0] * 16)
+    assert index.add("ok", _vec(1))
+    assert not index.add("short", _vec(2, dim=8))
+    assert len(index) == 1
+
+
+@pytest.mark.asyncio
+async def test_find_similar_skips_deactivated_candidate():
+    service = SimilarityService.__new__(SimilarityService)
+    service.threshold = 0.85
+    service.index = EmbeddingIndex()
+    service._pgvector_available = None
+    service.index.ensure_fresh = AsyncMock()
+
+    stale_id, live_id = uuid.uuid4(), uuid.uuid4()
+    base = np.array(_vec(3))
+    service.index.add(str(stale_id), base.tolist())
+    service.index.add(str(live_id), (base + 0.01).tolist())
+
+    rows = {
+        stale_id: SimpleNamespace(id=stale_id, is_active=False, status="completed", image_url="x"),
+        live_id: SimpleNamespace(
+            id=live_id, is_active=True, status="completed", image_url="https://cdn/live.png",
+            usage_count=0, prompt_original="p", prompt_enhanced="pe",
+            video_url=None, video_url_watermarked=None,
+        ),
+    }
+    db = SimpleNamespace(get=AsyncMock(side_effect=lambda _model, key: rows[key]), commit=AsyncMock())
+
+    result = await service._find_similar_by_embedding(base.tolist(), db)
+
+    assert result["cached_id"] == str(live_id)
+    assert rows[live_id].usage_count == 1
+    assert len(service.index) == 1